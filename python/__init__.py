@@ -17,8 +17,9 @@ __version__ = '1.1.5'
 
 import os
 import sys
-import copy
+import functools
 import pydantic
+from types import MappingProxyType
 
 
 class PythonVersionChecker:
@@ -46,20 +47,29 @@ class SDKReportConfig(pydantic.BaseModel):
     appbuilder_sdk_mcp_context: str = None
 
 
-def get_default_header(mcp_context: str = None):
+def resolve_mcp_context(mcp_context: str = None):
     if not mcp_context:
         mcp_context = os.environ.get(
                 "APPBUILDER_SDK_MCP_CONTEXT", None
             )
+    return mcp_context or None
+
+
+@functools.lru_cache(maxsize=128)
+def default_header_template(mcp_context: str = None):
+    # 只读的默认header模板，同一mcp_context只构建一次SDKReportConfig
     if mcp_context:
         sdk_report_config = SDKReportConfig(appbuilder_sdk_mcp_context=mcp_context)
     else:
         sdk_report_config = SDKReportConfig()
-    default_header = {
+    return MappingProxyType({
         "X-Appbuilder-Sdk-Config": sdk_report_config.model_dump_json(exclude_none=True),
         "X-Appbuilder-Origin": "appbuilder_sdk",
-    }
-    return copy.deepcopy(default_header)
+    })
+
+
+def get_default_header(mcp_context: str = None):
+    return dict(default_header_template(resolve_mcp_context(mcp_context)))
 
 
 from .core import *
@@ -94,6 +104,8 @@ from .core.components.retriever.bes.component import BESRetriever
 from .core.components.retriever.bes.component import BESVectorStoreIndex
 from .core.components.retriever.baidu_vdb.component import BaiduVDBVectorStoreIndex
 from .core.components.retriever.baidu_vdb.component import BaiduVDBRetriever
+from .core.components.retriever.local.component import LocalVectorStoreIndex
+from .core.components.retriever.local.component import LocalRetriever
 from .core.components.retriever.baidu_vdb.component import TableParams
 from .core.components.retriever.reranker.component import Reranker
 from .core.components.ppt_generation_from_instruction.component import PPTGenerationFromInstruction
@@ -108,7 +120,7 @@ from .core.components.qrcode_ocr.component import QRcodeOCR
 from .core.components.table_ocr.component import TableOCR
 from .core.components.doc_format_converter.component import DocFormatConverter
 
-from .core.components.embeddings import Embedding
+from .core.components.embeddings import Embedding, LRUEmbeddingCache, MmapEmbeddingCache
 from .core.components.matching import Matching
 
 from .core.components.gbi.nl2sql.component import NL2Sql
@@ -148,6 +160,8 @@ __COMPONENTS__ = [
     "BESVectorStoreIndex",
     "BaiduVDBVectorStoreIndex",
     "BaiduVDBRetriever",
+    "LocalVectorStoreIndex",
+    "LocalRetriever",
     "TableParams",
     "Reranker",
     "PPTGenerationFromInstruction",
@@ -161,6 +175,8 @@ __COMPONENTS__ = [
     "TableOCR",
     "DocFormatConverter",
     "Embedding",
+    "LRUEmbeddingCache",
+    "MmapEmbeddingCache",
     "Matching",
     "NL2Sql",
     "SelectTable",
@@ -175,6 +191,8 @@ __COMPONENTS__ = [
 from appbuilder.core.message import Message
 from appbuilder.core.agent import AgentRuntime
 from appbuilder.core.user_session import UserSession
+from appbuilder.core.session_backend import (
+    SessionBackend, SQLAlchemySessionBackend, MemorySessionBackend, RedisSessionBackend)
 
 from appbuilder.utils.logger_util import logger
 
@@ -187,7 +205,7 @@ from appbuilder.core.console.appbuilder_client.appbuilder_client import AppBuild
 from appbuilder.core.console.appbuilder_client.async_appbuilder_client import AsyncAppBuilderClient
 from appbuilder.core.console.ai_search import AISearch
 from appbuilder.core.console.appbuilder_client.appbuilder_client import AgentBuilder
-from appbuilder.core.console.appbuilder_client.appbuilder_client import get_app_list, get_all_apps, describe_apps, describe_app
+from appbuilder.core.console.appbuilder_client.appbuilder_client import get_app_list, get_all_apps, iter_apps, describe_apps, describe_app
 from appbuilder.core.console.component_client.component_client import ComponentClient
 from appbuilder.core.console.knowledge_base.knowledge_base import KnowledgeBase
 from appbuilder.core.console.knowledge_base.data_class import CustomProcessRule, DocumentSource, DocumentChoices, DocumentChunker, DocumentSeparator, DocumentPattern, DocumentProcessOption, DocumentSourceUrlConfig
@@ -233,6 +251,7 @@ __all__ = [
     "ComponentClient",
     "get_app_list",
     "get_all_apps",
+    "iter_apps",
     "describe_apps",
     "describe_app",
     "KnowledgeBase",
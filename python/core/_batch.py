@@ -0,0 +1,147 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Bounded-concurrency batch execution used by Component.batch and Component.abatch"""
+
+import asyncio
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+
+def _check_args(max_concurrency: int, item_timeout: Optional[float]):
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be >= 1, got {}".format(max_concurrency))
+    if item_timeout is not None and item_timeout <= 0:
+        raise ValueError("item_timeout must be > 0, got {}".format(item_timeout))
+
+
+def _timeout_error(index: int, item_timeout: float) -> TimeoutError:
+    return TimeoutError("batch item {} timed out after {}s".format(index, item_timeout))
+
+
+def run_batch(
+    func: Callable[..., Any],
+    inputs: Sequence[Any],
+    kwargs: Dict[str, Any],
+    max_concurrency: int,
+    item_timeout: Optional[float] = None,
+    return_exceptions: bool = False,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+) -> List[Any]:
+    r"""在有界线程池中对每个输入调用func(input, **kwargs)，结果与inputs顺序一致。
+
+    item_timeout从该输入开始执行时计时，超时后以TimeoutError作为该输入的结果，但执行中的线程无法被中断，
+    会继续占用一个线程直至func返回。return_exceptions为False时遇到第一个异常即取消尚未开始的输入并抛出该异常。
+    """
+    _check_args(max_concurrency, item_timeout)
+    total = len(inputs)
+    results = [None] * total
+    completed = 0
+
+    def finish(index, result):
+        nonlocal completed
+        results[index] = result
+        completed += 1
+        if isinstance(result, BaseException) and not return_exceptions:
+            raise result
+        if progress_callback is not None:
+            progress_callback(completed, total)
+
+    if max_concurrency == 1 and item_timeout is None:
+        # 与原实现一致，在当前线程中依次执行
+        for index, inp in enumerate(inputs):
+            try:
+                result = func(inp, **kwargs)
+            except Exception as e:
+                result = e
+            finish(index, result)
+        return results
+
+    started = {}
+
+    def call(index, inp):
+        started[index] = time.monotonic()
+        return func(inp, **kwargs)
+
+    executor = ThreadPoolExecutor(max_workers=min(max_concurrency, total) or 1,
+                                  thread_name_prefix="appbuilder-batch")
+    try:
+        futures = {executor.submit(contextvars.copy_context().run, call, index, inp): index
+                   for index, inp in enumerate(inputs)}
+        pending = set(futures)
+        while pending:
+            timeout = None
+            if item_timeout is not None:
+                deadlines = [started[futures[f]] + item_timeout for f in pending if futures[f] in started]
+                timeout = max(min(deadlines) - time.monotonic(), 0) if deadlines else item_timeout
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=futures.get):
+                finish(futures[future], future.exception() or future.result())
+            if item_timeout is not None:
+                now = time.monotonic()
+                for future in sorted(pending, key=futures.get):
+                    index = futures[future]
+                    if index in started and now - started[index] >= item_timeout:
+                        pending.discard(future)
+                        finish(index, _timeout_error(index, item_timeout))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results
+
+
+async def arun_batch(
+    func: Callable[..., Awaitable[Any]],
+    inputs: Sequence[Any],
+    kwargs: Dict[str, Any],
+    max_concurrency: int,
+    item_timeout: Optional[float] = None,
+    return_exceptions: bool = False,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+) -> List[Any]:
+    r"""通过asyncio.gather并发await func(input, **kwargs)，由信号量限制同时执行的数量，结果与inputs顺序一致。
+
+    item_timeout从该输入获得信号量后开始计时，超时的协程会被取消。return_exceptions为False时遇到第一个异常即取消其余输入并抛出该异常。
+    """
+    _check_args(max_concurrency, item_timeout)
+    total = len(inputs)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    completed = 0
+
+    async def call(index, inp):
+        nonlocal completed
+        async with semaphore:
+            try:
+                if item_timeout is None:
+                    result = await func(inp, **kwargs)
+                else:
+                    result = await asyncio.wait_for(func(inp, **kwargs), item_timeout)
+            except asyncio.TimeoutError:
+                result = _timeout_error(index, item_timeout)
+            except Exception as e:
+                result = e
+        if isinstance(result, BaseException) and not return_exceptions:
+            raise result
+        completed += 1
+        if progress_callback is not None:
+            progress_callback(completed, total)
+        return result
+
+    tasks = [asyncio.ensure_future(call(index, inp)) for index, inp in enumerate(inputs)]
+    try:
+        return list(await asyncio.gather(*tasks))
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -16,17 +16,22 @@
 
 import os
 import uuid
+import logging
+import functools
+from types import MappingProxyType
 from typing import Optional
 
 import requests
-from requests.adapters import HTTPAdapter, Retry
+from requests.adapters import Retry
 from aiohttp import ClientResponse
 
 from appbuilder.utils.logger_util import logger
-from appbuilder import get_default_header
+from appbuilder import default_header_template, resolve_mcp_context
 
 from appbuilder.core._exception import *
 from appbuilder.core._session import InnerSession, AsyncInnerSession
+from appbuilder.core._pool import connection_pool_registry
+from appbuilder.core._retry import RetryPolicy, RetryingSession, AsyncRetryingSession
 from appbuilder.core.constants import (
     GATEWAY_URL,
     GATEWAY_URL_V2,
@@ -34,7 +39,13 @@ from appbuilder.core.constants import (
     CONSOLE_OPENAPI_PREFIX,
     SECRET_KEY_PREFIX,
 )
-from appbuilder.utils.logger_util import logger
+
+
+@functools.lru_cache(maxsize=256)
+def _auth_header_template(mcp_context: Optional[str], *items):
+    header = dict(default_header_template(mcp_context))
+    header.update(items)
+    return MappingProxyType(header)
 
 
 class HTTPClient:
@@ -62,7 +73,12 @@ class HTTPClient:
 
         self.session = InnerSession()
         self.retry = Retry(total=0, backoff_factor=0.1)
-        self.session.mount(self.gateway, HTTPAdapter(max_retries=self.retry))
+        # 同一网关host的所有client共享底层连接池
+        for gateway_url in (self.gateway, self.gateway_v2):
+            self.session.mount(
+                gateway_url,
+                connection_pool_registry.adapter(gateway_url, max_retries=self.retry),
+            )
 
     def _init_gateway_url(self, gateway: str):
         if not gateway and not os.getenv("GATEWAY_URL"):
@@ -106,6 +122,21 @@ class HTTPClient:
 
         logger.debug("AppBuilder Secret key: {}\n".format(self.secret_key))
 
+    def with_retry(self, retry=None) -> RetryingSession:
+        r"""with_retry is a helper method return a session view that retries with a per-call policy.
+        :param retry: int(max retries) or RetryPolicy, the shared session and self.retry are never modified.
+        :rtype: RetryingSession.
+        """
+        return RetryingSession(self.session, RetryPolicy.from_value(retry))
+
+    @staticmethod
+    def pool_stats(url: Optional[str] = None) -> dict:
+        r"""pool_stats is a helper method return shared connection pool stats per gateway host.
+        :param url: only return stats of the host of this url, default return all hosts.
+        :rtype: dict.
+        """
+        return connection_pool_registry.stats(url)
+
     @staticmethod
     def check_response_header(response: requests.Response):
         r"""check_response_header is a helper method for check head status .
@@ -221,29 +252,32 @@ class HTTPClient:
             raise AppBuilderServerException(
                 requestId, data["code"], data["message"])
 
+    @staticmethod
+    def _stamp_request_id(template, request_id: Optional[str] = None):
+        r"""copy the cached header template and stamp the per request id fields"""
+        auth_header = dict(template)
+        request_id = request_id if request_id else str(uuid.uuid4())
+        auth_header["X-Appbuilder-Request-Id"] = request_id
+        auth_header["X-Bce-Request-Id"] = request_id
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Request header: {}\n".format(auth_header))
+        return auth_header
+
     def auth_header(self, request_id: Optional[str] = None):
         r"""auth_header is a helper method return auth info"""
-        auth_header = get_default_header()
-        new_request_id = str(uuid.uuid4())
-        auth_header["X-Appbuilder-Request-Id"] = (
-            request_id if request_id else new_request_id
+        template = _auth_header_template(
+            resolve_mcp_context(),
+            ("X-Appbuilder-Authorization", self.secret_key),
         )
-        auth_header["X-Bce-Request-Id"] = request_id if request_id else new_request_id
-        auth_header["X-Appbuilder-Authorization"] = self.secret_key
-        logger.debug("Request header: {}\n".format(auth_header))
-        return auth_header
+        return self._stamp_request_id(template, request_id)
 
     def auth_header_v2(self, request_id: Optional[str] = None, mcp_context = None):
         r"""auth_header_v2 is a helper method return auth info for OpenAPI, only used by AppBuilderClient"""
-        auth_header = get_default_header(mcp_context)
-        new_request_id = str(uuid.uuid4())
-        auth_header["X-Appbuilder-Request-Id"] = (
-            request_id if request_id else new_request_id
+        template = _auth_header_template(
+            resolve_mcp_context(mcp_context),
+            ("Authorization", self.secret_key),
         )
-        auth_header["X-Bce-Request-Id"] = request_id if request_id else new_request_id
-        auth_header["Authorization"] = self.secret_key
-        logger.debug("Request header: {}\n".format(auth_header))
-        return auth_header
+        return self._stamp_request_id(template, request_id)
 
     @staticmethod
     def response_request_id(response: requests.Response):
@@ -254,7 +288,9 @@ class HTTPClient:
     def check_param(func):
         def inner(*args, **kwargs):
             retry = kwargs.get("retry", 0)
-            if retry < 0 or not isinstance(retry, int):
+            if isinstance(retry, RetryPolicy):
+                pass
+            elif not isinstance(retry, int) or retry < 0:
                 raise InvalidRequestArgumentError(
                     'Rqeuest argument "retry" format error. Expected retry >=0. Got {}'.format(
                         retry
@@ -300,6 +336,13 @@ class AsyncHTTPClient(HTTPClient):
         super().__init__(secret_key, gateway, gateway_v2)
         self.session = AsyncInnerSession()
 
+    def with_retry(self, retry=None) -> AsyncRetryingSession:
+        r"""with_retry is a helper method return an async session view that retries with a per-call policy.
+        :param retry: int(max retries) or RetryPolicy.
+        :rtype: AsyncRetryingSession.
+        """
+        return AsyncRetryingSession(self.session, RetryPolicy.from_value(retry))
+
     @staticmethod
     async def check_response_header(response: ClientResponse):
         r"""check_response_header is a helper method for check head status .
@@ -405,17 +448,13 @@ class AssistantHTTPClient(HTTPClient):
             无参数。
         """
         r"""auth_header is a helper method return auth info"""
-        auth_header = get_default_header()
-        auth_header["Authorization"] = self.secret_key
-        new_request_id = str(uuid.uuid4())
-        auth_header["X-Appbuilder-Request-Id"] = (
-            request_id if request_id else new_request_id
+        template = _auth_header_template(
+            resolve_mcp_context(),
+            ("Authorization", self.secret_key),
+            ("X-Appbuilder-Authorization", self.secret_key),
+            ("Content-Type", "application/json"),
         )
-        auth_header["X-Bce-Request-Id"] = request_id if request_id else new_request_id
-        auth_header["X-Appbuilder-Authorization"] = self.secret_key
-        auth_header["Content-Type"] = "application/json"
-        logger.debug("Request header: {}\n".format(auth_header))
-        return auth_header
+        return self._stamp_request_id(template, request_id)
 
     @staticmethod
     def check_assistant_response(request_id, data):
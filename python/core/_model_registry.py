@@ -0,0 +1,290 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Process-wide model registry shared by all LLM components"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from appbuilder.core._client import HTTPClient
+from appbuilder.core._exception import ModelNotSupportedException
+from appbuilder.utils.logger_util import logger
+from appbuilder.utils.model_util import Models, remote_model_collector
+
+
+class ModelIndex:
+    r"""某个账号在某个网关下的模型列表快照，按模型原始名称建立索引，不可变。
+
+    Args:
+        models (List[dict]): 模型列表，每一项包含name、url、apiType。
+        fetched_at (float): 模型列表的获取时间(time.time())。
+    """
+
+    __slots__ = ("models", "fetched_at")
+
+    def __init__(self, models: List[dict], fetched_at: float):
+        index = {}
+        for model in models:
+            # 与原先的线性查找保持一致：同名模型以列表中第一个为准
+            index.setdefault(model["name"], (model.get("url", ""), model.get("apiType", "")))
+        object.__setattr__(self, "models", index)
+        object.__setattr__(self, "fetched_at", fetched_at)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ModelIndex is immutable")
+
+    def __contains__(self, origin_name: str) -> bool:
+        return origin_name in self.models
+
+    def __len__(self):
+        return len(self.models)
+
+    def get(self, origin_name: str) -> Optional[Tuple[str, str]]:
+        r"""根据模型原始名称获取(url, apiType)，不存在时返回None"""
+        return self.models.get(origin_name)
+
+    def to_list(self) -> List[dict]:
+        return [{"name": name, "url": url, "apiType": api_type}
+                for name, (url, api_type) in self.models.items()]
+
+    @classmethod
+    def from_response(cls, response) -> "ModelIndex":
+        models = [{"name": model.name, "url": model.url, "apiType": model.apiType}
+                  for model in [*response.result.common, *response.result.custom]]
+        return cls(models, time.time())
+
+
+class ModelRegistry:
+    r"""进程级模型注册表，按(网关, 账号)缓存模型列表，供所有LLM组件共享，线程安全。
+
+    - 过期后采用stale-while-revalidate策略：继续返回旧数据，同时在后台线程刷新，请求不会被阻塞。
+    - 查询的模型不在列表中时，若列表已超过miss_refresh_interval秒，会同步刷新一次后再判断。
+    - 配置snapshot_path后，每次刷新成功都会将模型列表写入磁盘；冷启动时优先使用磁盘快照，
+      首次completion无需等待Models.list()返回。快照中不保存secret_key，仅保存其摘要。
+
+    Args:
+        ttl (float, optional): 模型列表的有效期(秒)。默认从环境变量APPBUILDER_MODEL_REGISTRY_TTL读取，未设置时为3600。
+        snapshot_path (str, optional): 磁盘快照文件路径。默认从环境变量APPBUILDER_MODEL_REGISTRY_SNAPSHOT读取，未设置时不使用快照。
+        miss_refresh_interval (float): 查询未命中时触发同步刷新的最小间隔(秒)。默认为60。
+
+    Examples:
+
+        .. code-block:: python
+
+            from appbuilder.core._model_registry import model_registry
+
+            model_registry.configure(ttl=600, snapshot_path="/tmp/appbuilder_models.json")
+    """
+
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        snapshot_path: Optional[str] = None,
+        miss_refresh_interval: float = 60.0,
+    ):
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._indexes: Dict[Tuple[str, str], ModelIndex] = {}
+        self._refreshing = set()
+        self.ttl = ttl if ttl is not None else float(
+            os.getenv("APPBUILDER_MODEL_REGISTRY_TTL", 3600))
+        self.snapshot_path = snapshot_path or os.getenv("APPBUILDER_MODEL_REGISTRY_SNAPSHOT") or None
+        self.miss_refresh_interval = miss_refresh_interval
+
+    def configure(
+        self,
+        ttl: Optional[float] = None,
+        snapshot_path: Optional[str] = None,
+        miss_refresh_interval: Optional[float] = None,
+    ):
+        r"""修改注册表配置，对已缓存的模型列表同样生效。
+
+        Args:
+            ttl (float, optional): 模型列表的有效期(秒)。
+            snapshot_path (str, optional): 磁盘快照文件路径，传入空字符串表示关闭快照。
+            miss_refresh_interval (float, optional): 查询未命中时触发同步刷新的最小间隔(秒)。
+
+        Returns:
+            None
+        """
+        with self._lock:
+            if ttl is not None:
+                self.ttl = ttl
+            if snapshot_path is not None:
+                self.snapshot_path = snapshot_path or None
+            if miss_refresh_interval is not None:
+                self.miss_refresh_interval = miss_refresh_interval
+
+    @staticmethod
+    def _key(client: HTTPClient) -> Tuple[str, str]:
+        return client.gateway, client.secret_key
+
+    @staticmethod
+    def _snapshot_key(key: Tuple[str, str]) -> str:
+        return hashlib.sha256("\n".join(key).encode("utf-8")).hexdigest()
+
+    def _key_lock(self, key) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get(self, client: HTTPClient) -> ModelIndex:
+        r"""获取client所属账号的模型列表索引。
+
+        已缓存时直接返回（过期则触发后台刷新）；未缓存时依次尝试磁盘快照与同步拉取。
+
+        Args:
+            client (HTTPClient): 用于拉取模型列表的客户端。
+
+        Returns:
+            ModelIndex: 模型列表索引。
+        """
+        key = self._key(client)
+        index = self._indexes.get(key)
+        if index is None:
+            with self._key_lock(key):
+                index = self._indexes.get(key)
+                if index is None:
+                    index = self._load_snapshot(key)
+                    if index is None:
+                        return self._fetch(key, client)
+                    self._indexes[key] = index
+        if time.time() - index.fetched_at >= self.ttl:
+            self._refresh_in_background(key, client)
+        return index
+
+    def refresh(self, client: HTTPClient) -> ModelIndex:
+        r"""同步刷新client所属账号的模型列表。
+
+        Args:
+            client (HTTPClient): 用于拉取模型列表的客户端。
+
+        Returns:
+            ModelIndex: 刷新后的模型列表索引。
+        """
+        key = self._key(client)
+        with self._key_lock(key):
+            return self._fetch(key, client)
+
+    def lookup(self, client: HTTPClient, model_name: str) -> Tuple[str, str]:
+        r"""根据模型名称(原始名称或简称)获取模型的(url, apiType)。
+
+        Args:
+            client (HTTPClient): 用于拉取模型列表的客户端。
+            model_name (str): 模型名称或简称。
+
+        Returns:
+            Tuple[str, str]: 模型在工作台网关的请求url及模型类型。
+
+        Raises:
+            ModelNotSupportedException: 模型不存在。
+        """
+        origin_name = remote_model_collector.get_remote_name_by_short_name(model_name) or model_name
+        index = self.get(client)
+        entry = index.get(origin_name)
+        if entry is None and time.time() - index.fetched_at >= self.miss_refresh_interval:
+            entry = self.refresh(client).get(origin_name)
+        if entry is None:
+            raise ModelNotSupportedException(f"Model[{model_name}] not available! "
+                                             f"You can query available models through: appbuilder.get_model_list()")
+        return entry
+
+    def invalidate(self, client: Optional[HTTPClient] = None):
+        r"""清除内存中的模型列表缓存，下一次查询时重新加载。
+
+        Args:
+            client (HTTPClient, optional): 仅清除该client所属账号的缓存。默认为None，清除全部。
+
+        Returns:
+            None
+        """
+        with self._lock:
+            if client is None:
+                self._indexes.clear()
+            else:
+                self._indexes.pop(self._key(client), None)
+
+    def _fetch(self, key, client: HTTPClient) -> ModelIndex:
+        index = ModelIndex.from_response(Models(client).list())
+        self._indexes[key] = index
+        self._save_snapshot(key, index)
+        return index
+
+    def _refresh_in_background(self, key, client: HTTPClient):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                with self._key_lock(key):
+                    self._fetch(key, client)
+            except Exception as e:
+                # 刷新失败时继续使用旧数据，并推迟下一次刷新，避免每次查询都触发请求
+                logger.warning("refresh model list failed, keep using stale list: {}".format(e))
+                stale = self._indexes.get(key)
+                if stale is not None:
+                    retry_at = time.time() - self.ttl + min(self.ttl, self.miss_refresh_interval)
+                    self._indexes[key] = ModelIndex(stale.to_list(), retry_at)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, name="appbuilder-model-registry", daemon=True).start()
+
+    def _load_snapshot(self, key) -> Optional[ModelIndex]:
+        if not self.snapshot_path:
+            return None
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                entry = json.load(f).get(self._snapshot_key(key))
+        except (OSError, ValueError) as e:
+            logger.debug("load model registry snapshot failed: {}".format(e))
+            return None
+        if not entry:
+            return None
+        return ModelIndex(entry["models"], entry["fetched_at"])
+
+    def _save_snapshot(self, key, index: ModelIndex):
+        if not self.snapshot_path:
+            return
+        with self._lock:
+            try:
+                try:
+                    with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                        snapshot = json.load(f)
+                except (OSError, ValueError):
+                    snapshot = {}
+                snapshot[self._snapshot_key(key)] = {
+                    "fetched_at": index.fetched_at, "models": index.to_list()}
+                directory = os.path.dirname(os.path.abspath(self.snapshot_path))
+                os.makedirs(directory, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "w", encoding="utf-8") as f:
+                        json.dump(snapshot, f, ensure_ascii=False)
+                    os.replace(tmp_path, self.snapshot_path)
+                except BaseException:
+                    os.unlink(tmp_path)
+                    raise
+            except OSError as e:
+                logger.warning("save model registry snapshot failed: {}".format(e))
+
+
+model_registry = ModelRegistry()
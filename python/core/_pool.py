@@ -0,0 +1,337 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Process-wide connection pool registry shared by all HTTPClient instances"""
+
+import socket
+import threading
+import time
+import weakref
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from requests.adapters import HTTPAdapter
+from urllib3 import PoolManager
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from appbuilder.core._session import _env_int
+
+# 同一网关host的连接由进程内所有组件共享，需按进程级并发（批量上传、batch、embedding并发等）预留连接
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 64
+
+
+class HostPoolStats:
+    r"""单个网关host的连接池统计信息，线程安全"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.in_use = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def record_checkout(self, wait_time: float):
+        with self._lock:
+            self.requests += 1
+            self.in_use += 1
+            self.wait_time_total += wait_time
+            if wait_time > self.wait_time_max:
+                self.wait_time_max = wait_time
+
+    def record_checkin(self):
+        with self._lock:
+            if self.in_use > 0:
+                self.in_use -= 1
+
+    def record_new_connection(self):
+        with self._lock:
+            self.new_connections += 1
+
+    def snapshot(self, idle_connections: int = 0) -> dict:
+        with self._lock:
+            requests = self.requests
+            reused = max(requests - self.new_connections, 0)
+            return {
+                "open_connections": self.in_use + idle_connections,
+                "in_use_connections": self.in_use,
+                "idle_connections": idle_connections,
+                "requests": requests,
+                "new_connections": self.new_connections,
+                "reuse_ratio": reused / requests if requests else 0.0,
+                "wait_time_total": self.wait_time_total,
+                "wait_time_avg": self.wait_time_total / requests if requests else 0.0,
+                "wait_time_max": self.wait_time_max,
+            }
+
+
+class _StatsPoolMixin:
+    host_stats: Optional[HostPoolStats] = None
+
+    def _new_conn(self):
+        conn = super()._new_conn()
+        if self.host_stats is not None:
+            self.host_stats.record_new_connection()
+        return conn
+
+    def _get_conn(self, timeout=None):
+        start = time.monotonic()
+        conn = super()._get_conn(timeout=timeout)
+        if self.host_stats is not None:
+            self.host_stats.record_checkout(time.monotonic() - start)
+        return conn
+
+    def _put_conn(self, conn):
+        if self.host_stats is not None:
+            self.host_stats.record_checkin()
+        return super()._put_conn(conn)
+
+    def idle_connections(self) -> int:
+        pool = self.pool
+        if pool is None:
+            return 0
+        with pool.mutex:
+            return sum(1 for conn in pool.queue if conn is not None)
+
+
+class _StatsHTTPConnectionPool(_StatsPoolMixin, HTTPConnectionPool):
+    pass
+
+
+class _StatsHTTPSConnectionPool(_StatsPoolMixin, HTTPSConnectionPool):
+    pass
+
+
+class _SharedPoolManager(PoolManager):
+    r"""按网关host共享的PoolManager，为新建的连接池挂载统计信息"""
+
+    def __init__(self, host_stats: HostPoolStats, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.host_stats = host_stats
+        # 自行记录创建过的连接池，不依赖urllib3内部的容器实现；被淘汰的连接池关闭后不再计入
+        self._created_pools = weakref.WeakSet()
+        self._created_pools_lock = threading.Lock()
+        self.pool_classes_by_scheme = {
+            "http": _StatsHTTPConnectionPool,
+            "https": _StatsHTTPSConnectionPool,
+        }
+
+    def _new_pool(self, scheme, host, port, request_context=None):
+        pool = super()._new_pool(scheme, host, port, request_context=request_context)
+        pool.host_stats = self.host_stats
+        with self._created_pools_lock:
+            self._created_pools.add(pool)
+        return pool
+
+    def idle_connections(self) -> int:
+        with self._created_pools_lock:
+            pools = list(self._created_pools)
+        return sum(pool.idle_connections() for pool in pools if isinstance(pool, _StatsPoolMixin))
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    r"""使用ConnectionPoolRegistry中共享连接池的HTTPAdapter。
+
+    每个HTTPClient持有自己的Adapter（因此可以拥有独立的重试策略），
+    但底层的TCP/TLS连接由同一网关host的所有Adapter共享。
+    """
+
+    def __init__(self, registry: "ConnectionPoolRegistry", url: str, **kwargs):
+        self._registry = registry
+        self._pool_url = url
+        super().__init__(**kwargs)
+
+    @property
+    def poolmanager(self):
+        # 每次从registry中获取，使configure()对已创建的client同样生效
+        return self._registry.pool_manager(self._pool_url)
+
+    @poolmanager.setter
+    def poolmanager(self, value):
+        pass
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+
+    def close(self):
+        # 共享连接池由registry统一管理，此处仅关闭代理连接
+        for proxy in self.proxy_manager.values():
+            proxy.clear()
+
+
+class ConnectionPoolRegistry:
+    r"""进程级共享连接池注册表，按网关host复用连接，线程安全。
+
+    同一网关host只有一个PoolManager，进程内所有HTTPClient共享其中的连接，
+    因此pool_maxsize应按整个进程对该host的最大并发请求数设置，而不是单个client的并发数。
+
+    Args:
+        pool_connections (int, optional): 每个网关host的PoolManager最多缓存的连接池数量（按scheme/host/port区分，
+            同一网关通常只需一个），进程内所有client共享。默认为None，读取环境变量APPBUILDER_POOL_CONNECTIONS，未设置时为10。
+        pool_maxsize (int, optional): 每个连接池保存的最大空闲连接数，由进程内访问该host的所有client共享。
+            默认为None，读取环境变量APPBUILDER_POOL_MAXSIZE，未设置时为64。
+        pool_block (bool): 连接池耗尽时是否阻塞等待空闲连接。默认为False。
+        keep_alive (bool): 是否开启TCP keep-alive。默认为True。
+        keep_alive_idle (int, optional): TCP keep-alive 空闲探测间隔(秒)，仅在支持的平台生效。默认为None。
+
+    Examples:
+
+        .. code-block:: python
+
+            from appbuilder.core._pool import connection_pool_registry
+
+            connection_pool_registry.configure(pool_maxsize=50, pool_block=True)
+            print(connection_pool_registry.stats())
+    """
+
+    def __init__(
+        self,
+        pool_connections: Optional[int] = None,
+        pool_maxsize: Optional[int] = None,
+        pool_block: bool = False,
+        keep_alive: bool = True,
+        keep_alive_idle: Optional[int] = None,
+    ):
+        self._lock = threading.Lock()
+        self._managers: Dict[str, _SharedPoolManager] = {}
+        self._stats: Dict[str, HostPoolStats] = {}
+        self.pool_connections = pool_connections if pool_connections is not None else _env_int(
+            "APPBUILDER_POOL_CONNECTIONS", DEFAULT_POOL_CONNECTIONS)
+        self.pool_maxsize = pool_maxsize if pool_maxsize is not None else _env_int(
+            "APPBUILDER_POOL_MAXSIZE", DEFAULT_POOL_MAXSIZE)
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.keep_alive_idle = keep_alive_idle
+
+    def configure(
+        self,
+        pool_connections: Optional[int] = None,
+        pool_maxsize: Optional[int] = None,
+        pool_block: Optional[bool] = None,
+        keep_alive: Optional[bool] = None,
+        keep_alive_idle: Optional[int] = None,
+    ):
+        r"""修改连接池配置并关闭已有的空闲连接，新配置在下一次请求时生效。
+
+        Args:
+            pool_connections (int, optional): 每个网关host的PoolManager最多缓存的连接池数量。
+            pool_maxsize (int, optional): 每个连接池保存的最大空闲连接数，由进程内所有client共享。
+            pool_block (bool, optional): 连接池耗尽时是否阻塞等待。
+            keep_alive (bool, optional): 是否开启TCP keep-alive。
+            keep_alive_idle (int, optional): TCP keep-alive 空闲探测间隔(秒)。
+
+        Returns:
+            None
+        """
+        with self._lock:
+            if pool_connections is not None:
+                self.pool_connections = pool_connections
+            if pool_maxsize is not None:
+                self.pool_maxsize = pool_maxsize
+            if pool_block is not None:
+                self.pool_block = pool_block
+            if keep_alive is not None:
+                self.keep_alive = keep_alive
+            if keep_alive_idle is not None:
+                self.keep_alive_idle = keep_alive_idle
+            for manager in self._managers.values():
+                manager.clear()
+            self._managers.clear()
+
+    @staticmethod
+    def host_key(url: str) -> str:
+        r"""将url归一化为"scheme://netloc"形式的注册表key"""
+        parsed = urlparse(url)
+        scheme = parsed.scheme or "https"
+        return "{}://{}".format(scheme, parsed.netloc or parsed.path).rstrip("/")
+
+    def _socket_options(self):
+        options = list(HTTPConnection.default_socket_options)
+        if self.keep_alive:
+            options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+            if self.keep_alive_idle and hasattr(socket, "TCP_KEEPIDLE"):
+                options.append(
+                    (socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, int(self.keep_alive_idle)))
+        return options
+
+    def pool_manager(self, url: str) -> PoolManager:
+        r"""获取url所属host的共享PoolManager，不存在时创建"""
+        key = self.host_key(url)
+        manager = self._managers.get(key)
+        if manager is not None:
+            return manager
+        with self._lock:
+            manager = self._managers.get(key)
+            if manager is None:
+                stats = self._stats.setdefault(key, HostPoolStats())
+                manager = _SharedPoolManager(
+                    stats,
+                    num_pools=self.pool_connections,
+                    maxsize=self.pool_maxsize,
+                    block=self.pool_block,
+                    socket_options=self._socket_options(),
+                )
+                self._managers[key] = manager
+            return manager
+
+    def adapter(self, url: str, **kwargs) -> PooledHTTPAdapter:
+        r"""创建挂载到url所属host共享连接池上的HTTPAdapter
+
+        Args:
+            url (str): 网关地址。
+            **kwargs: 透传给HTTPAdapter的参数，如max_retries。
+
+        Returns:
+            PooledHTTPAdapter: 使用共享连接池的Adapter。
+        """
+        return PooledHTTPAdapter(self, url, **kwargs)
+
+    def stats(self, url: Optional[str] = None) -> Dict[str, dict]:
+        r"""获取各host连接池的统计信息。
+
+        Args:
+            url (str, optional): 仅返回该url所属host的统计信息。默认为None，返回全部host。
+
+        Returns:
+            Dict[str, dict]: host到统计信息的映射，统计信息包括open_connections、idle_connections、
+                in_use_connections、requests、new_connections、reuse_ratio、wait_time_total、
+                wait_time_avg、wait_time_max。
+        """
+        with self._lock:
+            items = list(self._stats.items())
+            managers = dict(self._managers)
+        if url is not None:
+            key = self.host_key(url)
+            items = [(k, v) for k, v in items if k == key]
+        result = {}
+        for key, stats in items:
+            manager = managers.get(key)
+            idle = manager.idle_connections() if manager is not None else 0
+            result[key] = stats.snapshot(idle_connections=idle)
+        return result
+
+    def clear(self):
+        r"""关闭所有共享连接并清空统计信息"""
+        with self._lock:
+            for manager in self._managers.values():
+                manager.clear()
+            self._managers.clear()
+            self._stats.clear()
+
+
+connection_pool_registry = ConnectionPoolRegistry()
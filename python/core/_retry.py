@@ -0,0 +1,240 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per-call retry policy shared by HTTPClient and AsyncHTTPClient"""
+
+import asyncio
+import email.utils
+import random
+import time
+from typing import Optional, Tuple, Union
+
+import aiohttp
+import requests
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+from appbuilder.utils.logger_util import logger
+
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "PUT", "DELETE", "OPTIONS"])
+
+
+class RetryPolicy:
+    r"""单次请求的重试策略，不可变对象，可在多线程间安全共享。
+
+    仅在拿到响应头之前（连接失败、可重试状态码）重试，流式请求一旦开始读取响应体便不再重试。
+    对于POST等非幂等请求，读超时等可能已被服务端处理的错误不会重试。
+
+    Args:
+        max_retries (int): 最大重试次数，总请求次数为max_retries + 1。默认为0，即不重试。
+        backoff_factor (float): 指数退避因子，第n次重试前等待 backoff_factor * 2 ** n 秒。默认为0.1。
+        backoff_max (float): 单次退避等待的最大秒数。默认为20。
+        jitter (float): 退避抖动比例，取值[0, 1]，实际等待时间在[(1 - jitter) * delay, delay]间随机。默认为0.5。
+        retryable_status_codes (Tuple[int]): 需要重试的HTTP状态码。默认为(429, 500, 502, 503, 504)。
+        respect_retry_after (bool): 是否遵循服务端返回的Retry-After头。默认为True。
+        max_retry_after (float): Retry-After超过该秒数时不再重试，直接返回响应。默认为60。
+    """
+
+    __slots__ = ("max_retries", "backoff_factor", "backoff_max", "jitter",
+                 "retryable_status_codes", "respect_retry_after", "max_retry_after")
+
+    def __init__(
+        self,
+        max_retries: int = 0,
+        backoff_factor: float = 0.1,
+        backoff_max: float = 20.0,
+        jitter: float = 0.5,
+        retryable_status_codes: Tuple[int, ...] = (429, 500, 502, 503, 504),
+        respect_retry_after: bool = True,
+        max_retry_after: float = 60.0,
+    ):
+        if not isinstance(max_retries, int) or max_retries < 0:
+            raise ValueError("max_retries must be an int >= 0, got {}".format(max_retries))
+        if not 0 <= jitter <= 1:
+            raise ValueError("jitter must be in [0, 1], got {}".format(jitter))
+        object.__setattr__(self, "max_retries", max_retries)
+        object.__setattr__(self, "backoff_factor", backoff_factor)
+        object.__setattr__(self, "backoff_max", backoff_max)
+        object.__setattr__(self, "jitter", jitter)
+        object.__setattr__(self, "retryable_status_codes", frozenset(retryable_status_codes))
+        object.__setattr__(self, "respect_retry_after", respect_retry_after)
+        object.__setattr__(self, "max_retry_after", max_retry_after)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("RetryPolicy is immutable")
+
+    def __repr__(self):
+        return "RetryPolicy(max_retries={}, backoff_factor={}, backoff_max={}, jitter={}, " \
+               "retryable_status_codes={}, respect_retry_after={})".format(
+                   self.max_retries, self.backoff_factor, self.backoff_max, self.jitter,
+                   sorted(self.retryable_status_codes), self.respect_retry_after)
+
+    @classmethod
+    def from_value(cls, retry: Union[int, "RetryPolicy", None]) -> "RetryPolicy":
+        r"""将组件run方法的retry参数(int或RetryPolicy)转换为RetryPolicy"""
+        if isinstance(retry, RetryPolicy):
+            return retry
+        if retry is None or retry <= 0:
+            # 与urllib3 Retry(total<0)的行为保持一致，负数视为不重试
+            return NO_RETRY
+        return cls(max_retries=retry)
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        r"""计算第attempt次重试前需要等待的秒数"""
+        if retry_after is not None:
+            return retry_after
+        delay = min(self.backoff_max, self.backoff_factor * (2 ** attempt))
+        if self.jitter:
+            delay = random.uniform(delay * (1 - self.jitter), delay)
+        return delay
+
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        r"""解析Retry-After头，支持秒数及HTTP日期两种格式"""
+        if not value:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        try:
+            retry_date = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_date is None:
+            return None
+        return max(retry_date.timestamp() - time.time(), 0.0)
+
+    def status_retry_delay(self, attempt: int, status_code: int, headers) -> Optional[float]:
+        r"""根据响应状态码判断是否需要重试，需要时返回等待秒数，否则返回None"""
+        if attempt >= self.max_retries or status_code not in self.retryable_status_codes:
+            return None
+        retry_after = None
+        if self.respect_retry_after:
+            retry_after = self.parse_retry_after(headers.get("Retry-After"))
+            if retry_after is not None and retry_after > self.max_retry_after:
+                return None
+        return self.backoff(attempt, retry_after)
+
+    def exception_retry_delay(self, attempt: int, method: str, connect_error: bool) -> Optional[float]:
+        r"""根据请求异常判断是否需要重试，需要时返回等待秒数，否则返回None"""
+        if attempt >= self.max_retries:
+            return None
+        if not connect_error and method.upper() not in IDEMPOTENT_METHODS:
+            return None
+        return self.backoff(attempt)
+
+
+NO_RETRY = RetryPolicy()
+
+
+def _is_connect_error(e: Exception) -> bool:
+    # 连接建立阶段的失败，请求尚未发出，任何方法均可安全重试
+    # trace开启时异常会被重新构造并丢失args，原始异常保存在__cause__/__context__中
+    seen = set()
+    while e is not None and id(e) not in seen:
+        seen.add(id(e))
+        if isinstance(e, requests.exceptions.ConnectTimeout):
+            return True
+        if isinstance(e, requests.exceptions.ReadTimeout):
+            return False
+        reason = getattr(e.args[0], "reason", None) if e.args else None
+        if isinstance(reason, (NewConnectionError, ConnectTimeoutError)):
+            return True
+        e = e.__cause__ or e.__context__
+    return False
+
+
+class RetryingSession:
+    r"""按指定RetryPolicy发起请求的轻量会话视图，底层复用HTTPClient的session"""
+
+    def __init__(self, session, policy: RetryPolicy):
+        self._session = session
+        self._policy = policy
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        send = getattr(self._session, method.lower())
+        attempt = 0
+        while True:
+            try:
+                response = send(url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                delay = self._policy.exception_retry_delay(attempt, method, _is_connect_error(e))
+                if delay is None:
+                    raise
+                logger.warning("{} {} failed: {}, retry {}/{} in {:.2f}s".format(
+                    method, url, e, attempt + 1, self._policy.max_retries, delay))
+            else:
+                delay = self._policy.status_retry_delay(attempt, response.status_code, response.headers)
+                if delay is None:
+                    return response
+                logger.warning("{} {} got http status {}, retry {}/{} in {:.2f}s".format(
+                    method, url, response.status_code, attempt + 1, self._policy.max_retries, delay))
+                response.close()
+            attempt += 1
+            time.sleep(delay)
+
+    def post(self, url, data=None, json=None, **kwargs):
+        return self._request("POST", url, data=data, json=json, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self._request("GET", url, **kwargs)
+
+    def put(self, url, data=None, **kwargs):
+        return self._request("PUT", url, data=data, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self._request("DELETE", url, **kwargs)
+
+
+class AsyncRetryingSession:
+    r"""按指定RetryPolicy发起请求的异步会话视图，底层复用AsyncHTTPClient的session"""
+
+    def __init__(self, session, policy: RetryPolicy):
+        self._session = session
+        self._policy = policy
+
+    async def _request(self, method: str, url: str, **kwargs) -> aiohttp.ClientResponse:
+        send = getattr(self._session, method.lower())
+        attempt = 0
+        while True:
+            try:
+                response = await send(url, **kwargs)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                connect_error = isinstance(e, aiohttp.ClientConnectorError)
+                delay = self._policy.exception_retry_delay(attempt, method, connect_error)
+                if delay is None:
+                    raise
+                logger.warning("{} {} failed: {}, retry {}/{} in {:.2f}s".format(
+                    method, url, e, attempt + 1, self._policy.max_retries, delay))
+            else:
+                delay = self._policy.status_retry_delay(attempt, response.status, response.headers)
+                if delay is None:
+                    return response
+                logger.warning("{} {} got http status {}, retry {}/{} in {:.2f}s".format(
+                    method, url, response.status, attempt + 1, self._policy.max_retries, delay))
+                response.release()
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def post(self, url, data=None, json=None, **kwargs):
+        return await self._request("POST", url, data=data, json=json, **kwargs)
+
+    async def get(self, url, **kwargs):
+        return await self._request("GET", url, **kwargs)
+
+    async def put(self, url, data=None, **kwargs):
+        return await self._request("PUT", url, data=data, **kwargs)
+
+    async def delete(self, url, **kwargs):
+        return await self._request("DELETE", url, **kwargs)
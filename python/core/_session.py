@@ -12,14 +12,84 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
+import itertools
+import logging
 import requests
 import json
 import aiohttp
+from typing import Optional
 from aiohttp import ClientSession, hdrs
 from appbuilder.utils.logger_util import logger
 from appbuilder.utils.trace.tracer_wrapper import session_post
 
 
+# 采样日志以INFO级别输出，其中的鉴权信息需要脱敏
+_SENSITIVE_HEADERS = {"authorization", "x-appbuilder-authorization", "x-bce-authorization"}
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning("invalid {0}={1!r}, fallback to {2}".format(name, value, default))
+        return default
+
+
+def _header_value(key, value, mask_auth: bool):
+    if mask_auth and key.lower() in _SENSITIVE_HEADERS:
+        return "***"
+    return value
+
+
+class RequestLogSampler:
+    r"""请求日志采样器，DEBUG关闭时每N个请求以INFO级别输出一次截断后的cURL命令。
+
+    Args:
+        sample_rate (int): 采样间隔N，每N个请求记录1个，<=0表示关闭采样。
+            默认从环境变量中获取: os.getenv("APPBUILDER_REQUEST_LOG_SAMPLE_RATE", "0")
+        max_body_size (int): 采样日志中请求体的最大长度(字符)，超出部分被截断。
+            默认从环境变量中获取: os.getenv("APPBUILDER_REQUEST_LOG_MAX_BODY_SIZE", "1024")
+    """
+
+    def __init__(self, sample_rate: Optional[int] = None, max_body_size: Optional[int] = None):
+        self._counter = itertools.count()
+        self.sample_rate = 0
+        self.max_body_size = 1024
+        self.configure(
+            sample_rate if sample_rate is not None else _env_int(
+                "APPBUILDER_REQUEST_LOG_SAMPLE_RATE", 0),
+            max_body_size if max_body_size is not None else _env_int(
+                "APPBUILDER_REQUEST_LOG_MAX_BODY_SIZE", 1024),
+        )
+
+    def configure(self, sample_rate: Optional[int] = None, max_body_size: Optional[int] = None):
+        r"""修改采样间隔及请求体截断长度"""
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if max_body_size is not None:
+            self.max_body_size = max_body_size
+        self._counter = itertools.count()
+
+    def should_sample(self) -> bool:
+        r"""判断当前请求是否需要被采样记录"""
+        if self.sample_rate <= 0:
+            return False
+        return next(self._counter) % self.sample_rate == 0
+
+
+request_log_sampler = RequestLogSampler()
+
+
+def _truncate_body(body: str, max_body_size: Optional[int]) -> str:
+    if max_body_size is None or len(body) <= max_body_size:
+        return body
+    return "{0}...(truncated, {1} chars in total)".format(body[:max_body_size], len(body))
+
+
 class InnerSession(requests.sessions.Session):
 
     def __init__(self, *args, **kwargs):
@@ -28,14 +98,17 @@ class InnerSession(requests.sessions.Session):
         """
         super(InnerSession, self).__init__(*args, **kwargs)
 
-    def build_curl(self, request: requests.PreparedRequest) -> str:
+    def build_curl(self, request: requests.PreparedRequest, max_body_size: Optional[int] = None,
+                   mask_auth: bool = False) -> str:
         """
         Generate cURL command from prepared request object.
+        Request body longer than max_body_size is truncated without being re-parsed,
+        streamed bodies are replaced by a placeholder, and auth headers are masked if mask_auth is True.
         """
         curl = "curl -X {0} -L '{1}' \\\n".format(request.method, request.url)
 
         headers = [
-            "-H '{0}: {1}' \\".format(k, v)
+            "-H '{0}: {1}' \\".format(k, _header_value(k, v, mask_auth))
             for k, v in request.headers.items()
             if k != "Content-Length"
         ]
@@ -43,7 +116,17 @@ class InnerSession(requests.sessions.Session):
         if headers:
             headers[-1] = headers[-1].rstrip(" \\")
         curl += "\n".join(headers)
-        if request.body:
+        if request.body is not None and not isinstance(request.body, (str, bytes)):
+            # 文件、生成器等流式请求体只能读取一次，不能在日志中展开
+            curl += " \\\n-d '<streamed body>'"
+        elif request.body:
+            if max_body_size is not None and len(request.body) > max_body_size:
+                body = request.body[:max_body_size]
+                if isinstance(body, bytes):
+                    body = body.decode("utf-8", errors="replace")
+                curl += " \\\n-d '{0}...(truncated, {1} bytes in total)'".format(
+                    body, len(request.body))
+                return curl
             try:
                 body = json.loads(request.body)
                 body = "'{0}'".format(json.dumps(body, ensure_ascii=False))
@@ -56,7 +139,12 @@ class InnerSession(requests.sessions.Session):
         """
         Send request using inner session.
         """
-        logger.debug("Curl Command:\n" + self.build_curl(request) + "\n")
+        # 仅在DEBUG开启或命中采样时才渲染cURL，避免每次请求重复序列化请求体
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Curl Command:\n" + self.build_curl(request) + "\n")
+        elif logger.isEnabledFor(logging.INFO) and request_log_sampler.should_sample():
+            logger.info("Sampled Curl Command:\n" + self.build_curl(
+                request, max_body_size=request_log_sampler.max_body_size, mask_auth=True) + "\n")
         return super(InnerSession, self).send(request, **kwargs)
 
     @session_post
@@ -84,43 +172,53 @@ class AsyncInnerSession(ClientSession):
         """
         super(AsyncInnerSession, self).__init__(*args, **kwargs)
 
-    async def build_curl(self, method, url, data=None, json_data=None, **kwargs) -> str:
+    async def build_curl(self, method, url, data=None, json_data=None, max_body_size=None, mask_auth=False,
+                         **kwargs) -> str:
         """
         Generate cURL command from prepared request object.
+        Request body longer than max_body_size is truncated, and auth headers are masked if mask_auth is True.
         """
         curl = "curl -X {0} -L '{1}' \\\n".format(method, url)
 
         headers = kwargs.get("headers", {})
         headers_strs = [
-            "-H '{0}: {1}' \\".format(k, v) for k, v in headers.items()]
+            "-H '{0}: {1}' \\".format(k, _header_value(k, v, mask_auth)) for k, v in headers.items()]
         if headers_strs:
             headers_strs[-1] = headers_strs[-1].rstrip(" \\")
         curl += "\n".join(headers_strs)
 
         if data:
             try:
-                body = "'{0}'".format(json.dumps(data, ensure_ascii=False))
-                curl += " \\\n-d {0}".format(body)
+                body = _truncate_body(json.dumps(data, ensure_ascii=False), max_body_size)
+                curl += " \\\n-d '{0}'".format(body)
             except:
                 pass
         elif json_data:
-            body = "'{0}'".format(json.dumps(json_data, ensure_ascii=False))
-            curl += " \\\n-d {0}".format(body)
+            body = _truncate_body(json.dumps(json_data, ensure_ascii=False), max_body_size)
+            curl += " \\\n-d '{0}'".format(body)
 
         return curl
 
+    async def _log_request(self, method, url, **kwargs):
+        # 仅在DEBUG开启或命中采样时才渲染cURL，避免每次请求重复序列化请求体
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Curl Command:\n" + await self.build_curl(method, url, **kwargs) + "\n")
+        elif logger.isEnabledFor(logging.INFO) and request_log_sampler.should_sample():
+            logger.info("Sampled Curl Command:\n" + await self.build_curl(
+                method, url, max_body_size=request_log_sampler.max_body_size, mask_auth=True, **kwargs) + "\n")
+
     async def post(self, url, data=None, json=None, **kwargs):
-        logger.debug("Curl Command:\n" + await self.build_curl(hdrs.METH_POST, url, data=data, json_data=json, **kwargs) + "\n")
+        await self._log_request(hdrs.METH_POST, url, data=data, json_data=json, **kwargs)
         return await super().post(url=url, data=data, json=json, **kwargs)
 
     async def delete(self, url, **kwargs):
-        logger.debug("Curl Command:\n" + await self.build_curl(hdrs.METH_DELETE, url, **kwargs) + "\n")
+        await self._log_request(hdrs.METH_DELETE, url, **kwargs)
         return await super().delete(url=url, **kwargs)
 
     async def get(self, url, **kwargs):
-        logger.debug("Curl Command:\n" + await self.build_curl(hdrs.METH_GET, url, **kwargs) + "\n")
+        await self._log_request(hdrs.METH_GET, url, **kwargs)
         return await super().get(url=url, **kwargs)
 
     async def put(self, url, data=None, **kwargs):
-        logger.debug("Curl Command:\n" + await self.build_curl(hdrs.METH_PUT, url, data=data, **kwargs) + "\n")
+        await self._log_request(hdrs.METH_PUT, url, data=data, **kwargs)
         return await super().put(url=url, data=data, **kwargs)
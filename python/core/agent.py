@@ -12,14 +12,19 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import sys
-import copy
 import os
 import logging
 import uuid
 import json
 import shutil
 import inspect
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pydantic import BaseModel, model_validator, Extra
+from pydantic_core import to_jsonable_python
 from typing import Optional, Dict, Any, Union
 import appbuilder
 from appbuilder.core.context import init_context
@@ -31,6 +36,213 @@ from appbuilder.core.console.appbuilder_client.data_class import ToolChoiceFunct
 # 流式场景首包超时时，最大重试次数
 MAX_RETRY_COUNT = 3
 
+_STREAM_END = object()
+
+
+class _SSEMessageEncoder(object):
+    r"""AgentRuntime 流式响应的 SSE 事件编码器。
+
+    事件信封（code、session_id 以及 answer_message 中除 content 以外的字段）序列化后缓存为前后缀，
+    每个分片只序列化 content 并拼接到前后缀之间，不再逐分片 deepcopy 整个 Message 并多次 JSON 往返。
+    组件可能在迭代过程中更新 Message 的其它字段（如 LLMMessage 的 extra、token_usage），
+    因此每个分片都会比较一次除 content 外的字段，变化后才重新生成信封。
+
+    Args:
+        session_id (str): 会话ID。
+        answer (Message): 组件返回的 Message。
+    """
+
+    _PLACEHOLDER = "__appbuilder_sse_content_{}__".format(uuid.uuid4().hex)
+
+    def __init__(self, session_id: str, answer: Message):
+        self.session_id = session_id
+        self.answer = answer
+        self._metadata = None
+        self._envelopes = {}
+
+    def _envelope(self, is_completion: bool):
+        metadata = self.answer.model_dump_json(exclude={"content"}, exclude_none=True)
+        if metadata != self._metadata:
+            self._metadata = metadata
+            self._envelopes = {}
+        envelope = self._envelopes.get(is_completion)
+        if envelope is None:
+            answer_message = {"content": self._PLACEHOLDER}
+            answer_message.update(json.loads(metadata))
+            text = json.dumps({
+                "code": 0, "message": "",
+                "result": {
+                    "session_id": self.session_id,
+                    "is_completion": is_completion,
+                    "answer_message": answer_message
+                }
+            }, ensure_ascii=False)
+            prefix, suffix = text.split(json.dumps(self._PLACEHOLDER), 1)
+            envelope = self._envelopes[is_completion] = ("data: " + prefix, suffix + "\n\n")
+        return envelope
+
+    def encode(self, content: Any, is_completion: bool = False) -> str:
+        r"""编码一个流式分片
+
+        Args:
+            content (Any): 分片内容，与 Message.content 的序列化方式一致。
+            is_completion (bool): 是否为结束事件。
+
+        Returns:
+            str: SSE 事件文本。
+        """
+        if content is None:
+            # exclude_none 时不输出 content 字段
+            answer_message = json.loads(self.answer.model_dump_json(exclude={"content"}, exclude_none=True))
+            return "data: " + json.dumps({
+                "code": 0, "message": "",
+                "result": {
+                    "session_id": self.session_id,
+                    "is_completion": is_completion,
+                    "answer_message": answer_message
+                }
+            }, ensure_ascii=False) + "\n\n"
+        prefix, suffix = self._envelope(is_completion)
+        if type(content) is not str:
+            content = to_jsonable_python(content, exclude_none=True)
+        return prefix + json.dumps(content, ensure_ascii=False) + suffix
+
+
+class _SyncStreamPuller(object):
+    r"""在线程池中逐个拉取同步迭代器的元素。
+
+    拉取与关闭在同一把锁下串行执行，客户端断开后提交的关闭操作会等待正在进行的拉取结束，
+    避免在另一个线程中关闭正在执行的生成器。所有调用都在请求的 contextvars 上下文中执行，
+    保证组件内部可以通过 get_context 获取到当前 Session。
+    """
+
+    def __init__(self, iterable, context: contextvars.Context):
+        self._iterable = iterable
+        self._iterator = None
+        self._context = context
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def next(self):
+        with self._lock:
+            if self._closed:
+                return _STREAM_END
+            if self._iterator is None:
+                self._iterator = self._context.run(iter, self._iterable)
+            return self._context.run(next, self._iterator, _STREAM_END)
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            close = getattr(self._iterator, "close", None)
+            if close is not None:
+                self._context.run(close)
+
+
+class _ContentStream(object):
+    r"""将 Message.content 统一为异步迭代器。
+
+    content 为异步迭代器时直接迭代；否则每次只在线程池中拉取一个元素，下游未消费时不会继续拉取，
+    从而把客户端的背压传递到组件。
+
+    Args:
+        content: 流式返回的 Message.content。
+        executor (Optional[ThreadPoolExecutor]): 拉取同步迭代器使用的线程池，为None时使用事件循环默认线程池。
+        context (contextvars.Context): 执行同步迭代器时使用的上下文。
+    """
+
+    def __init__(self, content, executor: Optional[ThreadPoolExecutor], context: contextvars.Context):
+        self._executor = executor
+        self._exhausted = False
+        if hasattr(content, "__aiter__"):
+            self._aiterator = content.__aiter__()
+            self._puller = None
+        else:
+            self._aiterator = None
+            self._puller = _SyncStreamPuller(content, context)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._aiterator is not None:
+            return await self._aiterator.__anext__()
+        loop = asyncio.get_running_loop()
+        item = await loop.run_in_executor(self._executor, self._puller.next)
+        if item is _STREAM_END:
+            self._exhausted = True
+            raise StopAsyncIteration
+        return item
+
+    def close(self):
+        r"""关闭底层迭代器，不等待关闭完成"""
+        if self._exhausted:
+            return
+        if self._puller is not None:
+            try:
+                if self._executor is not None:
+                    self._executor.submit(self._puller.close)
+                else:
+                    asyncio.get_running_loop().run_in_executor(None, self._puller.close)
+            except RuntimeError:
+                # 线程池已关闭或事件循环已退出
+                self._puller.close()
+        elif hasattr(self._aiterator, "aclose"):
+            try:
+                asyncio.ensure_future(self._aiterator.aclose())
+            except RuntimeError:
+                pass
+
+
+class _SSEStreamResponse(object):
+    r"""ASGI 流式响应。
+
+    在发送事件的同时监听 http.disconnect，客户端断开后立即取消事件生成并关闭事件生成器，
+    不依赖下一次写入失败才发现断开。send 在传输层缓冲区满时会挂起，此时事件生成也随之暂停。
+
+    Args:
+        body_iterator (AsyncGenerator[str]): SSE 事件生成器。
+        on_close (Callable[[], None]): 响应结束（包括客户端断开）时的回调。
+    """
+
+    def __init__(self, body_iterator, on_close=None):
+        self.body_iterator = body_iterator
+        self.on_close = on_close
+
+    async def _stream(self, send):
+        await send({
+            "type": "http.response.start", "status": 200,
+            "headers": [(b"content-type", b"text/event-stream; charset=utf-8")],
+        })
+        async for chunk in self.body_iterator:
+            await send({"type": "http.response.body", "body": chunk.encode("utf-8"), "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def _wait_disconnect(self, receive):
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+
+    async def __call__(self, scope, receive, send):
+        stream_task = asyncio.ensure_future(self._stream(send))
+        disconnect_task = asyncio.ensure_future(self._wait_disconnect(receive))
+        try:
+            await asyncio.wait({stream_task, disconnect_task}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in (stream_task, disconnect_task):
+                task.cancel()
+            await asyncio.gather(stream_task, disconnect_task, return_exceptions=True)
+            await self.body_iterator.aclose()
+            if self.on_close is not None:
+                self.on_close()
+        if not stream_task.cancelled() and stream_task.exception() is not None:
+            # 写入失败说明客户端已断开，无需继续抛出
+            if not isinstance(stream_task.exception(), OSError):
+                raise stream_task.exception()
+
 
 class AgentRuntime(BaseModel):
     r"""
@@ -247,6 +459,31 @@ class AgentRuntime(BaseModel):
         """
         return self.component.run(message=message, stream=stream, **args)
 
+    def _component_supports_async(self) -> bool:
+        return type(self.component).arun is not Component.arun
+
+    async def _achat(self, executor: Optional[ThreadPoolExecutor], context: contextvars.Context,
+                     message: Message, stream: bool = False, **args) -> Message:
+        if self._component_supports_async():
+            return await self.component.arun(message=message, stream=stream, **args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            executor, functools.partial(context.run, self.chat, message, stream, **args))
+
+    async def achat(self, message: Message, stream: bool = False, **args) -> Message:
+        """
+        异步执行一次对话。组件实现了 arun 时直接调用 arun，否则在线程池中调用 run，不阻塞事件循环。
+
+        Args:
+            message (Message): 该次对话用户输入的 Message
+            stream (bool): 是否流式请求
+            **args: 其他参数，会被透传到 component
+
+        Returns:
+            Message(Message): 返回的 Message
+        """
+        return await self._achat(None, contextvars.copy_context(), message, stream, **args)
+
     def create_flask_app(self, url_rule="/chat"):
         """ 
         创建 Flask 应用，主要用于 Gunicorn 这样的 WSGI 服务器来运行服务。
@@ -364,19 +601,10 @@ class AgentRuntime(BaseModel):
                         else:  # 调用chat方法成功，开始生成流式事件
                             content_iterator = iter(answer.content)
                             answer.content = None
-                            result = None
+                            encoder = _SSEMessageEncoder(session_id, answer)
                             try:
                                 for sub_content in content_iterator:
-                                    result = copy.deepcopy(answer)
-                                    result.content = sub_content
-                                    yield "data: " + json.dumps({
-                                        "code": 0, "message": "",
-                                        "result": {
-                                            "session_id": session_id,
-                                            "is_completion": False,
-                                            "answer_message": json.loads(result.json(exclude_none=True))
-                                        }
-                                    }, ensure_ascii=False) + "\n\n"
+                                    yield encoder.encode(sub_content)
                                     received_first_packet = True
                             except Exception as e:
                                 retry_count += 1
@@ -395,15 +623,7 @@ class AgentRuntime(BaseModel):
                                     err_resp = {"code": code, "message": "InternalServerError", "result": None}
                                     yield "data: " + json.dumps(err_resp, ensure_ascii=False) + "\n\n"
                                     return
-                            result.content = ""
-                            yield "data: " + json.dumps({
-                                "code": 0, "message": "",
-                                "result": {
-                                    "session_id": session_id,
-                                    "is_completion": True,
-                                    "answer_message": json.loads(result.json(exclude_none=True))
-                                }
-                            }, ensure_ascii=False) + "\n\n"
+                            yield encoder.encode("", is_completion=True)
                             logging.info(
                                 f"request_id={request_id}, session_id={session_id}]"
                                 f"retry_count={retry_count}, success response", exc_info=True)
@@ -416,7 +636,7 @@ class AgentRuntime(BaseModel):
             if not stream:  # 非流式
                 try:
                     answer = self.chat(message, stream, **data)
-                    blocking_result = json.loads(copy.deepcopy(answer).json(exclude_none=True))
+                    blocking_result = answer.model_dump(mode="json", exclude_none=True)
                     logging.debug(f"[request_id={request_id}, session_id={session_id}] blocking_result={blocking_result}")
                     self.user_session._post_append()
                     return {
@@ -448,6 +668,205 @@ class AgentRuntime(BaseModel):
         app = self.create_flask_app(url_rule=url_rule)
         app.run(host=host, debug=debug, port=port)
 
+    def create_asgi_app(self, url_rule="/chat", max_workers: Optional[int] = None,
+                        max_concurrency: int = 4096):
+        """
+        创建 Starlette ASGI 应用，主要用于 Uvicorn 这样的 ASGI 服务器来运行服务。请求参数与返回格式与 create_flask_app 一致。
+
+        组件实现了 arun 时在事件循环中直接调用 arun；否则在有界线程池中调用 run，流式结果每次只拉取一个元素，
+        客户端消费不及时时暂停拉取。客户端断开连接后立即停止拉取并关闭组件返回的生成器。
+
+        Args:
+            url_rule (str): 服务的URL规则，默认为"/chat"
+            max_workers (Optional[int]): 执行同步组件的线程数，默认为 min(32, CPU核数 + 4)
+            max_concurrency (int): 同时处理的最大请求数(包括进行中的流式会话)，超出时返回503。默认为4096
+
+        Returns:
+            Starlette
+        """
+        # lazy import starlette
+        try:
+            from starlette.applications import Starlette
+            from starlette.responses import JSONResponse
+            from starlette.routing import Route
+        except ImportError:
+            raise ImportError("starlette module is not installed. Please install it using 'pip install "
+                              "starlette uvicorn'.")
+        import contextlib
+
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="appbuilder-agent")
+        state = {"active": 0}
+
+        def release():
+            state["active"] -= 1
+
+        def bad_request(description):
+            return JSONResponse({"code": 400, "message": f"400 Bad Request: {description}", "result": None}, 400)
+
+        def error_response(e):
+            code = 500 if not hasattr(e, "code") else e.code
+            return {"code": code, "message": "InternalServerError", "result": None}
+
+        async def gen_sse_resp(message, session_id, request_id, stream, data, context):
+            received_first_packet = False
+            retry_count = 0
+            while retry_count < MAX_RETRY_COUNT:
+                try:
+                    answer = await self._achat(executor, context, message, stream, **data)
+                except Exception as e:  # 调用chat方法报错，直接返回
+                    logging.error(
+                        f"request_id={request_id}, session_id={session_id}, err={e}, execute self.chat failed",
+                        exc_info=True)
+                    yield "data: " + json.dumps(error_response(e), ensure_ascii=False) + "\n\n"
+                    return
+                content_stream = _ContentStream(answer.content, executor, context)
+                answer.content = None
+                encoder = _SSEMessageEncoder(session_id, answer)
+                try:
+                    async for sub_content in content_stream:
+                        yield encoder.encode(sub_content)
+                        received_first_packet = True
+                except Exception as e:
+                    retry_count += 1
+                    logging.error(
+                        f"[request_id={request_id}, session_id={session_id}] err={e}, "
+                        f"retry_count={retry_count}", exc_info=True)
+                    # 如果未收到首包且重试次数小于最大重试次数，则尝试重新执行一次chat方法
+                    if not received_first_packet and retry_count < MAX_RETRY_COUNT:
+                        continue
+                    yield "data: " + json.dumps(error_response(e), ensure_ascii=False) + "\n\n"
+                    return
+                finally:
+                    # 客户端断开时生成器在此处被关闭
+                    content_stream.close()
+                yield encoder.encode("", is_completion=True)
+                logging.info(
+                    f"request_id={request_id}, session_id={session_id}]"
+                    f"retry_count={retry_count}, success response")
+                await self.user_session._apost_append()
+                return  # 正常返回
+
+        async def chat(request):
+            """
+            处理对话请求，校验规则与 create_flask_app 相同。
+
+            Args:
+                request (starlette.requests.Request): 请求
+
+            Returns:
+                如果stream为True，则返回流式响应（Content-Type为text/event-stream）。
+                如果stream为False，则返回包含处理结果的JSON。
+            """
+            if state["active"] >= max_concurrency:
+                return JSONResponse({"code": 503, "message": "Service Unavailable", "result": None}, 503)
+            state["active"] += 1
+            streaming = False
+            try:
+                response = await handle(request)
+                streaming = isinstance(response, _SSEStreamResponse)
+                return response
+            except Exception as e:
+                logging.error(f"failed to handle request. err={e}", exc_info=True)
+                if hasattr(e, "code"):
+                    return JSONResponse({"code": e.code, "message": str(e), "result": None}, 200)
+                return JSONResponse({"code": 500, "message": "Internal Server Error", "result": None}, 200)
+            finally:
+                # 流式请求在响应结束时释放
+                if not streaming:
+                    release()
+
+        async def handle(request):
+            loop = asyncio.get_running_loop()
+            if self.component.lazy_certification:
+                app_builder_token = None
+                for key in ["X-Appbuilder-Token", "X-Appbuilder-Authorization"]:
+                    if key in request.headers:
+                        app_builder_token = request.headers[key]
+                        break
+                if not app_builder_token:
+                    return bad_request("X-Appbuilder-Authorization is required in Headers")
+                try:
+                    await loop.run_in_executor(executor, functools.partial(
+                        self.component.set_secret_key_and_gateway, secret_key=app_builder_token))
+                except appbuilder.core._exception.BaseRPCException as e:
+                    logging.error(f"failed to verify. err={e}", exc_info=True)
+                    return bad_request("X-Appbuilder-Authorization invalid")
+
+            try:
+                data = await request.json()
+            except ValueError:
+                return bad_request("Failed to decode JSON object")
+            if not isinstance(data, dict) or "message" not in data:
+                return bad_request("message is required")
+            message = Message(data.pop('message'))
+            if "session_id" not in data:
+                session_id = str(uuid.uuid4())
+            else:
+                session_id = data.pop("session_id")
+                if not isinstance(session_id, str):
+                    return bad_request("session_id must be str type")
+            if "stream" not in data:
+                stream = False
+            else:
+                stream = data.pop("stream")
+                if not isinstance(stream, bool):
+                    return bad_request("stream must be bool type")
+            request_id = request.headers.get("X-Appbuilder-Request-Id", str(uuid.uuid4()))
+            user_id = request.headers.get("X-Appbuilder-User-Id", None)
+
+            init_context(session_id=session_id, request_id=request_id, user_id=user_id)
+            context = contextvars.copy_context()
+            logging.info(
+                f"request_id={request_id}, session_id={session_id}] message={message},"
+                f" stream={stream}, data={data}, start run...")
+
+            if stream:  # 流式
+                return _SSEStreamResponse(
+                    gen_sse_resp(message, session_id, request_id, stream, data, context), on_close=release)
+            try:  # 非流式
+                answer = await self._achat(executor, context, message, stream, **data)
+                blocking_result = answer.model_dump(mode="json", exclude_none=True)
+                logging.debug(f"[request_id={request_id}, session_id={session_id}] blocking_result={blocking_result}")
+                await self.user_session._apost_append()
+                return JSONResponse({
+                    "code": 0, "message": "",
+                    "result": {"session_id": session_id, "answer_message": blocking_result}
+                })
+            except Exception as e:
+                logging.error(
+                    f"[request_id={request_id}, session_id={session_id}] err={e}", exc_info=True)
+                return JSONResponse(error_response(e))
+
+        @contextlib.asynccontextmanager
+        async def lifespan(app):
+            yield
+            executor.shutdown(wait=False)
+
+        return Starlette(routes=[Route(url_rule, chat, methods=["POST"])], lifespan=lifespan)
+
+    def serve_asgi(self, host='0.0.0.0', port=8092, url_rule="/chat", max_workers: Optional[int] = None,
+                   max_concurrency: int = 4096, **kwargs):
+        """
+        将 component 服务化，使用 Uvicorn 提供异步 http API 接口，接口与 serve 一致
+
+        Args:
+            host (str): 服务运行的host地址，默认为'0.0.0.0'
+            port (int): 服务运行的端口号，默认为8092
+            url_rule (str): 服务的URL规则，默认为"/chat"
+            max_workers (Optional[int]): 执行同步组件的线程数
+            max_concurrency (int): 同时处理的最大请求数，默认为4096
+            **kwargs: 其他参数，会被透传到 uvicorn.run
+
+        Returns:
+            None
+        """
+        try:
+            import uvicorn
+        except ImportError:
+            raise ImportError("uvicorn module is not installed. Please install it using 'pip install uvicorn'.")
+        app = self.create_asgi_app(url_rule=url_rule, max_workers=max_workers, max_concurrency=max_concurrency)
+        uvicorn.run(app, host=host, port=port, **kwargs)
+
     def prepare_chainlit_readme(self):
         """
         准备 Chainlit 的 README 文件
@@ -509,15 +928,17 @@ class AgentRuntime(BaseModel):
             session_id = cl.user_session.get("id")
             request_id = str(uuid.uuid4())
             init_context(session_id=session_id, request_id=request_id)
+            context = contextvars.copy_context()
             msg = cl.Message(content="")
             await msg.send()
-            stream_message = self.chat(Message(message.content), stream=True)
+            # 同步组件在线程池中执行，避免阻塞事件循环
+            stream_message = await self._achat(None, context, Message(message.content), stream=True)
 
-            for part in stream_message.content:
+            async for part in _ContentStream(stream_message.content, None, context):
                 if token := part or "":
                     await msg.stream_token(token)
             await msg.update()
-            self.user_session._post_append()
+            await self.user_session._apost_append()
 
         # start chainlit service
         if os.getenv('APPBUILDER_RUN_CHAINLIT') == '1':
@@ -17,6 +17,7 @@
 
 import os
 import json
+import requests
 from typing import Optional
 from appbuilder.core.assistant.type import assistant_type
 from appbuilder.core._client import AssistantHTTPClient
@@ -24,6 +25,21 @@ from appbuilder.core._client import AssistantHTTPClient
 from appbuilder.core._exception import AppBuilderServerException,HTTPConnectionException
 from appbuilder.utils.trace.tracer_wrapper import assistent_tool_trace
 
+_DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def _expected_size(response, offset):
+    # 内容经过压缩时Content-Length与写入的字节数不一致，不做校验
+    if response.headers.get('Content-Encoding', 'identity') != 'identity':
+        return None
+    content_range = response.headers.get('Content-Range')
+    if content_range and response.status_code == requests.codes.partial_content:
+        total = content_range.rsplit("/", 1)[-1]
+        return int(total) if total.isdigit() else None
+    content_length = response.headers.get('Content-Length')
+    return offset + int(content_length) if content_length and content_length.isdigit() else None
+
+
 class Files(object):
     def __init__(self):
         self._http_client = AssistantHTTPClient()
@@ -206,21 +222,30 @@ class Files(object):
                  file_id:str,
                  file_path:str="", # 要求若文件路径不为空，需要以/结尾，默认下载到当前文件夹
                  timeout:Optional[int]=None,
+                 chunk_size:int=_DOWNLOAD_CHUNK_SIZE,
+                 resume:bool=False,
+                 check_file:bool=True,
                  ):
         """
         下载文件
+
+        文件内容以流式方式按chunk_size分块写入临时文件(file_path + file_id + ".part")，下载完成后原子地重命名为目标文件，
+        下载失败不会留下不完整的目标文件。resume为True时保留下载失败的临时文件，再次下载时通过Range请求从断点继续。
         
         Args:
             file_id (str): 文件ID
             file_path (str, optional): 文件保存路径，默认为空字符串。如果未指定，则使用文件名的默认值。要求若文件路径不为空，需要以/结尾。
             timeout (Optional[int], optional): 请求超时时间，单位秒。如果未指定，则使用默认超时时间。
+            chunk_size (int, optional): 每次读取并写入文件的字节数，默认为1MB。
+            resume (bool, optional): 是否从上次未完成的临时文件断点续传，默认为False。
+            check_file (bool, optional): 下载前是否先查询文件是否存在，默认为True。为False时跳过该次请求。
         
         Returns:
-            None
+            str: 下载后的文件路径
         
         Raises:
             TypeError: 当file_path或file_id类型不为str时引发此异常。
-            ValueError: 当file_id为空或None时，或file_path不是文件目录时引发此异常。
+            ValueError: 当file_id为空或None时，或file_path不是文件目录时，或chunk_size不是正整数时引发此异常。
             FileNotFoundError: 当指定的文件路径或文件不存在时引发此异常。
             OSError: 当磁盘空间不足时引发此异常。
             HTTPConnectionException: 当请求失败时引发此异常。
@@ -232,43 +257,78 @@ class Files(object):
             raise TypeError("file_id must be str")
         if file_id == "" or file_id is None:
             raise ValueError("file_id cannot be empty or None")
-        try:
-            self.query(file_id)
-        except:
-            raise FileNotFoundError("file_id {} not found".format(file_id))
+        if not isinstance(chunk_size, int) or chunk_size <= 0:
+            raise ValueError("chunk_size must be a positive integer")
+        if check_file:
+            try:
+                self.query(file_id)
+            except:
+                raise FileNotFoundError("file_id {} not found".format(file_id))
         if file_path != "" and not os.path.exists(file_path):
             raise FileNotFoundError("file_path {} not found".format(file_path))
         if file_path != "" and not os.path.isdir(file_path):
             raise ValueError("file_path must be a file directory")
+
+        part_path = file_path + file_id + ".part"
+        offset = os.path.getsize(part_path) if resume and os.path.exists(part_path) else 0
+        response = self._download_request(file_id, offset, timeout)
+        if response.status_code == requests.codes.requested_range_not_satisfiable:
+            # 临时文件与服务端文件不一致，重新下载
+            response.close()
+            offset = 0
+            response = self._download_request(file_id, offset, timeout)
+        try:
+            if response.status_code != requests.codes.partial_content:
+                self._http_client.check_response_header(response)
+                # 服务端不支持Range时返回完整内容
+                offset = 0
+            filename = response.headers['Content-Disposition'].split("filename=")[-1]
+            expected_size = _expected_size(response, offset)
+            try:
+                with open(part_path, 'ab' if offset else 'wb') as file:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        if chunk:
+                            file.write(chunk)
+                    size = file.tell()
+            except requests.exceptions.RequestException as e:
+                raise HTTPConnectionException("download interrupted: {}".format(e))
+            except FileNotFoundError as e:
+                raise FileNotFoundError("请检查文件路径是否正确,错误信息{}".format(e))
+            except OSError as e:
+                raise OSError("磁盘空间不足,错误信息{}".format(e))
+            except Exception as e:
+                raise Exception("出现错误,错误信息{}".format(e))
+            if expected_size is not None and size != expected_size:
+                raise HTTPConnectionException(
+                    "incomplete download, expected {} bytes but got {}".format(expected_size, size))
+            file_path += filename
+            os.replace(part_path, file_path)
+        except BaseException:
+            if not resume and os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+        finally:
+            response.close()
+        return file_path
+
+    def _download_request(self, file_id, offset, timeout):
         headers = self._http_client.auth_header()
+        if offset:
+            headers['Range'] = "bytes={}-".format(offset)
         url = self._http_client.service_url("/v2/storage/files/download")
         try:
-            response = self._http_client.session.post(
+            return self._http_client.session.post(
                 url=url,
                 headers=headers,
                 json={
                     'file_id': file_id
                 },
-                timeout=timeout
+                timeout=timeout,
+                stream=True
             )
         except:
             raise HTTPConnectionException("request failed")
-        self._http_client.check_response_header(response)
-        
-        filename=response.headers['Content-Disposition'].split("filename=")[-1]
-        file_path+=filename
-        try:    
-            with open(file_path,'wb') as file:
-                for chunk in response.iter_content():
-                    if chunk:
-                        file.write(chunk)
-        except FileNotFoundError as e:
-            raise FileNotFoundError("请检查文件路径是否正确,错误信息{}".format(e))
-        except OSError as e:
-            raise OSError("磁盘空间不足,错误信息{}".format(e))
-        except Exception as e:
-            raise Exception("出现错误,错误信息{}".format(e))
-        
+
     @assistent_tool_trace
     def content(self,
                 file_id:str,
@@ -311,10 +371,7 @@ class Files(object):
             raise HTTPConnectionException("request failed")
         self._http_client.check_response_header(response)
         
-        content=b''
-        for chunk in response.iter_content():
-            if chunk:
-                content+=chunk
+        content=response.content
         
         res=assistant_type.AssistantFilesContentResponse(
             content_type =response.headers['Content-Type'],
@@ -13,6 +13,7 @@
 # limitations under the License.
 
 """Component模块包括组件基类，用户自定义组件需要继承Component类，并至少实现run方法"""
+import asyncio
 import json
 
 from enum import Enum
@@ -20,8 +21,9 @@ from enum import Enum
 from pydantic import BaseModel
 from pydantic import Field, field_validator
 from typing import (
-    Dict, List, Optional, Any, Generator, Union, AsyncGenerator)
+    Dict, List, Optional, Any, Callable, Generator, Union, AsyncGenerator)
 from appbuilder.core.utils import ttl_lru_cache
+from appbuilder.core._batch import run_batch, arun_batch
 from appbuilder.core._client import HTTPClient, AsyncHTTPClient
 from appbuilder.core.message import Message
 
@@ -399,21 +401,28 @@ class Component:
         """
         raise NotImplementedError
 
-    def batch(self, *args, **kwargs) -> List[Message]:
+    def batch(self, *args, max_concurrency: int = 4, item_timeout: Optional[float] = None,
+              return_exceptions: bool = False, progress_callback: Optional[Callable[[int, int], None]] = None,
+              **kwargs) -> List[Message]:
         """
-        批量处理输入并返回结果列表。
+        批量处理输入并返回结果列表，各输入在有界线程池中并发调用run方法。
 
         Args:
-            *args: 可变数量的输入参数，每个参数将依次被处理。
+            *args: 可变数量的输入参数，每个参数将作为第一个参数传给run方法。
+            max_concurrency (int, optional): 同时处理的最大输入数，为1且未设置item_timeout时在当前线程中依次处理。默认为4。
+            item_timeout (Optional[float], optional): 单个输入的超时时间(秒)，从该输入开始处理时计时，超时后以TimeoutError作为其结果。
+                超时的run调用无法被中断，会继续占用线程直至返回。默认为None，不限制。
+            return_exceptions (bool, optional): 为True时单个输入的异常作为该输入的结果返回，不影响其他输入；
+                为False时遇到第一个异常即取消尚未开始的输入并抛出该异常。默认为False。
+            progress_callback (Optional[Callable[[int, int], None]], optional): 每个输入处理完成时调用，参数为已完成数及总数。
             **kwargs: 关键字参数，这些参数将被传递给每个输入的处理函数。
 
         Returns:
-            List[Message]: 包含处理结果的列表，每个元素对应一个输入参数的处理结果。
+            List[Message]: 包含处理结果的列表，每个元素对应一个输入参数的处理结果，顺序与输入一致。
 
         """
-
-        results = [self.run(inp, **kwargs) for inp in args]
-        return results
+        return run_batch(self.run, args, kwargs, max_concurrency, item_timeout=item_timeout,
+                         return_exceptions=return_exceptions, progress_callback=progress_callback)
 
     def non_stream_tool_eval(self, *args, **kwargs) -> Union[ComponentOutput, dict]:
         """
@@ -456,15 +465,34 @@ class Component:
         """
         return None
 
-    async def abatch(self, *args, **kwargs) -> List[Message]:
+    async def abatch(self, *args, max_concurrency: int = 4, item_timeout: Optional[float] = None,
+                     return_exceptions: bool = False, progress_callback: Optional[Callable[[int, int], None]] = None,
+                     **kwargs) -> List[Message]:
         r"""
-        abatch method,待子类重写实现
+        异步批量处理输入，通过asyncio.gather并发处理，由信号量限制同时处理的数量。
+
+        组件实现了arun时await arun，否则在线程中调用run，不阻塞事件循环。
 
         Args:
-            args: list of arguments
-            kwargs: keyword arguments
+            *args: 可变数量的输入参数，每个参数将作为第一个参数传给arun或run方法。
+            max_concurrency (int, optional): 同时处理的最大输入数。默认为4。
+            item_timeout (Optional[float], optional): 单个输入的超时时间(秒)，从该输入开始处理时计时，超时后以TimeoutError作为其结果。
+                默认为None，不限制。
+            return_exceptions (bool, optional): 为True时单个输入的异常作为该输入的结果返回，不影响其他输入；
+                为False时遇到第一个异常即取消其余输入并抛出该异常。默认为False。
+            progress_callback (Optional[Callable[[int, int], None]], optional): 每个输入处理完成时调用，参数为已完成数及总数。
+            **kwargs: 关键字参数，这些参数将被传递给每个输入的处理函数。
+
+        Returns:
+            List[Message]: 包含处理结果的列表，顺序与输入一致。
         """
-        return None
+        if type(self).arun is not Component.arun:
+            func = self.arun
+        else:
+            def func(inp, **kwargs):
+                return asyncio.to_thread(self.run, inp, **kwargs)
+        return await arun_batch(func, args, kwargs, max_concurrency, item_timeout=item_timeout,
+                                return_exceptions=return_exceptions, progress_callback=progress_callback)
 
     def _trace(self, **data) -> None:
         r"""pass"""
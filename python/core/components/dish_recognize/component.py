@@ -92,13 +92,11 @@ class DishRecognition(Component):
         if not request.filter_threshold:
             request.filter_threshold = 0.95
         request_data = DishRecognitionRequest.to_dict(request)
-        if retry != self.http_client.retry.total:
-            self.http_client.retry.total = retry
         headers = self.http_client.auth_header()
         headers['content-type'] = 'application/x-www-form-urlencoded'
 
         url = self.http_client.service_url("/v1/bce/aip/image-classify/v2/dish")
-        response = self.http_client.session.post(url, headers=headers, data=request_data, timeout=timeout)
+        response = self.http_client.with_retry(retry).post(url, headers=headers, data=request_data, timeout=timeout)
         self.http_client.check_response_header(response)
         data = response.json()
         self.http_client.check_response_json(data)
@@ -97,12 +97,10 @@ class DocCropEnhance(Component):
             raise ValueError("request argument error, one of image or url must be set")
 
         req = json.dumps(DocCropEnhanceRequest.to_dict(request))
-        if self.http_client.retry.total != retry:
-            self.http_client.retry.total = retry
         headers = self.http_client.auth_header()
         headers['content-type'] = 'application/json'
         url = self.http_client.service_url("/v1/bce/aip/ocr/v1/doc_crop_enhance")
-        response = self.http_client.session.post(url, headers=headers, data=req, timeout=timeout)
+        response = self.http_client.with_retry(retry).post(url, headers=headers, data=req, timeout=timeout)
         self.http_client.check_response_header(response)
         data = response.json()
         self.http_client.check_response_json(data)
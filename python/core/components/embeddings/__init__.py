@@ -3,4 +3,5 @@ init
 """
 
 from .component import Embedding
-from .base import EmbeddingBaseComponent
+from .base import EmbeddingBaseComponent, vector_to_list
+from .cache import EmbeddingCache, LRUEmbeddingCache, MmapEmbeddingCache
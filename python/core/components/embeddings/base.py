@@ -16,11 +16,20 @@
 from abc import abstractmethod
 from typing import List, Union
 
+import numpy as np
+
 from appbuilder.core.component import Component
 from appbuilder.core.message import Message
 from appbuilder.core.component import ComponentArguments
 
 
+def vector_to_list(vector: Union[List[float], np.ndarray]) -> List[float]:
+    """
+    将Embedding返回的向量(List[float]或ndarray)转换为List[float]，用于JSON序列化等需要原生列表的场景
+    """
+    return vector.tolist() if isinstance(vector, np.ndarray) else vector
+
+
 class EmbeddingBaseComponent(Component):
     """
     EmbeddingBaseComponent
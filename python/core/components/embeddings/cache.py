@@ -0,0 +1,199 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+content-addressed embedding cache
+"""
+
+import json
+import os
+import threading
+from abc import abstractmethod
+from collections import OrderedDict
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+
+class EmbeddingCache(object):
+    """
+    EmbeddingCache
+
+    以文本内容的哈希为key缓存向量，Embedding命中缓存的文本不再请求服务端。实现需保证多线程安全。
+    缓存的向量可以是List[float]或一维ndarray，Embedding在合并结果时统一转换为return_numpy对应的类型。
+    """
+
+    @abstractmethod
+    def get_many(self, keys: Sequence[str]) -> List[Optional[List[float]]]:
+        """
+        Args:
+            keys: 文本内容的哈希
+        Returns:
+            与keys顺序一致的向量，未命中的位置为None
+        """
+
+    @abstractmethod
+    def set_many(self, keys: Sequence[str], vectors: Sequence[List[float]]) -> None:
+        """
+        Args:
+            keys: 文本内容的哈希
+            vectors: 与keys一一对应的向量
+        """
+
+
+class LRUEmbeddingCache(EmbeddingCache):
+    """
+    LRUEmbeddingCache
+
+    内存中的LRU缓存，可选地以MmapEmbeddingCache作为持久化的下一级缓存：内存未命中时从下一级读取，写入时同时写入两级。
+
+    Args:
+        max_size (int): 内存中最多缓存的向量数。默认为100000。
+        store (Optional[EmbeddingCache]): 下一级缓存。默认为None。
+
+    Examples:
+
+        .. code-block:: python
+
+            import appbuilder
+
+            cache = appbuilder.LRUEmbeddingCache(store=appbuilder.MmapEmbeddingCache("./embedding_cache"))
+            embedding = appbuilder.Embedding(cache=cache)
+    """
+
+    def __init__(self, max_size: int = 100000, store: Optional[EmbeddingCache] = None):
+        if max_size < 1:
+            raise ValueError("max_size must be >= 1, got {}".format(max_size))
+        self.max_size = max_size
+        self.store = store
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[List[float]]]:
+        results = []
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._data.get(key)
+                if vector is not None:
+                    self._data.move_to_end(key)
+                else:
+                    missing.append(i)
+                results.append(vector)
+        if missing and self.store is not None:
+            found = self.store.get_many([keys[i] for i in missing])
+            hits = [(i, vector) for i, vector in zip(missing, found) if vector is not None]
+            for i, vector in hits:
+                results[i] = vector
+            self._put([keys[i] for i, _ in hits], [vector for _, vector in hits])
+        return results
+
+    def set_many(self, keys: Sequence[str], vectors: Sequence[List[float]]) -> None:
+        self._put(keys, vectors)
+        if self.store is not None:
+            self.store.set_many(keys, vectors)
+
+    def _put(self, keys, vectors):
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                self._data[key] = vector
+                self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+
+class MmapEmbeddingCache(EmbeddingCache):
+    """
+    MmapEmbeddingCache
+
+    磁盘上的追加写向量存储，向量以float32连续保存在vectors.f32中，通过numpy.memmap按需读取，不会整体加载到内存。
+    get_many返回float32 ndarray。
+    同一目录可被同一进程中的多个Embedding共享，不支持多进程同时写入。
+
+    Args:
+        directory (str): 存储目录，不存在时自动创建。
+    """
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._meta_path = os.path.join(directory, "meta.json")
+        self._keys_path = os.path.join(directory, "keys.txt")
+        self._vectors_path = os.path.join(directory, "vectors.f32")
+        self._lock = threading.Lock()
+        self._index = {}
+        self._dim = None
+        self._mmap = None
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self._meta_path):
+            return
+        with open(self._meta_path, encoding="utf-8") as f:
+            self._dim = json.load(f)["dim"]
+        keys = []
+        if os.path.exists(self._keys_path):
+            with open(self._keys_path, encoding="utf-8") as f:
+                keys = f.read().split("\n")
+            # 最后一行可能因进程中断而不完整
+            keys = keys[:-1]
+        rows = os.path.getsize(self._vectors_path) // (4 * self._dim) if os.path.exists(self._vectors_path) else 0
+        # 先写向量再写key，中断时以两者中较短的为准并截断，保证后续追加的行号对齐
+        rows = min(rows, len(keys))
+        keys = keys[:rows]
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(rows * 4 * self._dim)
+        with open(self._keys_path, "w", encoding="utf-8") as f:
+            f.write("".join(key + "\n" for key in keys))
+        self._index = {key: row for row, key in enumerate(keys)}
+
+    def __len__(self):
+        return len(self._index)
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[np.ndarray]]:
+        with self._lock:
+            rows = [self._index.get(key) for key in keys]
+            hit_rows = [row for row in rows if row is not None]
+            if not hit_rows:
+                return [None] * len(keys)
+            if self._mmap is None or max(hit_rows) >= self._mmap.shape[0]:
+                self._mmap = np.memmap(self._vectors_path, dtype=np.float32, mode="r",
+                                       shape=(len(self._index), self._dim))
+            mmap = self._mmap
+        return [np.array(mmap[row]) if row is not None else None for row in rows]
+
+    def set_many(self, keys: Sequence[str], vectors: Sequence[List[float]]) -> None:
+        with self._lock:
+            new = {}
+            for key, vector in zip(keys, vectors):
+                if key not in self._index:
+                    new[key] = vector
+            if not new:
+                return
+            data = np.asarray(list(new.values()), dtype=np.float32)
+            if self._dim is None:
+                self._dim = data.shape[1]
+                with open(self._meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"dim": self._dim}, f)
+            elif data.shape[1] != self._dim:
+                raise ValueError("vector dim {} does not match the cache dim {}".format(data.shape[1], self._dim))
+            with open(self._vectors_path, "ab") as f:
+                f.write(data.tobytes())
+            with open(self._keys_path, "a", encoding="utf-8") as f:
+                f.write("".join(key + "\n" for key in new))
+            for key in new:
+                self._index[key] = len(self._index)
@@ -16,10 +16,16 @@
 ernie bot embedding
 """
 
-from typing import Union, List
+import asyncio
+import hashlib
+from typing import Union, List, Optional
+
+import numpy as np
 
 from appbuilder.core.message import Message
-from appbuilder.core.components.embeddings.base import EmbeddingBaseComponent
+from appbuilder.core._batch import run_batch, arun_batch
+from appbuilder.core.components.embeddings.base import EmbeddingBaseComponent, vector_to_list
+from appbuilder.core.components.embeddings.cache import EmbeddingCache
 from appbuilder.core._exception import AppBuilderServerException, ModelNotSupportedException
 from appbuilder.utils.trace.tracer_wrapper import components_run_trace, components_run_stream_trace
 from .base import EmbeddingArgs
@@ -32,6 +38,10 @@ class Embedding(EmbeddingBaseComponent):
 
     Attributes:
         model: str = "Embedding-V1"
+        cache (Optional[EmbeddingCache]): 向量缓存，以文本内容的哈希为key，命中的文本不再请求服务端。默认为None。
+        max_concurrency (int): batch时同时请求的最大批次数，每批最多16条文本。默认为4。
+        return_numpy (bool): 为True时run返回一维float32 ndarray，batch返回形状为(文本数, 维度)的连续float32 ndarray，
+            逐行迭代得到的是不复制数据的视图，内存约为List[List[float]]的1/7。默认为False。
 
     Examples:
 
@@ -47,6 +57,12 @@ class Embedding(EmbeddingBaseComponent):
             embedding_single = embedding(Message("hello world!"))
 
             embedding_batch = embedding.batch(Message(["hello", "world"]))
+
+            # 缓存向量，重复的文本不再请求服务端
+            cached_embedding = appbuilder.Embedding(cache=appbuilder.LRUEmbeddingCache())
+
+            # 返回float32 ndarray，可直接传给Matching、BESVectorStoreIndex等组件
+            numpy_embedding = appbuilder.Embedding(return_numpy=True)
     """
 
     name: str = "embedding"
@@ -61,9 +77,14 @@ class Embedding(EmbeddingBaseComponent):
 
     def __init__(self, 
                  model="Embedding-V1",
+                 cache: Optional[EmbeddingCache] = None,
+                 max_concurrency: int = 4,
+                 return_numpy: bool = False,
                  **kwargs
                  ):
         """Embedding"""
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be >= 1, got {}".format(max_concurrency))
 
         if model not in self.accepted_models:
             raise ModelNotSupportedException(f"Model {model} not supported, only support {self.accepted_models}")
@@ -73,6 +94,10 @@ class Embedding(EmbeddingBaseComponent):
         else:
             raise ModelNotSupportedException(f"Model {model} is not yet supported, only support {self.base_urls.keys()}")
 
+        self.model = model
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self.return_numpy = return_numpy
         super().__init__(self.meta)
 
     def _check_response_json(self, data: dict):
@@ -99,9 +124,10 @@ class Embedding(EmbeddingBaseComponent):
             json=payload,
         )
         self.http_client.check_response_header(resp)
-        self._check_response_json(resp.json())
+        data = resp.json()
+        self._check_response_json(data)
 
-        return resp.json()
+        return data
 
     def _batchify(self, texts: List[str], batch_size: int = 16) -> List[List[str]]:
         """
@@ -114,18 +140,62 @@ class Embedding(EmbeddingBaseComponent):
             texts[i : i + batch_size] for i in range(0, len(texts), batch_size)
         ]
 
-    def _batch(self, texts: List[str]) -> Message[List[List[float]]]:
+    def _embed_batch(self, batch: List[str]) -> Union[List[List[float]], np.ndarray]:
+        """
+        request embeddings of one batch
+        """
+        vectors = [result['embedding'] for result in self._request({"input": batch})['data']]
+        if self.return_numpy:
+            # 尽早转换为float32，避免所有批次的List[float]同时驻留内存
+            return np.asarray(vectors, dtype=np.float32)
+        return vectors
+
+    def _cache_key(self, text: str) -> str:
+        return hashlib.sha256((self.model + "\n" + text).encode("utf-8")).hexdigest()
+
+    def _lookup(self, texts: List[str]):
+        """
+        split texts into cached vectors and unique texts to request
+        """
+        vectors = [None] * len(texts)
+        if self.cache is not None and texts:
+            vectors = self.cache.get_many([self._cache_key(text) for text in texts])
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        return vectors, missing
+
+    def _merge(self, texts, vectors, missing, batches, results) -> Message[List[List[float]]]:
+        embedded = {}
+        for batch, result in zip(batches, results):
+            embedded.update(zip(batch, result))
+        if self.cache is not None and missing:
+            self.cache.set_many([self._cache_key(text) for text in missing], [embedded[text] for text in missing])
+        vectors = [vector if vector is not None else embedded[text] for text, vector in zip(texts, vectors)]
+        if self.return_numpy:
+            return Message(np.asarray(vectors, dtype=np.float32) if vectors else np.empty((0, 0), dtype=np.float32))
+        # 缓存命中的向量可能是ndarray，与服务端返回的list统一转换为List[float]，避免结果中类型混杂
+        return Message([vector_to_list(vector) for vector in vectors])
+
+    def _batch(self, texts: List[str], max_concurrency: Optional[int] = None) -> Message[List[List[float]]]:
         """
         batch run implement
         """
-        batches = self._batchify(texts)
-        results = []
-        for batch in batches:
-            result = self._request({"input": batch})
-            results.extend(result['data'])
-        results = Message([result['embedding'] for result in results])
+        vectors, missing = self._lookup(texts)
+        batches = self._batchify(missing)
+        results = run_batch(self._embed_batch, batches, {}, max_concurrency or self.max_concurrency)
+        return self._merge(texts, vectors, missing, batches, results)
+
+    async def _abatch(self, texts: List[str], max_concurrency: Optional[int] = None) -> Message[List[List[float]]]:
+        """
+        async batch run implement
+        """
+        vectors, missing = self._lookup(texts)
+        batches = self._batchify(missing)
+
+        def embed_batch(batch):
+            return asyncio.to_thread(self._embed_batch, batch)
 
-        return results
+        results = await arun_batch(embed_batch, batches, {}, max_concurrency or self.max_concurrency)
+        return self._merge(texts, vectors, missing, batches, results)
 
     @components_run_trace
     def run(self, text: Union[Message[str], str]) -> Message[List[float]]:
@@ -142,13 +212,15 @@ class Embedding(EmbeddingBaseComponent):
 
         return Message(self._batch([_text]).content[0])
 
-    def batch(self, texts: Union[Message[List[str]], List[str]]) -> Message[List[List[float]]]:
+    def batch(self, texts: Union[Message[List[str]], List[str]],
+              max_concurrency: Optional[int] = None) -> Message[List[List[float]]]:
         """
-        批量处理文本数据。
+        批量处理文本数据。文本按每批16条切分，各批次并发请求，结果顺序与输入一致。
         
         Args:
             texts (Union[Message[List[str]], List[str]]):
                 待处理的文本数据，可以是 Message 类型，包含多个文本列表，也可以是普通列表类型，包含多个文本。
+            max_concurrency (Optional[int]): 同时请求的最大批次数。默认为None，使用初始化时的max_concurrency。
         
         Returns:
             Message[List[List[float]]]:
@@ -157,4 +229,22 @@ class Embedding(EmbeddingBaseComponent):
         """
         _texts = texts if isinstance(texts, list) else texts.content
 
-        return self._batch(_texts)
+        return self._batch(_texts, max_concurrency)
+
+    async def abatch(self, texts: Union[Message[List[str]], List[str]],
+                     max_concurrency: Optional[int] = None) -> Message[List[List[float]]]:
+        """
+        异步批量处理文本数据，各批次的请求在线程中执行，不阻塞事件循环。
+        
+        Args:
+            texts (Union[Message[List[str]], List[str]]):
+                待处理的文本数据，可以是 Message 类型，包含多个文本列表，也可以是普通列表类型，包含多个文本。
+            max_concurrency (Optional[int]): 同时请求的最大批次数。默认为None，使用初始化时的max_concurrency。
+        
+        Returns:
+            Message[List[List[float]]]: 处理后的结果，顺序与输入一致。
+        
+        """
+        _texts = texts if isinstance(texts, list) else texts.content
+
+        return await self._abatch(_texts, max_concurrency)
@@ -132,8 +132,6 @@ class SelectTable(Component):
         headers = self.http_client.auth_header()
         headers["Content_Type"] = "application/json"
 
-        if retry != self.http_client.retry.total:
-            self.http_client.retry.total = retry
 
         payload = {"query": query,
                    "table_descriptions": table_descriptions,
@@ -142,8 +140,8 @@ class SelectTable(Component):
                    "prompt_template": prompt_template}
 
         server_url = self.http_client.service_url(sub_path=self.server_sub_path)
-        response = self.http_client.session.post(url=server_url, headers=headers,
-                                                 json=payload, timeout=timeout)
+        response = self.http_client.with_retry(retry).post(url=server_url, headers=headers,
+                                                           json=payload, timeout=timeout)
         self.http_client.check_response_header(response)
         data = response.json()
         self.http_client.check_response_json(data)
@@ -178,12 +178,10 @@ class HandwriteOCR(Component):
         if not request.image and not request.url:
             raise ValueError("request format error, one of image or url must be set")
         data = HandwriteOCRRequest.to_dict(request)
-        if self.http_client.retry.total != retry:
-            self.http_client.retry.total = retry
         headers = self.http_client.auth_header(request_id)
         headers['content-type'] = 'application/x-www-form-urlencoded'
         url = self.http_client.service_url("/v1/bce/aip/ocr/v1/handwriting")
-        response = self.http_client.session.post(url, headers=headers, data=data, timeout=timeout)
+        response = self.http_client.with_retry(retry).post(url, headers=headers, data=data, timeout=timeout)
         self.http_client.check_response_header(response)
         data = response.json()
         self.http_client.check_response_json(data)
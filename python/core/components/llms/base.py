@@ -27,12 +27,13 @@ from pydantic.types import confloat
 from appbuilder.core.component import Component
 from appbuilder.core.message import Message, _T
 from appbuilder.utils.logger_util import logger
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Union
 
 from appbuilder.core.component import ComponentArguments
 from appbuilder.core.utils import ModelInfo, ttl_lru_cache
 from appbuilder.utils.sse_util import SSEClient
 from appbuilder.core._exception import AppBuilderServerException, ModelNotSupportedException
+from appbuilder.core._retry import RetryPolicy
 
 
 class LLMMessage(Message):
@@ -399,33 +400,50 @@ class CompletionBaseComponent(Component):
 
         return query, inputs, response_mode, user_id
 
-    def get_model_config(self, model_config_inputs: ModelArgsConfig, other_params: dict = {}):
-        """获取模型配置信息"""
-        self.model_config["model"]["name"] = self.model_name
+    def get_model_config(self, model_config_inputs: ModelArgsConfig, other_params: Optional[dict] = None):
+        """获取本次请求的模型配置信息。
+
+        以类属性model_config为模板，写时复制生成本次请求独立的配置字典，不修改共享模板，
+        因此同一个组件实例可以被多个线程并发调用。
+
+        Args:
+            model_config_inputs (ModelArgsConfig): 本次请求的模型参数。
+            other_params (dict, optional): 透传给模型completion_params的其他参数。默认为None。
+
+        Returns:
+            dict: 本次请求的模型配置。
+        """
+        template = self.model_config["model"]
+        model = dict(template)
+        model["name"] = self.model_name
         # 不需要进行地址替换
         if os.environ.get("PRIVATE_AB", "false") == "false":
             model_url = self._check_model_and_get_model_url(self.model_name, self.model_type)
             if model_url:
-                self.model_config["model"]["url"] = model_url
+                model["url"] = model_url
         elif os.environ.get("PRIVATE_AB", "false") == "true":
             if self.model_url:
-                self.model_config["model"]["url"] = self.model_url
+                model["url"] = self.model_url
 
-        self.model_config["model"]["completion_params"]["temperature"] = model_config_inputs.temperature
-        self.model_config["model"]["completion_params"]["top_p"] = model_config_inputs.top_p
-        self.model_config["model"]["completion_params"]["max_output_tokens"] = model_config_inputs.max_output_tokens
-        self.model_config["model"]["completion_params"]["disable_search"] = model_config_inputs.disable_search
-        self.model_config["model"]["completion_params"]["response_format"] = model_config_inputs.response_format
-        self.model_config["model"]["completion_params"]["stop"] = model_config_inputs.stop
+        completion_params = dict(template.get("completion_params", {}))
+        completion_params["temperature"] = model_config_inputs.temperature
+        completion_params["top_p"] = model_config_inputs.top_p
+        completion_params["max_output_tokens"] = model_config_inputs.max_output_tokens
+        completion_params["disable_search"] = model_config_inputs.disable_search
+        completion_params["response_format"] = model_config_inputs.response_format
+        completion_params["stop"] = list(model_config_inputs.stop)
 
-        if len(other_params) > 0:
+        if other_params:
             logger.info("Some paramters are not expected by the model configuration, we assume they will be used in llm completion api")
 
             for k, v in other_params.items():
-                self.model_config["model"]["completion_params"][k] = v
+                completion_params[k] = v
                 logger.info("Add parameter: {}, value: {} in completion_params.".format(k, v))
-            
-        return self.model_config
+
+        model["completion_params"] = completion_params
+        model_config = dict(self.model_config)
+        model_config["model"] = model
+        return model_config
 
     def completion(
         self,
@@ -433,7 +451,7 @@ class CompletionBaseComponent(Component):
         base_url,
         request: CompletionRequest,
         timeout: float = None,
-        retry: int = 0,
+        retry: Union[int, RetryPolicy] = 0,
         request_id: str = None,
     ) -> CompletionResponse:
         r"""Send a byte array of an audio file to obtain the result of speech recognition."""
@@ -445,8 +463,9 @@ class CompletionBaseComponent(Component):
 
         stream = True if request.response_mode == "streaming" else False
         url = self.http_client.service_url(completion_url, self.base_url)
-        response = self.http_client.session.post(url, json=request.params, headers=headers, timeout=timeout,
-                                                 stream=stream)
+        # 流式请求仅在收到响应头之前重试，开始读取响应体后不再重试
+        response = self.http_client.with_retry(retry).post(url, json=request.params, headers=headers, timeout=timeout,
+                                                           stream=stream)
         
         return self.gene_response(response, stream)
 
@@ -17,4 +17,4 @@
 init
 """
 
-from .component import Matching
+from .component import Matching, PreparedContexts
@@ -13,7 +13,7 @@
 # limitations under the License.
 
 
-from typing import List, Union
+from typing import List, Optional, Union
 
 import numpy as np
 
@@ -49,6 +49,11 @@ class Matching(MatchingBaseComponent):
             contexts_matched = matching(query, contexts)
             print(contexts_matched.content)
             # ['你好', '世界']
+
+            # 对同一组文本多次匹配时，只需计算一次文本列表的embedding
+            prepared = matching.prepare(contexts)
+            print(matching(query, prepared, top_k=1).content)
+            # ['你好']
     """
 
     name: str = "Matching"
@@ -71,32 +76,75 @@ class Matching(MatchingBaseComponent):
     def run(
         self,
         query: Union[Message[str], str],
-        contexts: Union[Message[List[str]], List[str]],
+        contexts: Union[Message[List[str]], List[str], "PreparedContexts"],
         return_score: bool=False,
+        top_k: Optional[int] = None,
     ) -> Message[List[str]]:
         """
         根据给定的查询和上下文，返回匹配的上下文列表。
         
         Args:
             query (Union[Message[str], str]): 查询字符串或Message对象，包含查询字符串。
-            contexts (Union[Message[List[str]], List[str]]): 上下文字符串列表或Message对象，包含上下文字符串列表。
+            contexts (Union[Message[List[str]], List[str], PreparedContexts]): 上下文字符串列表或Message对象，包含上下文字符串列表。
+                传入prepare返回的PreparedContexts时不再计算上下文的embedding，只计算query的embedding。
             return_score (bool, optional): 是否返回匹配得分。默认为False。
+            top_k (Optional[int], optional): 只返回得分最高的top_k个上下文，通过np.argpartition部分排序。默认为None，返回全部上下文。
         
         Returns:
-            Message[List[str]]: 匹配的上下文列表。如果return_score为True，则返回包含得分和上下文的元组列表；否则仅返回上下文列表。
+            Message[List[str]]: 按得分从高到低排列的上下文列表，得分相同时保持输入顺序。如果return_score为True，则返回包含得分和上下文的元组列表；否则仅返回上下文列表。
         """
+        _check_top_k(top_k)
+        prepared = self._prepare(contexts)
+        if len(prepared) == 0:
+            return Message([])
         query_embedding = self.embedding_component(query)
-        contexts_embedding = self.embedding_component.batch(contexts)
+        scores = prepared.matrix @ _normalize(np.asarray(query_embedding.content))
+        return Message(_rank(scores, prepared.contexts, return_score, top_k))
 
-        sematic = self.semantics(query_embedding, contexts_embedding)
+    def prepare(self, contexts: Union[Message[List[str]], List[str]]) -> "PreparedContexts":
+        """
+        计算并缓存一组上下文归一化后的embedding，用于对同一组上下文的多次匹配。
+        
+        Args:
+            contexts (Union[Message[List[str]], List[str]]): 上下文字符串列表或Message对象，包含上下文字符串列表。
+        
+        Returns:
+            PreparedContexts: 可作为run和batch的contexts参数重复使用。
+        """
+        _contexts = contexts.content if isinstance(contexts, Message) else contexts
+        if len(_contexts) == 0:
+            return PreparedContexts(_contexts, np.empty((0, 0)))
+        return PreparedContexts(_contexts, self.embedding_component.batch(_contexts).content)
 
-        combined = list(zip(sematic.content, contexts.content))
-        sorted_combined = sorted(combined, reverse=True)
+    def _prepare(self, contexts) -> "PreparedContexts":
+        return contexts if isinstance(contexts, PreparedContexts) else self.prepare(contexts)
 
-        if return_score:
-            return Message([(item[0], item[1]) for item in sorted_combined])
-        else:
-            return Message([item[1] for item in sorted_combined])
+    def batch(
+        self,
+        queries: Union[Message[List[str]], List[str]],
+        contexts: Union[Message[List[str]], List[str], "PreparedContexts"],
+        return_score: bool = False,
+        top_k: Optional[int] = None,
+    ) -> Message[List[List[str]]]:
+        """
+        对多个query批量匹配同一组上下文，所有query的得分通过一次Q x N的矩阵乘法计算，适用于离线评测等场景。
+        
+        Args:
+            queries (Union[Message[List[str]], List[str]]): 查询字符串列表或Message对象，包含查询字符串列表。
+            contexts (Union[Message[List[str]], List[str], PreparedContexts]): 上下文字符串列表、Message对象或prepare返回的PreparedContexts。
+            return_score (bool, optional): 是否返回匹配得分。默认为False。
+            top_k (Optional[int], optional): 每个query只返回得分最高的top_k个上下文。默认为None，返回全部上下文。
+        
+        Returns:
+            Message[List[List[str]]]: 与queries顺序一致，每个元素为该query的匹配结果，格式与run的返回值相同。
+        """
+        _check_top_k(top_k)
+        _queries = queries.content if isinstance(queries, Message) else queries
+        prepared = self._prepare(contexts)
+        if len(_queries) == 0 or len(prepared) == 0:
+            return Message([[] for _ in _queries])
+        scores = self.batch_semantics(self.embedding_component.batch(_queries), prepared).content
+        return Message([_rank(row, prepared.contexts, return_score, top_k) for row in scores])
 
     def _cosine_similarity(self, X, Y):
         """
@@ -107,6 +155,9 @@ class Matching(MatchingBaseComponent):
             长度为 m x 1 的矩阵，每个元素表示 X 与 Y的对应行m 的余弦相似度
         """
 
+        # ndarray输入不会被复制，float32的向量保持float32计算
+        X = np.asarray(X)
+        Y = np.asarray(Y)
         X_norm = X / np.linalg.norm(X)
         Y_norm = Y / np.linalg.norm(Y, axis=1, keepdims=True)
 
@@ -115,15 +166,16 @@ class Matching(MatchingBaseComponent):
 
     def semantics(
         self,
-        query_embedding: Union[Message[List[float]], List[float]],
-        context_embeddings: Union[Message[List[List[float]]], List[List[float]]],
+        query_embedding: Union[Message[List[float]], List[float], np.ndarray],
+        context_embeddings: Union[Message[List[List[float]]], List[List[float]], np.ndarray],
     ) -> Message[List[float]]:
         """
         计算query和context的相似度
         
         Args:
-            query_embedding (Union[Message[List[float]], List[float]]): query的embedding，长度为n的数组
-            context_embeddings (Union[Message[List[List[float]]], List[List[float]]]): context的embedding，长度为m x n的矩阵，其中m表示候选context的数量
+            query_embedding (Union[Message[List[float]], List[float], np.ndarray]): query的embedding，长度为n的数组
+            context_embeddings (Union[Message[List[List[float]]], List[List[float]], np.ndarray]): context的embedding，长度为m x n的矩阵，其中m表示候选context的数量。
+                可直接传入Embedding(return_numpy=True)返回的ndarray，不会被复制
         
         Returns:
             Message[List[float]]: query和所有候选context的相似度列表
@@ -132,7 +184,76 @@ class Matching(MatchingBaseComponent):
         _query_embedding = query_embedding.content if isinstance(query_embedding, Message) else query_embedding
         _context_embeddings = context_embeddings.content if isinstance(context_embeddings, Message) else context_embeddings
 
-        similarity_matrix = self._cosine_similarity([_query_embedding], _context_embeddings)
+        similarity_matrix = self._cosine_similarity(np.asarray(_query_embedding).reshape(1, -1), _context_embeddings)
         similarity_matrix = similarity_matrix.flatten().tolist()
 
         return Message(similarity_matrix)
+
+    def batch_semantics(
+        self,
+        query_embeddings: Union[Message[List[List[float]]], List[List[float]], np.ndarray],
+        context_embeddings: Union[Message[List[List[float]]], List[List[float]], np.ndarray, "PreparedContexts"],
+    ) -> Message:
+        """
+        计算多个query和context的相似度矩阵
+        
+        Args:
+            query_embeddings (Union[Message[List[List[float]]], List[List[float]], np.ndarray]): query的embedding，Q x n的矩阵
+            context_embeddings (Union[Message[List[List[float]]], List[List[float]], np.ndarray, PreparedContexts]):
+                context的embedding，N x n的矩阵，或prepare返回的PreparedContexts
+        
+        Returns:
+            Message[np.ndarray]: Q x N的相似度矩阵，第i行为第i个query与所有context的相似度
+        """
+        _query_embeddings = query_embeddings.content if isinstance(query_embeddings, Message) else query_embeddings
+        if isinstance(context_embeddings, PreparedContexts):
+            context_matrix = context_embeddings.matrix
+        else:
+            _context_embeddings = context_embeddings.content if isinstance(context_embeddings, Message) \
+                else context_embeddings
+            context_matrix = _normalize(np.asarray(_context_embeddings))
+
+        return Message(_normalize(np.asarray(_query_embeddings)) @ context_matrix.T)
+
+
+class PreparedContexts(object):
+    """
+    PreparedContexts
+
+    Matching.prepare的返回值，缓存一组上下文逐行归一化后的embedding矩阵，可在多次run或batch中重复使用。
+
+    Attributes:
+        contexts (List[str]): 上下文字符串列表
+        matrix (np.ndarray): 逐行归一化后的embedding矩阵，形状为(上下文数, 维度)
+    """
+
+    def __init__(self, contexts: List[str], embeddings: Union[List[List[float]], np.ndarray]):
+        self.contexts = list(contexts)
+        self.matrix = _normalize(np.asarray(embeddings))
+
+    def __len__(self):
+        return len(self.contexts)
+
+
+def _normalize(X: np.ndarray) -> np.ndarray:
+    return X / np.linalg.norm(X, axis=-1, keepdims=True)
+
+
+def _check_top_k(top_k: Optional[int]):
+    if top_k is not None and top_k <= 0:
+        raise ValueError("Parameter `top_k` must be a positive integer, but got {}".format(top_k))
+
+
+def _rank(scores: np.ndarray, contexts: List[str], return_score: bool, top_k: Optional[int]):
+    if top_k is None or top_k >= len(scores):
+        index = np.arange(len(scores))
+    else:
+        kth = scores[np.argpartition(-scores, top_k - 1)[top_k - 1]]
+        # argpartition在第k名并列时选出的子集不确定，并列项按输入顺序补足
+        above = np.flatnonzero(scores > kth)
+        index = np.concatenate([above, np.flatnonzero(scores == kth)[:top_k - len(above)]])
+    # 按得分降序排列，得分相同时保持输入顺序
+    index = index[np.lexsort((index, -scores[index]))]
+    if return_score:
+        return [(float(scores[i]), contexts[i]) for i in index]
+    return [contexts[i] for i in index]
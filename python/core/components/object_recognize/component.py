@@ -119,12 +119,10 @@ class ObjectRecognition(Component):
             raise ValueError("request format error, one of image or url must be set")
 
         data = ObjectRecognitionRequest.to_dict(request)
-        if self.http_client.retry.total != retry:
-            self.http_client.retry.total = retry
         headers = self.http_client.auth_header(request_id)
         headers['content-type'] = 'application/x-www-form-urlencoded'
         url = self.http_client.service_url("/v1/bce/aip/image-classify/v2/advanced_general")
-        response = self.http_client.session.post(url, headers=headers, data=data, timeout=timeout)
+        response = self.http_client.with_retry(retry).post(url, headers=headers, data=data, timeout=timeout)
         self.http_client.check_response_header(response)
         data = response.json()
         self.http_client.check_response_json(data)
@@ -17,4 +17,7 @@ from .bes import BESRetriever
 
 from .baidu_vdb import BaiduVDBVectorStoreIndex
 from .baidu_vdb import BaiduVDBRetriever
-from .baidu_vdb import TableParams
\ No newline at end of file
+from .baidu_vdb import TableParams
+
+from .local import LocalVectorStoreIndex
+from .local import LocalRetriever
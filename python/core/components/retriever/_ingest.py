@@ -0,0 +1,83 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Streaming ingestion shared by the remote vector store indexes"""
+
+import contextvars
+import hashlib
+import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, List
+
+from appbuilder.core.component import Message
+
+
+def segment_id(text: str, metadata: Any = "") -> str:
+    r"""由文本与元数据计算稳定的ID，重复写入相同的数据段时覆盖而不是新增。
+    """
+    if not isinstance(metadata, str):
+        metadata = json.dumps(metadata, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256((metadata + "\n" + text).encode("utf-8")).hexdigest()
+
+
+def iter_windows(segments: Any, size: int) -> Iterator[List[str]]:
+    r"""将Message、列表或任意可迭代对象切分为长度不超过size的窗口，不会一次性物化全部数据段。
+    """
+    if size < 1:
+        raise ValueError("batch_size must be >= 1, got {}".format(size))
+    if isinstance(segments, Message):
+        segments = segments.content
+    if isinstance(segments, str):
+        raise TypeError("segments must be an iterable of str, but got a str")
+    it = iter(segments)
+    while True:
+        window = list(islice(it, size))
+        if not window:
+            return
+        yield window
+
+
+def ingest(
+    segments: Iterable[str],
+    embed: Callable[[List[str]], Any],
+    write: Callable[[List[str], Any], None],
+    batch_size: int,
+    max_pending: int = 2,
+) -> int:
+    r"""按窗口计算embedding并写入，写入在后台线程中依次执行，与下一窗口的embedding计算重叠。
+
+    最多有max_pending个窗口等待写入，内存占用与数据总量无关。写入出错时停止读取并抛出该异常。
+
+    Returns:
+        写入的数据段数量
+    """
+    if max_pending < 1:
+        raise ValueError("max_pending must be >= 1, got {}".format(max_pending))
+    total = 0
+    pending = deque()
+    # 单线程保证写入顺序与输入顺序一致
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="appbuilder-ingest")
+    try:
+        for window in iter_windows(segments, batch_size):
+            vectors = embed(window)
+            while len(pending) >= max_pending:
+                pending.popleft().result()
+            pending.append(executor.submit(contextvars.copy_context().run, write, window, vectors))
+            total += len(window)
+        while pending:
+            pending.popleft().result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    return total
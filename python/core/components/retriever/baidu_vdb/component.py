@@ -22,6 +22,8 @@ import time
 from typing import Dict, Any
 from appbuilder.core.component import Component, Message
 from appbuilder.core.components.embeddings.component import Embedding
+from appbuilder.core.components.embeddings.base import vector_to_list
+from appbuilder.core.components.retriever._ingest import ingest, segment_id
 from appbuilder.core.constants import GATEWAY_URL
 from appbuilder.utils.trace.tracer_wrapper import components_run_trace, components_run_stream_trace
 from .model import *
@@ -188,7 +190,7 @@ class BaiduVDBVectorStoreIndex:
                 FieldType.UINT64,
                 primary_key=True,
                 partition_key=True,
-                auto_increment=True,
+                auto_increment=False,
                 not_null=True,
             )
         )
@@ -304,41 +306,54 @@ class BaiduVDBVectorStoreIndex:
             table=self.table,
         )
 
-    def add_segments(self, segments: Message, metadata=""):
+    def add_segments(self, segments: Message, metadata="", batch_size: int = DEFAULT_BATCH_SIZE):
         """
-        向bes中插入数据段
-        
+        向vdb中插入数据段
+
+        数据段按batch_size分窗口计算embedding并分批upsert，写入与下一窗口的embedding计算并行，内存占用与数据总量无关。
+        表的主键不是自增时，以文本与元数据的哈希作为主键，重复写入相同的数据段时覆盖原数据而不会产生重复。
+
         Args:
-            segments (Message): 需要插入的数据段。
+            segments (Message): 需要插入的数据段，content也可以是生成器等任意可迭代对象。
             metadata (str, optional): 元数据，默认为空字符串。
-        
+            batch_size (int, optional): 每批upsert的数据段数量，默认为1000。
+
         Returns:
-            无返回值
-        
+            int: 写入的数据段数量
+
         Raises:
             ValueError: 如果segments为空，则抛出此异常。
-        
+
         """
         from pymochow.model.table import Row
 
-        segment_vectors = self.embedding.batch(segments)
-        segment_vectors = segment_vectors.content
-        vector_dims = len(segment_vectors[0])
-        segments = segments.content
-        if len(segments) == 0:
-            raise ValueError("segments is emtpty")
-
-        rows = []
-        for segment, vector in zip(segments, segment_vectors):
-            row = Row(text=segment, vector=vector, metadata=metadata)
-            rows.append(row)
-        if len(rows) >= DEFAULT_BATCH_SIZE:
-            self.collection.upsert(rows=rows)
-            rows = []
+        stable_id = not self._auto_increment_id()
+
+        def embed(window):
+            return self.embedding.batch(Message(window)).content
 
-        if len(rows) > 0:
+        def write(window, vectors):
+            rows = []
+            for segment, vector in zip(window, vectors):
+                fields = {FIELD_TEXT: segment, FIELD_VECTOR: vector_to_list(vector), FIELD_METADATA: metadata}
+                if stable_id:
+                    # UINT64主键取哈希的前8个字节
+                    fields[FIELD_ID] = int(segment_id(segment, metadata)[:16], 16)
+                rows.append(Row(**fields))
             self.table.upsert(rows=rows)
 
+        count = ingest(segments, embed, write, batch_size)
+        if count == 0:
+            raise ValueError("segments is empty")
+        return count
+
+    def _auto_increment_id(self) -> bool:
+        schema = getattr(self.table, "schema", None)
+        for field in getattr(schema, "fields", None) or []:
+            if field.field_name == FIELD_ID:
+                return bool(field.auto_increment)
+        return False
+
     @classmethod
     def from_params(
         cls,
@@ -484,7 +499,7 @@ class BaiduVDBRetriever(Component):
         query_embedding = self.embedding(query)
         anns = AnnSearch(
             vector_field=FIELD_VECTOR,
-            vector_floats=query_embedding.content,
+            vector_floats=vector_to_list(query_embedding.content),
             params=HNSWSearchParams(ef=10, limit=top_k),
         )
         res = self.table.search(
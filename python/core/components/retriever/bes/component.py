@@ -25,11 +25,15 @@ import string
 from typing import Dict, Any
 from appbuilder.core.component import Component, Message
 from appbuilder.core.components.embeddings.component import Embedding
+from appbuilder.core.components.embeddings.base import vector_to_list
+from appbuilder.core.components.retriever._ingest import ingest, segment_id
 from appbuilder.core.constants import GATEWAY_URL
 from appbuilder.utils.logger_util import logger
 from appbuilder import get_default_header
 from appbuilder.utils.trace.tracer_wrapper import components_run_trace, components_run_stream_trace
 
+DEFAULT_BATCH_SIZE = 1000
+
 
 class BESVectorStoreIndex:
     """
@@ -50,6 +54,7 @@ class BESVectorStoreIndex:
 
         self._es = None
         self._helpers = None
+        self._index_created = False
         self.bes_client = self._create_bes_client(cluster_id, user_name, password)
 
     @property
@@ -188,31 +193,53 @@ class BESVectorStoreIndex:
             mappings["properties"]["vector"]["parameters"] = {"m": 4, "ef_construction": 200}
         return mappings
 
-    def add_segments(self, segments: Message, metadata=""):
+    def add_segments(self, segments: Message, metadata="", batch_size: int = DEFAULT_BATCH_SIZE):
         """
         向BES中插入数据
-        
+
+        数据段按batch_size分窗口计算embedding并批量写入，写入与下一窗口的embedding计算并行，内存占用与数据总量无关。
+        文档ID由文本与元数据的哈希生成，重复写入相同的数据段时覆盖原文档而不会产生重复。
+
         Args:
-            segments (Message[str]): 需要插入的内容，包含多个文本段
+            segments (Message[str]): 需要插入的内容，包含多个文本段，content也可以是生成器等任意可迭代对象
             metadata (str, optional): 元数据，默认为空字符串。
-        
+            batch_size (int, optional): 每个窗口的数据段数量，默认为1000。
+
         Returns:
-            无返回值
+            int: 写入的数据段数量
+
+        Raises:
+            ValueError: 如果segments为空，则抛出此异常。
         """
-        segment_vectors = self.embedding.batch(segments)
-        segment_vectors = segment_vectors.content
-        vector_dims = len(segment_vectors[0])
-        segments = segments.content
-        documents = [
-            {"_index": self.index_name,
-             "_source": {"text": segment, "vector": vector, "metadata": metadata,
-                         "id": BESVectorStoreIndex.generate_id()}}
-            for segment, vector in zip(segments, segment_vectors)]
-
-        mappings = BESVectorStoreIndex.create_index_mappings(self.index_type, vector_dims)
-        self.bes_client.indices.create(index=self.index_name,
-                                       body={"settings": {"index": {"knn": True}}, "mappings": mappings})
-        self.helpers.bulk(self.bes_client, documents)
+        def embed(window):
+            return self.embedding.batch(Message(window)).content
+
+        def documents(window, vectors):
+            # 按需将每行向量转换为列表，Embedding返回ndarray时不会同时持有整份List[List[float]]
+            for segment, vector in zip(window, vectors):
+                doc_id = segment_id(segment, metadata)
+                yield {"_index": self.index_name,
+                       "_id": doc_id,
+                       "_source": {"text": segment, "vector": vector_to_list(vector), "metadata": metadata,
+                                   "id": doc_id}}
+
+        def write(window, vectors):
+            self._create_index_if_not_exists(len(vectors[0]))
+            self.helpers.bulk(self.bes_client, documents(window, vectors), chunk_size=batch_size)
+
+        count = ingest(segments, embed, write, batch_size)
+        if count == 0:
+            raise ValueError("segments is empty")
+        return count
+
+    def _create_index_if_not_exists(self, vector_dims):
+        if self._index_created:
+            return
+        if not self.bes_client.indices.exists(index=self.index_name):
+            mappings = BESVectorStoreIndex.create_index_mappings(self.index_type, vector_dims)
+            self.bes_client.indices.create(index=self.index_name,
+                                           body={"settings": {"index": {"knn": True}}, "mappings": mappings})
+        self._index_created = True
 
     @classmethod
     def from_segments(cls, segments, cluster_id, user_name, password, embedding=None, **kwargs):
@@ -324,7 +351,7 @@ class BESRetriever(Component):
         
         """
         query_embedding = self.embedding(query)
-        vector_query = {"vector": query_embedding.content, "k": top_k}
+        vector_query = {"vector": vector_to_list(query_embedding.content), "k": top_k}
         if self.index_type == "linear":
             vector_query["linear"] = True
         else:
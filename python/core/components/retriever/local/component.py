@@ -0,0 +1,488 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# -*- coding: utf-8 -*-
+"""
+基于NumPy的本地向量检索
+"""
+import json
+import math
+import os
+import threading
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from appbuilder.core.component import Component, Message
+from appbuilder.core.components.embeddings.component import Embedding
+from appbuilder.utils.trace.tracer_wrapper import components_run_trace
+
+INDEX_TYPES = ("flat", "ivf")
+
+
+def _normalize(X: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(X, axis=-1, keepdims=True)
+    return X / np.where(norm == 0, 1, norm)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    if k < len(scores):
+        index = np.argpartition(-scores, k - 1)[:k]
+    else:
+        index = np.arange(len(scores))
+    return index[np.argsort(-scores[index], kind="stable")]
+
+
+class _VectorStorage:
+    """
+    按行追加的float32向量矩阵，指定path时追加写入文件并通过numpy.memmap读取，否则保存在按倍数扩容的内存数组中
+    """
+
+    def __init__(self, dim: int, path: Optional[str] = None):
+        self.dim = dim
+        self.path = path
+        self.size = 0
+        self._data = np.empty((0, dim), dtype=np.float32)
+        if path is not None and os.path.exists(path):
+            self.size = os.path.getsize(path) // (4 * dim)
+            self._remap()
+
+    def _remap(self):
+        if self.size == 0:
+            self._data = np.empty((0, self.dim), dtype=np.float32)
+        else:
+            self._data = np.memmap(self.path, dtype=np.float32, mode="r", shape=(self.size, self.dim))
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._data[:self.size]
+
+    def append(self, vectors: np.ndarray):
+        if self.path is not None:
+            with open(self.path, "ab") as f:
+                f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+            self.size += len(vectors)
+            self._remap()
+            return
+        if self.size + len(vectors) > len(self._data):
+            capacity = max(self.size + len(vectors), 2 * len(self._data), 16)
+            data = np.empty((capacity, self.dim), dtype=np.float32)
+            data[:self.size] = self._data[:self.size]
+            self._data = data
+        self._data[self.size:self.size + len(vectors)] = vectors
+        self.size += len(vectors)
+
+    def truncate(self, size: int):
+        self.size = size
+        if self.path is not None:
+            with open(self.path, "ab") as f:
+                f.truncate(size * 4 * self.dim)
+            self._remap()
+
+
+class _IVFIndex:
+    """
+    倒排文件(IVF)近似检索：用球面k-means将向量划分为nlist个簇，查询时只计算与query最接近的nprobe个簇内的向量
+    """
+
+    def __init__(self, nlist: Optional[int] = None, nprobe: int = 8, min_train_size: int = 1024,
+                 iterations: int = 10, seed: int = 0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.iterations = iterations
+        self.seed = seed
+        self.centroids = None
+        self.trained_size = 0
+        self._lists: List[List[np.ndarray]] = []
+
+    def needs_training(self, size: int) -> bool:
+        # 数据量较上次训练翻倍后重新训练，避免簇的大小失衡
+        return size >= self.min_train_size and (self.centroids is None or size >= 2 * self.trained_size)
+
+    def train(self, matrix: np.ndarray, alive: np.ndarray):
+        rows = np.flatnonzero(alive)
+        nlist = self.nlist or max(1, int(math.sqrt(len(rows))))
+        nlist = min(nlist, len(rows))
+        rng = np.random.RandomState(self.seed)
+        sample = rows if len(rows) <= 64 * nlist else rng.choice(rows, 64 * nlist, replace=False)
+        data = np.asarray(matrix[np.sort(sample)])
+        centroids = data[rng.choice(len(data), nlist, replace=False)]
+        for _ in range(self.iterations):
+            assign = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, data)
+            empty = np.bincount(assign, minlength=nlist) == 0
+            sums[empty] = centroids[empty]
+            centroids = _normalize(sums)
+        self.centroids = centroids
+        self.trained_size = len(rows)
+        self._lists = [[] for _ in range(nlist)]
+        self.add(matrix, rows)
+
+    def add(self, matrix: np.ndarray, rows: np.ndarray):
+        if self.centroids is None or len(rows) == 0:
+            return
+        assign = np.argmax(np.asarray(matrix[rows]) @ self.centroids.T, axis=1)
+        order = np.argsort(assign, kind="stable")
+        lists, starts = np.unique(assign[order], return_index=True)
+        for cluster, chunk in zip(lists, np.split(rows[order], starts[1:])):
+            self._lists[cluster].append(chunk)
+
+    def candidates(self, query: np.ndarray) -> np.ndarray:
+        probes = _top_k(self.centroids @ query, min(self.nprobe, len(self.centroids)))
+        chunks = []
+        for cluster in probes:
+            if len(self._lists[cluster]) > 1:
+                # 合并增量写入的行，下次查询无需再次拼接
+                self._lists[cluster] = [np.concatenate(self._lists[cluster])]
+            chunks.extend(self._lists[cluster])
+        return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+
+
+class LocalVectorStoreIndex:
+    """
+    本地向量存储检索工具，无需远程集群，适用于单元测试、端侧部署及小规模语料。
+
+    向量归一化后以float32保存，按余弦相似度检索。index_type为"flat"时精确检索；为"ivf"时使用倒排文件近似检索，
+    数据量达到min_train_size后在查询时自动训练聚类中心，之前退化为精确检索。
+    指定path时向量追加写入path目录下的vectors.f32并通过numpy.memmap读取，文本、元数据及删除记录追加写入segments.jsonl，
+    再次使用同一path初始化即可加载。IVF的聚类中心不落盘，加载后在首次查询时重新训练。
+
+    Args:
+        embedding (Embedding, optional): 文本段落embedding工具，默认为None，使用默认的Embedding类。
+        index_type (str, optional): 索引类型，"flat"或"ivf"。默认为"flat"。
+        path (str, optional): 持久化目录，默认为None，仅保存在内存中。
+        nlist (int, optional): IVF的簇数，默认为None，取向量数的平方根。
+        nprobe (int, optional): IVF查询时搜索的簇数，越大召回率越高、速度越慢。默认为8。
+        min_train_size (int, optional): IVF开始训练所需的最少向量数。默认为1024。
+
+    Examples:
+
+    .. code-block:: python
+
+        import appbuilder
+        os.environ["APPBUILDER_TOKEN"] = '...'
+
+        segments = appbuilder.Message(["文心一言大模型", "百度在线科技有限公司"])
+        vector_index = appbuilder.LocalVectorStoreIndex.from_segments(segments, path="./vector_index")
+        retriever = vector_index.as_retriever()
+        res = retriever(appbuilder.Message("文心一言"))
+    """
+
+    def __init__(self, embedding=None, index_type: str = "flat", path: Optional[str] = None,
+                 nlist: Optional[int] = None, nprobe: int = 8, min_train_size: int = 1024):
+        if index_type not in INDEX_TYPES:
+            raise ValueError("Parameter `index_type` must be one of {}, but got {}".format(INDEX_TYPES, index_type))
+        if embedding is None:
+            embedding = Embedding()
+
+        self.embedding = embedding
+        self.index_type = index_type
+        self.path = path
+        self._ivf = _IVFIndex(nlist, nprobe, min_train_size) if index_type == "ivf" else None
+        self._lock = threading.RLock()
+        self._storage = None
+        self._ids: List[str] = []
+        self._texts: List[str] = []
+        self._metadata: List[Any] = []
+        self._rows: Dict[str, int] = {}
+        self._alive = np.zeros(0, dtype=bool)
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            self._load()
+
+    def _meta_path(self):
+        return os.path.join(self.path, "meta.json")
+
+    def _segments_path(self):
+        return os.path.join(self.path, "segments.jsonl")
+
+    def _vectors_path(self):
+        return os.path.join(self.path, "vectors.f32")
+
+    def _load(self):
+        if not os.path.exists(self._meta_path()):
+            return
+        with open(self._meta_path(), encoding="utf-8") as f:
+            dim = json.load(f)["dim"]
+        self._storage = _VectorStorage(dim, self._vectors_path())
+        lines = []
+        if os.path.exists(self._segments_path()):
+            with open(self._segments_path(), encoding="utf-8") as f:
+                lines = f.readlines()
+        kept = []
+        alive = []
+        for line in lines:
+            # 最后一行可能因进程中断而不完整
+            if not line.endswith("\n"):
+                break
+            record = json.loads(line)
+            if "delete" in record:
+                row = self._rows.pop(record["delete"], None)
+                if row is not None:
+                    alive[row] = False
+            elif len(self._ids) < self._storage.size:
+                replaced = self._register(record["id"], record["text"], record["metadata"])
+                if replaced is not None:
+                    alive[replaced] = False
+                alive.append(True)
+            else:
+                # 先写向量再写文本，缺少向量的文本视为未写入
+                continue
+            kept.append(line)
+        self._alive = np.array(alive, dtype=bool)
+        self._storage.truncate(len(self._ids))
+        if len(kept) != len(lines):
+            with open(self._segments_path(), "w", encoding="utf-8") as f:
+                f.write("".join(kept))
+
+    def _register(self, segment_id, text, metadata) -> Optional[int]:
+        replaced = self._rows.get(segment_id)
+        self._rows[segment_id] = len(self._ids)
+        self._ids.append(segment_id)
+        self._texts.append(text)
+        self._metadata.append(metadata)
+        return replaced
+
+    def _mark_deleted(self, segment_id) -> bool:
+        row = self._rows.pop(segment_id, None)
+        if row is None:
+            return False
+        self._alive[row] = False
+        return True
+
+    def _write_log(self, records):
+        if self.path is not None:
+            with open(self._segments_path(), "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+
+    def __len__(self):
+        return len(self._rows)
+
+    def add_segments(self, segments: Message, metadata="", ids: Optional[List[str]] = None) -> List[str]:
+        """
+        向索引中插入数据
+
+        Args:
+            segments (Message[List[str]]): 需要插入的内容，包含多个文本段
+            metadata (str, optional): 元数据，默认为空字符串。
+            ids (List[str], optional): 文本段的ID，与segments一一对应，已存在的ID会被覆盖。默认为None，自动生成。
+
+        Returns:
+            List[str]: 插入的文本段的ID
+        """
+        _segments = segments.content if isinstance(segments, Message) else segments
+        if ids is None:
+            ids = [uuid.uuid4().hex for _ in _segments]
+        elif len(ids) != len(_segments):
+            raise ValueError("Parameter `ids` must have the same length as segments, got {} and {}"
+                             .format(len(ids), len(_segments)))
+        if len(_segments) == 0:
+            return []
+        vectors = _normalize(np.asarray(self.embedding.batch(_segments).content, dtype=np.float32))
+        self._add_vectors(vectors, _segments, metadata, ids)
+        return list(ids)
+
+    def _add_vectors(self, vectors: np.ndarray, texts: List[str], metadata, ids: List[str]):
+        with self._lock:
+            if self._storage is None:
+                self._storage = _VectorStorage(vectors.shape[1],
+                                               self._vectors_path() if self.path is not None else None)
+                if self.path is not None:
+                    with open(self._meta_path(), "w", encoding="utf-8") as f:
+                        json.dump({"dim": vectors.shape[1]}, f)
+            elif vectors.shape[1] != self._storage.dim:
+                raise ValueError("vector dim {} does not match the index dim {}"
+                                 .format(vectors.shape[1], self._storage.dim))
+            start = self._storage.size
+            self._storage.append(vectors)
+            self._write_log({"id": segment_id, "text": text, "metadata": metadata}
+                            for segment_id, text in zip(ids, texts))
+            self._alive = np.concatenate([self._alive, np.ones(len(texts), dtype=bool)])
+            for segment_id, text in zip(ids, texts):
+                replaced = self._register(segment_id, text, metadata)
+                if replaced is not None:
+                    self._alive[replaced] = False
+            if self._ivf is not None:
+                self._ivf.add(self._storage.matrix, np.arange(start, self._storage.size))
+
+    def delete_segments(self, ids: List[str]) -> int:
+        """
+        删除指定ID的文本段
+
+        Args:
+            ids (List[str]): 需要删除的文本段的ID
+
+        Returns:
+            int: 实际删除的文本段数量
+        """
+        with self._lock:
+            deleted = [segment_id for segment_id in ids if self._mark_deleted(segment_id)]
+            self._write_log({"delete": segment_id} for segment_id in deleted)
+        return len(deleted)
+
+    def delete_all_segments(self):
+        """
+        删除索引中的全部内容。
+        """
+        self.delete_segments(list(self._rows))
+
+    def get_all_segments(self) -> List[Dict[str, Any]]:
+        """
+        获取索引中的全部内容
+        """
+        with self._lock:
+            return [{"id": self._ids[row], "text": self._texts[row], "meta": self._metadata[row]}
+                    for row in sorted(self._rows.values())]
+
+    def search(self, query_vector, top_k: int = 1) -> List[Dict[str, Any]]:
+        """
+        根据向量检索最相似的文本段
+
+        Args:
+            query_vector (Union[List[float], np.ndarray]): 查询向量
+            top_k (int, optional): 返回的结果数。默认为1。
+
+        Returns:
+            List[Dict]: 按相似度从高到低排列的结果，包含id、文本、元数据以及余弦相似度得分
+        """
+        rows, scores = self._search(query_vector, top_k)
+        return [{"id": self._ids[row], "text": self._texts[row], "meta": self._metadata[row], "score": float(score)}
+                for row, score in zip(rows, scores)]
+
+    def _search(self, query_vector, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        if top_k <= 0:
+            raise ValueError("Parameter `top_k` must be a positive integer, but got {}".format(top_k))
+        query = _normalize(np.asarray(query_vector, dtype=np.float32).reshape(-1))
+        with self._lock:
+            if self._storage is None or len(self._rows) == 0:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            matrix = self._storage.matrix
+            alive = self._alive
+            if self._ivf is not None and self._ivf.needs_training(len(self._rows)):
+                self._ivf.train(matrix, alive)
+            if self._ivf is not None and self._ivf.centroids is not None:
+                rows = self._ivf.candidates(query)
+                # 按行号顺序读取，memmap时为顺序访问
+                rows = np.sort(rows[alive[rows]])
+                scores = np.asarray(matrix[rows]) @ query
+            else:
+                scores = matrix @ query
+                rows = np.flatnonzero(alive)
+                scores = scores[rows]
+        index = _top_k(scores, top_k)
+        return rows[index], scores[index]
+
+    def compact(self):
+        """
+        重写持久化文件，移除已删除的文本段，释放其占用的磁盘空间。
+        """
+        with self._lock:
+            rows = np.array(sorted(self._rows.values()), dtype=np.int64)
+            vectors = np.array(self._storage.matrix[rows]) if self._storage is not None \
+                else np.empty((0, 0), dtype=np.float32)
+            ids = [self._ids[row] for row in rows]
+            texts = [self._texts[row] for row in rows]
+            metadata = [self._metadata[row] for row in rows]
+            if self.path is not None:
+                for name, data in ((self._vectors_path(), vectors.tobytes()),
+                                   (self._segments_path(), "".join(
+                                       json.dumps({"id": i, "text": t, "metadata": m}, ensure_ascii=False) + "\n"
+                                       for i, t, m in zip(ids, texts, metadata)).encode("utf-8"))):
+                    with open(name + ".tmp", "wb") as f:
+                        f.write(data)
+                    os.replace(name + ".tmp", name)
+            dim = self._storage.dim if self._storage is not None else None
+            self._ids, self._texts, self._metadata, self._rows = [], [], [], {}
+            self._alive = np.zeros(0, dtype=bool)
+            if dim is not None:
+                self._storage = _VectorStorage(dim, self._vectors_path() if self.path is not None else None)
+                if self.path is None:
+                    self._storage.append(vectors)
+                self._alive = np.ones(len(ids), dtype=bool)
+                for segment_id, text, meta in zip(ids, texts, metadata):
+                    self._register(segment_id, text, meta)
+            if self._ivf is not None:
+                self._ivf = _IVFIndex(self._ivf.nlist, self._ivf.nprobe, self._ivf.min_train_size)
+
+    def as_retriever(self):
+        """
+        转化为retriever
+        """
+        return LocalRetriever(vector_index=self)
+
+    @classmethod
+    def from_segments(cls, segments, embedding=None, **kwargs):
+        """
+        根据段落创建一个本地向量索引。
+
+        Args:
+            segments (Message[List[str]]): 切分的文本段落列表。
+            embedding (Embedding, optional): 文本段落embedding工具，默认为None，使用默认的Embedding类。
+            **kwargs: 其他初始化参数，如index_type、path等。
+
+        Returns:
+            LocalVectorStoreIndex: 本地向量索引实例。
+        """
+        vector_index = cls(embedding=embedding, **kwargs)
+        vector_index.add_segments(segments)
+        return vector_index
+
+
+class LocalRetriever(Component):
+    """
+    本地向量检索组件，用于检索和query相匹配的内容
+
+    Examples:
+
+    .. code-block:: python
+
+        import appbuilder
+        os.environ["APPBUILDER_TOKEN"] = '...'
+
+        segments = appbuilder.Message(["文心一言大模型", "百度在线科技有限公司"])
+        vector_index = appbuilder.LocalVectorStoreIndex.from_segments(segments)
+        retriever = vector_index.as_retriever()
+        res = retriever(appbuilder.Message("文心一言"))
+
+    """
+    name: str = "LocalRetriever"
+    tool_desc: Dict[str, Any] = {"description": "a retriever based on a local vector index"}
+
+    def __init__(self, vector_index: LocalVectorStoreIndex, **kwargs):
+        super().__init__(lazy_certification=True)
+
+        self.vector_index = vector_index
+        self.embedding = vector_index.embedding
+
+    @components_run_trace
+    def run(self, query: Message, top_k: int = 1):
+        """
+        根据query进行查询
+
+        Args:
+            query (Message[str]): 需要查询的内容，以Message对象的形式传递。
+            top_k (int, optional): 查询结果中匹配度最高的top_k个结果。默认为1。
+
+        Returns:
+            obj (Message[Dict]): 查询到的结果，包含文本、元数据以及匹配得分，以Message对象的形式返回。
+
+        """
+        if not isinstance(top_k, int) or top_k <= 0:
+            raise ValueError("Parameter `top_k` must be a positive integer, but got {}".format(top_k))
+        query_embedding = self.embedding(query)
+        docs = self.vector_index.search(query_embedding.content, top_k)
+        return Message([{"text": doc["text"], "meta": doc["meta"], "score": doc["score"]} for doc in docs])
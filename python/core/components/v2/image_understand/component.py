@@ -141,14 +141,12 @@ class ImageUnderstand(Component):
         """
         if not request.image and not request.url:
             raise ValueError("request format error, one of image or url must be set")
-        if retry != self.http_client.retry.total:
-            self.http_client.retry.total = retry
         data = ImageUnderstandRequest.to_dict(request)
         headers = self.http_client.auth_header(request_id)
         headers['Content-Type'] = 'application/json'
         url = self.http_client.service_url("/v1/bce/aip/image-classify/v1/image-understanding/request")
         try:
-            response = self.http_client.session.post(url, json=data, timeout=timeout, headers=headers)
+            response = self.http_client.with_retry(retry).post(url, json=data, timeout=timeout, headers=headers)
             response.raise_for_status()
             data = response.json()
             self.http_client.check_response_json(data)
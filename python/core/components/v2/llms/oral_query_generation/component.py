@@ -140,8 +140,8 @@ class OralQueryGeneration(CompletionBaseComponent):
         stream = True if request.response_mode == "streaming" else False
         
         url = self.http_client.service_url("/app/query_generation", self.base_url)
-        response = self.http_client.session.post(url, json=request.params, headers=headers, timeout=timeout,
-                                                 stream=stream)
+        response = self.http_client.with_retry(retry).post(url, json=request.params, headers=headers, timeout=timeout,
+                                                           stream=stream)
         return self.gene_response(response, stream)
 
     @components_run_trace
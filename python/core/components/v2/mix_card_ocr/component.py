@@ -128,12 +128,10 @@ class MixCardOCR(Component):
             raise ValueError(
                 "request format error, one of image or url must be set")
         data = request.model_dump()
-        if self.http_client.retry.total != retry:
-            self.http_client.retry.total = retry
         headers = self.http_client.auth_header(request_id)
         headers['content-type'] = 'application/x-www-form-urlencoded'
         url = self.http_client.service_url("/v1/bce/aip/ocr/v1/multi_idcard")
-        response = self.http_client.session.post(
+        response = self.http_client.with_retry(retry).post(
             url, headers=headers, data=data, timeout=timeout)
         self.http_client.check_response_header(response)
         data = response.json()
@@ -135,12 +135,10 @@ class PlantRecognition(Component):
         if not request.image and not request.url:
             raise ValueError("request format error, one of image or url must be set")
         data = PlantRecognitionRequest.to_dict(request)
-        if retry != self.http_client.retry.total:
-            self.http_client.retry.total = retry
         headers = self.http_client.auth_header(request_id)
         headers['content-type'] = 'application/x-www-form-urlencoded'
         url = self.http_client.service_url("/v1/bce/aip/image-classify/v1/plant")
-        response = self.http_client.session.post(url, data=data, timeout=timeout, headers=headers)
+        response = self.http_client.with_retry(retry).post(url, data=data, timeout=timeout, headers=headers)
         self.http_client.check_response_header(response)
         data = response.json()
         self.http_client.check_response_json(data)
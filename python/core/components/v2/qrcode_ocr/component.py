@@ -122,13 +122,11 @@ class QRcodeOCR(Component):
                 "request format error, one of image or url must be set")
 
         data = QRcodeRequest.model_dump(request)
-        if self.http_client.retry.total != retry:
-            self.http_client.retry.total = retry
         headers = self.http_client.auth_header(request_id)
         headers['content-type'] = 'application/x-www-form-urlencoded'
         headers['Accept'] = 'application/json'
         url = self.http_client.service_url("/v1/bce/aip/ocr/v1/qrcode")
-        response = self.http_client.session.post(
+        response = self.http_client.with_retry(retry).post(
             url, headers=headers, data=data, timeout=timeout)
         
         self.http_client.check_response_header(response)
@@ -334,9 +334,7 @@ class Text2Image(Component):
         }
         headers = self.http_client.auth_header(request_id)
         headers['content-type'] = 'application/json'
-        if retry != self.http_client.retry.total:
-            self.http_client.retry.total = retry
-        response = self.http_client.session.post(url, json=data, headers=headers, timeout=timeout)
+        response = self.http_client.with_retry(retry).post(url, json=data, headers=headers, timeout=timeout)
         self.http_client.check_response_header(response)
         data = response.json()
         self.http_client.check_response_json(data)
@@ -128,14 +128,12 @@ class Translation(Component):
         if not request.from_lang:
             request.from_lang = "auto"
         request_data = TranslateRequest.to_json(request)
-        if retry != self.http_client.retry.total:
-            self.http_client.retry.total = retry
         headers = self.http_client.auth_header(request_id)
         headers['content-type'] = 'application/json;charset=utf-8'
 
         url = self.http_client.service_url("/v1/bce/aip/mt/texttrans/v1")
 
-        response = self.http_client.session.post(url, headers=headers, data=request_data, timeout=timeout)
+        response = self.http_client.with_retry(retry).post(url, headers=headers, data=request_data, timeout=timeout)
 
         self.http_client.check_response_header(response)
         data = response.json()
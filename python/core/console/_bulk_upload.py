@@ -0,0 +1,272 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Concurrent bulk file upload shared by KnowledgeBase and Dataset"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+import requests
+from pydantic import BaseModel, PrivateAttr
+from urllib3.fields import format_header_param_html5
+
+from appbuilder.core._retry import RetryPolicy, _is_connect_error
+from appbuilder.utils.logger_util import logger
+
+
+class MultipartFileBody(object):
+    r"""流式的multipart/form-data请求体。
+
+    文件内容在发送时按块读取，不会整体读入内存；实现了__len__，requests据此设置Content-Length而不使用chunked编码。
+
+    Args:
+        file_path (str): 上传的文件路径。
+        fields (Optional[Dict[str, str]]): 文件之外的表单字段。
+        file_field (str): 文件对应的表单字段名。默认为"file"。
+    """
+
+    def __init__(self, file_path: str, fields: Optional[Dict[str, str]] = None, file_field: str = "file"):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = "multipart/form-data; boundary={}".format(self.boundary)
+        head = b""
+        # 与requests的files=参数一致，按urllib3的html5规则转义字段名与文件名中的引号和控制字符
+        for name, value in (fields or {}).items():
+            head += "--{}\r\nContent-Disposition: form-data; {}\r\n\r\n{}\r\n".format(
+                self.boundary, format_header_param_html5("name", name), value).encode("utf-8")
+        head += "--{}\r\nContent-Disposition: form-data; {}; {}\r\n\r\n".format(
+            self.boundary, format_header_param_html5("name", file_field),
+            format_header_param_html5("filename", os.path.basename(file_path))).encode("utf-8")
+        self._head = head
+        self._tail = "\r\n--{}--\r\n".format(self.boundary).encode("utf-8")
+        self._file_path = file_path
+        self._file_size = os.path.getsize(file_path)
+        self._file = None
+        self._parts = None
+
+    def __len__(self):
+        return len(self._head) + self._file_size + len(self._tail)
+
+    def read(self, size: int = -1) -> bytes:
+        if self._parts is None:
+            self._file = open(self._file_path, "rb")
+            self._parts = [self._head, self._file, self._tail]
+        if size is None or size < 0:
+            size = len(self)
+        data = b""
+        while self._parts and len(data) < size:
+            part = self._parts[0]
+            if isinstance(part, bytes):
+                chunk, rest = part[:size - len(data)], part[size - len(data):]
+                if rest:
+                    self._parts[0] = rest
+                else:
+                    self._parts.pop(0)
+            else:
+                chunk = part.read(size - len(data))
+                if not chunk:
+                    part.close()
+                    self._parts.pop(0)
+            data += chunk
+        return data
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(64 * 1024)
+            if not chunk:
+                break
+            yield chunk
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+class BulkUploadResult(BaseModel):
+    r"""单个文件的上传结果
+
+    Attributes:
+        file_path (str): 文件路径
+        success (bool): 是否上传成功
+        id (Optional[str]): 上传成功后服务端返回的文档ID或文件ID
+        error (Optional[str]): 上传失败时的错误信息
+        attempts (int): 请求次数
+    """
+    file_path: str
+    success: bool
+    id: Optional[str] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    # 上传失败时的原始异常，不写入结果清单
+    _exception: Optional[Exception] = PrivateAttr(default=None)
+
+
+class BulkUploadResponse(BaseModel):
+    r"""批量上传的结果清单，results与输入的文件顺序一致"""
+    results: List[BulkUploadResult] = []
+
+    @property
+    def succeeded(self) -> List[BulkUploadResult]:
+        return [r for r in self.results if r.success]
+
+    @property
+    def failed(self) -> List[BulkUploadResult]:
+        return [r for r in self.results if not r.success]
+
+
+class _RateLimitGate(object):
+    # 任一请求收到429后，所有worker在退避结束前都不再发起请求
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._resume_at = 0.0
+
+    def pause(self, delay: float):
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + delay)
+
+    def wait(self):
+        while True:
+            with self._lock:
+                remaining = self._resume_at - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(remaining)
+
+
+def _load_manifest(manifest_path: Optional[str]) -> Dict[str, BulkUploadResult]:
+    if not manifest_path or not os.path.exists(manifest_path):
+        return {}
+    results = {}
+    with open(manifest_path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                result = BulkUploadResult(**json.loads(line))
+                results[result.file_path] = result
+    return results
+
+
+def bulk_upload(
+    file_paths: Iterable[str],
+    send: Callable[[str], requests.Response],
+    parse: Callable[[requests.Response], str],
+    validate: Optional[Callable[[str], None]] = None,
+    max_workers: int = 8,
+    retry: Union[int, RetryPolicy] = 3,
+    progress_callback: Optional[Callable[[BulkUploadResult, int, Optional[int]], None]] = None,
+    manifest_path: Optional[str] = None,
+) -> BulkUploadResponse:
+    r"""通过有界线程池并发上传文件。
+
+    每个文件按retry重试连接失败及429/5xx响应，收到429时所有worker一同退避，优先遵循Retry-After头。
+    单个文件失败不影响其他文件，结果记录在返回的清单中。指定manifest_path时每完成一个文件即追加一行JSON，
+    再次使用同一manifest_path调用时跳过其中已上传成功的文件。
+
+    Args:
+        file_paths (Iterable[str]): 文件路径列表或迭代器，迭代器会按需消费。
+        send (Callable[[str], requests.Response]): 发起单个文件上传请求，每次重试都会重新调用。
+        parse (Callable[[requests.Response], str]): 校验响应并返回文档ID或文件ID，抛出异常表示上传失败。
+        validate (Optional[Callable[[str], None]]): 上传前校验文件，抛出异常表示该文件失败。
+        max_workers (int): 并发上传的线程数。默认为8。
+        retry (Union[int, RetryPolicy]): 单个文件的重试次数或重试策略。默认为3。
+        progress_callback (Optional[Callable[[BulkUploadResult, int, Optional[int]], None]]):
+            每个文件完成时调用，参数为该文件的结果、已完成的文件数及文件总数(输入为迭代器时为None)。
+        manifest_path (Optional[str]): 结果清单文件路径。默认为None，不记录。
+
+    Returns:
+        BulkUploadResponse: 每个文件的上传结果
+    """
+    if max_workers < 1:
+        raise ValueError("max_workers must be >= 1, got {}".format(max_workers))
+    policy = RetryPolicy.from_value(retry)
+    total = len(file_paths) if hasattr(file_paths, "__len__") else None
+    previous = _load_manifest(manifest_path)
+    gate = _RateLimitGate()
+    results = []
+    completed = 0
+
+    def upload(file_path):
+        attempts = 0
+        try:
+            if validate is not None:
+                validate(file_path)
+            while True:
+                gate.wait()
+                attempts += 1
+                try:
+                    response = send(file_path)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                    delay = policy.exception_retry_delay(attempts - 1, "POST", _is_connect_error(e))
+                    if delay is None:
+                        raise
+                    logger.warning("upload {} failed: {}, retry {}/{} in {:.2f}s".format(
+                        file_path, e, attempts, policy.max_retries, delay))
+                else:
+                    delay = policy.status_retry_delay(attempts - 1, response.status_code, response.headers)
+                    if delay is None:
+                        return BulkUploadResult(file_path=file_path, success=True, id=parse(response),
+                                                attempts=attempts)
+                    logger.warning("upload {} got http status {}, retry {}/{} in {:.2f}s".format(
+                        file_path, response.status_code, attempts, policy.max_retries, delay))
+                    response.close()
+                    if response.status_code == requests.codes.too_many_requests:
+                        gate.pause(delay)
+                time.sleep(delay)
+        except Exception as e:
+            result = BulkUploadResult(file_path=file_path, success=False, error="{}: {}".format(type(e).__name__, e),
+                                      attempts=attempts)
+            result._exception = e
+            return result
+
+    def finish(index, result, record=True):
+        nonlocal completed
+        results.append((index, result))
+        completed += 1
+        if record and manifest is not None:
+            # 每完成一个文件即落盘，进程中断后可据此续传
+            manifest.write(result.model_dump_json() + "\n")
+            manifest.flush()
+        if progress_callback is not None:
+            progress_callback(result, completed, total)
+
+    manifest = open(manifest_path, "a", encoding="utf-8") if manifest_path else None
+    try:
+        _run(file_paths, previous, upload, finish, max_workers)
+    finally:
+        if manifest is not None:
+            manifest.close()
+
+    results.sort(key=lambda item: item[0])
+    return BulkUploadResponse(results=[result for _, result in results])
+
+
+def _run(file_paths, previous, upload, finish, max_workers):
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="appbuilder-upload") as executor:
+        pending = {}
+        for index, file_path in enumerate(file_paths):
+            if file_path in previous and previous[file_path].success:
+                finish(index, previous[file_path], record=False)
+                continue
+            # 限制已提交未完成的任务数，避免一次性消费整个迭代器
+            while len(pending) >= max_workers * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finish(pending.pop(future), future.result())
+            pending[executor.submit(upload, file_path)] = index
+        for future in as_completed(list(pending)):
+            finish(pending.pop(future), future.result())
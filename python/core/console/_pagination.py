@@ -0,0 +1,95 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Lazy marker-based pagination shared by the console list APIs"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+
+_END = object()
+
+
+class PageIterator(object):
+    r"""按marker分页的惰性迭代器。
+
+    逐条返回当前页的数据，在调用方处理当前页时由后台线程预取下一页。只有被消费的页才会被请求，内存中最多保留两页数据。
+
+    marker属性为当前正在返回的页的起始marker，将其传给对应的iter_*方法即可从该页继续迭代
+    (该页中已返回过的数据会被再次返回)。请求失败时异常在next()中抛出，再次调用next()会重新请求失败的页。
+
+    Args:
+        fetch_page (Callable[[Optional[str]], Tuple[List[Any], Optional[str]]]):
+            请求marker对应的一页，返回该页数据及下一页的marker，没有下一页时返回None。
+        marker (Optional[str]): 第一页的marker。默认为None，从头开始。
+        prefetch (bool): 是否在后台预取下一页。默认为True。
+    """
+
+    def __init__(self,
+                 fetch_page: Callable[[Optional[str]], Tuple[List[Any], Optional[str]]],
+                 marker: Optional[str] = None,
+                 prefetch: bool = True):
+        self._fetch_page = fetch_page
+        self._prefetch = prefetch
+        self._executor = None
+        self._future = None
+        self._items = iter(())
+        self._next_marker = marker
+        self._done = False
+        self.marker = marker
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while True:
+            item = next(self._items, _END)
+            if item is not _END:
+                return item
+            if self._done:
+                self.close()
+                raise StopIteration
+            self._load_next_page()
+
+    def _load_next_page(self):
+        future, self._future = self._future, None
+        if future is not None:
+            items, next_marker = future.result()
+        else:
+            items, next_marker = self._fetch_page(self._next_marker)
+        self.marker = self._next_marker
+        self._items = iter(items)
+        self._next_marker = next_marker
+        if not items or not next_marker:
+            self._done = True
+        elif self._prefetch:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="appbuilder-prefetch")
+            self._future = self._executor.submit(self._fetch_page, next_marker)
+
+    def close(self):
+        r"""停止预取并释放后台线程，提前结束迭代时调用"""
+        if self._future is not None:
+            self._future.cancel()
+            self._future = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self._done = True
+        self._items = iter(())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
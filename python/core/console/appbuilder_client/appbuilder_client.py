@@ -22,6 +22,7 @@ from appbuilder.core.console.appbuilder_client import data_class
 from appbuilder.core._exception import AppBuilderServerException
 from appbuilder.utils.sse_util import SSEClient
 from appbuilder.core._client import HTTPClient
+from appbuilder.core.console._pagination import PageIterator
 from appbuilder.utils.func_utils import deprecated
 from appbuilder.utils.trace.tracer_wrapper import client_run_trace, client_tool_trace
 
@@ -93,6 +94,15 @@ def describe_apps(
         DescribeAppsResponse: 应用列表。
 
     """
+    return _describe_apps(marker, maxKeys, secret_key, gateway).data
+
+
+def _describe_apps(
+    marker: Optional[str],
+    maxKeys: int,
+    secret_key: Optional[str],
+    gateway: Optional[str],
+) -> data_class.DescribeAppsResponse:
     client = HTTPClient(secret_key=secret_key, gateway_v2=gateway)
     headers = client.auth_header_v2()
     headers["Content-Type"] = "application/json"
@@ -106,9 +116,39 @@ def describe_apps(
 
     client.check_response_header(response)
     data = response.json()
-    resp = data_class.DescribeAppsResponse(**data)
-    out = resp.data
-    return out
+    return data_class.DescribeAppsResponse(**data)
+
+
+def iter_apps(
+    page_size: int = 100,
+    marker: Optional[str] = None,
+    prefetch: bool = True,
+    secret_key: Optional[str] = None,
+    gateway: Optional[str] = None,
+) -> PageIterator:
+    """
+    惰性迭代用户下已发布的应用，在处理当前页时后台预取下一页。
+
+    Args:
+        page_size (int, optional): 每页的应用数量，默认值为100，最大为100。
+        marker (Optional[str], optional): 起始位置，可传入迭代器的marker属性从中断处继续。默认值为None。
+        prefetch (bool, optional): 是否在后台预取下一页。默认值为True。
+        secret_key (Optional[str], optional): 认证密钥。如果未指定，则使用默认的密钥。默认值为None。
+        gateway (Optional[str], optional): 网关地址。如果未指定，则使用默认的地址。默认值为None。
+
+    Returns:
+        PageIterator: 逐个返回AppOverview的迭代器。
+
+    """
+
+    def fetch_page(page_marker):
+        resp = _describe_apps(page_marker, page_size, secret_key, gateway)
+        # 与get_all_apps保持一致：返回满页时以最后一个应用的ID作为下一页的marker
+        if resp.data and (resp.isTruncated or len(resp.data) == page_size):
+            return resp.data, resp.nextMarker or resp.data[-1].id
+        return resp.data, None
+
+    return PageIterator(fetch_page, marker=marker, prefetch=prefetch)
 
 
 @client_tool_trace
@@ -157,19 +197,7 @@ def get_all_apps():
         其中App对象的结构取决于get_app_list函数的返回结果。
 
     """
-    app_list = []
-    response_per_time = describe_apps(maxKeys=100)
-    list_len_per_time = len(response_per_time)
-    if list_len_per_time != 0:
-        app_list.extend(response_per_time)
-    while list_len_per_time == 100:
-        after_id = response_per_time[-1].id
-        response_per_time = describe_apps(marker=after_id, maxKeys=100)
-        list_len_per_time = len(response_per_time)
-        if list_len_per_time != 0:
-            app_list.extend(response_per_time)
-
-    return app_list
+    return list(iter_apps(page_size=100))
 
 
 class AppBuilderClient(Component):
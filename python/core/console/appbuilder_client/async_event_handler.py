@@ -11,6 +11,9 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import asyncio
+import inspect
+from typing import Optional
 from appbuilder.utils.logger_util import logger
 from appbuilder.core.console.appbuilder_client import data_class
 
@@ -466,12 +469,38 @@ class AsyncAppBuilderEventHandler(object):
 
 
 class AsyncToolCallEventHandler(AsyncAppBuilderEventHandler):
-    def __init__(self, mcp_client=None, functions=[]):
+    def __init__(self, mcp_client=None, functions=[], parallel_tool_calls: bool = False,
+                 tool_timeout: Optional[float] = None):
+        """
+        初始化异步工具调用事件处理器。
+
+        Args:
+            mcp_client (optional): MCP客户端，本地函数中找不到的工具交由其调用。默认为None。
+            functions (list, optional): 可供Agent调用的函数列表，支持普通函数及协程函数，按函数名匹配tool_call。
+            parallel_tool_calls (bool, optional): 同一轮中有多个tool_call时，是否通过asyncio.gather并发执行。
+                并发时普通函数在线程中执行，避免阻塞事件循环。默认为False。
+            tool_timeout (Optional[float], optional): 单个工具的超时时间(秒)，超时后以超时信息作为该工具的输出。
+                默认为None，不限制。
+
+        Returns:
+            None
+        """
         super().__init__()
         self.mcp_client = mcp_client
         self.functions = functions
+        self.parallel_tool_calls = parallel_tool_calls
+        self.tool_timeout = tool_timeout
         self.result = ""
 
+    @property
+    def functions(self):
+        return self._functions
+
+    @functions.setter
+    def functions(self, functions):
+        self._functions = functions
+        self._function_map = {f.__name__: f for f in functions}
+
     async def init(
         self,
         appbuilder_client,
@@ -520,31 +549,17 @@ class AsyncToolCallEventHandler(AsyncAppBuilderEventHandler):
         thought = run_context.current_thought
         logger.debug("Agent 中间思考: {}\n".format(thought))
 
+        tool_calls = run_context.current_tool_calls
+        parallel = self.parallel_tool_calls and len(tool_calls) > 1
+        calls = [self._call_tool_with_timeout(tool_call, parallel) for tool_call in tool_calls]
+        if parallel:
+            # gather按传入顺序返回结果
+            results = await asyncio.gather(*calls)
+        else:
+            results = [await call for call in calls]
+
         tool_output = []
-        for tool_call in run_context.current_tool_calls:
-            function_name = tool_call.function.name
-            function_arguments = tool_call.function.arguments
-            result = ""
-            function_map = {f.__name__: f for f in self.functions}
-            if function_name in function_map:
-                result = function_map[function_name](
-                    **tool_call.function.arguments)
-                logger.debug("ToolCall结果: {}\n".format(result))
-            elif self.mcp_client:
-                logger.debug(
-                    "MCP工具名称: {}, MCP参数:{}\n".format(
-                        function_name, function_arguments
-                    )
-                )
-                mcp_server_result = await self.mcp_client.call_tool(
-                    function_name, function_arguments
-                )
-                logger.debug("MCP ToolCall结果: {}\n".format(mcp_server_result))
-                for i, content in enumerate(mcp_server_result.content):
-                    if content.type == "text":
-                        result = result + mcp_server_result.content[i].text
-            else:
-                logger.warning(f"Tool not found: {function_name}")
+        for tool_call, result in zip(tool_calls, results):
             tool_output.append(
                 {
                     "tool_call_id": tool_call.id,
@@ -553,6 +568,46 @@ class AsyncToolCallEventHandler(AsyncAppBuilderEventHandler):
             )
         return tool_output
 
+    async def _call_tool_with_timeout(self, tool_call, parallel):
+        if self.tool_timeout is None:
+            return await self._call_tool(tool_call, parallel)
+        try:
+            return await asyncio.wait_for(self._call_tool(tool_call, parallel), self.tool_timeout)
+        except asyncio.TimeoutError:
+            message = "Tool {} timed out after {}s".format(tool_call.function.name, self.tool_timeout)
+            logger.error(message)
+            return message
+
+    async def _call_tool(self, tool_call, parallel):
+        function_name = tool_call.function.name
+        function_arguments = tool_call.function.arguments
+        result = ""
+        if function_name in self._function_map:
+            function = self._function_map[function_name]
+            if inspect.iscoroutinefunction(function):
+                result = await function(**function_arguments)
+            elif parallel or self.tool_timeout is not None:
+                result = await asyncio.to_thread(function, **function_arguments)
+            else:
+                result = function(**function_arguments)
+            logger.debug("ToolCall结果: {}\n".format(result))
+        elif self.mcp_client:
+            logger.debug(
+                "MCP工具名称: {}, MCP参数:{}\n".format(
+                    function_name, function_arguments
+                )
+            )
+            mcp_server_result = await self.mcp_client.call_tool(
+                function_name, function_arguments
+            )
+            logger.debug("MCP ToolCall结果: {}\n".format(mcp_server_result))
+            for i, content in enumerate(mcp_server_result.content):
+                if content.type == "text":
+                    result = result + mcp_server_result.content[i].text
+        else:
+            logger.warning(f"Tool not found: {function_name}")
+        return result
+
     async def running(self, run_context, run_response):
         if self._stream and run_response.answer and run_response.answer != "":
             logger.debug("Agent 流式回答: {}".format(run_response.answer))
@@ -12,6 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import os
+import time
+import contextvars
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from appbuilder.utils.sse_util import SSEClient
 from appbuilder.utils.logger_util import logger
 from appbuilder.core.console.appbuilder_client import data_class
@@ -436,11 +440,38 @@ class AppBuilderEventHandler(object):
 
 
 class ToolCallEventHandler(AppBuilderEventHandler):
-    def __init__(self, functions):
+    def __init__(self, functions, parallel_tool_calls: bool = False, max_workers: Optional[int] = None,
+                 tool_timeout: Optional[float] = None):
+        """
+        初始化工具调用事件处理器。
+
+        Args:
+            functions (list): 可供Agent调用的函数列表，按函数名匹配tool_call。
+            parallel_tool_calls (bool, optional): 同一轮中有多个tool_call时，是否在线程池中并发执行。默认为False。
+            max_workers (Optional[int], optional): 线程池的最大线程数。默认为None，使用ThreadPoolExecutor的默认值。
+            tool_timeout (Optional[float], optional): 单个工具的超时时间(秒)，超时后以超时信息作为该工具的输出，
+                超时的函数仍会在后台线程中执行完毕。默认为None，不限制。
+
+        Returns:
+            None
+        """
         super().__init__()
         self.functions = functions
+        self.parallel_tool_calls = parallel_tool_calls
+        self.max_workers = max_workers
+        self.tool_timeout = tool_timeout
+        self._executor = None
         self.result = ""
 
+    @property
+    def functions(self):
+        return self._functions
+
+    @functions.setter
+    def functions(self, functions):
+        self._functions = functions
+        self._function_map = {f.__name__: f for f in functions}
+
     def init(
         self,
         appbuilder_client,
@@ -469,18 +500,14 @@ class ToolCallEventHandler(AppBuilderEventHandler):
         thought = run_context.current_thought
         logger.debug("Agent 中间思考: {}\n".format(thought))
 
+        tool_calls = run_context.current_tool_calls
+        if (self.parallel_tool_calls and len(tool_calls) > 1) or self.tool_timeout is not None:
+            results = self._run_tool_calls_in_executor(tool_calls)
+        else:
+            results = [self._call_tool(tool_call) for tool_call in tool_calls]
+
         tool_output = []
-        for tool_call in run_context.current_tool_calls:
-            function_name = tool_call.function.name
-            function_arguments = tool_call.function.arguments
-            result = ""
-            function_map = {f.__name__: f for f in self.functions}
-            if function_name in function_map:
-                result = function_map[function_name](**function_arguments)
-                logger.debug("ToolCall结果: {}\n".format(result))
-            else:
-                logger.error(
-                    "{} is not a valid tool".format(function_name))
+        for tool_call, result in zip(tool_calls, results):
             tool_output.append(
                 {
                     "tool_call_id": tool_call.id,
@@ -489,6 +516,45 @@ class ToolCallEventHandler(AppBuilderEventHandler):
             )
         return tool_output
 
+    def _call_tool(self, tool_call):
+        function_name = tool_call.function.name
+        result = ""
+        if function_name in self._function_map:
+            result = self._function_map[function_name](**tool_call.function.arguments)
+            logger.debug("ToolCall结果: {}\n".format(result))
+        else:
+            logger.error(
+                "{} is not a valid tool".format(function_name))
+        return result
+
+    def _run_tool_calls_in_executor(self, tool_calls):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix="appbuilder-tool-call")
+
+        def submit(tool_call):
+            return self._executor.submit(contextvars.copy_context().run, self._call_tool, tool_call)
+
+        if self.parallel_tool_calls:
+            futures = [submit(tool_call) for tool_call in tool_calls]
+            # 所有工具同时提交，共用同一个截止时间
+            deadline = time.monotonic() + self.tool_timeout if self.tool_timeout is not None else None
+        results = []
+        for i, tool_call in enumerate(tool_calls):
+            if self.parallel_tool_calls:
+                future = futures[i]
+                timeout = max(deadline - time.monotonic(), 0) if deadline is not None else None
+            else:
+                future = submit(tool_call)
+                timeout = self.tool_timeout
+            try:
+                results.append(future.result(timeout=timeout))
+            except FutureTimeoutError:
+                message = "Tool {} timed out after {}s".format(tool_call.function.name, self.tool_timeout)
+                logger.error(message)
+                results.append(message)
+        return results
+
     def running(self, run_context, run_response):
         if self._stream and run_response.answer and run_response.answer != "":
             logger.debug("Agent 流式回答: {}".format(run_response.answer))
@@ -1,5 +1,7 @@
-from typing import List, Dict
+from typing import List, Dict, Union
 from appbuilder.core._client import HTTPClient
+from appbuilder.core._retry import RetryPolicy
+from appbuilder.core.console._bulk_upload import MultipartFileBody, bulk_upload
 from appbuilder.core.console.dataset.model import DocumentListResponse, AddDocumentsResponse
 from appbuilder.core.constants import MAX_DOCUMENTS_NUM, SUPPORTED_FILE_TYPE
 import json
@@ -86,7 +88,8 @@ class Dataset:
 
     @deprecated()
     def add_documents(self, file_path_list: List[str], is_custom_process_rule: bool = False,
-                      custom_process_rule: Dict = None, is_enhanced: bool = False) -> AddDocumentsResponse:
+                      custom_process_rule: Dict = None, is_enhanced: bool = False,
+                      max_workers: int = 8, retry: Union[int, RetryPolicy] = 3) -> AddDocumentsResponse:
         r"""
         向知识库中添加文档
         
@@ -100,6 +103,8 @@ class Dataset:
                 "overlap_rate": 0.3           # 文本片段重叠率，取值范围[0, 0.3]
             }
             is_enhanced: 是否开启知识增强, 默认为False，在检索问答时通过知识点来索引到对应的切片，大模型根据切片内容生成答案，开启知识增强会调用大模型抽取更加丰富的知识点，增加切片的召回率
+            max_workers: 并发上传文档的线程数，默认为8
+            retry: 单个文档上传的重试次数或重试策略，默认为3，收到429时按Retry-After退避
             
         Returns:
             AddDocumentsResponse: 添加文档的响应结果，包含以下属性：
@@ -116,10 +121,12 @@ class Dataset:
         if len(file_path_list) + current_documents_num > MAX_DOCUMENTS_NUM:
             raise ValueError(f"too much documents. at most upload {MAX_DOCUMENTS_NUM} documents per dataset，left {MAX_DOCUMENTS_NUM-current_documents_num} documents can be uploaded")
 
-        file_ids = []
-        for file_path in file_path_list:
-            upload_res = self._upload_document(file_path)
-            file_ids.append(upload_res["id"])
+        upload_res = bulk_upload(file_path_list, self._upload_document_request,
+                                 lambda response: self._parse_upload_document_response(response)["id"],
+                                 max_workers=max_workers, retry=retry)
+        if upload_res.failed:
+            raise upload_res.failed[0]._exception
+        file_ids = [result.id for result in upload_res.results]
         payload = {"dataset_id": self.dataset_id, "file_ids": file_ids,
                    "is_custom_process_rule": is_custom_process_rule, "is_enhanced": is_enhanced}
         if is_custom_process_rule and custom_process_rule:
@@ -144,15 +151,23 @@ class Dataset:
         Returns:
             上传文档的信息
         """
+        return self._parse_upload_document_response(self._upload_document_request(file_path))
+
+    def _upload_document_request(self, file_path: str):
         headers = self.http_client.auth_header()
-        with open(file_path, 'rb') as file:
-            files = {'file': (os.path.basename(file_path), file)}
-            response = self.http_client.session.post(url=self.http_client.service_url(self.upload_file_url),
-                                                     files=files, headers=headers)
-            self.http_client.check_response_header(response)
-            self.http_client.check_console_response(response)
-            res = response.json()["result"]
-        return res
+        # 文件内容在发送时按块读取，不整体读入内存
+        body = MultipartFileBody(file_path)
+        headers["Content-Type"] = body.content_type
+        try:
+            return self.http_client.session.post(url=self.http_client.service_url(self.upload_file_url),
+                                                 data=body, headers=headers)
+        finally:
+            body.close()
+
+    def _parse_upload_document_response(self, response):
+        self.http_client.check_response_header(response)
+        self.http_client.check_console_response(response)
+        return response.json()["result"]
 
     @deprecated()
     def delete_documents(self, document_ids: List[str]):
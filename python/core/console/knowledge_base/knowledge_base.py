@@ -15,8 +15,16 @@
 import os
 import json
 import uuid
-from typing import Optional
+from typing import Callable, Iterable, Optional, Union
 from appbuilder.core._client import HTTPClient
+from appbuilder.core._retry import RetryPolicy
+from appbuilder.core.console._bulk_upload import (
+    BulkUploadResponse,
+    BulkUploadResult,
+    MultipartFileBody,
+    bulk_upload,
+)
+from appbuilder.core.console._pagination import PageIterator
 from appbuilder.core.console.knowledge_base import data_class
 from appbuilder.core.component import Message, Component
 from appbuilder.utils.func_utils import deprecated
@@ -670,6 +678,65 @@ class KnowledgeBase(Component):
         if not os.path.exists(file_path):
             raise FileNotFoundError("File {} does not exist".format(file_path))
 
+        response = self._upload_documents_request(
+            file_path, content_format, id, processOption, client_token)
+        return self._parse_upload_documents_response(response)
+
+    def bulk_upload_documents(
+        self,
+        file_paths: Iterable[str],
+        content_format: str = "rawText",
+        id: Optional[str] = None,
+        processOption: data_class.DocumentProcessOption = None,
+        max_workers: int = 8,
+        retry: Union[int, RetryPolicy] = 3,
+        progress_callback: Optional[Callable[[BulkUploadResult, int, Optional[int]], None]] = None,
+        manifest_path: Optional[str] = None,
+    ) -> BulkUploadResponse:
+        r"""
+        并发批量上传文档
+
+        通过有界线程池并发上传，文件内容以流式方式发送。单个文件失败不会中断其他文件的上传，
+        收到429时所有上传线程一同退避。同一文件的重试使用相同的client_token。
+
+        Args:
+            file_paths (Iterable[str]): 文件路径列表或迭代器
+            content_format (str, optional): 内容格式。默认值为"rawText"。
+            id (Optional[str], optional): 知识库ID，如果不指定则使用当前实例的knowledge_id属性。默认值为None。
+            processOption (data_class.DocumentProcessOption, optional): 文档处理选项。默认值为None。
+            max_workers (int, optional): 并发上传的线程数。默认为8。
+            retry (Union[int, RetryPolicy], optional): 单个文件的重试次数或重试策略。默认为3。
+            progress_callback (Optional[Callable], optional): 每个文件完成时调用，参数为该文件的BulkUploadResult、
+                已完成的文件数及文件总数(输入为迭代器时为None)。默认为None。
+            manifest_path (Optional[str], optional): 结果清单文件路径，每完成一个文件追加一行JSON。
+                再次使用同一路径调用时跳过已上传成功的文件。默认为None。
+
+        Returns:
+            BulkUploadResponse: 与输入顺序一致的上传结果，每个BulkUploadResult包含以下属性：
+            - file_path (str): 文件路径
+            - success (bool): 是否上传成功
+            - id (str): 文档ID
+            - error (str): 失败原因
+            - attempts (int): 请求次数
+        """
+        client_tokens = {}
+
+        def validate(file_path):
+            if not os.path.exists(file_path):
+                raise FileNotFoundError("File {} does not exist".format(file_path))
+
+        def send(file_path):
+            client_token = client_tokens.setdefault(file_path, str(uuid.uuid4()))
+            return self._upload_documents_request(
+                file_path, content_format, id, processOption, client_token)
+
+        def parse(response):
+            return self._parse_upload_documents_response(response).documentId
+
+        return bulk_upload(file_paths, send, parse, validate=validate, max_workers=max_workers, retry=retry,
+                           progress_callback=progress_callback, manifest_path=manifest_path)
+
+    def _upload_documents_request(self, file_path, content_format, id, processOption, client_token):
         headers = self.http_client.auth_header_v2()
         if not client_token:
             client_token = str(uuid.uuid4())
@@ -677,33 +744,31 @@ class KnowledgeBase(Component):
             "/knowledgeBase?Action=UploadDocuments", client_token=client_token
         )
 
-        with open(file_path, "rb") as f:
-            multipart_form_data = {"file": (os.path.basename(file_path), f)}
-
-            request = data_class.KnowledgeBaseCreateDocumentsRequest(
-                id=id or self.knowledge_id,
-                source=data_class.DocumentSource(type="file"),
-                contentFormat=content_format,
-                processOption=processOption,
-            )
-
-            data = {
-                "payload": request.model_dump_json(exclude_none=True),
-            }
-
-            response = self.http_client.session.post(
+        request = data_class.KnowledgeBaseCreateDocumentsRequest(
+            id=id or self.knowledge_id,
+            source=data_class.DocumentSource(type="file"),
+            contentFormat=content_format,
+            processOption=processOption,
+        )
+        # 文件内容在发送时按块读取，不整体读入内存
+        body = MultipartFileBody(file_path, fields={
+            "payload": request.model_dump_json(exclude_none=True),
+        })
+        headers["Content-Type"] = body.content_type
+        try:
+            return self.http_client.session.post(
                 url=url,
                 headers=headers,
-                data=data,
-                files=multipart_form_data,
+                data=body,
             )
+        finally:
+            body.close()
 
-            self.http_client.check_response_header(response)
-            self.http_client.check_console_response(response)
-            data = response.json()
-            resp = data_class.KnowledgeBaseUploadDocumentsResponse(**data)
-
-        return resp
+    def _parse_upload_documents_response(self, response):
+        self.http_client.check_response_header(response)
+        self.http_client.check_console_response(response)
+        data = response.json()
+        return data_class.KnowledgeBaseUploadDocumentsResponse(**data)
 
     def create_chunk(
         self,
@@ -978,6 +1043,71 @@ class KnowledgeBase(Component):
 
         return doc_list
 
+    def iter_documents(
+        self,
+        knowledge_base_id: Optional[str] = None,
+        page_size: int = 100,
+        marker: Optional[str] = None,
+        prefetch: bool = True,
+    ) -> PageIterator:
+        r"""
+        惰性迭代知识库中的文档，在处理当前页时后台预取下一页，不会一次性将所有文档加载到内存。
+
+        Args:
+            knowledge_base_id (Optional[str], optional): 知识库ID。默认为None，此时使用当前类的knowledge_id属性。
+            page_size (int, optional): 每页的文档数量。默认为100。
+            marker (Optional[str], optional): 起始位置，可传入迭代器的marker属性从中断处继续。默认为None。
+            prefetch (bool, optional): 是否在后台预取下一页。默认为True。
+
+        Returns:
+            PageIterator: 逐个返回DescribeDocument的迭代器。
+        """
+        if self.knowledge_id == None and knowledge_base_id == None:
+            raise ValueError(
+                "knowledge_base_id cannot be empty, please call `create` first or use existing one"
+            )
+
+        def fetch_page(page_marker):
+            resp = self.describe_documents(
+                knowledge_base_id=knowledge_base_id, marker=page_marker, maxKeys=page_size)
+            return resp.data, resp.nextMarker if resp.isTruncated else None
+
+        return PageIterator(fetch_page, marker=marker, prefetch=prefetch)
+
+    def iter_chunks(
+        self,
+        documentId: str,
+        knowledgebase_id: Optional[str] = None,
+        page_size: int = 100,
+        marker: Optional[str] = None,
+        type: str = None,
+        keyword: str = None,
+        prefetch: bool = True,
+    ) -> PageIterator:
+        r"""
+        惰性迭代文档中的切片，在处理当前页时后台预取下一页。
+
+        Args:
+            documentId (str): 文档ID
+            knowledgebase_id (Optional[str], optional): 知识库ID。默认为None，此时使用当前类的knowledge_id属性。
+            page_size (int, optional): 每页的切片数量。默认为100。
+            marker (Optional[str], optional): 起始位置，可传入迭代器的marker属性从中断处继续。默认为None。
+            type (str, optional): 文档块类型。默认为None，表示不限定类型。
+            keyword (str, optional): 根据关键字模糊匹配切片，最大长度2000字符。
+            prefetch (bool, optional): 是否在后台预取下一页。默认为True。
+
+        Returns:
+            PageIterator: 逐个返回DescribeChunkResponse的迭代器。
+        """
+
+        def fetch_page(page_marker):
+            resp = self.describe_chunks(
+                documentId, knowledgebase_id=knowledgebase_id, marker=page_marker, maxKeys=page_size,
+                type=type, keyword=keyword)
+            return resp.data, resp.nextMarker if resp.isTruncated else None
+
+        return PageIterator(fetch_page, marker=marker, prefetch=prefetch)
+
     def query_knowledge_base(
         self,
         query: str,
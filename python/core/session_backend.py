@@ -0,0 +1,464 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""UserSession 的会话历史存储后端"""
+
+import asyncio
+import collections
+import copy
+import datetime
+import functools
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Union
+
+from appbuilder.core.message import Message
+
+
+def _dump_message(message: Message) -> dict:
+    # 一次序列化得到可写入JSON列的对象，等价于json.loads(message.json(exclude_none=True))
+    return message.model_dump(mode="json", exclude_none=True)
+
+
+def _dump_message_json(message: Message) -> str:
+    return message.model_dump_json(exclude_none=True)
+
+
+class SessionBackend(object):
+    r"""会话历史存储后端基类。
+
+    后端按 (session_id, key) 保存 Message 的序列化结果，get_history 按写入顺序返回最近 limit 条，
+    每条为 Message 序列化后的 dict。append 写入一次请求的全部数据，需要保证原子性。
+    """
+
+    def append(self, session_id: str, request_id: str, messages: Dict[str, Message]) -> None:
+        r"""原子写入一次请求中 append 的全部数据
+
+        Args:
+            session_id (str): 会话ID
+            request_id (str): 请求ID
+            messages (Dict[str, Message]): 键为变量名，值为 Message
+        """
+        raise NotImplementedError
+
+    def get_history(self, session_id: str, key: str, limit: int) -> List[dict]:
+        r"""获取最近 limit 条历史，按写入顺序排列
+
+        Args:
+            session_id (str): 会话ID
+            key (str): 变量名
+            limit (int): 最大条数
+
+        Returns:
+            List[dict]: Message 序列化后的 dict
+        """
+        raise NotImplementedError
+
+    async def aappend(self, session_id: str, request_id: str, messages: Dict[str, Message]) -> None:
+        r"""append 的异步版本，默认在线程池中执行"""
+        await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(self.append, session_id, request_id, messages))
+
+    async def aget_history(self, session_id: str, key: str, limit: int) -> List[dict]:
+        r"""get_history 的异步版本，默认在线程池中执行"""
+        return await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(self.get_history, session_id, key, limit))
+
+    def close(self) -> None:
+        r"""释放后端持有的连接等资源"""
+        pass
+
+
+class _HistoryCache(object):
+    r"""按 (session_id, key) 缓存最近历史 Message 内容的 LRU。
+
+    每个键最多保留 depth 条记录。complete 为 True 表示缓存中已包含该键的全部历史，此时任意 limit 的查询都由缓存返回，
+    否则只有 limit 不超过缓存条数时才由缓存返回。本进程写入的记录会同步追加到缓存中。
+
+    Args:
+        max_size (int): 缓存的 (session_id, key) 数量上限，小于等于0时不缓存。
+        depth (int): 每个键缓存的最大记录数。默认为64。
+    """
+
+    def __init__(self, max_size: int, depth: int = 64):
+        self.max_size = max_size
+        self.depth = depth
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, session_id: str, key: str, limit: int) -> Optional[list]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get((session_id, key))
+            if entry is None:
+                return None
+            values, complete = entry
+            if not complete and len(values) < limit:
+                return None
+            self._entries.move_to_end((session_id, key))
+            values = list(values)[-limit:] if limit > 0 else []
+        return copy.deepcopy(values)
+
+    def put(self, session_id: str, key: str, values: list, complete: bool) -> None:
+        if not self.enabled:
+            return
+        values = copy.deepcopy(values[-self.depth:])
+        with self._lock:
+            self._entries[(session_id, key)] = [
+                collections.deque(values, maxlen=self.depth), complete and len(values) < self.depth]
+            self._entries.move_to_end((session_id, key))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def extend(self, session_id: str, key: str, values: list) -> None:
+        if not self.enabled:
+            return
+        values = copy.deepcopy(values)
+        with self._lock:
+            entry = self._entries.get((session_id, key))
+            if entry is None:
+                return
+            if len(entry[0]) + len(values) > self.depth:
+                entry[1] = False
+            entry[0].extend(values)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLAlchemySessionBackend(SessionBackend):
+    r"""基于 SQLAlchemy 的会话历史存储，数据保存在 appbuilder_session_messages 表中。
+
+    每次数据库操作使用独立的短生命周期 Session，连接由 engine 的连接池复用，可以在多线程中并发调用。
+    配置 history_cache_size 后，最近访问的会话历史会缓存在内存中。缓存只感知本进程的写入，
+    多个进程共享同一个数据库且请求不固定路由到同一进程时不要开启。
+
+    Args:
+        user_session_config (sqlalchemy.engine.URL|str): 遵循 sqlalchemy 后端定义的配置字符串
+        async_user_session_config (sqlalchemy.engine.URL|str|None): 异步 engine 的配置字符串，需使用异步驱动，
+            如 sqlite+aiosqlite:///user_session.db。配置后 aappend 与 aget_history 使用异步 engine。默认为 None
+        history_cache_size (int|None): 内存中缓存历史的 (session_id, key) 数量，默认从环境变量
+            APPBUILDER_SESSION_HISTORY_CACHE_SIZE 读取，未设置时为0，即不缓存
+    """
+
+    def __init__(
+        self,
+        user_session_config: Union[Any, str],
+        async_user_session_config: Optional[Union[Any, str]] = None,
+        history_cache_size: Optional[int] = None,
+    ):
+        try:
+            import sqlalchemy
+            from sqlalchemy import create_engine
+            from sqlalchemy.orm import sessionmaker
+        except ImportError:
+            raise ImportError("Please install SQLAlchemy first: python3 -m pip install SQLAlchemy==2.0.31")
+        from appbuilder.core.session_message import get_db_base_class, SessionMessage
+
+        _db = get_db_base_class()
+        logging.info(f"create user_session by {user_session_config}")
+        self._engine = create_engine(user_session_config, pool_pre_ping=True)
+        _db.metadata.create_all(self._engine)  # 创建表
+        # 早期版本创建的表没有索引，create_all 不会为已存在的表补建索引
+        for index in SessionMessage.__table__.indexes:
+            index.create(self._engine, checkfirst=True)
+        self._session_factory = sessionmaker(self._engine, expire_on_commit=False)
+
+        self._async_engine = None
+        self._async_session_factory = None
+        if async_user_session_config is not None:
+            from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+            logging.info(f"create async user_session by {async_user_session_config}")
+            self._async_engine = create_async_engine(async_user_session_config, pool_pre_ping=True)
+            self._async_session_factory = async_sessionmaker(self._async_engine, expire_on_commit=False)
+
+        if history_cache_size is None:
+            history_cache_size = int(os.getenv("APPBUILDER_SESSION_HISTORY_CACHE_SIZE", "0"))
+        self._history_cache = _HistoryCache(history_cache_size)
+
+    def _history_statement(self, session_id: str, key: str, limit: int):
+        from sqlalchemy import select
+        from appbuilder.core.session_message import SessionMessage
+        return select(SessionMessage.message_value).where(
+            SessionMessage.session_id == session_id,
+            SessionMessage.message_key == key,
+            SessionMessage.deleted == False).order_by(
+                SessionMessage.updated_at.desc()).limit(limit)
+
+    def _history_fetch_size(self, limit: int) -> int:
+        # 开启缓存时多取一些记录，后续轮次可以直接命中缓存
+        return max(limit, self._history_cache.depth) if self._history_cache.enabled else limit
+
+    def _cache_history(self, session_id: str, key: str, limit: int, fetch_size: int, rows: list) -> list:
+        values = list(rows)[::-1]
+        self._history_cache.put(session_id, key, values, complete=len(values) < fetch_size)
+        return values[-limit:] if limit > 0 else []
+
+    def _records(self, session_id: str, request_id: str, messages: Dict[str, Message]) -> list:
+        from appbuilder.core.session_message import SessionMessage
+        now = datetime.datetime.now()
+        return [
+            SessionMessage(
+                session_id=session_id,
+                request_id=request_id,
+                message_key=key,
+                message_value=_dump_message(message),
+                created_at=now,
+                updated_at=now)
+            for key, message in messages.items()
+        ]
+
+    def _after_commit(self, session_id: str, records: list) -> None:
+        for record in records:
+            self._history_cache.extend(session_id, record.message_key, [record.message_value])
+
+    def append(self, session_id: str, request_id: str, messages: Dict[str, Message]) -> None:
+        records = self._records(session_id, request_id, messages)
+        if records:
+            with self._session_factory.begin() as db_session:
+                db_session.add_all(records)
+        self._after_commit(session_id, records)
+
+    def get_history(self, session_id: str, key: str, limit: int) -> List[dict]:
+        values = self._history_cache.get(session_id, key, limit)
+        if values is None:
+            fetch_size = self._history_fetch_size(limit)
+            with self._session_factory() as db_session:
+                rows = db_session.execute(self._history_statement(session_id, key, fetch_size)).scalars().all()
+            values = self._cache_history(session_id, key, limit, fetch_size, rows)
+        return values
+
+    async def aappend(self, session_id: str, request_id: str, messages: Dict[str, Message]) -> None:
+        if self._async_session_factory is None:
+            return await super().aappend(session_id, request_id, messages)
+        records = self._records(session_id, request_id, messages)
+        if records:
+            async with self._async_session_factory.begin() as db_session:
+                db_session.add_all(records)
+        self._after_commit(session_id, records)
+
+    async def aget_history(self, session_id: str, key: str, limit: int) -> List[dict]:
+        if self._async_session_factory is None:
+            return await super().aget_history(session_id, key, limit)
+        values = self._history_cache.get(session_id, key, limit)
+        if values is None:
+            fetch_size = self._history_fetch_size(limit)
+            async with self._async_session_factory() as db_session:
+                rows = (await db_session.execute(
+                    self._history_statement(session_id, key, fetch_size))).scalars().all()
+            values = self._cache_history(session_id, key, limit, fetch_size, rows)
+        return values
+
+    def close(self) -> None:
+        self._engine.dispose()
+
+
+class MemorySessionBackend(SessionBackend):
+    r"""进程内的会话历史存储，按会话 LRU 淘汰。
+
+    会话数超过 max_sessions 或全部会话占用的字节数超过 max_bytes 时淘汰最久未访问的会话，
+    超过 ttl 秒未写入的会话视为过期。每个键最多保留 max_history 条，get_history 的耗时只与 limit 有关。
+    数据只保存在当前进程中，适用于单进程部署或开发调试。
+
+    Args:
+        max_sessions (int): 最大会话数。默认为10000。
+        max_bytes (int): 全部会话序列化后的最大字节数。默认为256MB。
+        ttl (Optional[float]): 会话过期时间(秒)，为None时不过期。默认为None。
+        max_history (int): 每个键保留的最大条数。默认为1000。
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 10000,
+        max_bytes: int = 256 * 1024 * 1024,
+        ttl: Optional[float] = None,
+        max_history: int = 1000,
+    ):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_history = max_history
+        # session_id -> [expires_at, nbytes, {key: deque}]
+        self._sessions = collections.OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _get_entry(self, session_id: str, now: float):
+        entry = self._sessions.get(session_id)
+        if entry is not None and entry[0] is not None and entry[0] <= now:
+            self._pop(session_id)
+            return None
+        return entry
+
+    def _pop(self, session_id: str):
+        entry = self._sessions.pop(session_id)
+        self._nbytes -= entry[1]
+
+    def _evict(self, now: float):
+        # 先清理队首已过期的会话，再按LRU淘汰直到满足容量限制
+        while self._sessions:
+            session_id, entry = next(iter(self._sessions.items()))
+            expired = entry[0] is not None and entry[0] <= now
+            if not expired and len(self._sessions) <= self.max_sessions and self._nbytes <= self.max_bytes:
+                return
+            self._pop(session_id)
+
+    def append(self, session_id: str, request_id: str, messages: Dict[str, Message]) -> None:
+        values = [(key, _dump_message_json(message)) for key, message in messages.items()]
+        if not values:
+            return
+        now = time.monotonic()
+        with self._lock:
+            entry = self._get_entry(session_id, now)
+            if entry is None:
+                entry = self._sessions[session_id] = [None, 0, {}]
+            self._sessions.move_to_end(session_id)
+            entry[0] = now + self.ttl if self.ttl is not None else None
+            for key, value in values:
+                history = entry[2].get(key)
+                if history is None:
+                    history = entry[2][key] = collections.deque()
+                history.append(value)
+                added = len(value)
+                while len(history) > self.max_history:
+                    added -= len(history.popleft())
+                entry[1] += added
+                self._nbytes += added
+            self._evict(now)
+
+    def get_history(self, session_id: str, key: str, limit: int) -> List[dict]:
+        if limit <= 0:
+            return []
+        with self._lock:
+            entry = self._get_entry(session_id, time.monotonic())
+            if entry is None or key not in entry[2]:
+                return []
+            self._sessions.move_to_end(session_id)
+            values = list(itertools.islice(reversed(entry[2][key]), limit))
+        return [json.loads(value) for value in reversed(values)]
+
+    async def aappend(self, session_id: str, request_id: str, messages: Dict[str, Message]) -> None:
+        self.append(session_id, request_id, messages)
+
+    async def aget_history(self, session_id: str, key: str, limit: int) -> List[dict]:
+        return self.get_history(session_id, key, limit)
+
+    def close(self) -> None:
+        with self._lock:
+            self._sessions.clear()
+            self._nbytes = 0
+
+
+class RedisSessionBackend(SessionBackend):
+    r"""基于 Redis 的会话历史存储。
+
+    每个 (session_id, key) 对应一个 Redis List，一次请求的全部数据在一个 MULTI/EXEC 事务中写入，
+    写入后裁剪到 max_history 条并刷新过期时间。get_history 使用 LRANGE 从队尾读取，耗时只与 limit 有关。
+
+    Args:
+        client (redis.Redis|None): Redis 客户端，为None时使用 url 创建。
+        url (str|None): Redis 地址，如 redis://127.0.0.1:6379/0。
+        key_prefix (str): 键前缀。默认为"appbuilder:session:"。
+        ttl (Optional[int]): 会话过期时间(秒)，为None时不过期。默认为None。
+        max_history (int): 每个键保留的最大条数。默认为1000。
+    """
+
+    def __init__(
+        self,
+        client: Optional[Any] = None,
+        url: Optional[str] = None,
+        key_prefix: str = "appbuilder:session:",
+        ttl: Optional[int] = None,
+        max_history: int = 1000,
+    ):
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise ImportError("Please install redis first: python3 -m pip install redis")
+            if url is None:
+                raise ValueError("either client or url is required")
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.key_prefix = key_prefix
+        self.ttl = ttl
+        self.max_history = max_history
+
+    def _key(self, session_id: str, key: str) -> str:
+        return f"{self.key_prefix}{session_id}:{key}"
+
+    def append(self, session_id: str, request_id: str, messages: Dict[str, Message]) -> None:
+        values = [(self._key(session_id, key), _dump_message_json(message)) for key, message in messages.items()]
+        if not values:
+            return
+        pipeline = self.client.pipeline(transaction=True)
+        for redis_key, value in values:
+            pipeline.rpush(redis_key, value)
+            pipeline.ltrim(redis_key, -self.max_history, -1)
+            if self.ttl is not None:
+                pipeline.expire(redis_key, self.ttl)
+        pipeline.execute()
+
+    def get_history(self, session_id: str, key: str, limit: int) -> List[dict]:
+        if limit <= 0:
+            return []
+        return [json.loads(value) for value in self.client.lrange(self._key(session_id, key), -limit, -1)]
+
+    def close(self) -> None:
+        close = getattr(self.client, "close", None)
+        if close is not None:
+            close()
+
+
+def create_session_backend(
+    user_session_config: Optional[Union[Any, str]] = None,
+    async_user_session_config: Optional[Union[Any, str]] = None,
+    history_cache_size: Optional[int] = None,
+) -> SessionBackend:
+    r"""根据配置创建会话历史存储后端
+
+    Args:
+        user_session_config (sqlalchemy.engine.URL|str|None): 以 redis:// 或 rediss:// 开头时使用 Redis，
+            为 memory:// 时使用进程内存储，其它情况按 sqlalchemy 配置处理。默认使用 sqlite:///user_session.db
+        async_user_session_config (sqlalchemy.engine.URL|str|None): 见 SQLAlchemySessionBackend
+        history_cache_size (int|None): 见 SQLAlchemySessionBackend
+
+    Returns:
+        SessionBackend: 存储后端
+    """
+    if user_session_config is None:
+        user_session_config = "sqlite:///user_session.db"
+    if isinstance(user_session_config, str):
+        if user_session_config.startswith(("redis://", "rediss://")):
+            return RedisSessionBackend(url=user_session_config)
+        if user_session_config == "memory://":
+            return MemorySessionBackend()
+    return SQLAlchemySessionBackend(user_session_config, async_user_session_config, history_cache_size)
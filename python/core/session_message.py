@@ -44,9 +44,13 @@ class SessionMessage(get_db_base_class()):
         created_at：创建时间字段，使用当前时间作为默认值，不允许为空。
         updated_at：更新时间字段，使用当前时间作为默认值，不允许为空。
         deleted：删除标记字段，使用False作为默认值，不允许为空。当该字段为True时，表示该条记录已被删除。
+        __table_args__：(session_id, message_key, updated_at) 联合索引，get_history 按会话和键取最近的记录时使用。
         """
-        from sqlalchemy import create_engine, Column, Integer, String, JSON, DateTime, Boolean
+        from sqlalchemy import create_engine, Column, Integer, String, JSON, DateTime, Boolean, Index
         __tablename__ = 'appbuilder_session_messages'
+        __table_args__ = (
+            Index("ix_appbuilder_session_messages_session_key_updated", "session_id", "message_key", "updated_at"),
+        )
 
         id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()), unique=True)
         session_id = Column(String(36), nullable=False)
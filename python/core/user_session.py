@@ -11,15 +11,12 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import datetime
-import uuid
-import json
-import os
 import logging
 from typing import Union, List, Dict, Optional, Any
 
 from appbuilder.core.message import Message
 from appbuilder.core.context import get_context, _LOCAL_KEY
+from appbuilder.core.session_backend import SessionBackend, create_session_backend
 
 
 def lazy_import_sqlalchemy():
@@ -30,31 +27,48 @@ def lazy_import_sqlalchemy():
     except ImportError as e:
         raise ImportError("Please install SQLAlchemy first: python3 -m pip install SQLAlchemy==2.0.31")
 
+
 class UserSession(object):
     """
     会话数据管理工具，实例化后将是一个全局变量。
     提供保存对话数据与获取历史数据的方法，**必须**在 AgentRuntime 启动的服务中使用。
+
+    服务化版本的数据由存储后端(SessionBackend)保存，默认使用 SQLAlchemy，
+    也可以通过 user_session_config 或 backend 参数使用 Redis 或进程内存储。
     """
     _instance = None
     _initialized = False
+    # 非服务化版本中每个变量在内存中保留的最大条数
+    local_history_limit = 1000
 
     def __new__(cls, *args, **kwargs):
         """
         单例模式
         """
-        lazy_import_sqlalchemy()
-
         if cls._instance is None:
             cls._instance = object.__new__(cls)
         return cls._instance
 
-    def __init__(self, user_session_config: Optional[Union[Any, str]] = None):
+    def __init__(
+        self,
+        user_session_config: Optional[Union[Any, str]] = None,
+        async_user_session_config: Optional[Union[Any, str]] = None,
+        history_cache_size: Optional[int] = None,
+        backend: Optional[SessionBackend] = None,
+    ):
         """
         初始化 UserSession
         
         Args:
             user_session_config (str|None): Session 配置字符串，遵循 sqlalchemy 后端定义，参考文档
-              https://docs.sqlalchemy.org/en/20/core/engines.html#backend-specific-urls
+              https://docs.sqlalchemy.org/en/20/core/engines.html#backend-specific-urls 。
+              以 redis:// 或 rediss:// 开头时使用 Redis 存储，为 memory:// 时使用进程内存储
+            async_user_session_config (str|None): 异步 engine 的配置字符串，需使用异步驱动，如
+              sqlite+aiosqlite:///user_session.db。配置后 aget_history 与 _apost_append 使用异步 engine，
+              否则在线程池中执行同步方法。默认为 None
+            history_cache_size (int|None): 内存中缓存历史的 (session_id, key) 数量，默认从环境变量
+              APPBUILDER_SESSION_HISTORY_CACHE_SIZE 读取，未设置时为0，即不缓存
+            backend (SessionBackend|None): 自定义存储后端，设置后忽略以上参数。默认为 None
         
         Returns:
             None
@@ -63,29 +77,23 @@ class UserSession(object):
             return
         self._initialized = True
 
-        import sqlalchemy
-        from sqlalchemy.orm import sessionmaker
-        from sqlalchemy.orm import declarative_base
-        from sqlalchemy import create_engine
-        from appbuilder.core. session_message import get_db_base_class
-        
-        _db = get_db_base_class()
-
-        if user_session_config is None:
-            user_session_config = "sqlite:///user_session.db"
-        if not isinstance(user_session_config, (sqlalchemy.engine.URL, str)):
-            raise ValueError("user_session_config must be sqlalchemy.URL or str")
-        logging.info(f"create user_session by {user_session_config}")
-        engine = create_engine(user_session_config)
-        _db.metadata.create_all(engine) # 创建表
-        Session = sessionmaker(engine)
-        self._db_session = Session()
-    
+        if backend is None:
+            if user_session_config is not None and not isinstance(user_session_config, str):
+                lazy_import_sqlalchemy()
+                import sqlalchemy
+                if not isinstance(user_session_config, sqlalchemy.engine.URL):
+                    raise ValueError("user_session_config must be sqlalchemy.URL or str")
+            backend = create_session_backend(user_session_config, async_user_session_config, history_cache_size)
+        self._backend = backend
+
+    @property
+    def backend(self) -> SessionBackend:
+        return self._backend
 
     def get_history(self, key: str, limit: int=10) -> List[Message]:
         """
         获取同个 session 中名为 key 的历史变量。
-        在非服务化版本中从内存获取。在服务化版本中，将从数据库获取。
+        在非服务化版本中从内存获取。在服务化版本中，将从存储后端获取。
         
         Args:
             key (str): 变量名
@@ -94,7 +102,6 @@ class UserSession(object):
         Returns:
             List[Message]
         """
-        from appbuilder.core.session_message import SessionMessage
         ctx = get_context()
         if ctx.session_id.startswith(_LOCAL_KEY):
             # 非服务化版本使用内存存储
@@ -103,18 +110,31 @@ class UserSession(object):
             session_messages = ctx.session_vars_dict[key][-limit:]
             return session_messages
         else:
-            # 服务化版本使用数据库存储
-            session_messages = self._db_session.query(SessionMessage).filter(
-                SessionMessage.session_id == ctx.session_id,
-                SessionMessage.message_key == key,
-                SessionMessage.deleted == False).order_by(
-                    SessionMessage.updated_at.desc()).limit(limit).all()
-            return [Message(content=item.message_value) for item in session_messages][::-1]
+            # 服务化版本使用存储后端
+            values = self._backend.get_history(ctx.session_id, key, limit)
+            return [Message(content=value) for value in values]
+
+    async def aget_history(self, key: str, limit: int=10) -> List[Message]:
+        """
+        get_history 的异步版本。
+
+        Args:
+            key (str): 变量名
+            limit (int): 最近 limit 条 Message 数据
+
+        Returns:
+            List[Message]
+        """
+        ctx = get_context()
+        if ctx.session_id.startswith(_LOCAL_KEY):
+            return self.get_history(key, limit)
+        values = await self._backend.aget_history(ctx.session_id, key, limit)
+        return [Message(content=value) for value in values]
 
     def append(self, message_dict: Dict[str, Message]) -> None:
         """
         将 message_dict 中的变量保存到 session 中。
-        在非服务化版本中使用内存存储。在服务化版本中，将使用数据库进行存储。
+        在非服务化版本中使用内存存储。在服务化版本中，将使用存储后端进行存储。
 
         Args:
             message_dict (Dict[str, Message]): 包含 Message 的字典，其中键为字符串类型，值为 Message 类型。
@@ -130,9 +150,12 @@ class UserSession(object):
                     raise ValueError("session format error, message must be Message type")
                 if key not in ctx.session_vars_dict:
                     ctx.session_vars_dict[key] = []
-                ctx.session_vars_dict[key].append(message)
+                history = ctx.session_vars_dict[key]
+                history.append(message)
+                if len(history) > self.local_history_limit:
+                    del history[:-self.local_history_limit]
         else:
-            # 服务化版本使用数据库存储
+            # 服务化版本使用存储后端
             for key, message in message_dict.items():
                 if not isinstance(message, Message):
                     raise ValueError("session format error, message must be Message type")
@@ -145,6 +168,7 @@ class UserSession(object):
     def _post_append(self) -> None:
         """
         后置保存。流式数据不能直接保存到数据库，需要通过该方法后置保存。
+        本次请求 append 的全部数据一次性原子写入。
         
         Args:
             None
@@ -152,21 +176,30 @@ class UserSession(object):
         Returns:
             None
         """
-        from appbuilder.core.session_message import SessionMessage
         ctx = get_context()
         try:
-            for key, message_value in ctx.session_vars_dict.items():
-                message = SessionMessage(
-                    session_id=ctx.session_id,
-                    request_id=ctx.request_id,
-                    message_key=key,
-                    message_value=json.loads(message_value.json(exclude_none=True)),
-                    created_at=datetime.datetime.now(),
-                    updated_at=datetime.datetime.now())
-                self._db_session.add(message)
-                self._db_session.commit()
+            if ctx.session_vars_dict:
+                self._backend.append(ctx.session_id, ctx.request_id, ctx.session_vars_dict)
+            ctx.session_vars_dict = {}
+        except Exception as e:
+            logging.error(e)
+            raise e
+
+    async def _apost_append(self) -> None:
+        """
+        _post_append 的异步版本。
+
+        Args:
+            None
+
+        Returns:
+            None
+        """
+        ctx = get_context()
+        try:
+            if ctx.session_vars_dict:
+                await self._backend.aappend(ctx.session_id, ctx.request_id, ctx.session_vars_dict)
             ctx.session_vars_dict = {}
         except Exception as e:
             logging.error(e)
-            self._db_session.rollback()
             raise e
@@ -11,13 +11,17 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import time
+import functools
 import itertools
+import threading
+import time
+import weakref
 from typing import List
 from urllib.parse import urlparse, unquote
 from appbuilder.core._client import HTTPClient
-from appbuilder.core._exception import TypeNotSupportedException, ModelNotSupportedException
-from appbuilder.utils.model_util import GetModelListRequestV2, Models, RemoteModelCollector
+from appbuilder.core._exception import TypeNotSupportedException
+from appbuilder.core._model_registry import model_registry
+from appbuilder.utils.model_util import GetModelListRequestV2, Models
 from functools import lru_cache
 
 
@@ -111,6 +115,9 @@ def is_url(string):
 def ttl_lru_cache(seconds_to_live: int, maxsize: int = 128):
     """
     Time aware lru caching
+
+    第一个参数可被弱引用时（如修饰实例方法时的self），为每个对象单独维护缓存，
+    缓存只弱引用该对象，不会阻止组件实例被回收。
     """
     def wrapper(func):
         @lru_cache(maxsize)
@@ -118,42 +125,58 @@ def ttl_lru_cache(seconds_to_live: int, maxsize: int = 128):
             # Note that __ttl is not passed down to func,
             # as it's only used to trigger cache miss after some time
             return func(*args, **kwargs)
-        return lambda *args, **kwargs: inner(time.time() // seconds_to_live, *args, **kwargs)
+
+        owner_caches = weakref.WeakKeyDictionary()
+        lock = threading.Lock()
+
+        def owner_cache(owner):
+            cache = owner_caches.get(owner)
+            if cache is None:
+                with lock:
+                    cache = owner_caches.get(owner)
+                    if cache is None:
+                        owner_ref = weakref.ref(owner)
+
+                        @lru_cache(maxsize)
+                        def cache(__ttl, *args, **kwargs):
+                            return func(owner_ref(), *args, **kwargs)
+                        owner_caches[owner] = cache
+            return cache
+
+        @functools.wraps(func)
+        def wrapped(*args, **kwargs):
+            ttl = time.time() // seconds_to_live
+            if args:
+                try:
+                    cache = owner_cache(args[0])
+                except TypeError:
+                    # 不可弱引用的对象（如str）沿用全局缓存
+                    pass
+                else:
+                    return cache(ttl, *args[1:], **kwargs)
+            return inner(ttl, *args, **kwargs)
+        return wrapped
     return wrapper
 
 
 class ModelInfo:
-    """ 模型信息类 """
+    """ 模型信息类，基于进程级的model_registry查询，同一账号的模型列表在所有组件间共享 """
 
     def __init__(self, client: HTTPClient):
         """根据模型名称获取并初始化模型信息"""
         self.client = client
-        response = Models(client).list()
-        self.model_list = [*response.result.common, *response.result.custom]
+        # 预热注册表：已有缓存或磁盘快照时不会阻塞
+        model_registry.get(client)
+
+    @property
+    def model_list(self) -> List[dict]:
+        """模型列表，每一项包含name、url、apiType"""
+        return model_registry.get(self.client).to_list()
 
     def get_model_url(self, model_name: str) -> str:
         """获取模型在工作台网关的请求url"""
-        short_name = model_name
-        remote_model_name_collector = RemoteModelCollector()
-        origin_name = remote_model_name_collector.get_remote_name_by_short_name(short_name)
-        if not origin_name:
-            origin_name = short_name
-        for model in self.model_list:
-            if model.name == origin_name:
-                return model.url
-                # return convert_cloudhub_url(self.client, model.url)
-        raise ModelNotSupportedException(f"Model[{model_name}] not available! "
-                                         f"You can query available models through: appbuilder.get_model_list()")
+        return model_registry.lookup(self.client, model_name)[0]
 
     def get_model_type(self, model_name: str) -> str:
         """获取模型类型"""
-        short_name = model_name
-        remote_model_name_collector = RemoteModelCollector()
-        origin_name = remote_model_name_collector.get_remote_name_by_short_name(short_name)
-        if not origin_name:
-            origin_name = short_name
-        for model in self.model_list:
-            if model.name == origin_name:
-                return model.apiType
-        raise ModelNotSupportedException(f"Model[{model_name}] not available! "
-                                         f"You can query available models through: appbuilder.get_model_list()")
+        return model_registry.lookup(self.client, model_name)[1]
@@ -0,0 +1,127 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import os
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from appbuilder.core.console.appbuilder_client.async_event_handler import AsyncToolCallEventHandler
+from appbuilder.core.console.appbuilder_client.event_handler import ToolCallEventHandler
+
+
+def _run_context(*calls):
+    tool_calls = [
+        SimpleNamespace(id="call-{}".format(i),
+                        function=SimpleNamespace(name=name, arguments=arguments))
+        for i, (name, arguments) in enumerate(calls)
+    ]
+    return SimpleNamespace(current_thought="", current_tool_calls=tool_calls)
+
+
+def slow_echo(text, delay):
+    time.sleep(delay)
+    return "{}@{}".format(text, threading.current_thread().name)
+
+
+async def async_echo(text, delay):
+    await asyncio.sleep(delay)
+    return text
+
+
+# 所有参与方都到达后才返回，工具调用未并行执行时等待超时
+_rendezvous = {"barrier": None}
+
+
+def rendezvous(text):
+    _rendezvous["barrier"].wait()
+    return "{}@{}".format(text, threading.current_thread().name)
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "CPU_PARALLEL", "")
+class TestToolCallEventHandlerParallel(unittest.TestCase):
+    def test_sequential_by_default(self):
+        handler = ToolCallEventHandler(functions=[slow_echo])
+        output = handler.interrupt(_run_context(("slow_echo", {"text": "a", "delay": 0})), None)
+        self.assertEqual(output[0]["tool_call_id"], "call-0")
+        # 默认在当前线程中执行
+        self.assertEqual(output[0]["output"], "a@" + threading.current_thread().name)
+
+    def test_parallel_preserves_order(self):
+        handler = ToolCallEventHandler(functions=[slow_echo], parallel_tool_calls=True, max_workers=4)
+        calls = [("slow_echo", {"text": str(i), "delay": 0.3 - i * 0.1}) for i in range(3)]
+        output = handler.interrupt(_run_context(*calls), None)
+        self.assertEqual([o["tool_call_id"] for o in output], ["call-0", "call-1", "call-2"])
+        self.assertEqual([o["output"].split("@")[0] for o in output], ["0", "1", "2"])
+        self.assertTrue(all("appbuilder-tool-call" in o["output"] for o in output))
+
+    def test_parallel_runs_concurrently(self):
+        _rendezvous["barrier"] = threading.Barrier(3, timeout=5)
+        handler = ToolCallEventHandler(functions=[rendezvous], parallel_tool_calls=True, max_workers=4)
+        output = handler.interrupt(_run_context(*[("rendezvous", {"text": str(i)}) for i in range(3)]), None)
+        self.assertEqual([o["output"].split("@")[0] for o in output], ["0", "1", "2"])
+        self.assertFalse(_rendezvous["barrier"].broken)
+
+    def test_timeout(self):
+        handler = ToolCallEventHandler(functions=[slow_echo], parallel_tool_calls=True, tool_timeout=0.2)
+        output = handler.interrupt(_run_context(("slow_echo", {"text": "a", "delay": 0}),
+                                                ("slow_echo", {"text": "b", "delay": 1})), None)
+        self.assertTrue(output[0]["output"].startswith("a@"))
+        self.assertEqual(output[1]["output"], "Tool slow_echo timed out after 0.2s")
+
+    def test_unknown_tool(self):
+        handler = ToolCallEventHandler(functions=[slow_echo], parallel_tool_calls=True)
+        output = handler.interrupt(_run_context(("missing", {}),
+                                                ("slow_echo", {"text": "a", "delay": 0})), None)
+        self.assertEqual(output[0]["output"], "")
+        self.assertTrue(output[1]["output"].startswith("a@"))
+
+    def test_functions_setter(self):
+        handler = ToolCallEventHandler(functions=[])
+        handler.functions = [slow_echo]
+        output = handler.interrupt(_run_context(("slow_echo", {"text": "a", "delay": 0})), None)
+        self.assertTrue(output[0]["output"].startswith("a@"))
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "CPU_PARALLEL", "")
+class TestAsyncToolCallEventHandlerParallel(unittest.TestCase):
+    def test_parallel_gather(self):
+        handler = AsyncToolCallEventHandler(functions=[slow_echo, async_echo], parallel_tool_calls=True)
+        calls = [("async_echo", {"text": "a", "delay": 0.3}),
+                 ("slow_echo", {"text": "b", "delay": 0.3}),
+                 ("async_echo", {"text": "c", "delay": 0.1})]
+        output = asyncio.run(handler.interrupt(_run_context(*calls), None))
+        self.assertEqual(output[0]["output"], "a")
+        self.assertTrue(output[1]["output"].startswith("b@"))
+        self.assertEqual(output[2]["output"], "c")
+
+        # 同步工具在线程中并行执行
+        _rendezvous["barrier"] = threading.Barrier(2, timeout=5)
+        handler = AsyncToolCallEventHandler(functions=[rendezvous], parallel_tool_calls=True)
+        output = asyncio.run(handler.interrupt(_run_context(("rendezvous", {"text": "a"}),
+                                                            ("rendezvous", {"text": "b"})), None))
+        self.assertEqual([o["output"].split("@")[0] for o in output], ["a", "b"])
+        self.assertFalse(_rendezvous["barrier"].broken)
+
+    def test_timeout(self):
+        handler = AsyncToolCallEventHandler(functions=[async_echo], tool_timeout=0.1)
+        output = asyncio.run(handler.interrupt(_run_context(("async_echo", {"text": "a", "delay": 1}),
+                                                            ("async_echo", {"text": "b", "delay": 0})), None))
+        self.assertEqual(output[0]["output"], "Tool async_echo timed out after 0.1s")
+        self.assertEqual(output[1]["output"], "b")
+
+
+if __name__ == '__main__':
+    unittest.main()
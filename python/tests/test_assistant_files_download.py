@@ -0,0 +1,170 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import requests
+
+from appbuilder.core._exception import HTTPConnectionException
+from appbuilder.core.assistant.assistants.files import Files
+
+
+FILE_CONTENT = os.urandom(3 * 1024 * 1024 + 17)
+
+
+class _Body(io.BytesIO):
+    # 读取fail_after字节后模拟连接中断
+    def __init__(self, data, fail_after=None):
+        super().__init__(data)
+        self.fail_after = fail_after
+        self.reads = 0
+
+    def read(self, size=-1, **kwargs):
+        if self.fail_after is not None and self.tell() >= self.fail_after:
+            raise requests.exceptions.ConnectionError("connection reset")
+        self.reads += 1
+        return super().read(size)
+
+    def stream(self, chunk_size, decode_content=True):
+        while True:
+            chunk = self.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+class StubDownloadServer(object):
+    def __init__(self, support_range=True, fail_after=None):
+        self.support_range = support_range
+        self.fail_after = fail_after
+        self.requests = []
+        self.bodies = []
+
+    def post(self, url, headers, json, timeout, stream=False):
+        self.requests.append({"url": url, "headers": dict(headers), "stream": stream})
+        offset = 0
+        response = requests.Response()
+        response.headers["Content-Disposition"] = "attachment; filename=test.bin"
+        range_header = headers.get("Range")
+        if range_header and self.support_range:
+            offset = int(range_header[len("bytes="):-1])
+            if offset >= len(FILE_CONTENT):
+                response.status_code = 416
+                response.raw = _Body(b"")
+                return response
+            response.status_code = 206
+            response.headers["Content-Range"] = "bytes {}-{}/{}".format(
+                offset, len(FILE_CONTENT) - 1, len(FILE_CONTENT))
+        else:
+            response.status_code = 200
+        data = FILE_CONTENT[offset:]
+        response.headers["Content-Length"] = str(len(data))
+        fail_after, self.fail_after = self.fail_after, None
+        response.raw = _Body(data, fail_after)
+        self.bodies.append(response.raw)
+        return response
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "CPU_PARALLEL", "")
+class TestAssistantFilesDownload(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.file_path = self.tmp_dir.name + "/"
+        self.files = Files()
+
+    def _download(self, server, **kwargs):
+        with mock.patch.object(self.files._http_client.session, "post", server.post), \
+                mock.patch.object(self.files, "query") as query:
+            path = self.files.download("file-1", self.file_path, **kwargs)
+        self.query_calls = query.call_count
+        return path
+
+    def _read(self, path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    def test_streaming_download(self):
+        server = StubDownloadServer()
+        path = self._download(server, chunk_size=256 * 1024)
+        self.assertEqual(path, self.file_path + "test.bin")
+        self.assertEqual(self._read(path), FILE_CONTENT)
+        self.assertTrue(server.requests[0]["stream"])
+        self.assertEqual(self.query_calls, 1)
+        # 按chunk_size分块读取，而不是逐字节读取
+        self.assertLessEqual(server.bodies[0].reads, len(FILE_CONTENT) // (256 * 1024) + 2)
+        self.assertEqual(os.listdir(self.file_path), ["test.bin"])
+
+    def test_skip_query(self):
+        self._download(StubDownloadServer(), check_file=False)
+        self.assertEqual(self.query_calls, 0)
+
+    def test_invalid_chunk_size(self):
+        with self.assertRaises(ValueError):
+            self._download(StubDownloadServer(), chunk_size=0)
+
+    def test_failed_download_leaves_no_file(self):
+        server = StubDownloadServer(fail_after=1024 * 1024)
+        with self.assertRaises(HTTPConnectionException):
+            self._download(server)
+        self.assertEqual(os.listdir(self.file_path), [])
+
+    def test_resume(self):
+        server = StubDownloadServer(fail_after=1024 * 1024)
+        with self.assertRaises(HTTPConnectionException):
+            self._download(server, resume=True, chunk_size=64 * 1024)
+        partial = os.path.getsize(self.file_path + "file-1.part")
+        self.assertGreater(partial, 0)
+        self.assertFalse(os.path.exists(self.file_path + "test.bin"))
+
+        path = self._download(server, resume=True)
+        self.assertEqual(server.requests[-1]["headers"]["Range"], "bytes={}-".format(partial))
+        self.assertEqual(self._read(path), FILE_CONTENT)
+        self.assertEqual(os.listdir(self.file_path), ["test.bin"])
+
+    def test_resume_without_range_support(self):
+        with open(self.file_path + "file-1.part", "wb") as f:
+            f.write(b"stale")
+        path = self._download(StubDownloadServer(support_range=False), resume=True)
+        self.assertEqual(self._read(path), FILE_CONTENT)
+
+    def test_resume_range_not_satisfiable(self):
+        with open(self.file_path + "file-1.part", "wb") as f:
+            f.write(FILE_CONTENT + b"stale")
+        server = StubDownloadServer()
+        path = self._download(server, resume=True)
+        self.assertEqual(len(server.requests), 2)
+        self.assertNotIn("Range", server.requests[1]["headers"])
+        self.assertEqual(self._read(path), FILE_CONTENT)
+
+    def test_incomplete_body(self):
+        server = StubDownloadServer()
+        post = server.post
+
+        def truncated_post(*args, **kwargs):
+            response = post(*args, **kwargs)
+            response.headers["Content-Length"] = str(len(FILE_CONTENT) + 1)
+            return response
+
+        server.post = truncated_post
+        with self.assertRaises(HTTPConnectionException):
+            self._download(server)
+        self.assertEqual(os.listdir(self.file_path), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import json
+import os
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from appbuilder.core.component import Component
+from appbuilder.core.message import Message
+
+
+class StubServer(object):
+    # 本地服务：固定延迟后返回请求中的text，记录最大并发数
+    def __init__(self, latency=0.05):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with server.lock:
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                try:
+                    time.sleep(body.get("delay", server.latency))
+                    payload = json.dumps({"result": body["text"].upper()}).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                finally:
+                    with server.lock:
+                        server.in_flight -= 1
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = "http://127.0.0.1:{}/upper".format(self.httpd.server_address[1])
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class UpperComponent(Component):
+    def __init__(self, url):
+        super().__init__(secret_key="Bearer test", gateway="http://127.0.0.1")
+        self.url = url
+
+    def run(self, message, delay=None):
+        if message.content == "bad":
+            raise ValueError("bad input")
+        data = {"text": message.content}
+        if delay is not None:
+            data["delay"] = delay
+        response = self.http_client.session.post(self.url, json=data, timeout=10)
+        return Message(response.json()["result"])
+
+
+class AsyncUpperComponent(Component):
+    # 记录同时执行的arun数量
+    def __init__(self):
+        super().__init__()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def arun(self, message, delay=0.05):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(float(message.content) if message.content.replace(".", "").isdigit() else delay)
+        finally:
+            self.in_flight -= 1
+        if message.content == "bad":
+            raise ValueError("bad input")
+        return Message(message.content.upper())
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "CPU_PARALLEL", "")
+class TestComponentBatch(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer()
+        self.addCleanup(self.server.close)
+        self.component = UpperComponent(self.server.url)
+        self.inputs = [Message("item{}".format(i)) for i in range(32)]
+
+    def test_concurrency(self):
+        for max_concurrency in (1, 8):
+            self.server.max_in_flight = 0
+            outputs = self.component.batch(*self.inputs, max_concurrency=max_concurrency)
+            self.assertEqual([o.content for o in outputs], ["ITEM{}".format(i) for i in range(32)])
+            self.assertLessEqual(self.server.max_in_flight, max_concurrency)
+            self.assertEqual(self.server.max_in_flight > 1, max_concurrency > 1)
+
+    def test_kwargs_and_progress(self):
+        progress = []
+        outputs = self.component.batch(Message("a"), Message("b"), delay=0,
+                                       progress_callback=lambda done, total: progress.append((done, total)))
+        self.assertEqual([o.content for o in outputs], ["A", "B"])
+        self.assertEqual(progress, [(1, 2), (2, 2)])
+
+    def test_errors(self):
+        outputs = self.component.batch(Message("a"), Message("bad"), Message("c"), return_exceptions=True)
+        self.assertEqual(outputs[0].content, "A")
+        self.assertIsInstance(outputs[1], ValueError)
+        self.assertEqual(outputs[2].content, "C")
+        with self.assertRaises(ValueError):
+            self.component.batch(Message("a"), Message("bad"))
+        with self.assertRaises(ValueError):
+            self.component.batch(Message("a"), Message("bad"), max_concurrency=1)
+        with self.assertRaises(ValueError):
+            self.component.batch(Message("a"), max_concurrency=0)
+
+    def test_item_timeout(self):
+        outputs = self.component.batch(Message("a"), Message("b"), delay=0.5, item_timeout=0.1,
+                                       return_exceptions=True)
+        self.assertTrue(all(isinstance(o, TimeoutError) for o in outputs))
+
+    def test_abatch_default_uses_threads(self):
+        outputs = asyncio.run(self.component.abatch(*self.inputs[:8], max_concurrency=8))
+        self.assertEqual([o.content for o in outputs], ["ITEM{}".format(i) for i in range(8)])
+        self.assertGreater(self.server.max_in_flight, 1)
+
+    def test_abatch(self):
+        component = AsyncUpperComponent()
+        inputs = [Message("0.2"), Message("b"), Message("0.01")]
+        outputs = asyncio.run(component.abatch(*inputs, max_concurrency=3))
+        self.assertEqual(component.max_in_flight, 3)
+        self.assertEqual([o.content for o in outputs], ["0.2", "B", "0.01"])
+
+        outputs = asyncio.run(component.abatch(Message("1"), Message("bad"), Message("c"),
+                                               item_timeout=0.2, return_exceptions=True))
+        self.assertIsInstance(outputs[0], TimeoutError)
+        self.assertIsInstance(outputs[1], ValueError)
+        self.assertEqual(outputs[2].content, "C")
+        with self.assertRaises(ValueError):
+            asyncio.run(component.abatch(Message("a"), Message("bad")))
+
+    def test_abatch_concurrency_limit(self):
+        component = AsyncUpperComponent()
+        asyncio.run(component.abatch(*[Message("0.1")] * 4, max_concurrency=2))
+        self.assertEqual(component.max_in_flight, 2)
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "BENCHMARK", "")
+class TestComponentBatchBenchmark(unittest.TestCase):
+    def test_benchmark(self):
+        server = StubServer()
+        self.addCleanup(server.close)
+        component = UpperComponent(server.url)
+        inputs = [Message("item{}".format(i)) for i in range(32)]
+        results = {}
+        for max_concurrency in (1, 8):
+            start = time.perf_counter()
+            component.batch(*inputs, max_concurrency=max_concurrency)
+            results[max_concurrency] = time.perf_counter() - start
+        print("\nbatch of {} items: sequential {:.2f}s, max_concurrency=8 {:.2f}s".format(
+            len(inputs), results[1], results[8]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,236 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from appbuilder.core._client import HTTPClient
+from appbuilder.core._retry import RetryPolicy
+from appbuilder.core._session import request_log_sampler
+from appbuilder.core.console._bulk_upload import MultipartFileBody
+from appbuilder.core.console.dataset.dataset import Dataset
+from appbuilder.core.console.knowledge_base.knowledge_base import KnowledgeBase
+
+
+def _parse_multipart(content_type, body):
+    boundary = content_type.split("boundary=")[1].encode()
+    fields = {}
+    for part in body.split(b"--" + boundary)[1:-1]:
+        header, value = part[2:-2].split(b"\r\n\r\n", 1)
+        disposition = header.decode().split("\r\n")[0]
+        name = disposition.split('name="')[1].split('"')[0]
+        if 'filename="' in disposition:
+            fields[name] = (disposition.split('filename="')[1].split('"')[0], value)
+        else:
+            fields[name] = value.decode()
+    return fields
+
+
+class StubUploadServer(object):
+    # 本地上传服务：记录并发数，可模拟429限流及指定文件失败
+    def __init__(self, latency=0.05, rate_limited=0, fail_files=()):
+        self.latency = latency
+        self.rate_limited = rate_limited
+        self.fail_files = set(fail_files)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.uploads = []
+        self.client_tokens = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                with server.lock:
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                    limited = server.rate_limited > 0
+                    if limited:
+                        server.rate_limited -= 1
+                try:
+                    if self.path.endswith(Dataset.add_file_url):
+                        file_ids = json.loads(body)["file_ids"]
+                        return self._reply(200, {"code": 0, "result": {"dataset_id": "dataset",
+                                                                       "document_ids": file_ids}})
+                    time.sleep(server.latency)
+                    if limited:
+                        return self._reply(429, {"code": 429, "message": "too many requests"},
+                                           {"Retry-After": "0"})
+                    fields = _parse_multipart(self.headers["Content-Type"], body)
+                    file_name, content = fields["file"]
+                    with server.lock:
+                        server.uploads.append((file_name, content, fields.get("payload")))
+                        server.client_tokens.append(self.path)
+                    if file_name in server.fail_files:
+                        return self._reply(400, {"code": 400, "message": "bad file"})
+                    if self.path.endswith(Dataset.upload_file_url):
+                        return self._reply(200, {"code": 0, "result": {"id": "file-" + file_name}})
+                    self._reply(200, {"requestId": "r", "documentId": "doc-" + file_name})
+                finally:
+                    with server.lock:
+                        server.in_flight -= 1
+
+            def _reply(self, status, data, headers=None):
+                payload = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = "http://127.0.0.1:{}".format(self.httpd.server_address[1])
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "CPU_PARALLEL", "")
+class TestConsoleBulkUpload(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.file_paths = []
+        for i in range(24):
+            path = os.path.join(self.tmp_dir.name, "doc{}.txt".format(i))
+            with open(path, "wb") as f:
+                f.write(os.urandom(1024 * (i + 1)))
+            self.file_paths.append(path)
+
+    def _server(self, **kwargs):
+        server = StubUploadServer(**kwargs)
+        self.addCleanup(server.close)
+        return server
+
+    def _knowledge_base(self, server):
+        knowledge_base = KnowledgeBase(knowledge_id="kb")
+        knowledge_base._http_client = HTTPClient(gateway=server.url, gateway_v2=server.url)
+        return knowledge_base
+
+    def test_multipart_body(self):
+        body = MultipartFileBody(self.file_paths[3], fields={"payload": "{}"})
+        data = b"".join(iter(lambda: body.read(1000), b""))
+        self.assertEqual(len(data), len(body))
+        fields = _parse_multipart(body.content_type, data)
+        with open(self.file_paths[3], "rb") as f:
+            self.assertEqual(fields["file"], ("doc3.txt", f.read()))
+        self.assertEqual(fields["payload"], "{}")
+
+    def test_multipart_body_escaped_filename(self):
+        # 文件名中的引号与换行需转义，否则Content-Disposition头格式错误
+        file_path = os.path.join(self.tmp_dir.name, 'a"b\r\nc.txt')
+        with open(file_path, "wb") as f:
+            f.write(b"content")
+        body = MultipartFileBody(file_path, fields={'pay"load': "{}"})
+        data = b"".join(iter(lambda: body.read(1000), b""))
+        self.assertIn(b'name="file"; filename="a%22b%0D%0Ac.txt"\r\n\r\n', data)
+        fields = _parse_multipart(body.content_type, data)
+        self.assertEqual(fields["file"], ("a%22b%0D%0Ac.txt", b"content"))
+        self.assertEqual(fields["pay%22load"], "{}")
+
+    def test_bulk_upload_documents(self):
+        server = self._server()
+        progress = []
+        res = self._knowledge_base(server).bulk_upload_documents(
+            iter(self.file_paths), max_workers=8,
+            progress_callback=lambda result, done, total: progress.append((done, total)))
+
+        self.assertEqual([r.id for r in res.results],
+                         ["doc-doc{}.txt".format(i) for i in range(len(self.file_paths))])
+        self.assertEqual(len(res.succeeded), len(self.file_paths))
+        self.assertEqual(progress[-1], (len(self.file_paths), None))
+        self.assertGreater(server.max_in_flight, 1)
+        self.assertLessEqual(server.max_in_flight, 8)
+        for file_name, content, payload in server.uploads:
+            with open(os.path.join(self.tmp_dir.name, file_name), "rb") as f:
+                self.assertEqual(content, f.read())
+            self.assertEqual(json.loads(payload)["id"], "kb")
+
+    def test_rate_limit_and_failures(self):
+        server = self._server(rate_limited=3, fail_files=["doc1.txt"])
+        file_paths = self.file_paths[:4] + [os.path.join(self.tmp_dir.name, "missing.txt")]
+        res = self._knowledge_base(server).bulk_upload_documents(
+            file_paths, max_workers=2, retry=RetryPolicy(max_retries=5, backoff_factor=0.01))
+        self.assertEqual([r.success for r in res.results], [True, False, True, True, False])
+        self.assertIn("BadRequestException", res.results[1].error)
+        self.assertIn("FileNotFoundError", res.results[4].error)
+        self.assertEqual(res.results[4].attempts, 0)
+        self.assertEqual(sum(r.attempts for r in res.results), 4 + 3)
+        # 同一文件的重试使用相同的client_token
+        self.assertEqual(len(set(server.client_tokens)), 4)
+
+    def test_manifest_resume(self):
+        manifest_path = os.path.join(self.tmp_dir.name, "manifest.jsonl")
+        server = self._server(fail_files=["doc2.txt"])
+        knowledge_base = self._knowledge_base(server)
+        res = knowledge_base.bulk_upload_documents(self.file_paths[:5], manifest_path=manifest_path)
+        self.assertEqual(len(res.failed), 1)
+        with open(manifest_path) as f:
+            self.assertEqual(len(f.readlines()), 5)
+
+        server.fail_files.clear()
+        server.uploads.clear()
+        res = knowledge_base.bulk_upload_documents(self.file_paths[:5], manifest_path=manifest_path)
+        self.assertEqual(len(res.succeeded), 5)
+        self.assertEqual([upload[0] for upload in server.uploads], ["doc2.txt"])
+        self.assertEqual(res.results[0].id, "doc-doc0.txt")
+
+    def test_sampled_request_log(self):
+        # 经由真实的InnerSession.send上传，采样日志不能读取或截断流式请求体
+        request_log_sampler.configure(sample_rate=1)
+        self.addCleanup(request_log_sampler.configure, sample_rate=0, max_body_size=1024)
+        server = self._server()
+        dataset = Dataset(dataset_id="dataset")
+        dataset._http_client = HTTPClient(gateway=server.url)
+        dataset.get_documents = lambda page, limit: type("Documents", (), {"data": []})()
+        with patch("appbuilder.core._session.logger.isEnabledFor", side_effect=lambda level: level >= logging.INFO), \
+                patch("appbuilder.core._session.logger.info") as mock_info:
+            res = self._knowledge_base(server).bulk_upload_documents(self.file_paths[:4], max_workers=2)
+            self.assertEqual(len(res.succeeded), 4)
+            res = dataset.add_documents(self.file_paths[4:6], max_workers=2)
+            self.assertEqual(res.document_ids, ["file-doc4.txt", "file-doc5.txt"])
+        messages = [call[0][0] for call in mock_info.call_args_list]
+        self.assertEqual(sum("<streamed body>" in message for message in messages), 6)
+        for file_name, content, _ in server.uploads:
+            with open(os.path.join(self.tmp_dir.name, file_name), "rb") as f:
+                self.assertEqual(content, f.read())
+
+    def test_dataset_add_documents(self):
+        server = self._server()
+        dataset = Dataset(dataset_id="dataset")
+        dataset._http_client = HTTPClient(gateway=server.url)
+        dataset.get_documents = lambda page, limit: type("Documents", (), {"data": []})()
+        file_paths = self.file_paths[:6]
+        res = dataset.add_documents(file_paths, max_workers=4)
+        self.assertEqual(res.document_ids, ["file-doc{}.txt".format(i) for i in range(6)])
+        self.assertGreater(server.max_in_flight, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
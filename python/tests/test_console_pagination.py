@@ -0,0 +1,134 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from appbuilder.core.console._pagination import PageIterator
+from appbuilder.core.console.appbuilder_client import appbuilder_client
+from appbuilder.core.console.knowledge_base.knowledge_base import KnowledgeBase
+
+
+class StubPages(object):
+    # 模拟按marker分页的列表接口，marker为下一页第一条数据的下标
+    def __init__(self, total, latency=0.0, fail_at=None):
+        self.total = total
+        self.latency = latency
+        self.fail_at = fail_at
+        self.markers = []
+        self.threads = set()
+        self.requested = threading.Condition()
+
+    def describe(self, marker=None, maxKeys=10, **kwargs):
+        with self.requested:
+            self.markers.append(marker)
+            self.threads.add(threading.current_thread().name)
+            self.requested.notify_all()
+        time.sleep(self.latency)
+        start = int(marker or 0)
+        if self.fail_at is not None and start == self.fail_at:
+            self.fail_at = None
+            raise ConnectionError("connection reset")
+        end = min(start + maxKeys, self.total)
+        return SimpleNamespace(
+            data=[SimpleNamespace(id=str(i)) for i in range(start, end)],
+            isTruncated=end < self.total, nextMarker=str(end) if end < self.total else "")
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "CPU_PARALLEL", "")
+class TestConsolePagination(unittest.TestCase):
+    def _iter_documents(self, pages, **kwargs):
+        knowledge_base = KnowledgeBase(knowledge_id="kb")
+        knowledge_base.describe_documents = lambda knowledge_base_id, marker, maxKeys: pages.describe(marker, maxKeys)
+        return knowledge_base.iter_documents(**kwargs)
+
+    def test_iter_documents(self):
+        pages = StubPages(total=250)
+        ids = [doc.id for doc in self._iter_documents(pages, page_size=100)]
+        self.assertEqual(ids, [str(i) for i in range(250)])
+        self.assertEqual(pages.markers, [None, "100", "200"])
+
+    def test_lazy(self):
+        pages = StubPages(total=1000)
+        iterator = self._iter_documents(pages, page_size=10)
+        self.assertEqual(pages.markers, [])
+        for _ in range(15):
+            next(iterator)
+        iterator.close()
+        time.sleep(0.05)
+        # 只请求已消费的页以及预取的下一页，close时尚未开始的预取会被取消
+        self.assertEqual(pages.markers[:2], [None, "10"])
+        self.assertLessEqual(len(pages.markers), 3)
+        self.assertEqual(list(iterator), [])
+
+    def test_prefetch_overlaps_processing(self):
+        # 处理当前页时，下一页已在后台线程中请求，无需等待消费者取下一条
+        pages = StubPages(total=50, latency=0.01)
+        ids = []
+        for doc in self._iter_documents(pages, page_size=10, prefetch=True):
+            ids.append(doc.id)
+            next_marker = str(int(doc.id) + 1)
+            if doc.id.endswith("9") and int(next_marker) < pages.total:
+                with pages.requested:
+                    self.assertTrue(pages.requested.wait_for(lambda: next_marker in pages.markers, timeout=5))
+        self.assertEqual(ids, [str(i) for i in range(50)])
+        self.assertIn("appbuilder-prefetch_0", pages.threads)
+
+        pages = StubPages(total=50)
+        for doc in self._iter_documents(pages, page_size=10, prefetch=False):
+            # 不预取时只在消费者需要下一条时请求
+            self.assertEqual(len(pages.markers), int(doc.id) // 10 + 1)
+        self.assertEqual(pages.threads, {threading.current_thread().name})
+
+    def test_resume_from_marker(self):
+        pages = StubPages(total=30, fail_at=20)
+        iterator = self._iter_documents(pages, page_size=10)
+        ids = []
+        with self.assertRaises(ConnectionError):
+            for doc in iterator:
+                ids.append(doc.id)
+        self.assertEqual(len(ids), 20)
+        self.assertEqual(iterator.marker, "10")
+        # 失败后继续迭代会重新请求失败的页
+        ids.extend(doc.id for doc in iterator)
+        self.assertEqual(ids, [str(i) for i in range(30)])
+
+        resumed = self._iter_documents(StubPages(total=30), page_size=10, marker="10")
+        self.assertEqual([doc.id for doc in resumed], [str(i) for i in range(10, 30)])
+
+    def test_iter_chunks(self):
+        pages = StubPages(total=25)
+        knowledge_base = KnowledgeBase(knowledge_id="kb")
+        knowledge_base.describe_chunks = lambda documentId, knowledgebase_id, marker, maxKeys, type, keyword: \
+            pages.describe(marker, maxKeys)
+        self.assertEqual(len(list(knowledge_base.iter_chunks("doc", page_size=10))), 25)
+
+    def test_iter_apps(self):
+        pages = StubPages(total=230)
+        with mock.patch.object(appbuilder_client, "_describe_apps",
+                               lambda marker, maxKeys, secret_key, gateway: pages.describe(marker, maxKeys)):
+            apps = appbuilder_client.get_all_apps()
+            self.assertEqual([app.id for app in apps], [str(i) for i in range(230)])
+            iterator = appbuilder_client.iter_apps(page_size=50, marker="200")
+            self.assertEqual([app.id for app in iterator], [str(i) for i in range(200, 230)])
+
+    def test_page_iterator_empty(self):
+        self.assertEqual(list(PageIterator(lambda marker: ([], None))), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,184 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import json
+import os
+import threading
+import time
+import unittest
+
+from starlette.testclient import TestClient
+
+from appbuilder.core.agent import AgentRuntime
+from appbuilder.core.component import Component
+from appbuilder.core.context import get_context
+from appbuilder.core.message import Message
+from appbuilder.utils.sse_util import SSEClient
+
+
+class SyncStreamComponent(Component):
+    def __init__(self, interval=0.0):
+        super().__init__()
+        self.interval = interval
+        self.closed = threading.Event()
+        self.session_ids = []
+        self.threads = set()
+
+    def _generate(self, n):
+        try:
+            for i in range(n):
+                time.sleep(self.interval)
+                self.threads.add(threading.current_thread().name)
+                self.session_ids.append(get_context().session_id)
+                yield "event{}".format(i)
+        finally:
+            self.closed.set()
+
+    def run(self, message, stream, **kwargs):
+        if stream:
+            return Message(content=self._generate(kwargs.get("n", 3)))
+        if kwargs.get("fail"):
+            raise Exception("内部执行报错")
+        return Message(content="result")
+
+
+class AsyncStreamComponent(Component):
+    async def _generate(self):
+        for i in range(3):
+            await asyncio.sleep(0)
+            yield "async{}".format(i)
+
+    def run(self, message, stream, **kwargs):
+        raise AssertionError("run should not be called")
+
+    async def arun(self, message, stream, **kwargs):
+        if stream:
+            return Message(content=self._generate())
+        return Message(content="async result")
+
+
+def _events(rsp):
+    return [json.loads(event.data) for event in SSEClient(rsp.content.splitlines(keepends=True)).events()]
+
+
+async def _call(app, payload, disconnect=None):
+    # 直接调用ASGI应用，disconnect被set后模拟客户端断开
+    body = json.dumps(payload).encode("utf-8")
+    messages = []
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        while disconnect is None or not disconnect.is_set():
+            await asyncio.sleep(0.01)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.3"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": "/chat", "raw_path": b"/chat", "query_string": b"",
+        "root_path": "", "headers": [(b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 1234), "server": ("127.0.0.1", 8092),
+    }
+    await app(scope, receive, send)
+    return messages
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "CPU_PARALLEL", "")
+class TestCoreAgentASGI(unittest.TestCase):
+    def test_sync_component(self):
+        component = SyncStreamComponent()
+        app = AgentRuntime(component=component).create_asgi_app()
+        with TestClient(app) as client:
+            rsp = client.post("/chat", json={"message": "message", "session_id": "s1"})
+            self.assertEqual(rsp.json()["code"], 0)
+            self.assertEqual(rsp.json()["result"]["answer_message"]["content"], "result")
+
+            rsp = client.post("/chat", json={"message": "message", "stream": True, "session_id": "s2", "n": 3})
+            self.assertTrue(rsp.headers["content-type"].startswith("text/event-stream"))
+            events = _events(rsp)
+            self.assertEqual([e["result"]["answer_message"]["content"] for e in events],
+                             ["event0", "event1", "event2", ""])
+            self.assertTrue(events[-1]["result"]["is_completion"])
+            # 线程池中执行的组件可以获取到请求的Session上下文
+            self.assertEqual(component.session_ids, ["s2"] * 3)
+
+            rsp = client.post("/chat", json={"message": "message", "fail": True})
+            self.assertEqual(rsp.json()["code"], 500)
+
+    def test_bad_request(self):
+        app = AgentRuntime(component=SyncStreamComponent()).create_asgi_app()
+        with TestClient(app) as client:
+            rsp = client.post("/chat", json={"stream": True})
+            self.assertEqual(rsp.status_code, 400)
+            self.assertIn("message is required", rsp.json()["message"])
+            rsp = client.post("/chat", json={"message": "message", "stream": "true"})
+            self.assertIn("stream must be bool type", rsp.json()["message"])
+            rsp = client.post("/chat", json={"message": "message", "session_id": 1})
+            self.assertIn("session_id must be str type", rsp.json()["message"])
+
+    def test_async_component(self):
+        app = AgentRuntime(component=AsyncStreamComponent()).create_asgi_app()
+        with TestClient(app) as client:
+            rsp = client.post("/chat", json={"message": "message"})
+            self.assertEqual(rsp.json()["result"]["answer_message"]["content"], "async result")
+            rsp = client.post("/chat", json={"message": "message", "stream": True})
+            self.assertEqual([e["result"]["answer_message"]["content"] for e in _events(rsp)],
+                             ["async0", "async1", "async2", ""])
+
+    def test_disconnect_cancel(self):
+        component = SyncStreamComponent(interval=0.01)
+        app = AgentRuntime(component=component).create_asgi_app(max_workers=2)
+
+        async def run():
+            disconnect = asyncio.Event()
+            task = asyncio.ensure_future(_call(app, {"message": "m", "stream": True, "n": 100000}, disconnect))
+            await asyncio.sleep(0.1)
+            disconnect.set()
+            return await asyncio.wait_for(task, 2)
+
+        messages = asyncio.run(run())
+        self.assertTrue(component.closed.wait(2))
+        chunks = len(component.session_ids)
+        self.assertLess(chunks, 100)
+        time.sleep(0.1)
+        # 断开后不再继续拉取
+        self.assertEqual(len(component.session_ids), chunks)
+        self.assertFalse(any(m.get("more_body") is False for m in messages))
+
+    def test_event_loop_not_blocked(self):
+        # 同步组件在有界线程池中执行，不阻塞事件循环，超出并发上限的请求直接返回503
+        component = SyncStreamComponent(interval=0.05)
+        app = AgentRuntime(component=component).create_asgi_app(max_workers=2, max_concurrency=4)
+
+        async def run():
+            return await asyncio.gather(*[_call(app, {"message": "m", "stream": True, "n": 4}) for _ in range(6)])
+
+        results = asyncio.run(run())
+        statuses = sorted(m["status"] for messages in results for m in messages
+                          if m["type"] == "http.response.start")
+        self.assertEqual(statuses, [200] * 4 + [503] * 2)
+        # 同步迭代器只在线程池中拉取，事件循环所在的线程不会执行组件代码
+        self.assertTrue(component.threads)
+        self.assertTrue(all(name.startswith("appbuilder-agent") for name in component.threads))
+        self.assertLessEqual(len(component.threads), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import copy
+import json
+import os
+import time
+import unittest
+
+from werkzeug.test import EnvironBuilder
+
+from appbuilder.core.agent import AgentRuntime, _SSEMessageEncoder
+from appbuilder.core.component import Component
+from appbuilder.core.components.llms.base import LLMMessage
+from appbuilder.core.message import Message
+
+
+CHUNK_COUNT = 2000
+
+
+def _legacy_encode(session_id, answer, sub_content, is_completion=False):
+    # 改造前的实现：逐分片deepcopy并进行多次JSON往返
+    result = copy.deepcopy(answer)
+    result.content = sub_content
+    return "data: " + json.dumps({
+        "code": 0, "message": "",
+        "result": {
+            "session_id": session_id,
+            "is_completion": is_completion,
+            "answer_message": json.loads(result.json(exclude_none=True))
+        }
+    }, ensure_ascii=False) + "\n\n"
+
+
+class StubStreamComponent(Component):
+    # 模拟LLM流式输出，迭代过程中更新Message的extra与token_usage
+    def __init__(self, chunk_count=CHUNK_COUNT):
+        super().__init__()
+        self.chunk_count = chunk_count
+
+    def run(self, message, stream, **kwargs):
+        answer = LLMMessage()
+
+        def generate():
+            for i in range(self.chunk_count):
+                if i % 500 == 0:
+                    answer.extra = {"search": [{"title": "标题{}".format(i)}]}
+                if i == self.chunk_count - 1:
+                    answer.token_usage = {"total_tokens": self.chunk_count}
+                yield "字"
+
+        answer.content = generate()
+        return answer
+
+
+def _asgi_chat(app, payload):
+    body = json.dumps(payload).encode("utf-8")
+    chunks = []
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        # 请求体读取完毕后，直到客户端断开前receive不会返回
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message.get("body"):
+            chunks.append(message["body"])
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/chat", "raw_path": b"/chat", "query_string": b"", "root_path": "",
+        "headers": [(b"content-type", b"application/json")],
+    }
+    asyncio.run(app(scope, receive, send))
+    return b"".join(chunks)
+
+
+def _wsgi_chat(app, payload):
+    environ = EnvironBuilder(path="/chat", method="POST", json=payload).get_environ()
+    return b"".join(app(environ, lambda status, headers, exc_info=None: None))
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "CPU_PARALLEL", "")
+class TestCoreAgentSSEBenchmark(unittest.TestCase):
+    def test_encoder_matches_legacy(self):
+        message = Message(content="x", extra_field={"k": None})
+        message.content = None
+        encoder = _SSEMessageEncoder("session", message)
+        for sub_content in ["你好", "", 1, {"a": None, "b": [1.5, True]}, [LLMMessage(content="y")]]:
+            self.assertEqual(encoder.encode(sub_content), _legacy_encode("session", message, sub_content))
+
+        answer = LLMMessage(content="x")
+        answer.content = None
+        encoder = _SSEMessageEncoder("session", answer)
+        self.assertEqual(encoder.encode("你好"), _legacy_encode("session", answer, "你好"))
+        answer.extra = {"search": ["result"]}
+        answer.token_usage = {"total_tokens": 10}
+        self.assertEqual(encoder.encode("a"), _legacy_encode("session", answer, "a"))
+        self.assertEqual(encoder.encode("", is_completion=True), _legacy_encode("session", answer, "", True))
+        self.assertEqual(encoder.encode(None), _legacy_encode("session", answer, None))
+        # 复用encoder连续编码时结果不变
+        self.assertEqual([encoder.encode("字") for _ in range(3)], [_legacy_encode("session", answer, "字")] * 3)
+
+    def test_chat_stream(self):
+        agent = AgentRuntime(component=StubStreamComponent())
+        payload = {"message": "message", "stream": True, "session_id": "session"}
+        for app, chat in [(agent.create_flask_app(), _wsgi_chat), (agent.create_asgi_app(), _asgi_chat)]:
+            data = chat(app, payload)
+            events = [json.loads(line[len(b"data: "):]) for line in data.split(b"\n\n") if line]
+            self.assertEqual(len(events), CHUNK_COUNT + 1)
+            self.assertEqual(events[0]["result"]["answer_message"]["extra"], {"search": [{"title": "标题0"}]})
+            self.assertEqual(events[-1]["result"]["answer_message"]["token_usage"], {"total_tokens": CHUNK_COUNT})
+            self.assertTrue(events[-1]["result"]["is_completion"])
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "BENCHMARK", "")
+class TestCoreAgentSSEThroughput(unittest.TestCase):
+    def test_encoder_throughput(self):
+        answer = LLMMessage(content="x", extra={"search": [{"title": "标题"}] * 5})
+        answer.content = None
+        encoder = _SSEMessageEncoder("session", answer)
+
+        start = time.process_time()
+        legacy = [_legacy_encode("session", answer, "字") for _ in range(CHUNK_COUNT)]
+        legacy_time = time.process_time() - start
+        start = time.process_time()
+        events = [encoder.encode("字") for _ in range(CHUNK_COUNT)]
+        encoder_time = time.process_time() - start
+
+        self.assertEqual(events, legacy)
+        print("\nlegacy: {:.0f} chunks/s, encoder: {:.0f} chunks/s".format(
+            CHUNK_COUNT / legacy_time, CHUNK_COUNT / encoder_time))
+
+    def test_chat_stream_throughput(self):
+        agent = AgentRuntime(component=StubStreamComponent())
+        payload = {"message": "message", "stream": True, "session_id": "session"}
+        for name, app, chat in [("flask", agent.create_flask_app(), _wsgi_chat),
+                                ("asgi", agent.create_asgi_app(), _asgi_chat)]:
+            streams = 5
+            start, cpu_start = time.time(), time.process_time()
+            for _ in range(streams):
+                chat(app, payload)
+            elapsed, cpu = time.time() - start, time.process_time() - cpu_start
+            print("\n{} /chat: {:.0f} chunks/s, {:.1f}ms cpu per stream of {} chunks".format(
+                name, streams * CHUNK_COUNT / elapsed, cpu / streams * 1000, CHUNK_COUNT))
+
+
+if __name__ == '__main__':
+    unittest.main()
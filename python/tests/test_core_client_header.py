@@ -0,0 +1,126 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import copy
+import json
+import os
+import time
+import uuid
+import unittest
+from unittest import mock
+
+from appbuilder import get_default_header, default_header_template, SDKReportConfig
+from appbuilder.core._client import HTTPClient, AssistantHTTPClient, _auth_header_template
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "CPU_PARALLEL", "")
+class TestCoreClientHeader(unittest.TestCase):
+    def setUp(self):
+        self.client = HTTPClient(secret_key="test-key")
+
+    def test_auth_header_fields(self):
+        header = self.client.auth_header()
+        self.assertEqual(header["X-Appbuilder-Authorization"], "Bearer test-key")
+        self.assertEqual(header["X-Appbuilder-Origin"], "appbuilder_sdk")
+        self.assertEqual(header["X-Appbuilder-Request-Id"], header["X-Bce-Request-Id"])
+        sdk_config = json.loads(header["X-Appbuilder-Sdk-Config"])
+        self.assertEqual(sdk_config["appbuilder_sdk_language"], "python")
+        self.assertNotIn("appbuilder_sdk_mcp_context", sdk_config)
+
+        header = self.client.auth_header("request-1")
+        self.assertEqual(header["X-Appbuilder-Request-Id"], "request-1")
+        self.assertEqual(header["X-Bce-Request-Id"], "request-1")
+
+    def test_auth_header_is_not_shared(self):
+        header = self.client.auth_header()
+        header["Content-Type"] = "application/json"
+        header["X-Appbuilder-Origin"] = "modified"
+        new_header = self.client.auth_header()
+        self.assertNotIn("Content-Type", new_header)
+        self.assertEqual(new_header["X-Appbuilder-Origin"], "appbuilder_sdk")
+        self.assertNotEqual(header["X-Appbuilder-Request-Id"], new_header["X-Appbuilder-Request-Id"])
+
+    def test_auth_header_v2_mcp_context(self):
+        header = self.client.auth_header_v2(mcp_context="mcp-test")
+        self.assertEqual(header["Authorization"], "Bearer test-key")
+        sdk_config = json.loads(header["X-Appbuilder-Sdk-Config"])
+        self.assertEqual(sdk_config["appbuilder_sdk_mcp_context"], "mcp-test")
+
+        os.environ["APPBUILDER_SDK_MCP_CONTEXT"] = "mcp-env"
+        try:
+            header = self.client.auth_header_v2()
+            sdk_config = json.loads(header["X-Appbuilder-Sdk-Config"])
+            self.assertEqual(sdk_config["appbuilder_sdk_mcp_context"], "mcp-env")
+        finally:
+            del os.environ["APPBUILDER_SDK_MCP_CONTEXT"]
+        self.assertNotIn("mcp-env", get_default_header()["X-Appbuilder-Sdk-Config"])
+
+    def test_assistant_auth_header(self):
+        header = AssistantHTTPClient(secret_key="test-key").auth_header()
+        self.assertEqual(header["Authorization"], "Bearer test-key")
+        self.assertEqual(header["X-Appbuilder-Authorization"], "Bearer test-key")
+        self.assertEqual(header["Content-Type"], "application/json")
+
+    def test_sdk_config_built_once(self):
+        # 同一mcp_context只构建一次SDKReportConfig，之后的auth_header复用缓存的模板
+        self.addCleanup(_auth_header_template.cache_clear)
+        self.addCleanup(default_header_template.cache_clear)
+        default_header_template.cache_clear()
+        _auth_header_template.cache_clear()
+        with mock.patch("appbuilder.SDKReportConfig") as mock_config:
+            mock_config.return_value.model_dump_json.return_value = "{}"
+            for _ in range(100):
+                self.client.auth_header()
+                self.client.auth_header_v2(mcp_context="mcp-test")
+        self.assertEqual(mock_config.call_count, 2)
+        mock_config.assert_any_call()
+        mock_config.assert_any_call(appbuilder_sdk_mcp_context="mcp-test")
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "BENCHMARK", "")
+class TestCoreClientHeaderBenchmark(unittest.TestCase):
+    def setUp(self):
+        self.client = HTTPClient(secret_key="test-key")
+
+    def test_auth_header_benchmark(self):
+        loops = 20000
+
+        def uncached_header():
+            # 旧实现: 每次调用构建pydantic模型、读取环境变量并deepcopy
+            os.environ.get("APPBUILDER_SDK_MCP_CONTEXT", None)
+            header = copy.deepcopy({
+                "X-Appbuilder-Sdk-Config": SDKReportConfig().model_dump_json(exclude_none=True),
+                "X-Appbuilder-Origin": "appbuilder_sdk",
+            })
+            new_request_id = str(uuid.uuid4())
+            header["X-Appbuilder-Request-Id"] = new_request_id
+            header["X-Bce-Request-Id"] = new_request_id
+            header["X-Appbuilder-Authorization"] = self.client.secret_key
+            return header
+
+        start = time.perf_counter()
+        for _ in range(loops):
+            uncached_header()
+        uncached_cost = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(loops):
+            self.client.auth_header()
+        cached_cost = time.perf_counter() - start
+
+        print("auth_header: {:.2f} us/call, uncached header: {:.2f} us/call".format(
+            cached_cost / loops * 1e6, uncached_cost / loops * 1e6))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from appbuilder.core._client import HTTPClient
+from unittest import mock
+
+from appbuilder.core._pool import connection_pool_registry, ConnectionPoolRegistry, DEFAULT_POOL_MAXSIZE
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"result": "ok"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "CPU_PARALLEL", "")
+class TestCoreClientPool(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.gateway = "http://127.0.0.1:{}".format(self.server.server_port)
+        connection_pool_registry.clear()
+
+    def tearDown(self):
+        connection_pool_registry.clear()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_clients_share_connections(self):
+        client_a = HTTPClient(secret_key="test", gateway=self.gateway)
+        client_b = HTTPClient(secret_key="test", gateway=self.gateway)
+        for client in [client_a, client_b, client_a, client_b]:
+            response = client.session.get(self.gateway + "/ping", timeout=5)
+            self.assertEqual(response.json()["result"], "ok")
+
+        stats = HTTPClient.pool_stats(self.gateway)[self.gateway]
+        self.assertEqual(stats["requests"], 4)
+        self.assertEqual(stats["new_connections"], 1)
+        self.assertEqual(stats["reuse_ratio"], 0.75)
+        self.assertEqual(stats["open_connections"], 1)
+        self.assertEqual(stats["in_use_connections"], 0)
+
+    def test_idle_connections_after_pool_closed(self):
+        client = HTTPClient(secret_key="test", gateway=self.gateway)
+        client.session.get(self.gateway + "/ping", timeout=5).json()
+        self.assertEqual(HTTPClient.pool_stats(self.gateway)[self.gateway]["idle_connections"], 1)
+        # 关闭后的连接池不再计入空闲连接
+        connection_pool_registry.pool_manager(self.gateway).clear()
+        self.assertEqual(HTTPClient.pool_stats(self.gateway)[self.gateway]["idle_connections"], 0)
+
+    def test_per_client_retry_is_independent(self):
+        client_a = HTTPClient(secret_key="test", gateway=self.gateway)
+        client_b = HTTPClient(secret_key="test", gateway=self.gateway)
+        client_a.retry.total = 3
+        adapter_a = client_a.session.get_adapter(self.gateway + "/ping")
+        adapter_b = client_b.session.get_adapter(self.gateway + "/ping")
+        self.assertIs(adapter_a.poolmanager, adapter_b.poolmanager)
+        self.assertEqual(adapter_a.max_retries.total, 3)
+        self.assertEqual(adapter_b.max_retries.total, 0)
+
+    def test_configure_and_concurrent_access(self):
+        pool_maxsize, pool_block = connection_pool_registry.pool_maxsize, connection_pool_registry.pool_block
+        self.addCleanup(connection_pool_registry.configure, pool_maxsize=pool_maxsize, pool_block=pool_block)
+        connection_pool_registry.configure(pool_maxsize=4, pool_block=True)
+        client = HTTPClient(secret_key="test", gateway=self.gateway)
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(5):
+                    client.session.get(self.gateway + "/ping", timeout=5).json()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        stats = connection_pool_registry.stats()[self.gateway]
+        self.assertEqual(stats["requests"], 40)
+        self.assertLessEqual(stats["new_connections"], 4)
+        self.assertLessEqual(stats["open_connections"], 4)
+
+    def test_pool_size_from_env(self):
+        with mock.patch.dict(os.environ):
+            os.environ.pop("APPBUILDER_POOL_MAXSIZE", None)
+            self.assertEqual(ConnectionPoolRegistry().pool_maxsize, DEFAULT_POOL_MAXSIZE)
+        with mock.patch.dict(os.environ, {"APPBUILDER_POOL_MAXSIZE": "128", "APPBUILDER_POOL_CONNECTIONS": "2"}):
+            registry = ConnectionPoolRegistry()
+            self.assertEqual((registry.pool_maxsize, registry.pool_connections), (128, 2))
+            self.assertEqual(ConnectionPoolRegistry(pool_maxsize=16).pool_maxsize, 16)
+        with mock.patch.dict(os.environ, {"APPBUILDER_POOL_MAXSIZE": "many"}):
+            self.assertEqual(ConnectionPoolRegistry().pool_maxsize, DEFAULT_POOL_MAXSIZE)
+
+    def test_host_key(self):
+        self.assertEqual(
+            ConnectionPoolRegistry.host_key("https://appbuilder.baidu.com/rpc/2.0"),
+            "https://appbuilder.baidu.com")
+        self.assertEqual(
+            ConnectionPoolRegistry.host_key("http://127.0.0.1:8080"),
+            "http://127.0.0.1:8080")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import os
+import threading
+import time
+import unittest
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from appbuilder.core._client import HTTPClient, AsyncHTTPClient
+from appbuilder.core._retry import RetryPolicy
+from appbuilder.utils.trace import tracer_wrapper
+from appbuilder.utils.trace.tracer import AppBuilderTracer
+
+
+class _FlakyHandler(BaseHTTPRequestHandler):
+    """前 N 次请求返回 503，之后返回 200。路径形如 /flaky/<key>/<N>"""
+    protocol_version = "HTTP/1.1"
+    counters = {}
+    lock = threading.Lock()
+
+    def _reply(self, status, body=b"{}", headers=None):
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        if length:
+            self.rfile.read(length)
+        _, kind, key, n = self.path.split("/")
+        with self.lock:
+            count = self.counters.get(key, 0) + 1
+            self.counters[key] = count
+        if kind == "flaky" and count <= int(n):
+            self._reply(503, headers={"Retry-After": "0"})
+        elif kind == "slow":
+            time.sleep(float(n))
+            self._reply(200)
+        else:
+            self._reply(200, body='{{"count": {}}}'.format(count).encode(),
+                        headers={"Content-Type": "application/json"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "CPU_PARALLEL", "")
+class TestCoreClientRetry(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _FlakyHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.gateway = "http://127.0.0.1:{}".format(cls.server.server_port)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.client = HTTPClient(secret_key="test", gateway=self.gateway)
+
+    def test_retry_on_retryable_status(self):
+        response = self.client.with_retry(3).post(self.gateway + "/flaky/a/2", json={})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["count"], 3)
+
+        response = self.client.with_retry(1).post(self.gateway + "/flaky/b/2", json={})
+        self.assertEqual(response.status_code, 503)
+
+        response = self.client.with_retry(0).post(self.gateway + "/flaky/c/1", json={})
+        self.assertEqual(response.status_code, 503)
+        # 共享的self.retry不会被修改
+        self.assertEqual(self.client.retry.total, 0)
+
+    def test_retry_after_too_long(self):
+        policy = RetryPolicy(max_retries=3, max_retry_after=-1)
+        response = self.client.with_retry(policy).post(self.gateway + "/flaky/d/1", json={})
+        self.assertEqual(response.status_code, 503)
+
+    def test_concurrent_policies(self):
+        def call(i):
+            retry = 3 if i % 2 == 0 else 0
+            response = self.client.with_retry(retry).post(
+                self.gateway + "/flaky/e{}/2".format(i), json={})
+            return retry, response.status_code
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(call, range(32)))
+        for retry, status_code in results:
+            self.assertEqual(status_code, 200 if retry else 503)
+
+    def test_post_read_timeout_not_retried(self):
+        with mock.patch("appbuilder.core._retry.time") as mock_time:
+            with self.assertRaises(requests.exceptions.ReadTimeout):
+                self.client.with_retry(3).post(self.gateway + "/slow/f/0.5", json={}, timeout=0.1)
+        self.assertEqual(_FlakyHandler.counters["f"], 1)
+        mock_time.sleep.assert_not_called()
+
+    def test_connect_error_retried(self):
+        policy = RetryPolicy(max_retries=2, backoff_factor=0.01)
+        with mock.patch("appbuilder.core._retry.time") as mock_time:
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                self.client.with_retry(policy).post("http://127.0.0.1:1/flaky/g/0", json={})
+        # 建立连接失败时POST同样会重试，每次重试前退避一次
+        self.assertEqual(mock_time.sleep.call_count, 2)
+
+    def test_connect_error_retried_with_trace(self):
+        # trace开启时session_post会重新构造异常，仍应识别为连接错误
+        state = (tracer_wrapper._trace_state.enabled, tracer_wrapper._trace_state.debug)
+        AppBuilderTracer.set_trace_enabled(True)
+        AppBuilderTracer.set_trace_debug(False)
+        try:
+            policy = RetryPolicy(max_retries=2, backoff_factor=0.01)
+            with mock.patch("appbuilder.core._retry.time") as mock_time:
+                with self.assertRaises(requests.exceptions.ConnectionError):
+                    self.client.with_retry(policy).post("http://127.0.0.1:1/flaky/g/0", json={})
+            self.assertEqual(mock_time.sleep.call_count, 2)
+            with mock.patch("appbuilder.core._retry.time") as mock_time:
+                with self.assertRaises(requests.exceptions.ReadTimeout):
+                    self.client.with_retry(3).post(self.gateway + "/slow/i/0.5", json={}, timeout=0.1)
+            mock_time.sleep.assert_not_called()
+        finally:
+            AppBuilderTracer.set_trace_enabled(state[0])
+            AppBuilderTracer.set_trace_debug(state[1])
+
+    def test_policy(self):
+        policy = RetryPolicy(max_retries=5, backoff_factor=1, backoff_max=4, jitter=0)
+        self.assertEqual(policy.backoff(0), 1)
+        self.assertEqual(policy.backoff(10), 4)
+        self.assertEqual(policy.status_retry_delay(0, 429, {"Retry-After": "2"}), 2)
+        self.assertIsNone(policy.status_retry_delay(0, 400, {}))
+        self.assertIsNone(policy.status_retry_delay(5, 503, {}))
+        self.assertIsNone(policy.exception_retry_delay(0, "POST", connect_error=False))
+        self.assertEqual(policy.exception_retry_delay(0, "GET", connect_error=False), 1)
+        self.assertIs(RetryPolicy.from_value(policy), policy)
+        self.assertEqual(RetryPolicy.from_value(-1).max_retries, 0)
+        with self.assertRaises(AttributeError):
+            policy.max_retries = 1
+        with self.assertRaises(ValueError):
+            RetryPolicy(max_retries=-1)
+
+    def test_async_retry(self):
+        async def run():
+            client = AsyncHTTPClient(secret_key="test", gateway=self.gateway)
+            response = await client.with_retry(3).post(self.gateway + "/flaky/h/2", json={})
+            data = await response.json()
+            await client.session.close()
+            return response.status, data
+
+        status, data = asyncio.run(run())
+        self.assertEqual(status, 200)
+        self.assertEqual(data["count"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
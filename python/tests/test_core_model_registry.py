@@ -0,0 +1,145 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import gc
+import os
+import tempfile
+import threading
+import time
+import unittest
+import weakref
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from appbuilder.core._client import HTTPClient
+from appbuilder.core._exception import ModelNotSupportedException
+from appbuilder.core._model_registry import ModelRegistry
+from appbuilder.core.utils import ttl_lru_cache
+
+
+def _fake_response(names):
+    models = [SimpleNamespace(name=name, url="http://{}".format(name), apiType="chat") for name in names]
+    return SimpleNamespace(result=SimpleNamespace(common=models, custom=[]))
+
+
+class _Owner(object):
+    def __init__(self):
+        self.calls = 0
+
+    @ttl_lru_cache(seconds_to_live=3600)
+    def compute(self, x):
+        self.calls += 1
+        return x * 2
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "CPU_PARALLEL", "")
+class TestCoreModelRegistry(unittest.TestCase):
+    def setUp(self):
+        self.client = HTTPClient(secret_key="test", gateway="http://127.0.0.1:1")
+        self.registry = ModelRegistry(ttl=3600, snapshot_path="")
+        self.names = ["ERNIE-Bot", "EB-turbo-AppBuilder专用版", "ERNIE-Speed-128K"]
+        self.calls = 0
+        self.list_delay = 0
+        self.list_gate = None
+        self.list_done = threading.Event()
+
+        def fake_list(models_self, *args, **kwargs):
+            self.calls += 1
+            time.sleep(self.list_delay)
+            if self.list_gate is not None:
+                self.list_gate.wait(5)
+            names = self.names
+            self.list_done.set()
+            return _fake_response(names)
+
+        patcher = patch("appbuilder.core._model_registry.Models.list", fake_list)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_lookup_by_origin_and_short_name(self):
+        self.assertEqual(self.registry.lookup(self.client, "ERNIE-Speed-128K"), ("http://ERNIE-Speed-128K", "chat"))
+        self.assertEqual(self.registry.lookup(self.client, "eb")[0], "http://ERNIE-Bot")
+        self.assertEqual(self.registry.lookup(self.client, "ernie_speed_appbuilder")[0],
+                         "http://EB-turbo-AppBuilder专用版")
+        with self.assertRaises(ModelNotSupportedException):
+            self.registry.lookup(self.client, "not-exist")
+        # 同一账号只拉取一次模型列表
+        self.assertEqual(self.calls, 1)
+
+    def test_single_flight_cold_start(self):
+        self.list_delay = 0.1
+        threads = [threading.Thread(target=self.registry.get, args=(self.client,)) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_while_revalidate(self):
+        self.registry.get(self.client)
+        self.registry.configure(ttl=0.05)
+        time.sleep(0.06)
+        self.names = self.names + ["New-Model"]
+        self.list_gate = threading.Event()
+        self.list_done.clear()
+
+        # 过期后立即返回旧数据，不等待刷新；刷新被阻塞，若get等待刷新则会拿到新数据
+        index = self.registry.get(self.client)
+        self.assertNotIn("New-Model", index)
+        self.list_gate.set()
+        self.assertTrue(self.list_done.wait(5))
+        self.registry.configure(ttl=3600)
+        for _ in range(100):
+            if "New-Model" in self.registry.get(self.client):
+                break
+            time.sleep(0.01)
+        self.assertIn("New-Model", self.registry.get(self.client))
+        self.assertEqual(self.calls, 2)
+
+    def test_miss_refresh(self):
+        self.registry.configure(miss_refresh_interval=0)
+        self.registry.get(self.client)
+        self.names = self.names + ["New-Model"]
+        self.assertEqual(self.registry.lookup(self.client, "New-Model")[0], "http://New-Model")
+        self.assertEqual(self.calls, 2)
+
+    def test_snapshot_cold_start(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "models.json")
+            self.registry.configure(snapshot_path=path)
+            self.registry.get(self.client)
+            self.assertEqual(self.calls, 1)
+            with open(path, encoding="utf-8") as f:
+                self.assertNotIn("test", f.read())
+
+            registry = ModelRegistry(ttl=3600, snapshot_path=path)
+            self.assertEqual(registry.lookup(self.client, "eb")[0], "http://ERNIE-Bot")
+            self.assertEqual(self.calls, 1)
+
+    def test_ttl_lru_cache_not_pin_instance(self):
+        owner = _Owner()
+        self.assertEqual(owner.compute(2), 4)
+        self.assertEqual(owner.compute(2), 4)
+        self.assertEqual(owner.calls, 1)
+        other = _Owner()
+        other.compute(2)
+        self.assertEqual(other.calls, 1)
+
+        ref = weakref.ref(owner)
+        del owner
+        gc.collect()
+        self.assertIsNone(ref())
+
+
+if __name__ == '__main__':
+    unittest.main()
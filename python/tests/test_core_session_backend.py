@@ -0,0 +1,191 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import os
+import threading
+import time
+import unittest
+import uuid
+
+from appbuilder.core.context import init_context
+from appbuilder.core.message import Message
+from appbuilder.core.session_backend import MemorySessionBackend, RedisSessionBackend, create_session_backend
+from appbuilder.core.user_session import UserSession
+
+
+class FakeRedis(object):
+    # 本地替身，只实现RedisSessionBackend用到的命令，语义与Redis一致
+    def __init__(self):
+        self.lists = {}
+        self.expires = {}
+        self.lock = threading.Lock()
+        self.lrange_calls = []
+
+    def _expire_if_needed(self, key):
+        if key in self.expires and self.expires[key] <= time.monotonic():
+            self.lists.pop(key, None)
+            self.expires.pop(key, None)
+
+    def _slice(self, values, start, end):
+        n = len(values)
+        start = max(start + n if start < 0 else start, 0)
+        end = end + n if end < 0 else min(end, n - 1)
+        return values[start:end + 1]
+
+    def lrange(self, key, start, end):
+        with self.lock:
+            self._expire_if_needed(key)
+            self.lrange_calls.append((key, start, end))
+            return [value.encode("utf-8") for value in self._slice(self.lists.get(key, []), start, end)]
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+
+class _FakePipeline(object):
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def rpush(self, key, value):
+        self.commands.append(("rpush", key, value))
+
+    def ltrim(self, key, start, end):
+        self.commands.append(("ltrim", key, start, end))
+
+    def expire(self, key, seconds):
+        self.commands.append(("expire", key, seconds))
+
+    def execute(self):
+        # MULTI/EXEC：命令在锁内一次性执行
+        with self.client.lock:
+            for command in self.commands:
+                key = command[1]
+                self.client._expire_if_needed(key)
+                if command[0] == "rpush":
+                    self.client.lists.setdefault(key, []).append(command[2])
+                elif command[0] == "ltrim":
+                    self.client.lists[key] = self.client._slice(self.client.lists.get(key, []), command[2], command[3])
+                elif command[0] == "expire":
+                    self.client.expires[key] = time.monotonic() + command[2]
+        self.commands = []
+
+
+def _contents(values):
+    return [value["content"] for value in values]
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "CPU_PARALLEL", "")
+class TestCoreSessionBackend(unittest.TestCase):
+    def _check_backend(self, backend):
+        backend.append("s1", "r1", {"query": Message("q0"), "answer": Message({"a": [1, None]})})
+        backend.append("s1", "r2", {"query": Message("q1")})
+        backend.append("s2", "r3", {"query": Message("other")})
+        self.assertEqual(_contents(backend.get_history("s1", "query", 10)), ["q0", "q1"])
+        self.assertEqual(_contents(backend.get_history("s1", "query", 1)), ["q1"])
+        self.assertEqual(_contents(backend.get_history("s1", "answer", 10)), [{"a": [1, None]}])
+        self.assertEqual(backend.get_history("s1", "query", 0), [])
+        self.assertEqual(backend.get_history("s3", "query", 10), [])
+        # 与改造前写入数据库的格式一致
+        message = Message("q")
+        backend.append("s4", "r4", {"query": message})
+        self.assertEqual(backend.get_history("s4", "query", 1)[0], message.model_dump(mode="json", exclude_none=True))
+
+        async def run():
+            await backend.aappend("s5", "r5", {"query": Message("async")})
+            return await backend.aget_history("s5", "query", 10)
+
+        self.assertEqual(_contents(asyncio.run(run())), ["async"])
+
+    def test_memory_backend(self):
+        self._check_backend(MemorySessionBackend())
+
+    def test_memory_backend_bounds(self):
+        backend = MemorySessionBackend(max_sessions=3, max_history=5)
+        for i in range(5):
+            backend.append("s{}".format(i), "r", {"query": Message("q")})
+        self.assertEqual(len(backend), 3)
+        self.assertEqual(backend.get_history("s0", "query", 10), [])
+        self.assertEqual(len(backend.get_history("s4", "query", 10)), 1)
+
+        for i in range(20):
+            backend.append("s4", "r", {"query": Message("q{}".format(i))})
+        self.assertEqual(_contents(backend.get_history("s4", "query", 100)), ["q15", "q16", "q17", "q18", "q19"])
+
+        size = backend.nbytes
+        backend = MemorySessionBackend(max_bytes=size)
+        for i in range(10):
+            backend.append("s{}".format(i), "r", {"query": Message("q")})
+            self.assertLessEqual(backend.nbytes, size)
+        self.assertEqual(len(backend.get_history("s9", "query", 10)), 1)
+
+    def test_memory_backend_ttl(self):
+        backend = MemorySessionBackend(ttl=0.05)
+        backend.append("s1", "r", {"query": Message("q")})
+        self.assertEqual(len(backend.get_history("s1", "query", 10)), 1)
+        time.sleep(0.06)
+        self.assertEqual(backend.get_history("s1", "query", 10), [])
+        self.assertEqual(len(backend), 0)
+        self.assertEqual(backend.nbytes, 0)
+
+    def test_redis_backend(self):
+        client = FakeRedis()
+        self._check_backend(RedisSessionBackend(client=client, ttl=60))
+        # 只读取队尾limit条
+        self.assertEqual(client.lrange_calls[1], ("appbuilder:session:s1:query", -1, -1))
+
+    def test_redis_backend_trim_and_ttl(self):
+        client = FakeRedis()
+        backend = RedisSessionBackend(client=client, ttl=0.05, max_history=3)
+        for i in range(10):
+            backend.append("s1", "r", {"query": Message("q{}".format(i))})
+        self.assertEqual(len(client.lists["appbuilder:session:s1:query"]), 3)
+        self.assertEqual(_contents(backend.get_history("s1", "query", 10)), ["q7", "q8", "q9"])
+        time.sleep(0.06)
+        self.assertEqual(backend.get_history("s1", "query", 10), [])
+
+    def test_concurrent_append(self):
+        for backend in [MemorySessionBackend(), RedisSessionBackend(client=FakeRedis())]:
+            def worker(i):
+                for turn in range(50):
+                    backend.append("s", "r", {"query": Message(i), "answer": Message(i)})
+
+            threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            self.assertEqual(len(backend.get_history("s", "query", 1000)), 400)
+            self.assertEqual(len(backend.get_history("s", "answer", 1000)), 400)
+
+    def test_create_session_backend(self):
+        self.assertIsInstance(create_session_backend("memory://"), MemorySessionBackend)
+
+    def test_user_session_with_backend(self):
+        UserSession._instance = None
+        UserSession._initialized = False
+        self.addCleanup(setattr, UserSession, "_instance", None)
+        self.addCleanup(setattr, UserSession, "_initialized", False)
+        user_session = UserSession(backend=MemorySessionBackend())
+        session_id = str(uuid.uuid4())
+        for turn in range(3):
+            init_context(session_id=session_id, request_id=str(uuid.uuid4()))
+            user_session.append({"query": Message("q{}".format(turn)), "answer": Message("a{}".format(turn))})
+            user_session._post_append()
+        history = user_session.get_history("answer", limit=2)
+        self.assertEqual([m.content["content"] for m in history], ["a1", "a2"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import json
+import logging
+import os
+import unittest
+from unittest.mock import patch, AsyncMock
+
+import requests
+
+from appbuilder.core._session import InnerSession, AsyncInnerSession, RequestLogSampler, request_log_sampler
+
+
+def _info_only(level):
+    return level >= logging.INFO
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "CPU_PARALLEL", "")
+class TestCoreSessionRequestLog(unittest.TestCase):
+    def setUp(self):
+        self.request = requests.Request(
+            "POST", "http://127.0.0.1/test",
+            headers={"Content-Type": "application/json", "X-Appbuilder-Authorization": "Bearer secret-token"},
+            data=json.dumps({"image": "a" * 4096})).prepare()
+
+    def tearDown(self):
+        request_log_sampler.configure(sample_rate=0, max_body_size=1024)
+
+    def test_no_curl_when_debug_disabled(self):
+        session = InnerSession()
+        with patch("appbuilder.core._session.logger.isEnabledFor", return_value=False), \
+                patch.object(InnerSession, "build_curl") as mock_build_curl, \
+                patch("requests.Session.send", return_value="resp"):
+            self.assertEqual(session.send(self.request), "resp")
+            mock_build_curl.assert_not_called()
+
+    def test_sampled_curl_is_truncated(self):
+        request_log_sampler.configure(sample_rate=2, max_body_size=64)
+        session = InnerSession()
+        with patch("appbuilder.core._session.logger.isEnabledFor", side_effect=_info_only), \
+                patch("appbuilder.core._session.logger.info") as mock_info, \
+                patch("requests.Session.send", return_value="resp"):
+            for _ in range(4):
+                session.send(self.request)
+        self.assertEqual(mock_info.call_count, 2)
+        message = mock_info.call_args[0][0]
+        self.assertIn("truncated", message)
+        self.assertLess(len(message), 1024)
+        # 采样日志中不包含鉴权信息
+        self.assertNotIn("secret-token", message)
+        self.assertIn("X-Appbuilder-Authorization: ***", message)
+
+    def test_no_sampled_curl_when_info_disabled(self):
+        request_log_sampler.configure(sample_rate=1)
+        session = InnerSession()
+        with patch("appbuilder.core._session.logger.isEnabledFor", return_value=False), \
+                patch.object(InnerSession, "build_curl") as mock_build_curl, \
+                patch("requests.Session.send", return_value="resp"):
+            session.send(self.request)
+            mock_build_curl.assert_not_called()
+
+    def test_streamed_body(self):
+        session = InnerSession()
+
+        def chunks():
+            yield b"a" * 4096
+
+        request = requests.Request("POST", "http://127.0.0.1/test", data=chunks()).prepare()
+        for max_body_size in (None, 64):
+            curl = session.build_curl(request, max_body_size=max_body_size)
+            self.assertIn("<streamed body>", curl)
+
+    def test_invalid_env(self):
+        with patch.dict(os.environ, {"APPBUILDER_REQUEST_LOG_SAMPLE_RATE": "abc",
+                                     "APPBUILDER_REQUEST_LOG_MAX_BODY_SIZE": ""}):
+            sampler = RequestLogSampler()
+        self.assertEqual((sampler.sample_rate, sampler.max_body_size), (0, 1024))
+
+    def test_async_no_curl_when_debug_disabled(self):
+        async def run():
+            session = AsyncInnerSession()
+            with patch("appbuilder.core._session.logger.isEnabledFor", return_value=False), \
+                    patch.object(AsyncInnerSession, "build_curl") as mock_build_curl, \
+                    patch("aiohttp.ClientSession.post", new_callable=AsyncMock):
+                await session.post("http://127.0.0.1/test", json={"image": "a"})
+                mock_build_curl.assert_not_called()
+            await session.close()
+
+        asyncio.run(run())
+
+    def test_async_build_curl_truncate(self):
+        async def run():
+            session = AsyncInnerSession()
+            curl = await session.build_curl(
+                "POST", "http://127.0.0.1/test", json_data={"image": "a" * 4096}, max_body_size=32,
+                mask_auth=True, headers={"Authorization": "Bearer secret-token"})
+            await session.close()
+            return curl
+
+        curl = asyncio.run(run())
+        self.assertIn("truncated", curl)
+        self.assertLess(len(curl), 256)
+        self.assertNotIn("secret-token", curl)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+import uuid
+
+from sqlalchemy import event
+
+from appbuilder.core.context import init_context
+from appbuilder.core.message import Message
+from appbuilder.core.user_session import UserSession
+
+
+def _new_request(session_id):
+    init_context(session_id=session_id, request_id=str(uuid.uuid4()))
+
+
+def _contents(history):
+    # 数据库中保存的是完整的Message
+    return [m.content["content"] for m in history]
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "CPU_PARALLEL", "")
+class TestCoreUserSessionStorage(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, "user_session.db")
+        self._reset()
+        self.addCleanup(self._reset)
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def _reset(self):
+        if UserSession._instance is not None and hasattr(UserSession._instance, "_backend"):
+            UserSession._instance.backend.close()
+        UserSession._instance = None
+        UserSession._initialized = False
+
+    def _user_session(self, **kwargs):
+        user_session = UserSession("sqlite:///" + self.db_path, **kwargs)
+        self.statements = []
+        self.commits = 0
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            self.statements.append(statement)
+
+        def commit(conn):
+            self.commits += 1
+
+        event.listen(user_session.backend._engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(user_session.backend._engine, "commit", commit)
+        return user_session
+
+    def _indexes(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return [row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='appbuilder_session_messages'")]
+        finally:
+            conn.close()
+
+    def test_index_created_for_existing_table(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE appbuilder_session_messages (id VARCHAR(36) PRIMARY KEY, "
+                     "session_id VARCHAR(36), request_id VARCHAR(36), message_key VARCHAR(128), "
+                     "message_value JSON, created_at DATETIME, updated_at DATETIME, deleted BOOLEAN)")
+        conn.commit()
+        conn.close()
+        self._user_session()
+        self.assertIn("ix_appbuilder_session_messages_session_key_updated", self._indexes())
+
+    def test_post_append_commits_once(self):
+        user_session = self._user_session()
+        _new_request("session-1")
+        user_session.append({"query": Message("q1"), "answer": Message("a1"), "extra": Message({"k": 1})})
+        user_session._post_append()
+        self.assertEqual(self.commits, 1)
+        self.assertEqual(_contents(user_session.get_history("query")), ["q1"])
+        self.assertEqual(_contents(user_session.get_history("extra")), [{"k": 1}])
+
+    def test_concurrent_requests(self):
+        user_session = self._user_session()
+        errors = []
+
+        def worker(i):
+            try:
+                for turn in range(5):
+                    _new_request("session-{}".format(i))
+                    user_session.append({"query": Message("q{}-{}".format(i, turn))})
+                    user_session._post_append()
+                _new_request("session-{}".format(i))
+                history = _contents(user_session.get_history("query", limit=3))
+                self.assertEqual(history, ["q{}-{}".format(i, turn) for turn in range(2, 5)])
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+
+    def test_history_cache(self):
+        user_session = self._user_session(history_cache_size=16)
+        _new_request("session-1")
+        self.assertEqual(user_session.get_history("query"), [])
+        for turn in range(3):
+            _new_request("session-1")
+            user_session.append({"query": Message("q{}".format(turn))})
+            user_session._post_append()
+
+        self.statements.clear()
+        history = user_session.get_history("query", limit=2)
+        self.assertEqual(_contents(history), ["q1", "q2"])
+        self.assertEqual(_contents(user_session.get_history("query", limit=100)), ["q0", "q1", "q2"])
+        # 缓存中包含该会话的全部历史，不访问数据库
+        self.assertFalse([s for s in self.statements if s.startswith("SELECT")])
+        # 修改返回值不影响缓存
+        history[0].content["content"] = "changed"
+        self.assertEqual(_contents(user_session.get_history("query", limit=2))[0], "q1")
+
+        _new_request("session-2")
+        user_session.get_history("query")
+        self.assertEqual(len([s for s in self.statements if s.startswith("SELECT")]), 1)
+
+    def test_history_cache_disabled_by_default(self):
+        user_session = self._user_session()
+        _new_request("session-1")
+        user_session.get_history("query")
+        user_session.get_history("query")
+        self.assertEqual(len([s for s in self.statements if s.startswith("SELECT")]), 2)
+
+    def test_async_api_without_async_engine(self):
+        user_session = self._user_session()
+
+        async def run():
+            _new_request("session-1")
+            user_session.append({"query": Message("q0")})
+            await user_session._apost_append()
+            return await user_session.aget_history("query")
+
+        self.assertEqual(_contents(asyncio.run(run())), ["q0"])
+
+
+if __name__ == '__main__':
+    unittest.main()
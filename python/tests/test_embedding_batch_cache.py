@@ -0,0 +1,218 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from appbuilder import Embedding, LRUEmbeddingCache, Matching, MmapEmbeddingCache, Message
+from appbuilder.core._client import HTTPClient
+
+
+def _vector(text):
+    return [float(len(text)), float(zlib.crc32(text.encode()) % 1000), 0.5]
+
+
+class StubEmbeddingServer(object):
+    def __init__(self, latency=0.05):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.texts = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                texts = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["input"]
+                with server.lock:
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                    server.texts.extend(texts)
+                try:
+                    time.sleep(server.latency)
+                    payload = json.dumps({"data": [{"embedding": _vector(text)} for text in texts]}).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                finally:
+                    with server.lock:
+                        server.in_flight -= 1
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = "http://127.0.0.1:{}".format(self.httpd.server_address[1])
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "CPU_PARALLEL", "")
+class TestEmbeddingBatchCache(unittest.TestCase):
+    def setUp(self):
+        self.server = StubEmbeddingServer()
+        self.addCleanup(self.server.close)
+        self.texts = ["text {}".format(i) for i in range(160)]
+        self.expected = [_vector(text) for text in self.texts]
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def _embedding(self, **kwargs):
+        embedding = Embedding(**kwargs)
+        embedding._http_client = HTTPClient(gateway=self.server.url)
+        return embedding
+
+    def test_concurrent_batch(self):
+        for max_concurrency in (1, 8):
+            self.server.max_in_flight = 0
+            res = self._embedding(max_concurrency=max_concurrency).batch(Message(self.texts))
+            self.assertEqual(res.content, self.expected)
+            self.assertLessEqual(self.server.max_in_flight, max_concurrency)
+            self.assertEqual(self.server.max_in_flight > 1, max_concurrency > 1)
+
+    def test_abatch(self):
+        res = asyncio.run(self._embedding().abatch(self.texts))
+        self.assertEqual(res.content, self.expected)
+        self.assertGreater(self.server.max_in_flight, 1)
+        self.assertEqual(self._embedding().batch([]).content, [])
+
+    def test_lru_cache(self):
+        embedding = self._embedding(cache=LRUEmbeddingCache(max_size=1000))
+        self.assertEqual(embedding.batch(self.texts[:20] + self.texts[:5]).content,
+                         self.expected[:20] + self.expected[:5])
+        # 重复的文本只请求一次
+        self.assertEqual(len(self.server.texts), 20)
+        self.assertEqual(embedding.batch(self.texts[10:30]).content, self.expected[10:30])
+        self.assertEqual(self.server.texts[20:], self.texts[20:30])
+        self.assertEqual(embedding("text 3").content, self.expected[3])
+        self.assertEqual(len(self.server.texts), 30)
+
+    def test_lru_eviction(self):
+        cache = LRUEmbeddingCache(max_size=2)
+        cache.set_many(["a", "b"], [[1.0], [2.0]])
+        cache.get_many(["a"])
+        cache.set_many(["c"], [[3.0]])
+        self.assertEqual(cache.get_many(["a", "b", "c"]), [[1.0], None, [3.0]])
+
+    def test_mmap_cache(self):
+        directory = os.path.join(self.tmp_dir.name, "cache")
+        embedding = self._embedding(cache=MmapEmbeddingCache(directory))
+        self.assertEqual(embedding.batch(self.texts[:40]).content, self.expected[:40])
+
+        # 重新打开后未改变的文本不再请求服务端
+        store = MmapEmbeddingCache(directory)
+        self.assertEqual(len(store), 40)
+        embedding = self._embedding(cache=LRUEmbeddingCache(max_size=10, store=store))
+        self.server.texts.clear()
+        self.assertEqual(embedding.batch(self.texts[:50]).content, self.expected[:50])
+        self.assertEqual(self.server.texts, self.texts[40:50])
+        self.assertEqual(len(MmapEmbeddingCache(directory)), 50)
+
+    def test_mmap_cache_truncated(self):
+        directory = os.path.join(self.tmp_dir.name, "cache")
+        MmapEmbeddingCache(directory).set_many(["a", "b"], [[1.0, 2.0], [3.0, 4.0]])
+        # 模拟写入向量后、写入key前进程中断
+        with open(os.path.join(directory, "vectors.f32"), "ab") as f:
+            f.write(b"\0" * 6)
+        cache = MmapEmbeddingCache(directory)
+        a, b, c = cache.get_many(["a", "b", "c"])
+        self.assertEqual(a.dtype, np.float32)
+        self.assertEqual((a.tolist(), b.tolist(), c), ([1.0, 2.0], [3.0, 4.0], None))
+        cache.set_many(["c"], [[5.0, 6.0]])
+        self.assertEqual(MmapEmbeddingCache(directory).get_many(["c"])[0].tolist(), [5.0, 6.0])
+        with self.assertRaises(ValueError):
+            cache.set_many(["d"], [[1.0]])
+
+    def test_mixed_hits_list_mode(self):
+        # 命中的向量来自MmapEmbeddingCache(ndarray)或return_numpy的Embedding写入的缓存，未命中的来自服务端(list)
+        store = MmapEmbeddingCache(os.path.join(self.tmp_dir.name, "cache"))
+        self._embedding(cache=store).batch(self.texts[:10])
+        shared = LRUEmbeddingCache()
+        self._embedding(cache=shared, return_numpy=True).batch(self.texts[10:20])
+        for cache in (store, shared):
+            res = self._embedding(cache=cache).batch(self.texts[5:25])
+            self.assertTrue(all(type(vector) is list for vector in res.content))
+            self.assertTrue(all(type(x) is float for vector in res.content for x in vector))
+            json.dumps(res.content)
+            np.testing.assert_allclose(res.content, self.expected[5:25])
+
+    def test_return_numpy(self):
+        embedding = self._embedding(return_numpy=True)
+        res = embedding.batch(self.texts)
+        self.assertIsInstance(res.content, np.ndarray)
+        self.assertEqual(res.content.dtype, np.float32)
+        self.assertTrue(res.content.flags["C_CONTIGUOUS"])
+        np.testing.assert_array_equal(res.content, np.asarray(self.expected, dtype=np.float32))
+        # 逐行迭代得到的是视图
+        row = next(iter(res.content))
+        self.assertIs(row.base, res.content)
+        single = embedding("text 1").content
+        self.assertEqual(single.shape, (3,))
+        self.assertEqual(embedding.batch([]).content.shape, (0, 0))
+        self.assertLess(res.content.nbytes * 7, sys.getsizeof(self.expected) +
+                        sum(sys.getsizeof(v) + sum(sys.getsizeof(x) for x in v) for v in self.expected))
+
+    def test_return_numpy_with_cache(self):
+        store = MmapEmbeddingCache(os.path.join(self.tmp_dir.name, "cache"))
+        self._embedding(cache=store).batch(self.texts[:20])
+        res = self._embedding(cache=store, return_numpy=True).batch(self.texts[:30])
+        np.testing.assert_array_equal(res.content, np.asarray(self.expected[:30], dtype=np.float32))
+        # ndarray缓存在list模式下转换回List[float]
+        res = self._embedding(cache=store).batch(self.texts[:30])
+        self.assertEqual(res.content, np.asarray(self.expected[:30], dtype=np.float32).tolist())
+
+    def test_matching_accepts_ndarray(self):
+        matching = Matching(self._embedding(return_numpy=True))
+        contexts = Message(["text 1", "text 22", "text 333"])
+        scores = matching.semantics(matching.embedding_component("text 22"),
+                                    matching.embedding_component.batch(contexts))
+        list_scores = matching.semantics(_vector("text 22"), [_vector(t) for t in contexts.content])
+        np.testing.assert_allclose(scores.content, list_scores.content, rtol=1e-5)
+        self.assertEqual(matching(Message("text 22"), contexts).content[0], "text 22")
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "BENCHMARK", "")
+class TestEmbeddingBatchBenchmark(unittest.TestCase):
+    def test_benchmark(self):
+        server = StubEmbeddingServer()
+        self.addCleanup(server.close)
+        texts = ["text {}".format(i) for i in range(160)]
+        results = {}
+        for max_concurrency in (1, 8):
+            embedding = Embedding(max_concurrency=max_concurrency)
+            embedding._http_client = HTTPClient(gateway=server.url)
+            start = time.perf_counter()
+            embedding.batch(Message(texts))
+            results[max_concurrency] = time.perf_counter() - start
+        print("\nembedding of {} texts: sequential {:.2f}s, max_concurrency=8 {:.2f}s".format(
+            len(texts), results[1], results[8]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import copy
+import json
+import os
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import appbuilder
+from appbuilder.core.components.llms.base import CompletionBaseComponent, ModelArgsConfig
+
+
+class _RecordComponent(appbuilder.Playground):
+    r"""不发送网络请求，只记录请求体的Playground"""
+
+    def completion(self, version, base_url, request, timeout=None, retry=0, request_id=None):
+        # 放大竞争窗口：请求体在序列化前被其他线程修改即可被发现
+        time.sleep(0.001)
+        body = json.loads(json.dumps(request.params))
+        return _FakeResponse(body)
+
+
+class _FakeResponse(object):
+    error_no = 0
+
+    def __init__(self, body):
+        self.body = body
+
+    def to_message(self):
+        return appbuilder.Message(self.body)
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "CPU_PARALLEL", "")
+class TestLlmBaseModelConfig(unittest.TestCase):
+    def setUp(self):
+        self.template = copy.deepcopy(CompletionBaseComponent.model_config)
+        patcher = patch.object(
+            CompletionBaseComponent, "_check_model_and_get_model_url", return_value="http://model-url")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.component = _RecordComponent(
+            prompt_template="{query}", model="ERNIE-Speed-128K", secret_key="test", lazy_certification=True)
+
+    def test_template_not_mutated(self):
+        config = self.component.get_model_config(
+            ModelArgsConfig(temperature=0.5, stop=["a"]), {"penalty_score": 1.5})
+        self.assertEqual(config["model"]["completion_params"]["temperature"], 0.5)
+        self.assertEqual(config["model"]["completion_params"]["penalty_score"], 1.5)
+        self.assertEqual(config["model"]["url"], "http://model-url")
+        self.assertEqual(CompletionBaseComponent.model_config, self.template)
+
+        # 上一次请求的透传参数不会泄漏到下一次请求
+        config = self.component.get_model_config(ModelArgsConfig())
+        self.assertNotIn("penalty_score", config["model"]["completion_params"])
+
+    def test_concurrent_run_bodies_never_cross(self):
+        def call(i):
+            temperature = round((i % 99 + 1) / 100, 2)
+            answer = self.component.run(
+                appbuilder.Message({"query": "q{}".format(i)}),
+                temperature=temperature, top_p=temperature, max_output_tokens=i + 2,
+                stop=["s{}".format(i)], request_tag=i)
+            return i, temperature, answer.content
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            results = list(executor.map(call, range(800)))
+
+        for i, temperature, body in results:
+            params = body["model_config"]["model"]["completion_params"]
+            self.assertEqual(body["query"], "q{}".format(i))
+            self.assertEqual(params["temperature"], temperature)
+            self.assertEqual(params["top_p"], temperature)
+            self.assertEqual(params["max_output_tokens"], i + 2)
+            self.assertEqual(params["stop"], ["s{}".format(i)])
+            self.assertEqual(params["request_tag"], i)
+        self.assertEqual(CompletionBaseComponent.model_config, self.template)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import tempfile
+import time
+import unittest
+
+import numpy as np
+
+from appbuilder import LocalRetriever, LocalVectorStoreIndex, Message
+from appbuilder.core.components.embeddings import EmbeddingBaseComponent
+
+
+class TableEmbedding(EmbeddingBaseComponent):
+    # "doc {i}"映射到vectors的第i行
+    name = "table_embedding"
+    version = "v1"
+
+    def __init__(self, vectors):
+        super().__init__(lazy_certification=True)
+        self.vectors = vectors
+
+    def run(self, text):
+        _text = text if isinstance(text, str) else text.content
+        return Message(self.vectors[int(_text.split()[-1])].tolist())
+
+    def batch(self, texts):
+        _texts = texts if isinstance(texts, list) else texts.content
+        return Message(self.vectors[[int(text.split()[-1]) for text in _texts]])
+
+
+def _clustered_vectors(n, dim, clusters, noise=0.3, seed=0):
+    rng = np.random.RandomState(seed)
+    centers = rng.randn(clusters, dim)
+    return (centers[rng.randint(clusters, size=n)] + noise * rng.randn(n, dim)).astype(np.float32)
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "CPU_PARALLEL", "")
+class TestLocalVectorIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.vectors = _clustered_vectors(2000, 32, 20)
+        self.embedding = TableEmbedding(self.vectors)
+        self.docs = ["doc {}".format(i) for i in range(len(self.vectors))]
+
+    def _exact(self, query, top_k, rows=None):
+        rows = np.arange(len(self.vectors)) if rows is None else np.asarray(rows)
+        matrix = self.vectors[rows] / np.linalg.norm(self.vectors[rows], axis=1, keepdims=True)
+        scores = matrix @ (self.vectors[query] / np.linalg.norm(self.vectors[query]))
+        return [self.docs[rows[i]] for i in np.argsort(-scores, kind="stable")[:top_k]]
+
+    def test_retriever(self):
+        index = LocalVectorStoreIndex.from_segments(Message(self.docs[:100]), embedding=self.embedding)
+        retriever = index.as_retriever()
+        self.assertIsInstance(retriever, LocalRetriever)
+        res = retriever(Message("doc 7"), top_k=5)
+        self.assertEqual([doc["text"] for doc in res.content], self._exact(7, 5, range(100)))
+        self.assertAlmostEqual(res.content[0]["score"], 1.0, places=5)
+        self.assertEqual(res.content[0]["meta"], "")
+        with self.assertRaises(ValueError):
+            retriever(Message("doc 7"), top_k=0)
+
+    def test_add_and_delete(self):
+        index = LocalVectorStoreIndex(embedding=self.embedding)
+        ids = index.add_segments(Message(self.docs[:10]), metadata={"source": "a"})
+        index.add_segments(Message(self.docs[10:20]))
+        self.assertEqual(len(index), 20)
+        self.assertEqual(index.delete_segments(ids[:5] + ["missing"]), 5)
+        res = index.search(self.vectors[3], top_k=20)
+        self.assertEqual(len(res), 15)
+        self.assertNotIn("doc 3", [doc["text"] for doc in res])
+        # 相同ID再次写入时覆盖原内容
+        index.add_segments(Message(["doc 30"]), ids=[ids[6]])
+        self.assertEqual(len(index), 15)
+        self.assertEqual(index.search(self.vectors[30])[0]["id"], ids[6])
+        self.assertNotIn("doc 6", [doc["text"] for doc in index.get_all_segments()])
+        index.delete_all_segments()
+        self.assertEqual(index.search(self.vectors[3]), [])
+
+    def test_persistence(self):
+        path = os.path.join(self.tmp_dir.name, "index")
+        index = LocalVectorStoreIndex(embedding=self.embedding, path=path)
+        ids = index.add_segments(Message(self.docs[:50]), metadata="m")
+        index.delete_segments(ids[:10])
+        index.add_segments(Message(self.docs[50:60]), ids=ids[20:30])
+
+        loaded = LocalVectorStoreIndex(embedding=self.embedding, path=path)
+        self.assertIsInstance(loaded._storage.matrix, np.memmap)
+        self.assertEqual(loaded.get_all_segments(), index.get_all_segments())
+        self.assertEqual(loaded.search(self.vectors[55], top_k=3), index.search(self.vectors[55], top_k=3))
+
+        loaded.compact()
+        self.assertEqual(loaded._storage.size, 40)
+        self.assertEqual(os.path.getsize(os.path.join(path, "vectors.f32")), 40 * 32 * 4)
+        reloaded = LocalVectorStoreIndex(embedding=self.embedding, path=path)
+        self.assertEqual(reloaded.get_all_segments(), index.get_all_segments())
+        self.assertEqual(reloaded.search(self.vectors[55], top_k=3), index.search(self.vectors[55], top_k=3))
+
+    def test_partial_write_recovery(self):
+        path = os.path.join(self.tmp_dir.name, "index")
+        LocalVectorStoreIndex(embedding=self.embedding, path=path).add_segments(Message(self.docs[:5]))
+        # 模拟写入向量后、写入文本前进程中断
+        with open(os.path.join(path, "vectors.f32"), "ab") as f:
+            f.write(self.vectors[5].tobytes())
+        with open(os.path.join(path, "segments.jsonl"), "a", encoding="utf-8") as f:
+            f.write('{"id": "x", "te')
+        index = LocalVectorStoreIndex(embedding=self.embedding, path=path)
+        self.assertEqual(len(index), 5)
+        index.add_segments(Message(self.docs[6:8]))
+        reloaded = LocalVectorStoreIndex(embedding=self.embedding, path=path)
+        self.assertEqual([doc["text"] for doc in reloaded.get_all_segments()],
+                         self.docs[:5] + self.docs[6:8])
+        self.assertEqual(reloaded.search(self.vectors[7])[0]["text"], "doc 7")
+
+    def test_ivf_incremental(self):
+        index = LocalVectorStoreIndex(embedding=self.embedding, index_type="ivf", nprobe=4, min_train_size=500)
+        index.add_segments(Message(self.docs[:400]))
+        self.assertEqual(index.search(self.vectors[5], top_k=3)[0]["text"], "doc 5")
+        self.assertIsNone(index._ivf.centroids)
+        index.add_segments(Message(self.docs[400:600]))
+        index.search(self.vectors[5])
+        self.assertIsNotNone(index._ivf.centroids)
+        # 训练后写入的向量同样可以被检索到
+        index.add_segments(Message(self.docs[600:700]))
+        for i in (650, 699):
+            self.assertEqual(index.search(self.vectors[i])[0]["text"], "doc {}".format(i))
+        ids = [doc["id"] for doc in index.get_all_segments() if doc["text"] == "doc 650"]
+        index.delete_segments(ids)
+        self.assertNotEqual(index.search(self.vectors[650])[0]["text"], "doc 650")
+
+    def test_ivf_recall(self):
+        # 检索全部簇时与精确检索一致
+        index = LocalVectorStoreIndex(embedding=self.embedding, index_type="ivf", nlist=20, min_train_size=500)
+        index.add_segments(Message(self.docs))
+        queries = np.random.RandomState(2).randint(len(self.vectors), size=50)
+        recalls = {}
+        for nprobe in (2, 20):
+            index._ivf.nprobe = nprobe
+            recalls[nprobe] = np.mean([len(set(self._exact(q, 10)) &
+                                           set(r["text"] for r in index.search(self.vectors[q], top_k=10))) / 10
+                                       for q in queries])
+        self.assertEqual(recalls[20], 1.0)
+        self.assertGreater(recalls[2], 0)
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "BENCHMARK", "")
+class TestLocalVectorIndexBenchmark(unittest.TestCase):
+    def test_benchmark(self):
+        vectors = _clustered_vectors(50000, 128, 200, noise=2.0, seed=1)
+        embedding = TableEmbedding(vectors)
+        docs = ["doc {}".format(i) for i in range(len(vectors))]
+        flat = LocalVectorStoreIndex(embedding=embedding)
+        ivf = LocalVectorStoreIndex(embedding=embedding, index_type="ivf")
+        for index in (flat, ivf):
+            for start in range(0, len(docs), 10000):
+                index.add_segments(Message(docs[start:start + 10000]))
+        start = time.perf_counter()
+        ivf.search(vectors[0])
+        train_time = time.perf_counter() - start
+
+        queries = np.random.RandomState(2).randint(len(vectors), size=200)
+        query_vectors = vectors[queries] + 0.1 * np.random.RandomState(3).randn(len(queries), 128).astype(np.float32)
+
+        def run(index):
+            start = time.perf_counter()
+            results = [[r["text"] for r in index.search(q, top_k=10)] for q in query_vectors]
+            return results, (time.perf_counter() - start) / len(queries) * 1000
+
+        expected, flat_latency = run(flat)
+        print("\n{} vectors x 128 dims, flat latency {:.2f}ms, ivf training {:.2f}s, nlist {}".format(
+            len(vectors), flat_latency, train_time, len(ivf._ivf.centroids)))
+        recalls = {}
+        for nprobe in (4, 16, 64):
+            ivf._ivf.nprobe = nprobe
+            results, latency = run(ivf)
+            recalls[nprobe] = np.mean([len(set(e) & set(r)) / 10 for e, r in zip(expected, results)])
+            print("ivf nprobe={}: recall@10 {:.3f}, latency {:.2f}ms".format(nprobe, recalls[nprobe], latency))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import unittest
+
+import numpy as np
+
+from appbuilder import Matching, Message
+from appbuilder.core.components.embeddings import EmbeddingBaseComponent
+from appbuilder.core.components.matching import PreparedContexts
+
+
+class FakeEmbedding(EmbeddingBaseComponent):
+    # 以文本中的数字为种子生成固定向量，记录请求过的文本
+    name = "fake_embedding"
+    version = "v1"
+
+    def __init__(self, return_numpy=False):
+        super().__init__(lazy_certification=True)
+        self.return_numpy = return_numpy
+        self.calls = []
+
+    def _vector(self, text):
+        return np.random.RandomState(int(text.split()[-1])).rand(8).tolist()
+
+    def run(self, text):
+        _text = text if isinstance(text, str) else text.content
+        self.calls.append([_text])
+        return Message(self._vector(_text))
+
+    def batch(self, texts):
+        _texts = texts if isinstance(texts, list) else texts.content
+        self.calls.append(list(_texts))
+        vectors = [self._vector(text) for text in _texts]
+        return Message(np.asarray(vectors, dtype=np.float32) if self.return_numpy else vectors)
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "CPU_PARALLEL", "")
+class TestMatchingTopK(unittest.TestCase):
+    def setUp(self):
+        self.embedding = FakeEmbedding()
+        self.matching = Matching(self.embedding)
+        self.contexts = ["context {}".format(i) for i in range(50)]
+
+    def _expected(self, query):
+        # 原实现：逐一计算余弦相似度后完整排序
+        q = np.asarray(self.embedding._vector(query))
+        scores = [float(np.dot(q, c) / np.linalg.norm(q) / np.linalg.norm(c))
+                  for c in (np.asarray(self.embedding._vector(t)) for t in self.contexts)]
+        return sorted(zip(scores, self.contexts), reverse=True)
+
+    def test_run_matches_full_sort(self):
+        res = self.matching(Message("query 7"), Message(self.contexts), return_score=True)
+        expected = self._expected("query 7")
+        self.assertEqual([r[1] for r in res.content], [e[1] for e in expected])
+        np.testing.assert_allclose([r[0] for r in res.content], [e[0] for e in expected])
+
+    def test_top_k(self):
+        expected = [e[1] for e in self._expected("query 3")]
+        for top_k in (1, 5, 49, 50, 100):
+            res = self.matching("query 3", self.contexts, top_k=top_k)
+            self.assertEqual(res.content, expected[:top_k])
+        with self.assertRaises(ValueError):
+            self.matching("query 3", self.contexts, top_k=0)
+
+    def test_ties_keep_input_order(self):
+        contexts = ["same 1", "other 2", "same 1", "same 1"]
+        res = self.matching("same 1", contexts, return_score=True)
+        self.assertEqual(res.content[0][0], res.content[1][0])
+        self.assertEqual([r[1] for r in res.content][:3], ["same 1"] * 3)
+        res = self.matching("same 1", ["b 1", "a 1", "c 1"], top_k=2)
+        self.assertEqual(res.content, ["b 1", "a 1"])
+
+    def test_ties_at_cutoff(self):
+        # 第k名并列时，top_k的结果与完整排序的前k个一致
+        contexts = ["tie{} 1".format(i) for i in range(40)] + ["best 5"]
+        full = self.matching("best 5", contexts).content
+        self.assertEqual(full[:3], ["best 5", "tie0 1", "tie1 1"])
+        for top_k in (1, 3, 20, 40):
+            self.assertEqual(self.matching("best 5", contexts, top_k=top_k).content, full[:top_k])
+        prepared = self.matching.prepare(contexts[::-1])
+        self.assertEqual(self.matching("best 5", prepared, top_k=3).content, ["best 5", "tie39 1", "tie38 1"])
+
+    def test_prepared_contexts(self):
+        prepared = self.matching.prepare(Message(self.contexts))
+        self.assertIsInstance(prepared, PreparedContexts)
+        self.assertEqual(len(self.embedding.calls), 1)
+        for i in range(5):
+            res = self.matching("query {}".format(i), prepared, top_k=3)
+            self.assertEqual(res.content, [e[1] for e in self._expected("query {}".format(i))][:3])
+        # 之后只计算query的embedding
+        self.assertEqual([len(c) for c in self.embedding.calls], [50, 1, 1, 1, 1, 1])
+
+    def test_batch(self):
+        queries = ["query {}".format(i) for i in range(6)]
+        res = self.matching.batch(Message(queries), self.contexts, return_score=True, top_k=4)
+        self.assertEqual(len(res.content), 6)
+        for query, row in zip(queries, res.content):
+            expected = self._expected(query)[:4]
+            self.assertEqual([r[1] for r in row], [e[1] for e in expected])
+            np.testing.assert_allclose([r[0] for r in row], [e[0] for e in expected])
+        # query与context各计算一次embedding
+        self.assertEqual(len(self.embedding.calls), 2)
+
+        scores = self.matching.batch_semantics(self.embedding.batch(queries), self.matching.prepare(self.contexts))
+        self.assertEqual(scores.content.shape, (6, 50))
+        single = self.matching.semantics(self.embedding("query 2"), self.embedding.batch(self.contexts))
+        np.testing.assert_allclose(scores.content[2], single.content)
+
+    def test_float32_embeddings(self):
+        matching = Matching(FakeEmbedding(return_numpy=True))
+        prepared = matching.prepare(self.contexts)
+        self.assertEqual(prepared.matrix.dtype, np.float32)
+        res = matching("query 7", prepared, top_k=10)
+        self.assertEqual(res.content, [e[1] for e in self._expected("query 7")][:10])
+
+    def test_empty(self):
+        self.assertEqual(self.matching("query 1", []).content, [])
+        self.assertEqual(self.matching.batch([], self.contexts).content, [])
+        self.assertEqual(self.matching.batch(["query 1"], []).content, [[]])
+
+
+if __name__ == '__main__':
+    unittest.main()
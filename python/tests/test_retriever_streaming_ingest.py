@@ -0,0 +1,206 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import threading
+import time
+import unittest
+
+import numpy as np
+
+from appbuilder import BaiduVDBVectorStoreIndex, BESVectorStoreIndex, Message
+from appbuilder.core.components.embeddings import EmbeddingBaseComponent
+from appbuilder.core.components.retriever._ingest import ingest, segment_id
+
+try:
+    import pymochow
+    _PYMOCHOW_AVAILABLE = True
+except ImportError:
+    _PYMOCHOW_AVAILABLE = False
+
+
+class SlowEmbedding(EmbeddingBaseComponent):
+    # 每次batch调用耗时latency秒，记录调用时间
+    name = "slow_embedding"
+    version = "v1"
+
+    def __init__(self, latency=0.0):
+        super().__init__(lazy_certification=True)
+        self.latency = latency
+        self.calls = []
+
+    def batch(self, texts):
+        _texts = texts if isinstance(texts, list) else texts.content
+        self.calls.append(len(_texts))
+        time.sleep(self.latency)
+        return Message(np.asarray([[len(text), 1.0] for text in _texts], dtype=np.float32))
+
+
+class FakeBESClient(object):
+    # 以_id为key保存文档，模拟bulk写入的覆盖语义
+    class Indices(object):
+        def __init__(self):
+            self.created = []
+
+        def exists(self, index):
+            return index in self.created
+
+        def create(self, index, body):
+            self.created.append(index)
+
+    def __init__(self):
+        self.indices = self.Indices()
+        self.docs = {}
+
+
+class FakeHelpers(object):
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.chunks = []
+
+    def bulk(self, client, actions, chunk_size=500):
+        actions = list(actions)
+        for start in range(0, len(actions), chunk_size):
+            self.chunks.append(len(actions[start:start + chunk_size]))
+        time.sleep(self.latency)
+        for action in actions:
+            client.docs[action["_id"]] = action["_source"]
+
+
+def _bes_index(embedding, helpers):
+    index = BESVectorStoreIndex.__new__(BESVectorStoreIndex)
+    index.embedding = embedding
+    index.index_name = "test_index"
+    index.index_type = "hnsw"
+    index._es = object()
+    index._helpers = helpers
+    index._index_created = False
+    index.bes_client = FakeBESClient()
+    return index
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "CPU_PARALLEL", "")
+class TestStreamingIngest(unittest.TestCase):
+    def test_ingest_windows(self):
+        written = []
+        count = ingest((str(i) for i in range(25)), lambda window: window,
+                       lambda window, vectors: written.append(window), batch_size=10)
+        self.assertEqual(count, 25)
+        self.assertEqual([len(w) for w in written], [10, 10, 5])
+        self.assertEqual(sum(written, []), [str(i) for i in range(25)])
+        with self.assertRaises(TypeError):
+            ingest("abc", lambda window: window, lambda window, vectors: None, batch_size=10)
+
+    def test_ingest_bounded(self):
+        # 写入慢于embedding时，读取输入的进度不超过已写入窗口数+max_pending+1
+        lock = threading.Lock()
+        state = {"read": 0, "written": 0, "max_ahead": 0}
+
+        def segments():
+            for i in range(100):
+                with lock:
+                    state["read"] += 1
+                    state["max_ahead"] = max(state["max_ahead"], state["read"] - state["written"])
+                yield str(i)
+
+        def write(window, vectors):
+            time.sleep(0.01)
+            with lock:
+                state["written"] += len(window)
+
+        ingest(segments(), lambda window: window, write, batch_size=5, max_pending=2)
+        self.assertEqual(state["written"], 100)
+        self.assertLessEqual(state["max_ahead"], 5 * 4)
+
+    def test_ingest_write_error(self):
+        def write(window, vectors):
+            raise RuntimeError("upsert failed")
+
+        read = []
+        with self.assertRaises(RuntimeError):
+            ingest((read.append(i) or str(i) for i in range(1000)), lambda window: window, write, batch_size=10)
+        self.assertLess(len(read), 100)
+
+    def test_segment_id(self):
+        self.assertEqual(segment_id("a", {"x": 1, "y": 2}), segment_id("a", {"y": 2, "x": 1}))
+        self.assertNotEqual(segment_id("a"), segment_id("a", "m"))
+
+    def test_bes_add_segments(self):
+        helpers = FakeHelpers()
+        index = _bes_index(SlowEmbedding(), helpers)
+        segments = ["segment {}".format(i) for i in range(250)]
+        self.assertEqual(index.add_segments(Message(iter(segments)), metadata="m", batch_size=100), 250)
+        self.assertEqual(index.embedding.calls, [100, 100, 50])
+        self.assertEqual(helpers.chunks, [100, 100, 50])
+        self.assertEqual(index.bes_client.indices.created, ["test_index"])
+        self.assertEqual(len(index.bes_client.docs), 250)
+        # 重复写入不产生重复文档，也不重新创建索引
+        index.add_segments(Message(segments[:120]), metadata="m", batch_size=100)
+        self.assertEqual(len(index.bes_client.docs), 250)
+        self.assertEqual(index.bes_client.indices.created, ["test_index"])
+        doc = index.bes_client.docs[segment_id("segment 3", "m")]
+        self.assertEqual((doc["text"], doc["vector"], doc["id"]), ("segment 3", [9.0, 1.0], segment_id("segment 3", "m")))
+        with self.assertRaises(ValueError):
+            index.add_segments(Message([]))
+
+    def test_bes_overlap(self):
+        # 写入第i个窗口时，第i+1个窗口的embedding应已开始，否则等待超时
+        embedding = SlowEmbedding()
+        helpers = FakeHelpers()
+        index = _bes_index(embedding, helpers)
+        overlapped = []
+        bulk = helpers.bulk
+
+        def blocking_bulk(client, actions, chunk_size=500):
+            window = len(helpers.chunks)
+            deadline = time.monotonic() + 5
+            while len(embedding.calls) < min(window + 2, 8) and time.monotonic() < deadline:
+                time.sleep(0.001)
+            overlapped.append(len(embedding.calls) >= min(window + 2, 8))
+            bulk(client, actions, chunk_size)
+
+        helpers.bulk = blocking_bulk
+        index.add_segments(Message(["segment {}".format(i) for i in range(400)]), batch_size=50)
+        self.assertEqual(overlapped, [True] * 8)
+        self.assertEqual(len(index.bes_client.docs), 400)
+
+
+class FakeTable(object):
+    # 以主键为key保存行，模拟upsert的覆盖语义
+    def __init__(self):
+        self.rows = {}
+        self.upserts = []
+
+    def upsert(self, rows):
+        self.upserts.append(len(rows))
+        for row in rows:
+            data = row.to_dict()
+            self.rows[data["id"]] = data
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "CPU_PARALLEL", "")
+@unittest.skipUnless(_PYMOCHOW_AVAILABLE, "pymochow is not available")
+class TestVDBStreamingIngest(unittest.TestCase):
+    def test_vdb_add_segments(self):
+        index = BaiduVDBVectorStoreIndex.__new__(BaiduVDBVectorStoreIndex)
+        index.embedding = SlowEmbedding()
+        index.table = FakeTable()
+        segments = ["segment {}".format(i) for i in range(2500)]
+        self.assertEqual(index.add_segments(Message(iter(segments))), 2500)
+        self.assertEqual(index.table.upserts, [1000, 1000, 500])
+        index.add_segments(Message(segments[:10]))
+        self.assertEqual(len(index.table.rows), 2500)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import json
+import os
+import time
+import unittest
+
+from appbuilder.utils.sse_util import SSEClient, AsyncSSEClient, Event
+
+CHUNK_SIZE = 16 * 1024
+
+
+def _record_stream():
+    """构造一段多MB的SSE流: 大量短的增量事件 + 若干超长的多行data事件"""
+    events = []
+    for i in range(20000):
+        body = json.dumps({"answer": "token{}".format(i), "is_completion": False})
+        events.append("id: {}\nevent: message\ndata: {}\n\n".format(i, body))
+    long_lines = "\n".join("data: " + "参考文档" * 64 for _ in range(2000))
+    for i in range(3):
+        events.append("event: references\n{}\n\n".format(long_lines))
+    stream = "".join(events).encode("utf-8")
+    return [stream[i:i + CHUNK_SIZE] for i in range(0, len(stream), CHUNK_SIZE)]
+
+
+class _AsyncContent:
+    def __init__(self, chunks):
+        self._chunks = chunks
+
+    async def iter_any(self):
+        for chunk in self._chunks:
+            yield chunk
+
+
+class _AsyncResponse:
+    def __init__(self, chunks):
+        self.content = _AsyncContent(chunks)
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "CPU_PARALLEL", "")
+class TestSSEUtilBenchmark(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.chunks = _record_stream()
+        cls.stream_size = sum(len(chunk) for chunk in cls.chunks)
+
+    def _check_events(self, events):
+        self.assertEqual(len(events), 20003)
+        self.assertEqual(events[0].id, "0")
+        self.assertEqual(json.loads(events[19999].data)["answer"], "token19999")
+        references = events[-1]
+        self.assertEqual(references.event, "references")
+        self.assertEqual(len(references.data.split("\n")), 2000)
+        self.assertFalse(references.data.endswith("\n"))
+
+    def _report(self, name, cost):
+        print("{}: {:.1f} MB in {:.3f}s, {:.1f} MB/s".format(
+            name, self.stream_size / 1024 / 1024, cost, self.stream_size / 1024 / 1024 / cost))
+
+    def test_sync_replay(self):
+        start = time.perf_counter()
+        events = list(SSEClient(iter(self.chunks)).events())
+        self._report("SSEClient", time.perf_counter() - start)
+        self._check_events(events)
+
+    def test_async_replay(self):
+        async def replay():
+            return [event async for event in AsyncSSEClient(_AsyncResponse(self.chunks)).events()]
+
+        start = time.perf_counter()
+        events = asyncio.run(replay())
+        self._report("AsyncSSEClient", time.perf_counter() - start)
+        self._check_events(events)
+
+    def test_event_slots(self):
+        event = Event(id="1", data="data")
+        self.assertFalse(hasattr(event, "__dict__"))
+        with self.assertRaises(AttributeError):
+            event.unknown = 1
+
+
+if __name__ == '__main__':
+    unittest.main()
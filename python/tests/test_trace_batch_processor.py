@@ -0,0 +1,111 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import threading
+import time
+import unittest
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+from appbuilder.utils.trace._processor import BoundedBatchSpanProcessor
+from appbuilder.utils.trace.tracer import create_tracer_provider
+
+
+class _SlowExporter(SpanExporter):
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.spans = []
+        self.batches = 0
+        self.release = threading.Event()
+        self.release.set()
+        self.is_shutdown = False
+
+    def export(self, spans):
+        self.release.wait(5)
+        time.sleep(self.delay)
+        self.spans.extend(spans)
+        self.batches += 1
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        self.is_shutdown = True
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "CPU_PARALLEL", "")
+class TestTraceBatchProcessor(unittest.TestCase):
+    def _provider(self, exporter, **kwargs):
+        processor = BoundedBatchSpanProcessor(exporter, **kwargs)
+        provider = TracerProvider(shutdown_on_exit=False)
+        provider.add_span_processor(processor)
+        return provider, processor, provider.get_tracer(__name__)
+
+    def test_span_end_does_not_wait_for_export(self):
+        exporter = _SlowExporter()
+        exporter.release.clear()
+        provider, processor, tracer = self._provider(exporter, max_export_batch_size=10, schedule_delay=0.01)
+        for i in range(50):
+            with tracer.start_as_current_span("span-{}".format(i)):
+                pass
+        # 导出被阻塞时span仍能结束，同步导出时这里已有导出的span
+        self.assertEqual(exporter.spans, [])
+        exporter.release.set()
+        provider.shutdown()
+        self.assertEqual(len(exporter.spans), 50)
+        self.assertLessEqual(exporter.batches, 10)
+        self.assertTrue(exporter.is_shutdown)
+
+    def test_drop_on_overflow(self):
+        exporter = _SlowExporter()
+        exporter.release.clear()
+        provider, processor, tracer = self._provider(
+            exporter, max_queue_size=8, max_export_batch_size=4, schedule_delay=60)
+        for i in range(30):
+            with tracer.start_as_current_span("span-{}".format(i)):
+                pass
+        stats = processor.stats()
+        self.assertLessEqual(stats["queue_depth"], 8)
+        self.assertEqual(stats["queue_depth_max"], 8)
+        self.assertGreater(stats["dropped_spans"], 0)
+        exporter.release.set()
+        self.assertTrue(processor.force_flush())
+        stats = processor.stats()
+        self.assertEqual(stats["queue_depth"], 0)
+        self.assertEqual(stats["exported_spans"] + stats["dropped_spans"], 30)
+        provider.shutdown()
+
+    def test_force_flush_before_schedule(self):
+        exporter = _SlowExporter()
+        provider, processor, tracer = self._provider(exporter, schedule_delay=60)
+        with tracer.start_as_current_span("span"):
+            pass
+        self.assertEqual(exporter.spans, [])
+        self.assertTrue(provider.force_flush())
+        self.assertEqual(len(exporter.spans), 1)
+        provider.shutdown()
+
+    def test_create_tracer_provider(self):
+        provider = create_tracer_provider(enable_phoenix=False, enable_console=True, max_queue_size=16,
+                                          max_export_batch_size=8)
+        processors = provider._active_span_processor._span_processors
+        self.assertIsInstance(processors[0], BoundedBatchSpanProcessor)
+        self.assertEqual(processors[0].max_queue_size, 16)
+        provider = create_tracer_provider(enable_phoenix=False, enable_console=True, batch_export=False)
+        self.assertNotIsInstance(provider._active_span_processor._span_processors[0], BoundedBatchSpanProcessor)
+        with self.assertRaises(ValueError):
+            BoundedBatchSpanProcessor(_SlowExporter(), max_queue_size=4, max_export_batch_size=8)
+
+
+if __name__ == '__main__':
+    unittest.main()
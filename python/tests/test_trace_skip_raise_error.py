@@ -14,6 +14,8 @@
 import os
 import unittest
 
+from appbuilder.utils.trace import tracer_wrapper
+from appbuilder.utils.trace.tracer import AppBuilderTracer
 from appbuilder.utils.trace.tracer_wrapper import (
 session_post, 
 client_run_trace, 
@@ -112,171 +114,209 @@ def mock_list_trace_02():
     raise TestException()
 
 class TestTraceSkipRaiseError(unittest.TestCase):
+    # trace开关在导入时读取并缓存，运行时通过AppBuilderTracer修改，结束后恢复
     def setUp(self):
-        os.environ["APPBUILDER_TRACE_DEBUG"] = "True"
-        os.environ["APPBUILDER_SDK_TRACE_ENABLE"] = "true"
+        self._state = (tracer_wrapper._trace_state.enabled, tracer_wrapper._trace_state.debug)
+        AppBuilderTracer.set_trace_enabled(True)
+        AppBuilderTracer.set_trace_debug(True)
 
     def tearDown(self):
-        del os.environ["APPBUILDER_TRACE_DEBUG"]
-        del os.environ["APPBUILDER_SDK_TRACE_ENABLE"]
+        AppBuilderTracer.set_trace_enabled(self._state[0])
+        AppBuilderTracer.set_trace_debug(self._state[1])
+
+    def test_trace_debug_switch(self):
+        # debug模式下抛出原始异常，否则抛出过滤trace堆栈后重新构造的异常
+        with self.assertRaises(Exception) as ctx:
+            mock_post_01()
+        self.assertEqual(str(ctx.exception), "mock exception")
+        AppBuilderTracer.set_trace_debug(False)
+        with self.assertRaises(Exception) as ctx:
+            mock_post_01()
+        self.assertIn("mock exception", str(ctx.exception))
+        self.assertNotIn("appbuilder/utils/trace", str(ctx.exception))
+        self.assertEqual(str(ctx.exception.__context__), "mock exception")
+        # 关闭trace后直接调用原函数
+        AppBuilderTracer.set_trace_enabled(False)
+        with self.assertRaises(Exception) as ctx:
+            mock_post_01()
+        self.assertEqual(str(ctx.exception), "mock exception")
+
+    def test_reload_trace_config(self):
+        keys = ("APPBUILDER_SDK_TRACE_ENABLE", "APPBUILDER_TRACE_DEBUG")
+        saved = {key: os.environ.get(key) for key in keys}
+        try:
+            os.environ["APPBUILDER_SDK_TRACE_ENABLE"] = "true"
+            AppBuilderTracer.set_trace_debug(False)
+            AppBuilderTracer.reload_trace_config()
+            self.assertTrue(tracer_wrapper._trace_state.enabled)
+            self.assertFalse(tracer_wrapper._trace_state.debug)
+            with self.assertRaises(Exception) as ctx:
+                mock_post_01()
+            self.assertNotEqual(str(ctx.exception), "mock exception")
+        finally:
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
 
     def test_session_post(self):
         # test_session_post APPBUILDER_TRACE_DEBUG = true
-        os.environ["APPBUILDER_TRACE_DEBUG"] = "true"
+        AppBuilderTracer.set_trace_debug(True)
         with self.assertRaises(Exception):
             mock_post_01()
         # test_session_post APPBUILDER_TRACE_DEBUG = false
-        os.environ["APPBUILDER_TRACE_DEBUG"] = "false"
+        AppBuilderTracer.set_trace_debug(False)
         with self.assertRaises(Exception):
             mock_post_01()
         with self.assertRaises(TestException):
             mock_post_02()
 
-        os.environ["APPBUILDER_SDK_TRACE_ENABLE"] = "false"
+        AppBuilderTracer.set_trace_enabled(False)
         with self.assertRaises(Exception):
             mock_post_02()
 
     def test_client_run_trace(self):
         # test_client_run_trace APPBUILDER_TRACE_DEBUG = true
-        os.environ["APPBUILDER_TRACE_DEBUG"] = "true"
+        AppBuilderTracer.set_trace_debug(True)
         with self.assertRaises(Exception):
             mock_client_run_trace_01()
         # test_client_run_trace APPBUILDER_TRACE_DEBUG = false
-        os.environ["APPBUILDER_TRACE_DEBUG"] = "false"
+        AppBuilderTracer.set_trace_debug(False)
         with self.assertRaises(Exception):
             mock_client_run_trace_01()
         with self.assertRaises(TestException):
             mock_client_run_trace_02()
 
-        os.environ["APPBUILDER_SDK_TRACE_ENABLE"] = "false"
+        AppBuilderTracer.set_trace_enabled(False)
         with self.assertRaises(Exception):
             mock_client_run_trace_02()
 
     def test_client_tool_trace(self):
         # test_client_tool_trace APPBUILDER_TRACE_DEBUG = true
-        os.environ["APPBUILDER_TRACE_DEBUG"] = "true"
+        AppBuilderTracer.set_trace_debug(True)
         with self.assertRaises(Exception):
             mock_client_tool_trace_01()
         # test_client
-        os.environ["APPBUILDER_TRACE_DEBUG"] = "false"
+        AppBuilderTracer.set_trace_debug(False)
         with self.assertRaises(Exception):
             mock_client_tool_trace_01()
         with self.assertRaises(TestException):
             mock_client_tool_trace_02()
 
-        os.environ["APPBUILDER_SDK_TRACE_ENABLE"] = "false"
+        AppBuilderTracer.set_trace_enabled(False)
         with self.assertRaises(Exception):
             mock_client_tool_trace_02()
 
     def test_assistent_tool_trace(self):
         # test_assistent_tool_trace APPBUILDER_TRACE_DEBUG = true
-        os.environ["APPBUILDER_TRACE_DEBUG"] = "true"
+        AppBuilderTracer.set_trace_debug(True)
         with self.assertRaises(Exception):
             mock_assistent_tool_trace_01()
         # test_assistent_tool_trace APPBUILDER_TRACE_DEBUG = false
-        os.environ["APPBUILDER_TRACE_DEBUG"] = "false"
+        AppBuilderTracer.set_trace_debug(False)
         with self.assertRaises(Exception):
             mock_assistent_tool_trace_01()
         with self.assertRaises(TestException):
             mock_assistent_tool_trace_02()
 
-        os.environ["APPBUILDER_SDK_TRACE_ENABLE"] = "false"
+        AppBuilderTracer.set_trace_enabled(False)
         with self.assertRaises(Exception):
             mock_assistent_tool_trace_02()
 
     def test_assistant_run_trace(self):
         # test_assistant_run_trace APPBUILDER_TRACE_DEBUG = true
-        os.environ["APPBUILDER_TRACE_DEBUG"] = "true"
+        AppBuilderTracer.set_trace_debug(True)
         with self.assertRaises(Exception):
             mock_assistant_run_trace_01()
         # test_assistant_run_trace APPBUILDER_TRACE_DEBUG = false
-        os.environ["APPBUILDER_TRACE_DEBUG"] = "false"
+        AppBuilderTracer.set_trace_debug(False)
         with self.assertRaises(Exception):
             mock_assistant_run_trace_01()
         with self.assertRaises(TestException):
             mock_assistant_run_trace_02()
         
-        os.environ["APPBUILDER_SDK_TRACE_ENABLE"] = "false"
+        AppBuilderTracer.set_trace_enabled(False)
         with self.assertRaises(Exception):
             mock_assistant_run_trace_02()
 
     def test_assistent_stream_run_trace(self):
         # test_assistent_stream_run_trace APPBUILDER_TRACE_DEBUG = true
-        os.environ["APPBUILDER_TRACE_DEBUG"] = "true"
+        AppBuilderTracer.set_trace_debug(True)
         with self.assertRaises(Exception):
             mock_assistent_stream_run_trace_01()
         # test_assistent_stream_run_trace APPBUILDER_TRACE_DEBUG = false
-        os.environ["APPBUILDER_TRACE_DEBUG"] = "false"
+        AppBuilderTracer.set_trace_debug(False)
         with self.assertRaises(Exception):
             mock_assistent_stream_run_trace_01()
         with self.assertRaises(TestException):
             mock_assistent_stream_run_trace_02()
         
-        os.environ["APPBUILDER_SDK_TRACE_ENABLE"] = "false"
+        AppBuilderTracer.set_trace_enabled(False)
         with self.assertRaises(Exception):
             mock_assistent_stream_run_trace_02()
 
     def test_assistent_stream_run_with_handler_trace(self):
         # test_assistent_stream_run_with_handler_trace APPBUILDER_TRACE_DEBUG = true
-        os.environ["APPBUILDER_TRACE_DEBUG"] = "true"
+        AppBuilderTracer.set_trace_debug(True)
         with self.assertRaises(Exception):
             mock_assistent_stream_run_with_handler_trace_01()
         # test_assistent_stream_run_with_handler_trace APPBUILDER_TRACE_DEBUG = false
-        os.environ["APPBUILDER_TRACE_DEBUG"] = "false"
+        AppBuilderTracer.set_trace_debug(False)
         with self.assertRaises(Exception):
             mock_assistent_stream_run_with_handler_trace_01()
         with self.assertRaises(TestException):
             mock_assistent_stream_run_with_handler_trace_02()
 
-        os.environ["APPBUILDER_SDK_TRACE_ENABLE"] = "false"
+        AppBuilderTracer.set_trace_enabled(False)
         with self.assertRaises(Exception):
             mock_assistent_stream_run_with_handler_trace_02()
 
     def test_components_run_trace(self):
         # test_components_run_trace APPBUILDER_TRACE_DEBUG = true
-        os.environ["APPBUILDER_TRACE_DEBUG"] = "true"
+        AppBuilderTracer.set_trace_debug(True)
         with self.assertRaises(Exception):
             mock_components_run_trace_01()
         # test_components_run_trace APPBUILDER_TRACE_DEBUG = false
-        os.environ["APPBUILDER_TRACE_DEBUG"] = "false"
+        AppBuilderTracer.set_trace_debug(False)
         with self.assertRaises(Exception):
             mock_components_run_trace_01()
         with self.assertRaises(TestException):
             mock_components_run_trace_02()
 
-        os.environ["APPBUILDER_SDK_TRACE_ENABLE"] = "false"
+        AppBuilderTracer.set_trace_enabled(False)
         with self.assertRaises(Exception):
             mock_components_run_trace_02()
     
     def test_components_run_stream_trace(self):
         # test_components_run_stream_trace APPBUILDER_TRACE_DEBUG = true
-        os.environ["APPBUILDER_TRACE_DEBUG"] = "true"
+        AppBuilderTracer.set_trace_debug(True)
         with self.assertRaises(Exception):
             mock_components_run_stream_trace_01()
         # test_components_run_stream_trace APPBUILDER_TRACE_DEBUG = false
-        os.environ["APPBUILDER_TRACE_DEBUG"] = "false"
+        AppBuilderTracer.set_trace_debug(False)
         with self.assertRaises(Exception):
             mock_components_run_stream_trace_01()
         with self.assertRaises(TestException):
             mock_components_run_stream_trace_02()
 
-        os.environ["APPBUILDER_SDK_TRACE_ENABLE"] = "false"
+        AppBuilderTracer.set_trace_enabled(False)
         with self.assertRaises(Exception):
             mock_components_run_stream_trace_02()
 
     def test_list_trace(self):
         # test_list_trace APPBUILDER_TRACE_DEBUG = true
-        os.environ["APPBUILDER_TRACE_DEBUG"] = "true"
+        AppBuilderTracer.set_trace_debug(True)
         with self.assertRaises(Exception):
             mock_list_trace_01()
         # test_list_trace APPBUILDER_TRACE_DEBUG = false
-        os.environ["APPBUILDER_TRACE_DEBUG"] = "false"
+        AppBuilderTracer.set_trace_debug(False)
         with self.assertRaises(Exception):
             mock_list_trace_01()
         with self.assertRaises(TestException):
             mock_list_trace_02()
 
-        os.environ["APPBUILDER_SDK_TRACE_ENABLE"] = "false"
+        AppBuilderTracer.set_trace_enabled(False)
         with self.assertRaises(Exception):
             mock_list_trace_02()
 
@@ -0,0 +1,90 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from appbuilder.core.console.appbuilder_client.data_class import AppBuilderClientAnswer, Event, Usage
+from appbuilder.utils.trace._function import _StreamSpanRecorder, _client_trace_generator
+
+
+def _answers(n):
+    for i in range(n):
+        event = Event(status="running", event_type="ChatAgent")
+        if i == 0:
+            event.detail = {"references": [{"title": "t", "content": "c"}]}
+        if i == n - 1:
+            event.usage = Usage(prompt_tokens=3, completion_tokens=n, total_tokens=n + 3)
+        yield AppBuilderClientAnswer(answer="a", events=[event])
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "CPU_PARALLEL", "")
+class TestTraceStreamRecorder(unittest.TestCase):
+    def setUp(self):
+        self.exporter = InMemorySpanExporter()
+        provider = TracerProvider(shutdown_on_exit=False)
+        provider.add_span_processor(SimpleSpanProcessor(self.exporter))
+        self.tracer = provider.get_tracer(__name__)
+
+    def _run(self, n):
+        messages = list(_client_trace_generator(_answers(n), self.tracer, None))
+        self.assertEqual(len(messages), n)
+        return {span.name: span for span in self.exporter.get_finished_spans()}
+
+    def test_stream_aggregated_into_one_span(self):
+        with patch.dict(os.environ, {"APPBUILDER_TRACE_STREAM_SAMPLE_RATE": "0"}):
+            spans = self._run(2000)
+        # 2000个chunk只产生父span与一个聚合span
+        self.assertEqual(len(self.exporter.get_finished_spans()), 2)
+        stream_span = spans["Client-Stream"]
+        attributes = stream_span.attributes
+        self.assertEqual(attributes["stream.chunk_count"], 2000)
+        self.assertEqual(sum(attributes["stream.inter_chunk_latency.bucket_counts"]), 1999)
+        self.assertEqual(attributes["llm.token_count.total"], 2003)
+        self.assertIn("title: t", attributes["input.value"])
+        self.assertEqual(attributes["output.value"], "a" * 2000)
+        self.assertEqual([event.name for event in stream_span.events], ["first_chunk"])
+
+        parent = spans["AppBuilderClient-Stream-RUN"]
+        self.assertEqual(parent.attributes["output.value"], "a" * 2000)
+        self.assertEqual(parent.attributes["llm.token_count.completion"], 2000)
+
+    def test_payload_sampling(self):
+        with patch.dict(os.environ, {"APPBUILDER_TRACE_STREAM_SAMPLE_RATE": "1"}):
+            spans = self._run(10)
+        chunk_events = [event for event in spans["Client-Stream"].events if event.name == "chunk"]
+        self.assertEqual(len(chunk_events), 10)
+        self.assertNotIn("\n", chunk_events[0].attributes["output.value"])
+
+    def test_latency_histogram(self):
+        span = self.tracer.start_span("test")
+        recorder = _StreamSpanRecorder(span, sample_rate=0)
+        for delay in [0, 0.03, 0.001]:
+            time.sleep(delay)
+            recorder.record()
+        recorder.finish()
+        span.end()
+        self.assertEqual(recorder.chunk_count, 3)
+        self.assertGreaterEqual(recorder.max_interval, 0.03)
+        self.assertEqual(sum(recorder.histogram), 2)
+        self.assertEqual(recorder.histogram[0], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import sys
+import timeit
+import unittest
+from functools import wraps
+from unittest.mock import patch
+
+from appbuilder.utils.trace.tracer import AppBuilderTracer
+from appbuilder.utils.trace import tracer_wrapper
+from appbuilder.utils.trace.tracer_wrapper import session_post, components_run_trace
+
+
+def _legacy_session_post(func):
+    # 改造前的实现：每次调用都读取环境变量
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if tracer_wrapper._env_enable_trace():
+            return tracer_wrapper.session_post_func(func, *args, **kwargs)
+        else:
+            try:
+                return func(*args, **kwargs)
+            except:
+                tp, exc, tb = sys.exc_info()
+                del tp, exc, tb
+                raise
+    return wrapper
+
+
+def _noop(x):
+    return x
+
+
+class _ValueError(Exception):
+    def __init__(self):
+        pass
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "CPU_PARALLEL", "")
+class TestTraceWrapperBenchmark(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(AppBuilderTracer.reload_trace_config)
+
+    def test_no_env_lookup_per_call(self):
+        # 被装饰的函数调用时只读取缓存的开关，不读取环境变量
+        wrapped = session_post(_noop)
+        with patch("os.getenv") as mock_getenv, patch.object(os.environ, "get") as mock_get:
+            for enabled in (False, True):
+                AppBuilderTracer.set_trace_enabled(enabled)
+                for i in range(100):
+                    self.assertEqual(wrapped(i), i)
+        mock_getenv.assert_not_called()
+        mock_get.assert_not_called()
+
+    def test_toggle_at_runtime(self):
+        calls = []
+
+        def fake_trace_func(func, *args, **kwargs):
+            calls.append(func.__name__)
+            return func(*args, **kwargs)
+
+        wrapped = components_run_trace(_noop)
+        with patch.object(tracer_wrapper, "components_run_trace_func", fake_trace_func):
+            AppBuilderTracer.set_trace_enabled(True)
+            self.assertTrue(AppBuilderTracer.is_trace_enabled())
+            self.assertEqual(wrapped(1), 1)
+            AppBuilderTracer.set_trace_enabled(False)
+            self.assertEqual(wrapped(2), 2)
+        self.assertEqual(calls, ["_noop"])
+
+    def test_env_read_once(self):
+        with patch.dict(os.environ, {"APPBUILDER_SDK_TRACE_ENABLE": "true"}):
+            self.assertFalse(AppBuilderTracer.is_trace_enabled())
+            AppBuilderTracer.reload_trace_config()
+            self.assertTrue(AppBuilderTracer.is_trace_enabled())
+        AppBuilderTracer.reload_trace_config()
+        self.assertFalse(AppBuilderTracer.is_trace_enabled())
+
+    def test_error_traceback_filtered(self):
+        def raise_error():
+            raise ValueError("boom")
+
+        def raise_custom_error():
+            raise _ValueError()
+
+        AppBuilderTracer.set_trace_enabled(True)
+        AppBuilderTracer.set_trace_debug(False)
+        with self.assertRaises(ValueError) as ctx:
+            session_post(raise_error)()
+        self.assertIn("boom", str(ctx.exception))
+        self.assertNotIn("appbuilder/utils/trace", str(ctx.exception))
+        # 无法以自定义信息构造的异常直接抛出原始异常
+        with self.assertRaises(_ValueError):
+            session_post(raise_custom_error)()
+        AppBuilderTracer.set_trace_debug(True)
+        with self.assertRaises(ValueError) as ctx:
+            session_post(raise_error)()
+        self.assertEqual(str(ctx.exception), "boom")
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "BENCHMARK", "")
+class TestTraceWrapperOverheadBenchmark(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(AppBuilderTracer.reload_trace_config)
+
+    def test_disabled_wrapper_overhead(self):
+        AppBuilderTracer.set_trace_enabled(False)
+        wrapped = session_post(_noop)
+        legacy = _legacy_session_post(_noop)
+        number = 200000
+
+        raw_time = min(timeit.repeat(lambda: _noop(1), number=number, repeat=3))
+        wrapped_time = min(timeit.repeat(lambda: wrapped(1), number=number, repeat=3))
+        legacy_time = min(timeit.repeat(lambda: legacy(1), number=number, repeat=3))
+        print("\nraw: {:.1f}ns/call, cached switch: {:.1f}ns/call, env lookup: {:.1f}ns/call".format(
+            raw_time / number * 1e9, wrapped_time / number * 1e9, legacy_time / number * 1e9))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import glob
+import logging
+import os
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime
+
+from appbuilder import SizeAndTimeRotatingFileHandler
+
+
+RECORD_COUNT = 20000
+
+
+class LegacyRotatingFileHandler(logging.Handler):
+    # 改造前的实现：每条日志stat一次文件，并在写入后立即flush
+    def __init__(self, file_name, max_file_size):
+        super().__init__()
+        self.file_name = file_name
+        self.max_file_size = max_file_size
+        self.stream = open(file_name, 'a')
+        self.last_rollover = time.time()
+
+    def emit(self, record):
+        current_time = time.time()
+        time_rollover = datetime.fromtimestamp(current_time).date() != datetime.fromtimestamp(self.last_rollover).date()
+        size_rollover = os.path.getsize(self.file_name) >= self.max_file_size
+        assert not (time_rollover or size_rollover)
+        self.stream.write(self.format(record) + '\n')
+        self.stream.flush()
+
+    def close(self):
+        self.stream.close()
+        super().close()
+
+
+def _read_lines(file_name):
+    lines = []
+    for f in glob.glob(file_name + "*"):
+        with open(f, encoding='utf-8') as fp:
+            lines.extend(fp.read().splitlines())
+    return lines
+
+
+@unittest.skipUnless(os.getenv("TEST_CASE", "UNKNOWN") == "CPU_PARALLEL", "")
+class TestLoggerFileHandlerBenchmark(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.file_name = os.path.join(self.tmp_dir.name, "test.log")
+
+    def _logger(self, handler):
+        logger = logging.getLogger("test_logger_file_handler_{}".format(id(handler)))
+        logger.propagate = False
+        logger.setLevel(logging.DEBUG)
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+        return logger
+
+    def test_throughput(self):
+        results = {}
+        for name, create in [
+            ("legacy", lambda f: LegacyRotatingFileHandler(f, max_file_size=1 << 30)),
+            ("sync", lambda f: SizeAndTimeRotatingFileHandler(f, max_file_size=1 << 30)),
+            ("non_blocking", lambda f: SizeAndTimeRotatingFileHandler(
+                f, max_file_size=1 << 30, non_blocking=True, queue_size=RECORD_COUNT)),
+        ]:
+            file_name = "{}.{}".format(self.file_name, name)
+            handler = create(file_name)
+            logger = self._logger(handler)
+            start = time.perf_counter()
+            for i in range(RECORD_COUNT):
+                logger.debug("request %d finished", i)
+            elapsed = time.perf_counter() - start
+            handler.close()
+            results[name] = elapsed
+            self.assertEqual(len(_read_lines(file_name)), RECORD_COUNT)
+        print("\n" + ", ".join("{}: {:.0f} records/s".format(name, RECORD_COUNT / elapsed)
+                               for name, elapsed in results.items()))
+
+    def test_rotation_by_size(self):
+        handler = SizeAndTimeRotatingFileHandler(
+            self.file_name, rotate_frequency='D', max_file_size=1024, max_log_files=3, total_log_size=1 << 30,
+            non_blocking=True)
+        logger = self._logger(handler)
+        for i in range(200):
+            logger.info("message %d %s", i, "x" * 100)
+        handler.close()
+        rotated = glob.glob(self.file_name + ".*")
+        self.assertEqual(len(rotated), 3)
+        for f in rotated:
+            self.assertLessEqual(os.path.getsize(f), 1024 + 200)
+        # 保留的日志按顺序且不重复
+        numbers = [int(line.split("message ")[1].split(" ")[0]) for line in _read_lines(self.file_name)]
+        self.assertEqual(sorted(numbers), list(range(numbers and min(numbers) or 0, 200)))
+
+    def test_rotation_by_total_size(self):
+        handler = SizeAndTimeRotatingFileHandler(
+            self.file_name, rotate_frequency='D', max_file_size=1024, max_log_files=10000, total_log_size=4096)
+        logger = self._logger(handler)
+        for i in range(200):
+            logger.info("message %d %s", i, "x" * 100)
+        handler.close()
+        rotated = glob.glob(self.file_name + ".*")
+        self.assertLessEqual(sum(os.path.getsize(f) for f in rotated), 4096)
+        self.assertGreater(len(rotated), 0)
+
+    def test_flush(self):
+        handler = SizeAndTimeRotatingFileHandler(self.file_name, non_blocking=True, flush_interval=60)
+        self.addCleanup(handler.close)
+        logger = self._logger(handler)
+        for i in range(10):
+            logger.info("message %d", i)
+        handler.flush()
+        self.assertEqual(len(_read_lines(self.file_name)), 10)
+
+    def test_concurrent_emit(self):
+        handler = SizeAndTimeRotatingFileHandler(
+            self.file_name, rotate_frequency='D', max_file_size=4096, max_log_files=10000,
+            total_log_size=1 << 30, non_blocking=True, queue_size=100000)
+        logger = self._logger(handler)
+
+        def worker(i):
+            for j in range(500):
+                logger.info("worker %d message %d", i, j)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        handler.close()
+        self.assertEqual(len(_read_lines(self.file_name)), 8 * 500)
+
+    def test_drop_when_queue_full(self):
+        handler = SizeAndTimeRotatingFileHandler(self.file_name, non_blocking=True, queue_size=1)
+        logger = self._logger(handler)
+        # 阻塞后台线程，使队列写满
+        handler._io_lock.acquire()
+        try:
+            for i in range(100):
+                logger.info("message %d", i)
+        finally:
+            handler._io_lock.release()
+        self.assertGreater(handler.dropped_records, 0)
+        logger.info("after drop")
+        handler.close()
+        lines = _read_lines(self.file_name)
+        self.assertIn("{} log records dropped because the log queue is full".format(handler.dropped_records), lines)
+        self.assertEqual(len(lines), 100 + 1 - handler.dropped_records + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -12,19 +12,60 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import os
+import sys
 import time
 import glob
+import queue
 import logging
+import threading
+import collections
 from datetime import datetime, timedelta
 
+_ROTATE_SECONDS = {'S': 1, 'M': 60, 'H': 3600, 'D': 86400}
+
+
+class _FlushRequest(object):
+    def __init__(self):
+        self.done = threading.Event()
+
+
+_STOP = object()
+
+
 class SizeAndTimeRotatingFileHandler(logging.Handler):
-    def __init__(self, 
-                 file_name, 
-                 rotate_frequency='MIDNIGHT', 
-                 rotate_interval=1, 
-                 max_file_size=0, 
-                 max_log_files=0, 
-                 total_log_size=0
+    r"""按文件大小和时间滚动的日志文件Handler。
+
+    当前文件大小与下一次按时间滚动的时刻都记录在内存中，判断是否滚动时不需要stat文件；
+    历史日志文件列表只在第一次滚动时扫描一次目录，之后在内存中维护。
+
+    non_blocking为True时，emit只格式化日志并放入有界队列，由后台线程写入文件、滚动和清理历史文件，
+    累计buffer_size字节或距上次刷盘超过flush_interval秒时刷盘。队列已满时丢弃日志并计数，
+    不会阻塞调用方，丢弃的条数会在后台线程恢复写入时记录到日志文件中。
+
+    Args:
+        file_name (str): 日志文件路径。
+        rotate_frequency (str): 按时间滚动的单位，可选S、M、H、D、MIDNIGHT。默认为MIDNIGHT。
+        rotate_interval (int): 按时间滚动的间隔。默认为1。
+        max_file_size (int): 单个文件的最大字节数，为0时不按大小滚动。默认为0。
+        max_log_files (int): 保留的历史日志文件数。默认为0。
+        total_log_size (int): 历史日志文件的最大总字节数。默认为0。
+        non_blocking (bool): 是否在后台线程中写入日志。默认为False。
+        queue_size (int): non_blocking模式下的队列长度。默认为10000。
+        buffer_size (int): non_blocking模式下累计多少字节后刷盘。默认为64KB。
+        flush_interval (float): non_blocking模式下两次刷盘的最大间隔(秒)。默认为1。
+    """
+
+    def __init__(self,
+                 file_name,
+                 rotate_frequency='MIDNIGHT',
+                 rotate_interval=1,
+                 max_file_size=0,
+                 max_log_files=0,
+                 total_log_size=0,
+                 non_blocking=False,
+                 queue_size=10000,
+                 buffer_size=64 * 1024,
+                 flush_interval=1.0,
                  ):
         super().__init__()
         self.file_name = file_name
@@ -33,66 +74,193 @@ class SizeAndTimeRotatingFileHandler(logging.Handler):
         self.max_file_size = max_file_size
         self.max_log_files = max_log_files
         self.total_log_size = total_log_size
+        self.non_blocking = non_blocking
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
         self.current_time = datetime.now()
         self.current_file = self.file_name
-        self.stream = open(self.current_file, 'a')
+        self.dropped_records = 0
+        self._reported_drops = 0
+        # 历史日志文件 (路径, 大小)，第一次滚动时初始化
+        self._log_files = None
+        # 保护文件写入与滚动。non_blocking模式下后台线程只持有该锁，不与调用方竞争Handler的锁
+        self._io_lock = threading.RLock()
+        self._open()
+
+        self.queue_size = queue_size
+        self._queue = None
+        self._writer = None
+        if self.non_blocking:
+            # SimpleQueue的put不需要条件变量通知，开销远小于queue.Queue；队列长度在emit中检查
+            self._queue = queue.SimpleQueue()
+            self._writer = threading.Thread(
+                target=self._writer_loop, name="appbuilder-log-writer", daemon=True)
+            self._writer.start()
+
+    def _open(self):
+        self.stream = open(self.current_file, 'ab')
+        self.current_size = self.stream.tell()
         self.last_rollover = time.time()
+        self.rollover_at = self._compute_rollover_at(self.last_rollover)
+
+    def _compute_rollover_at(self, current_time):
+        if self.rotate_frequency in _ROTATE_SECONDS:
+            return current_time + self.rotate_interval * _ROTATE_SECONDS[self.rotate_frequency]
+        if self.rotate_frequency == 'MIDNIGHT':
+            next_day = datetime.fromtimestamp(current_time).date() + timedelta(days=1)
+            return datetime(next_day.year, next_day.month, next_day.day).timestamp()
+        return float('inf')
 
     def _get_new_filename(self):
         suffix = self.current_time.strftime("%Y-%m-%d_%H-%M-%S")
-        return f"{self.file_name}.{suffix}"
+        new_filename = f"{self.file_name}.{suffix}"
+        # 同一秒内多次滚动时避免覆盖已有的历史文件
+        index = 1
+        while os.path.exists(new_filename):
+            new_filename = f"{self.file_name}.{suffix}.{index}"
+            index += 1
+        return new_filename
+
+    def _write(self, data):
+        with self._io_lock:
+            if time.time() >= self.rollover_at or (
+                    self.max_file_size > 0 and self.current_size >= self.max_file_size):
+                self.doRollover()
+            self.stream.write(data)
+            self.current_size += len(data)
 
     def emit(self, record):
-        if self.shouldRollover(record):
-            self.doRollover()
-        self.stream.write(self.format(record) + '\n')
-        self.stream.flush()
+        try:
+            data = (self.format(record) + '\n').encode('utf-8')
+        except Exception:
+            self.handleError(record)
+            return
+        if self.non_blocking:
+            if self._queue.qsize() >= self.queue_size:
+                self.dropped_records += 1
+            else:
+                self._queue.put(data)
+            return
+        try:
+            with self._io_lock:
+                self._write(data)
+                self.stream.flush()
+        except Exception:
+            self.handleError(record)
 
     def shouldRollover(self, record):
         current_time = time.time()
-        current_size = os.path.getsize(self.current_file)
-
-        time_rollover = False
-        if self.rotate_frequency == 'S':
-            time_rollover = current_time >= self.last_rollover + self.rotate_interval
-        elif self.rotate_frequency == 'M':
-            time_rollover = current_time >= self.last_rollover + self.rotate_interval * 60
-        elif self.rotate_frequency == 'H':
-            time_rollover = current_time >= self.last_rollover + self.rotate_interval * 3600
-        elif self.rotate_frequency == 'D':
-            time_rollover = current_time >= self.last_rollover + self.rotate_interval * 86400
-        elif self.rotate_frequency == 'MIDNIGHT':
-            time_rollover = datetime.fromtimestamp(current_time).date() != datetime.fromtimestamp(self.last_rollover).date()
-
-        size_rollover = current_size >= self.max_file_size if self.max_file_size > 0 else False
-
+        time_rollover = current_time >= self.rollover_at
+        size_rollover = self.current_size >= self.max_file_size if self.max_file_size > 0 else False
         return time_rollover or size_rollover
 
     def doRollover(self):
-        self.stream.close()
-        self.current_time = datetime.now()
-        new_filename = self._get_new_filename()
-        os.rename(self.current_file, new_filename)  # Rename current file to new name
-        self.current_file = self.file_name
-        self.stream = open(self.current_file, 'a')
-        self.last_rollover = time.time()
-        self.manage_log_files()
+        with self._io_lock:
+            self.stream.close()
+            self.current_time = datetime.now()
+            rotated_size = self.current_size
+            if os.path.exists(self.current_file):
+                new_filename = self._get_new_filename()
+                os.rename(self.current_file, new_filename)  # Rename current file to new name
+                if self._log_files is None:
+                    self._log_files = self._scan_log_files()
+                else:
+                    self._log_files.append((new_filename, rotated_size))
+            self.current_file = self.file_name
+            self._open()
+            self.manage_log_files()
 
-    def manage_log_files(self):
+    def _scan_log_files(self):
         log_files = sorted(glob.glob(f"{self.file_name}.*"), key=os.path.getmtime)
+        return collections.deque((f, os.path.getsize(f)) for f in log_files)
 
-        while len(log_files) > self.max_log_files:
-            oldest_log = log_files.pop(0)
-            os.remove(oldest_log)
-
-        while self._total_size(log_files) > self.total_log_size:
-            if log_files:
-                oldest_log = log_files.pop(0)
+    def manage_log_files(self):
+        if self._log_files is None:
+            self._log_files = self._scan_log_files()
+        log_files = self._log_files
+        total_size = sum(size for _, size in log_files)
+        while log_files and (len(log_files) > self.max_log_files or total_size > self.total_log_size):
+            oldest_log, size = log_files.popleft()
+            total_size -= size
+            try:
                 os.remove(oldest_log)
+            except FileNotFoundError:
+                pass
+
+    def _writer_loop(self):
+        buffered = 0
+        last_flush = time.monotonic()
+        running = True
+        while running:
+            timeout = max(self.flush_interval - (time.monotonic() - last_flush), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            flush_requests = []
+            # 一次取出队列中已有的全部日志，减少加锁次数
+            while True:
+                if item is _STOP:
+                    running = False
+                elif isinstance(item, _FlushRequest):
+                    flush_requests.append(item)
+                elif item is not None:
+                    try:
+                        buffered += self._write_with_drops(item)
+                    except Exception:
+                        self._report_error()
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if flush_requests or not running or buffered >= self.buffer_size or \
+                    time.monotonic() - last_flush >= self.flush_interval:
+                if buffered:
+                    try:
+                        with self._io_lock:
+                            self.stream.flush()
+                    except Exception:
+                        self._report_error()
+                buffered = 0
+                last_flush = time.monotonic()
+            for flush_request in flush_requests:
+                flush_request.done.set()
+
+    def _write_with_drops(self, data):
+        # dropped_records只在emit中递增，这里只读取
+        dropped = self.dropped_records - self._reported_drops
+        if dropped:
+            self._reported_drops += dropped
+            data = (f"{dropped} log records dropped because the log queue is full\n").encode('utf-8') + data
+        self._write(data)
+        return len(data)
+
+    def _report_error(self):
+        if logging.raiseExceptions and sys.stderr:
+            import traceback
+            traceback.print_exc(file=sys.stderr)
+
+    def flush(self, timeout=None):
+        r"""将已提交的日志写入文件
 
-    def _total_size(self, files):
-        return sum(os.path.getsize(f) for f in files if os.path.exists(f))
+        Args:
+            timeout (Optional[float]): non_blocking模式下的最长等待时间(秒)，为None时一直等待。
+        """
+        if self._writer is None:
+            with self._io_lock:
+                if self.stream and not self.stream.closed:
+                    self.stream.flush()
+            return
+        if not self._writer.is_alive():
+            return
+        flush_request = _FlushRequest()
+        self._queue.put(flush_request)
+        flush_request.done.wait(timeout)
 
     def close(self):
-        self.stream.close()
-        super().close()
\ No newline at end of file
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+        with self._io_lock:
+            self.stream.close()
+        super().close()
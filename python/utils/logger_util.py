@@ -217,7 +217,8 @@ class LoggerWithLoggerId(logging.LoggerAdapter):
                     max_file_size: Optional[int] = None, # 以B为单位
                     total_log_size: Optional[int] = None, # 以B为单位
                     max_log_files: Optional[int] = None,
-                    file_name: Optional[str] = None
+                    file_name: Optional[str] = None,
+                    non_blocking: bool = False
                     ):
         LOGGING_CONFIG["handlers"] = {}
         LOGGING_CONFIG["loggers"]["appbuilder"]["handlers"] = []
@@ -285,6 +286,10 @@ class LoggerWithLoggerId(logging.LoggerAdapter):
         SET_CONFIG_HEADER['max_log_files'] = max_log_files
         ERROR_SET_CONFIG_HEADER['max_log_files'] = max_log_files
 
+        # 设置是否在后台线程中写入日志
+        SET_CONFIG_HEADER['non_blocking'] = non_blocking
+        ERROR_SET_CONFIG_HEADER['non_blocking'] = non_blocking
+
         LOGGING_CONFIG["handlers"]["file"] = SET_CONFIG_HEADER
         LOGGING_CONFIG["handlers"]["error_file"] = ERROR_SET_CONFIG_HEADER
         LOGGING_CONFIG["loggers"]["appbuilder"]["handlers"].extend(["file", "error_file"])
@@ -82,6 +82,8 @@ class RemoteModelCollector():
             return
         self._initialized = True
         self.remote_models = {}
+        # short_name到RemoteModel的索引，避免每次查询都遍历全部远程模型
+        self._short_name_index = {}
 
     def __new__(cls, *args, **kwargs):
         """
@@ -103,6 +105,11 @@ class RemoteModelCollector():
             self.remote_models[remote_name] = RemoteModel(remote_name)
         
         self.remote_models[remote_name].register_short_name(short_name)
+        # 与遍历查找的语义保持一致：同一个简称以最先注册的远程模型为准
+        self._short_name_index = {}
+        for remote_model in self.remote_models.values():
+            for name in remote_model.short_names:
+                self._short_name_index.setdefault(name, remote_model)
     
     def get_remote_name_by_short_name(self, short_name: str) -> Optional[str]:
         r"""根据short_name获取远程模型名.
@@ -110,12 +117,10 @@ class RemoteModelCollector():
             short_name(str):
                 模型简称。
          """
-        for remote_model in self.remote_models.values():
-            remote_name = remote_model.get_remote_name_by_short_name(short_name)
-            if remote_name is not None:
-                return remote_name
-        
-        return None
+        remote_model = self._short_name_index.get(short_name)
+        if remote_model is None:
+            return None
+        return remote_model.get_remote_name_by_short_name(short_name)
 
 
 remote_model_collector = RemoteModelCollector()
@@ -393,9 +398,7 @@ class Models:
         data = GetModelListRequest.to_json(request)
         headers = self.http_client.auth_header()
         headers['content-type'] = 'application/json'
-        if retry != self.http_client.retry.total:
-            self.http_client.retry.total = retry
-        response = self.http_client.session.post(url, data=data, headers=headers, timeout=timeout)
+        response = self.http_client.with_retry(retry).post(url, data=data, headers=headers, timeout=timeout)
         self.http_client.check_response_header(response)
         data = response.json()
         self.http_client.check_response_json(data)
@@ -426,9 +429,7 @@ class Models:
         data = GetModelListRequestV2.model_validate(request)
         headers = self.http_client.auth_header()
         headers['content-type'] = 'application/json'
-        if retry != self.http_client.retry.total:
-            self.http_client.retry.total = retry
-        response = self.http_client.session.post(url, data=data.model_dump_json(), headers=headers, timeout=timeout)
+        response = self.http_client.with_retry(retry).post(url, data=data.model_dump_json(), headers=headers, timeout=timeout)
         self.http_client.check_response_header(response)
         data = response.json()
         self.http_client.check_response_json(data)
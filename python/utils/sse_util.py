@@ -14,10 +14,107 @@
 """
 SSE Client util
 """
-from appbuilder.utils.logger_util import logger
+import re
 import logging
+from typing import Optional
+
 import aiohttp
 
+from appbuilder.utils.logger_util import logger
+
+# SSE事件之间以空行分隔
+_EVENT_DELIMITER = re.compile(rb"\r\r|\n\n|\r\n\r\n")
+# 分隔符最长为4字节，未匹配时下次只需从缓冲区末尾3字节处继续扫描
+_DELIMITER_LOOKBACK = 3
+# 解码后仅按\r、\n切分行，与按字节切分的结果保持一致
+_LINE_SPLIT = re.compile(r"\r\n|\r|\n")
+_EVENT_FIELDS = frozenset(("id", "event", "data", "retry"))
+
+
+class _EventBuffer:
+    """
+    可增长的字节缓冲区，按SSE分隔符切分出完整的事件块。
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._scan_from = 0
+
+    def feed(self, chunk):
+        """
+        追加数据并返回所有已完整的事件块（包含结尾的分隔符）。
+        """
+        buffer = self._buffer
+        buffer += chunk
+        blocks = []
+        while True:
+            match = _EVENT_DELIMITER.search(buffer, self._scan_from)
+            if match is None:
+                self._scan_from = max(len(buffer) - _DELIMITER_LOOKBACK, 0)
+                return blocks
+            end = match.end()
+            blocks.append(bytes(buffer[:end]))
+            del buffer[:end]
+            self._scan_from = 0
+
+    def flush(self):
+        """
+        返回缓冲区中剩余的不完整事件块。
+        """
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        self._scan_from = 0
+        return data
+
+
+def _parse_event(chunk, char_enc, dispatch_raw_only=False) -> Optional["Event"]:
+    """
+    将一个完整的事件块解析为Event对象，整块只解码一次。
+    """
+    debug = logger.isEnabledFor(logging.DEBUG)
+    event = Event()
+    data_lines = []
+    raw_parts = []
+    for line in _LINE_SPLIT.split(chunk.decode(char_enc)):
+        # Lines starting with a separator are comments and are to be ignored.
+        if not line.strip() or line.startswith(":"):
+            continue
+        if debug:
+            logger.debug(f"raw line: {line}")
+        field, sep, value = line.partition(":")
+        # Ignore unknown fields.
+        if field not in _EVENT_FIELDS:
+            raw_parts.append(line)
+            if debug:
+                logger.debug(
+                    f"Saw invalid field {field} while parsing Server Side Event"
+                )
+            continue
+        # From the spec:
+        # "If value starts with a single U+0020 SPACE character,
+        # remove it from value."
+        if value.startswith(" "):
+            value = value[1:]
+        # The data field may come over multiple lines and their values
+        # are concatenated with each other.
+        if field == "data":
+            data_lines.append(value)
+            raw_parts.append(value)
+            raw_parts.append("\n")
+        else:
+            setattr(event, field, value)
+            raw_parts.append(value)
+
+    event.raw = "".join(raw_parts)
+    # Events with no data are not dispatched.
+    if data_lines:
+        event.data = "\n".join(data_lines)
+    elif not (dispatch_raw_only and event.raw):
+        return None
+    # Empty event names default to 'message'
+    event.event = event.event or "message"
+    return event
+
 
 class SSEClient:
     """
@@ -38,15 +135,12 @@ class SSEClient:
         """
         读取传入的事件源流并生成事件块。
         不幸的是，有些服务器可能会决定在响应中将事件分解为多个HTTP块。
-        因此，有必要正确地将连续的响应块缝合在一起，并找到SSE分隔符（空的新行），以生成完整、正确的事件块。
+        因此，有必要将连续的响应块追加到缓冲区中，并扫描SSE分隔符（空的新行），以生成完整、正确的事件块。
         """
-        data = b""
+        buffer = _EventBuffer()
         for chunk in self._event_source:
-            for line in chunk.splitlines(True):
-                data += line
-                if data.endswith((b"\r\r", b"\n\n", b"\r\n\r\n")):
-                    yield data
-                    data = b""
+            yield from buffer.feed(chunk)
+        data = buffer.flush()
         if data:
             yield data
 
@@ -61,65 +155,12 @@ class SSEClient:
             generator: 解析后的 Event 对象的生成器。
         """
         for chunk in self._read():
-            event = Event()
-            # Split before decoding so splitlines() only uses \r and \n
-            for line in chunk.splitlines():
-                # Decode the line.
-                line = line.decode(self._char_enc)
-                # Lines starting with a separator are comments and are to be
-                # ignored.
-                if not line.strip() or line.startswith(":"):
-                    continue
-                logger.debug(f"raw line: {line}")
-                data = line.split(":", 1)
-                field = data[0]
-                # Ignore unknown fields.
-                if field not in event.__dict__:
-                    event.raw += line
-                    logger.debug(
-                        f"Saw invalid field {field} while parsing Server Side Event"
-                    )
-                    continue
-
-                if len(data) > 1:
-                    # From the spec:
-                    # "If value starts with a single U+0020 SPACE character,
-                    # remove it from value."
-                    if data[1].startswith(" "):
-                        value = data[1][1:]
-                    else:
-                        value = data[1]
-                else:
-                    # If no value is present after the separator,
-                    # assume an empty value.
-                    value = ""
-                # The data field may come over multiple lines and their values
-                # are concatenated with each other.
-                if field == "data":
-                    event.__dict__[field] += value + "\n"
-                    event.raw += value + "\n"
-                else:
-                    event.__dict__[field] = value
-                    event.raw += value
-
-            # Events with no data are not dispatched.
-            if not event.data:
-                if event.raw:
-                    # unknown error
-                    pass
-                else:
-                    continue
-            else:
-                # If the data field ends with a newline, remove it.
-                if event.data.endswith("\n"):
-                    event.data = event.data[0:-1]
-            # Empty event names default to 'message'
-            event.event = event.event or "message"
+            event = _parse_event(chunk, self._char_enc, dispatch_raw_only=True)
+            if event is None:
+                continue
             # Dispatch the event
-            if logger.getEffectiveLevel() == logging.DEBUG:
+            if logger.isEnabledFor(logging.DEBUG):
                 logger.debug(f"Dispatching {event.debug_str}...")
-            else:
-                logger.debug(f"Dispatching {event}...")
             yield event
 
     def close(self):
@@ -145,13 +186,11 @@ class AsyncSSEClient:
         """
         读取传入的事件源流并生成事件块。
         """
-        data = b''
+        buffer = _EventBuffer()
         async for chunk in self._response.content.iter_any():
-            for line in chunk.splitlines(True):
-                data += line
-                if data.endswith((b'\r\r', b'\n\n', b'\r\n\r\n')):
-                    yield data
-                    data = b''
+            for block in buffer.feed(chunk):
+                yield block
+        data = buffer.flush()
         if data:
             yield data
 
@@ -162,54 +201,9 @@ class AsyncSSEClient:
             generator: 解析后的 Event 对象的生成器。
         """
         async for chunk in self._read():
-            event = Event()
-            # Split before decoding so splitlines() only uses \r and \n
-            for line in chunk.splitlines():
-                # Decode the line.
-                line = line.decode(self._char_enc)
-                # Lines starting with a separator are comments and are to be ignored.
-                if not line.strip() or line.startswith(':'):
-                    continue
-
-                data = line.split(':', 1)
-                field = data[0]
-                # Ignore unknown fields.
-                if field not in event.__dict__:
-                    event.raw += line
-                    continue
-
-                if len(data) > 1:
-                    # From the spec:
-                    # "If value starts with a single U+0020 SPACE character,
-                    # remove it from value."
-                    if data[1].startswith(' '):
-                        value = data[1][1:]
-                    else:
-                        value = data[1]
-                else:
-                    # If no value is present after the separator,
-                    # assume an empty value.
-                    value = ''
-
-                # The data field may come over multiple lines and their values are concatenated with each other.
-                if field == 'data':
-                    event.__dict__[field] += value + '\n'
-                    event.raw += value + '\n'
-                else:
-                    event.__dict__[field] = value
-                    event.raw += value
-
-            # Events with no data are not dispatched.
-            if not event.data:
+            event = _parse_event(chunk, self._char_enc)
+            if event is None:
                 continue
-
-            # If the data field ends with a newline, remove it.
-            if event.data.endswith('\n'):
-                event.data = event.data[0:-1]
-
-            # Empty event names default to 'message'
-            event.event = event.event or 'message'
-            
             yield event
 
 
@@ -218,6 +212,8 @@ class Event(object):
     事件流中的事件。
     """
 
+    __slots__ = ("id", "event", "data", "retry", "raw")
+
     def __init__(self, id=None, event="message", data="", retry=None):
         self.id = id
         self.event = event
@@ -14,6 +14,8 @@
 import os
 import time
 import json
+import bisect
+import random
 import inspect
 from opentelemetry import trace
 from pydantic import BaseModel
@@ -40,6 +42,101 @@ def _time(start_time,end_time,span):
     """
     span.set_attribute('time.cost-time',str(end_time-start_time)+'s')
 
+def _stream_payload_sample_rate() -> float:
+    """
+    获取流式trace中记录单个chunk完整内容的采样率，取值[0, 1]，默认为0，即不记录。
+    通过环境变量APPBUILDER_TRACE_STREAM_SAMPLE_RATE配置。
+    """
+    try:
+        rate = float(os.getenv("APPBUILDER_TRACE_STREAM_SAMPLE_RATE", 0))
+    except ValueError:
+        return 0.0
+    return min(max(rate, 0.0), 1.0)
+
+
+class _StreamSpanRecorder(object):
+    """
+    将流式输出的所有chunk聚合记录到一个span上，避免每个chunk创建span并序列化完整内容。
+
+    记录的信息包括chunk数量、首个chunk耗时(time to first token)、chunk间隔的直方图，
+    完整的chunk内容仅按采样率以span event的形式记录。
+
+    Args:
+        span (Span): 用于记录聚合信息的span。
+        sample_rate (float, optional): 记录chunk完整内容的采样率。默认为None，从环境变量中读取。
+    """
+
+    # chunk间隔直方图的桶上界（秒），最后一个桶为 > 5s
+    LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+    def __init__(self, span, sample_rate: float = None):
+        self.span = span
+        self.sample_rate = _stream_payload_sample_rate() if sample_rate is None else sample_rate
+        self.start_time = time.monotonic()
+        self.last_time = None
+        self.chunk_count = 0
+        self.time_to_first_chunk = None
+        self.max_interval = 0.0
+        self.total_interval = 0.0
+        self.histogram = [0] * (len(self.LATENCY_BUCKETS) + 1)
+
+    def record(self, payload=None):
+        """
+        记录收到一个chunk。
+
+        Args:
+            payload (Callable[[], str], optional): 返回chunk完整内容的函数，仅在被采样时调用。
+
+        Returns:
+            None
+        """
+        now = time.monotonic()
+        if self.last_time is None:
+            self.time_to_first_chunk = now - self.start_time
+            self.span.add_event("first_chunk", {"stream.time_to_first_chunk": self.time_to_first_chunk})
+        else:
+            interval = now - self.last_time
+            self.total_interval += interval
+            if interval > self.max_interval:
+                self.max_interval = interval
+            self.histogram[bisect.bisect_left(self.LATENCY_BUCKETS, interval)] += 1
+        self.last_time = now
+        self.chunk_count += 1
+        if payload is not None and self.sample_rate and random.random() < self.sample_rate:
+            self.span.add_event("chunk", {"stream.chunk_index": self.chunk_count - 1, "output.value": payload()})
+
+    def finish(self, output: str = None):
+        """
+        将聚合信息写入span的属性。
+
+        Args:
+            output (str, optional): 拼接后的完整输出，不为None时写入output.value。
+
+        Returns:
+            None
+        """
+        span = self.span
+        span.set_attribute("stream.chunk_count", self.chunk_count)
+        if self.time_to_first_chunk is not None:
+            span.set_attribute("stream.time_to_first_chunk", self.time_to_first_chunk)
+        if self.chunk_count > 1:
+            span.set_attribute("stream.inter_chunk_latency.avg", self.total_interval / (self.chunk_count - 1))
+            span.set_attribute("stream.inter_chunk_latency.max", self.max_interval)
+            span.set_attribute("stream.inter_chunk_latency.bucket_bounds", list(self.LATENCY_BUCKETS))
+            span.set_attribute("stream.inter_chunk_latency.bucket_counts", self.histogram)
+        if output is not None:
+            span.set_attribute("output.value", output)
+
+
+def _format_references(references) -> str:
+    """
+    将RAG引用列表格式化为字符串，每条引用的各字段占一行，引用之间空一行。
+    """
+    return "".join(
+        "".join('{}: {}\n'.format(key, value) for key, value in reference.items()) + '\n'
+        for reference in references)
+
+
 def _build_curl_from_post(url, headers, json_body, timeout) -> str:
         """
         从 POST 请求参数生成 cURL 命令。
@@ -177,35 +274,27 @@ def _client_trace_generator(generator, tracer, parent_context):
     """
     with tracer.start_as_current_span('AppBuilderClient-Stream-RUN', context = parent_context) as span:
         span.set_attribute("openinference.span.kind", 'agent')
-        result_str = ''
+        result_list = []
+        reference_list = []
         prompt_tokens = 0
         completion_tokens = 0
         total_tokens = 0
         run_list = []
+        new_span = tracer.start_span('Client-Stream')
+        new_span.set_attribute("openinference.span.kind", 'agent')
+        recorder = _StreamSpanRecorder(new_span)
         try:
-            new_span = tracer.start_span('Client-Stream')
             for message in generator:
-                new_span.set_attribute("openinference.span.kind", 'agent')
-                context_message_str = ""
-                has_reference = False
+                recorder.record(message.model_dump_json)
 
                 context_message_list = None
                 if hasattr(message, 'events') and message.events and hasattr(message.events[0], 'detail') and message.events[0].detail:
                     context_message_list = message.events[0].detail.get('references', None)
 
-                if context_message_list:
-                    for context_message in context_message_list:
-                        for context_message_key, context_message_value in context_message.items():
-                            context_message_str += '{}: {}\n'.format(context_message_key, context_message_value)
-                            has_reference = True
-                        context_message_str += '\n'
-
-                if has_reference:
-                    new_span.set_attribute("input.value", 'Context(上下文) For RAG:\n{}'.format(context_message_str))
+                if context_message_list and any(context_message_list):
+                    reference_list.append(_format_references(context_message_list))
 
-                new_span.set_attribute("output.value", "{}".format(message.model_dump_json(indent=4)))
-
-                result_str += str(message.answer)
+                result_list.append(str(message.answer))
 
                 if hasattr(message, 'events') and message.events and hasattr(message.events[0], 'event_type') and hasattr(message.events[0], 'status'):
                     run_list.append('{}[status:{}]'.format(message.events[0].event_type, message.events[0].status))
@@ -214,12 +303,16 @@ def _client_trace_generator(generator, tracer, parent_context):
                     prompt_tokens = message.events[0].usage.prompt_tokens
                     completion_tokens = message.events[0].usage.completion_tokens
                     total_tokens = message.events[0].usage.total_tokens
-                new_span.end()
-                new_span = tracer.start_span('Client-Stream')
                 yield message
         except Exception as e:
             raise AppbuilderTraceException(str(e))  
         finally:
+            result_str = ''.join(result_list)
+            if reference_list:
+                new_span.set_attribute("input.value", 'Context(上下文) For RAG:\n{}'.format(''.join(reference_list)))
+            new_span.set_attribute("llm.token_count.total", total_tokens)
+            recorder.finish(output=result_str)
+            new_span.end()
             span.set_attribute("output.value", result_str)
             span.set_attribute("llm.token_count.prompt", prompt_tokens)
             span.set_attribute("llm.token_count.completion", completion_tokens)
@@ -376,33 +469,34 @@ def _assistant_stream_run_with_handler_output(generator , tracer, parent_context
     """
     with tracer.start_as_current_span("Assistant-stream_run_with_handler", context=parent_context) as span:
         span.set_attribute("openinference.span.kind",'Agent')
-        result = ''
         output_list = []
+        new_span = tracer.start_span('Assistant-Stream_run_with_handler')
+        new_span.set_attribute("openinference.span.kind",'agent')
+        recorder = _StreamSpanRecorder(new_span)
         try:
-            new_span = tracer.start_span('Assistant-Stream_run_with_handler')
             for message in generator:
-                new_span.set_attribute("openinference.span.kind",'agent')
-                if isinstance(message, BaseModel):
-                    new_span.set_attribute("output.value", "{}".format(message.model_dump_json(indent=4)))
-                else:
-                    new_span.set_attribute("output.value", "{}".format(json.dumps(message, ensure_ascii=False)))
+                recorder.record(lambda: _stream_message_json(message))
                 if hasattr(message, 'content') and message.content and message.content[0]:
                     if hasattr(message.content[0], 'text') and message.content[0].text:
                         if hasattr(message.content[0].text, 'value') and message.content[0].text.value: 
                             output_list.append(message.content[0].text.value)
-                new_span.end()
-                new_span = tracer.start_span('Assistant-Stream_run_with_handler')
                 yield message
         except Exception as e:
             raise AppbuilderTraceException(str(e))
         finally:
-            new_span.set_attribute("output.value",'流式运行结束')
-            new_span.set_attribute("openinference.span.kind",'agent')   
+            result = ''.join(str(item) for item in output_list)
+            recorder.finish(output='流式运行结束')
             new_span.end()
-            for item in output_list:
-                result += str(item)
             span.set_attribute("output.value", result)
 
+def _stream_message_json(message) -> str:
+    """
+    将流式消息序列化为紧凑的JSON字符串，用于采样记录chunk内容。
+    """
+    if isinstance(message, BaseModel):
+        return message.model_dump_json()
+    return json.dumps(message, ensure_ascii=False)
+
 def _assistant_stream_output(output, span, tracer):
     """
     处理流式输出，并生成追踪信息。
@@ -416,26 +510,24 @@ def _assistant_stream_output(output, span, tracer):
         List[Any]: 存储所有输出消息的列表。
     
     """
-    result = ''
     run_list = []
     generator_list = []
     if output:
         new_span = tracer.start_span('Assistant-Stream_run')
+        new_span.set_attribute("openinference.span.kind",'agent')
+        recorder = _StreamSpanRecorder(new_span)
         for message in output:
             generator_list.append(message)
-            new_span.set_attribute("openinference.span.kind",'agent')
             if message.event == "status":
-                new_span.set_attribute("output.value", "{}".format(message.model_dump_json(indent=4)))
+                recorder.record(message.model_dump_json)
             elif message.event == "message":
-                new_span.set_attribute("output.value", "{}".format(message.model_dump_json(indent=4)))
+                recorder.record(message.model_dump_json)
                 if hasattr(message, 'content') and message.content and hasattr(message.content[0], 'text') and message.content[0].text and hasattr(message.content[0].text, 'value'):
                     run_list.append(message.content[0].text.value)
-            new_span.end()
-            new_span = tracer.start_span('Assistant-Stream_run')
-        for item in run_list:
-            result += str(item) 
-        new_span.set_attribute("output.value",'流式输出结束\n输出结果为:{}'.format(result))
-        new_span.set_attribute("openinference.span.kind",'agent')
+            else:
+                recorder.record()
+        result = ''.join(str(item) for item in run_list)
+        recorder.finish(output='流式输出结束\n输出结果为:{}'.format(result))
         new_span.end()
         span.set_attribute("output.value",result)
     return generator_list
@@ -614,17 +706,21 @@ def _assistant_stream_trace(tracer, func, *args, **kwargs):
         _input(args = args, kwargs = kwargs, span=span)
         run_list = []
         new_span = tracer.start_span("Assistant-stream_run")
-        for message in result:
-            new_span.set_attribute("openinference.span.kind",'agent')
-            if message.event == "status":
-                new_span.set_attribute("output.value", "{}".format(message.model_dump_json(indent=4)))
-            elif message.event == "message":
-                new_span.set_attribute("output.value", "{}".format(message.model_dump_json(indent=4)))
-                if hasattr(message, 'content') and message.content and hasattr(message.content[0], 'text') and message.content[0].text and hasattr(message.content[0].text, 'value'):
-                    run_list.append(message.content[0].text.value)
+        new_span.set_attribute("openinference.span.kind",'agent')
+        recorder = _StreamSpanRecorder(new_span)
+        try:
+            for message in result:
+                if message.event in ("status", "message"):
+                    recorder.record(message.model_dump_json)
+                else:
+                    recorder.record()
+                if message.event == "message":
+                    if hasattr(message, 'content') and message.content and hasattr(message.content[0], 'text') and message.content[0].text and hasattr(message.content[0].text, 'value'):
+                        run_list.append(message.content[0].text.value)
+                yield message
+        finally:
+            recorder.finish()
             new_span.end()
-            new_span = tracer.start_span('Assistant-Stream_run')
-            yield message
         end_time = time.time()  
         _time(start_time = start_time,end_time = end_time,span = span)
         result_str = ''.join(str(res) for res in run_list)
@@ -729,18 +825,23 @@ def _components_stream_run_trace_with_opentelemetry(tracer, func, *args, **kwarg
         span.set_attribute("openinference.span.kind",'tool')
         _input(args = args, kwargs = kwargs, span=span)
         run_list = [] 
-        for item in func(*args, **kwargs):  
-            with tracer.start_as_current_span('Component-Stream') as new_span:  
-                new_span.set_attribute("openinference.span.kind",'tool')
+        new_span = tracer.start_span('Component-Stream')
+        new_span.set_attribute("openinference.span.kind",'tool')
+        recorder = _StreamSpanRecorder(new_span)
+        try:
+            for item in func(*args, **kwargs):  
                 if isinstance(item, ComponentOutput):
-                    new_span.set_attribute("output.value", "{}".format(item.model_dump_json(indent=4)))
+                    recorder.record(item.model_dump_json)
                 else:
-                    new_span.set_attribute("output.value", "{}".format(json.dumps(item, ensure_ascii=False)))
+                    recorder.record(lambda: json.dumps(item, ensure_ascii=False))
                     if isinstance(item, dict):
                         run_list.append(item.get('text', None))
                     else:
                         run_list.append(str(item))
                 yield item
+        finally:
+            recorder.finish()
+            new_span.end()
         end_time = time.time()  
         _time(start_time = start_time,end_time = end_time,span = span)
         if run_list:
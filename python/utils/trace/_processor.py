@@ -0,0 +1,185 @@
+# Copyright (c) 2024 Baidu, Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Background batched span export with a bounded queue"""
+
+import collections
+import threading
+import time
+from typing import Optional
+
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+from appbuilder.utils.logger_util import logger
+
+
+class BoundedBatchSpanProcessor(SpanProcessor):
+    r"""在后台线程中批量导出span的SpanProcessor。
+
+    span结束时只在内存队列中追加一项，导出由后台线程完成，不占用业务请求线程。
+    队列已满时直接丢弃新的span并计数，不会阻塞调用方。进程退出（TracerProvider.shutdown）
+    或调用force_flush时会导出队列中剩余的span。
+
+    Args:
+        exporter (SpanExporter): span导出器，如OTLPSpanExporter、ConsoleSpanExporter。
+        max_queue_size (int): 队列最大长度，超出后丢弃新的span。默认为2048。
+        max_export_batch_size (int): 单次导出的最大span数量，队列达到该长度时立即触发导出。默认为512。
+        schedule_delay (float): 两次导出之间的最大间隔(秒)。默认为5。
+    """
+
+    def __init__(
+        self,
+        exporter: SpanExporter,
+        max_queue_size: int = 2048,
+        max_export_batch_size: int = 512,
+        schedule_delay: float = 5.0,
+    ):
+        if max_queue_size <= 0:
+            raise ValueError("max_queue_size must be a positive integer")
+        if max_export_batch_size <= 0 or max_export_batch_size > max_queue_size:
+            raise ValueError("max_export_batch_size must be in (0, max_queue_size]")
+        self.exporter = exporter
+        self.max_queue_size = max_queue_size
+        self.max_export_batch_size = max_export_batch_size
+        self.schedule_delay = schedule_delay
+
+        self._queue = collections.deque()
+        self._condition = threading.Condition(threading.Lock())
+        # 保证同一时刻只有一个线程调用exporter.export
+        self._export_lock = threading.Lock()
+        self._shutdown = False
+        self._dropped_spans = 0
+        self._exported_spans = 0
+        self._failed_spans = 0
+        self._queue_depth_max = 0
+        self._last_drop_warning = 0.0
+
+        self._worker = threading.Thread(
+            target=self._worker_loop, name="appbuilder-span-exporter", daemon=True)
+        self._worker.start()
+
+    def on_start(self, span, parent_context=None):
+        pass
+
+    def on_end(self, span: ReadableSpan):
+        if self._shutdown or not span.context.trace_flags.sampled:
+            return
+        with self._condition:
+            if len(self._queue) >= self.max_queue_size:
+                self._dropped_spans += 1
+                self._warn_dropped()
+                return
+            self._queue.append(span)
+            depth = len(self._queue)
+            if depth > self._queue_depth_max:
+                self._queue_depth_max = depth
+            if depth >= self.max_export_batch_size:
+                self._condition.notify()
+
+    def _warn_dropped(self):
+        # 至多每10秒提示一次，避免日志刷屏
+        now = time.monotonic()
+        if now - self._last_drop_warning >= 10:
+            self._last_drop_warning = now
+            logger.warning("span export queue is full (max_queue_size={}), {} spans dropped so far".format(
+                self.max_queue_size, self._dropped_spans))
+
+    def _take_batch(self):
+        batch = []
+        while self._queue and len(batch) < self.max_export_batch_size:
+            batch.append(self._queue.popleft())
+        return batch
+
+    def _export(self, batch):
+        if not batch:
+            return
+        with self._export_lock:
+            try:
+                result = self.exporter.export(batch)
+            except Exception as e:
+                result = SpanExportResult.FAILURE
+                logger.warning("export {} spans failed: {}".format(len(batch), e))
+        with self._condition:
+            if result == SpanExportResult.SUCCESS:
+                self._exported_spans += len(batch)
+            else:
+                self._failed_spans += len(batch)
+
+    def _worker_loop(self):
+        while True:
+            with self._condition:
+                if not self._shutdown and len(self._queue) < self.max_export_batch_size:
+                    self._condition.wait(self.schedule_delay)
+                if self._shutdown:
+                    return
+                batch = self._take_batch()
+            self._export(batch)
+
+    def _drain(self, deadline: Optional[float] = None) -> bool:
+        while True:
+            with self._condition:
+                batch = self._take_batch()
+            if not batch:
+                return True
+            if deadline is not None and time.monotonic() > deadline:
+                with self._condition:
+                    self._queue.extendleft(reversed(batch))
+                return False
+            self._export(batch)
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        r"""在调用线程中导出队列中的全部span
+
+        Args:
+            timeout_millis (int): 超时时间(毫秒)。默认为30000。
+
+        Returns:
+            bool: 是否在超时前导出完毕。
+        """
+        deadline = time.monotonic() + timeout_millis / 1000
+        if not self._drain(deadline):
+            return False
+        # 等待后台线程正在进行的导出结束
+        if not self._export_lock.acquire(timeout=max(deadline - time.monotonic(), 0)):
+            return False
+        self._export_lock.release()
+        return True
+
+    def shutdown(self):
+        if self._shutdown:
+            return
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+        self._worker.join()
+        self._drain()
+        self.exporter.shutdown()
+
+    def stats(self) -> dict:
+        r"""获取导出队列的统计信息
+
+        Returns:
+            dict: 包括queue_depth（当前队列长度）、queue_depth_max（队列长度峰值）、max_queue_size、
+                dropped_spans（因队列已满丢弃的span数）、exported_spans、failed_spans（导出失败的span数）。
+        """
+        with self._condition:
+            return {
+                "queue_depth": len(self._queue),
+                "queue_depth_max": self._queue_depth_max,
+                "max_queue_size": self.max_queue_size,
+                "dropped_spans": self._dropped_spans,
+                "exported_spans": self._exported_spans,
+                "failed_spans": self._failed_spans,
+            }
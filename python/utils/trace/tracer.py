@@ -25,6 +25,9 @@ from opentelemetry.sdk.trace.export import (
 )
 from wrapt import wrap_function_wrapper
 
+from appbuilder.utils.trace._processor import BoundedBatchSpanProcessor
+from appbuilder.utils.trace import tracer_wrapper
+
 from appbuilder.utils.trace._function import( 
     _post_trace, 
     _client_run_trace, 
@@ -91,6 +94,8 @@ class AppbuilderInstrumentor(BaseInstrumentor):
         if self._instrumented:
             return
         self._instrumented = True
+        # 环境变量可能在导入后才被设置，安装trace时同步一次缓存的trace开关
+        tracer_wrapper._trace_state.reload_from_env()
         
         # 判断是否启用Sentry跟踪，如果启用，则创建虚拟的的Tracer,仅对Components组件生效
         if os.environ.get('ENABLE_SENTRY_TRACE', None) == 'true' and os.environ.get('SENTRY_DSN', None):
@@ -304,7 +309,17 @@ class AppbuilderInstrumentor(BaseInstrumentor):
             print("appbuilder not found")
             
 
-def create_tracer_provider(enable_phoenix: bool = True, enable_console: bool = False, host: str = "127.0.0.1", port: int = 8080, method: str = "/v1/traces"):
+def create_tracer_provider(
+    enable_phoenix: bool = True,
+    enable_console: bool = False,
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    method: str = "/v1/traces",
+    batch_export: bool = True,
+    max_queue_size: int = 2048,
+    max_export_batch_size: int = 512,
+    schedule_delay: float = 5.0,
+):
     """
     创建一个用于跟踪的TracerProvider对象，并可选择性地添加span处理器，以便将跟踪数据发送到指定的端点或控制台。
     
@@ -314,6 +329,10 @@ def create_tracer_provider(enable_phoenix: bool = True, enable_console: bool = F
         host (str, optional): Phoenix可视化界面的主机地址。默认为"127.0.0.1"。
         port (int, optional): Phoenix可视化界面的端口号。默认为8080。
         method (str, optional): Phoenix可视化界面的请求路径。默认为"/v1/traces"。
+        batch_export (bool, optional): 是否在后台线程中批量导出span。为False时每个span结束时在当前线程同步导出。默认为True。
+        max_queue_size (int, optional): 批量导出时的队列最大长度，队列满时丢弃新的span。默认为2048。
+        max_export_batch_size (int, optional): 批量导出时单次导出的最大span数量。默认为512。
+        schedule_delay (float, optional): 批量导出时两次导出之间的最大间隔(秒)。默认为5。
     
     Returns:
         TracerProvider: 创建的TracerProvider对象，可用于创建跟踪的Span对象。
@@ -321,15 +340,23 @@ def create_tracer_provider(enable_phoenix: bool = True, enable_console: bool = F
     """
     tracer_provider = TracerProvider()
 
+    def span_processor(exporter):
+        if not batch_export:
+            return SimpleSpanProcessor(exporter)
+        return BoundedBatchSpanProcessor(
+            exporter,
+            max_queue_size=max_queue_size,
+            max_export_batch_size=max_export_batch_size,
+            schedule_delay=schedule_delay,
+        )
+
     if enable_phoenix:  # 将trace数据在本地可视化界面展示
         endpoint = f"{host}:{port}{method}"
         logger.info("OTLPSpanExporter endpoint: {}".format(endpoint))
-        tracer_provider.add_span_processor(
-            SimpleSpanProcessor(OTLPSpanExporter(endpoint)))
+        tracer_provider.add_span_processor(span_processor(OTLPSpanExporter(endpoint)))
 
     if enable_console:  # 将trace数据在控制台展示
-        tracer_provider.add_span_processor(
-            SimpleSpanProcessor(ConsoleSpanExporter()))
+        tracer_provider.add_span_processor(span_processor(ConsoleSpanExporter()))
 
     return tracer_provider
 
@@ -343,7 +370,18 @@ class AppBuilderTracer():
             cls._instance = super().__new__(cls)
         return cls._instance
 
-    def __init__(self, enable_phoenix: bool = True, enable_console: bool = False, host: str = "http://localhost", port: int = 8080, method="/v1/traces") -> None:
+    def __init__(
+        self,
+        enable_phoenix: bool = True,
+        enable_console: bool = False,
+        host: str = "http://localhost",
+        port: int = 8080,
+        method="/v1/traces",
+        batch_export: bool = True,
+        max_queue_size: int = 2048,
+        max_export_batch_size: int = 512,
+        schedule_delay: float = 5.0,
+    ) -> None:
         """
         初始化函数，用于设置追踪系统相关参数。
         
@@ -353,6 +391,10 @@ class AppBuilderTracer():
             host (str, optional): 可视化追踪系统服务的地址。默认为"http://localhost"。
             port (int, optional): 可视化追踪系统服务的端口号。默认为8080。
             method (str, optional): 可视化追踪系统服务的方法路径。默认为"/v1/traces"。
+            batch_export (bool, optional): 是否在后台线程中批量导出span。默认为True。
+            max_queue_size (int, optional): 批量导出时的队列最大长度，队列满时丢弃新的span。默认为2048。
+            max_export_batch_size (int, optional): 批量导出时单次导出的最大span数量。默认为512。
+            schedule_delay (float, optional): 批量导出时两次导出之间的最大间隔(秒)。默认为5。
         
         Returns:
             None: 无返回值。
@@ -363,7 +405,11 @@ class AppBuilderTracer():
             enable_console=enable_console,
             host=host,
             port=port,
-            method=method
+            method=method,
+            batch_export=batch_export,
+            max_queue_size=max_queue_size,
+            max_export_batch_size=max_export_batch_size,
+            schedule_delay=schedule_delay,
         )
         self._instrumentor = AppbuilderInstrumentor()
 
@@ -378,18 +424,91 @@ class AppBuilderTracer():
     def add_custom_processor(self, processor):
         self._tracer_provider.add_span_processor(processor)
 
+    def export_stats(self) -> list:
+        """
+        获取各批量导出处理器的队列统计信息，包括队列长度、丢弃的span数等。
+
+        Returns:
+            list: 每个BoundedBatchSpanProcessor的统计信息，参见BoundedBatchSpanProcessor.stats。
+        """
+        active_processor = getattr(self._tracer_provider, "_active_span_processor", None)
+        processors = getattr(active_processor, "_span_processors", ())
+        return [p.stats() for p in processors if isinstance(p, BoundedBatchSpanProcessor)]
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        """
+        立即导出所有尚未导出的span。
+
+        Args:
+            timeout_millis (int, optional): 超时时间(毫秒)。默认为30000。
+
+        Returns:
+            bool: 是否在超时前导出完毕。
+        """
+        return self._tracer_provider.force_flush(timeout_millis)
+
     def start_trace(self):
         if self._trace_start:
             return
         logger.info("AppBuilder Starting trace...")
         os.environ["APPBUILDER_SDK_TRACE_ENABLE"] = "true"
         self._instrumentor._instrument(tracer_provider=self._tracer_provider)
+        self.set_trace_enabled(True)
 
     def end_trace(self):
         logger.info("AppBuilder Ending trace...")
-        del os.environ["APPBUILDER_SDK_TRACE_ENABLE"]
+        os.environ.pop("APPBUILDER_SDK_TRACE_ENABLE", None)
+        self.reload_trace_config()
+        self.force_flush()
         self._instrumentor._uninstrument()
 
+    @staticmethod
+    def set_trace_enabled(enabled: bool):
+        """
+        在运行时打开或关闭trace。关闭后被trace装饰的函数直接调用原函数，几乎没有额外开销。
+
+        Args:
+            enabled (bool): 是否开启trace。
+
+        Returns:
+            None
+        """
+        tracer_wrapper._trace_state.enabled = bool(enabled)
+
+    @staticmethod
+    def set_trace_debug(debug: bool):
+        """
+        设置trace的调试模式，开启后被trace装饰的函数出错时直接抛出原始异常，不再过滤trace相关的堆栈。
+
+        Args:
+            debug (bool): 是否开启调试模式。
+
+        Returns:
+            None
+        """
+        tracer_wrapper._trace_state.debug = bool(debug)
+
+    @staticmethod
+    def is_trace_enabled() -> bool:
+        """
+        返回当前是否开启了trace。
+
+        Returns:
+            bool: 是否开启trace。
+        """
+        return tracer_wrapper._trace_state.enabled
+
+    @staticmethod
+    def reload_trace_config():
+        """
+        重新从环境变量 ENABLE_SENTRY_TRACE/SENTRY_DSN、APPBUILDER_SDK_TRACE_ENABLE、APPBUILDER_TRACE_DEBUG 读取trace配置。
+        trace配置在导入appbuilder时读取一次并缓存，导入后修改环境变量需调用该方法才会生效。
+
+        Returns:
+            None
+        """
+        tracer_wrapper._trace_state.reload_from_env()
+
     def __enter__(self):
         self.start_trace()
         return self
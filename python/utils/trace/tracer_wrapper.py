@@ -17,7 +17,8 @@ import traceback
 #import _testcapi
 from functools import wraps
 
-def _whether_enable_trace():
+
+def _env_enable_trace():
     if os.environ.get('ENABLE_SENTRY_TRACE', None) == 'true' and os.environ.get('SENTRY_DSN', None):
         return True
     elif os.environ.get('APPBUILDER_SDK_TRACE_ENABLE', None) == 'true':
@@ -25,6 +26,52 @@ def _whether_enable_trace():
     else:
         return False
 
+
+class _TraceState(object):
+    """
+    trace开关的缓存状态，被装饰的函数每次调用时只读取该对象的属性，不再读取环境变量。
+
+    导入时根据环境变量 ENABLE_SENTRY_TRACE/SENTRY_DSN、APPBUILDER_SDK_TRACE_ENABLE、APPBUILDER_TRACE_DEBUG 初始化，
+    运行时可通过 AppBuilderTracer.set_trace_enabled/set_trace_debug/reload_trace_config 修改。
+    """
+    __slots__ = ("enabled", "debug")
+
+    def __init__(self):
+        self.reload_from_env()
+
+    def reload_from_env(self):
+        self.enabled = _env_enable_trace()
+        self.debug = os.getenv("APPBUILDER_TRACE_DEBUG", "None").lower() == "true"
+
+
+_trace_state = _TraceState()
+
+
+def _whether_enable_trace():
+    return _trace_state.enabled
+
+
+def _raise_without_trace_frames(e):
+    """
+    过滤掉与 "appbuilder/utils/trace" 相关的堆栈，以自定义的异常信息重新抛出当前正在处理的异常。
+    如果无法以自定义信息构造同类型的异常，则直接抛出原始异常。
+    新异常的 __context__ 指向原始异常。
+    """
+    exc_type, exc_value, exc_traceback = sys.exc_info()
+    tb = traceback.extract_tb(exc_traceback)
+    filtered_tb = [frame for frame in tb if "appbuilder/utils/trace" not in frame.filename]
+    formatted_lines = traceback.format_list(filtered_tb)
+    formatted_lines += traceback.format_exception_only(exc_type, exc_value)
+    custom_traceback = ''.join(formatted_lines)
+    exception_type = type(e)
+    try:
+        new_e = exception_type('\n'+custom_traceback)
+    except Exception:
+        raise e from None
+    # from None只隐藏原始异常的打印，原始异常仍保存在__context__中，供重试等逻辑判断异常原因
+    new_e.__context__ = e
+    raise new_e from None
+
 def session_post_func(func, *args, **kwargs):
     return func(*args, **kwargs)
 
@@ -79,40 +126,15 @@ def session_post(func):
 
     @wraps(func)
     def wrapper(*args, **kwargs):
-        if _whether_enable_trace():  
-            try:
-                return session_post_func(func, *args, **kwargs)
-            except Exception as e:
-                if os.getenv("APPBUILDER_TRACE_DEBUG", "None").lower() == "true":
-                    raise
-                else:
-                    exc_type, exc_value, exc_traceback = sys.exc_info()
-                    tb = traceback.extract_tb(exc_traceback)
-                    filtered_tb = [frame for frame in tb if "appbuilder/utils/trace" not in frame.filename]
-                    formatted_lines = traceback.format_list(filtered_tb)
-                    formatted_lines += traceback.format_exception_only(exc_type, exc_value)
-                    custom_traceback = ''.join(formatted_lines)
-                    exception_type = type(e)
-                    try:
-                        try:
-                            exception_type('\n'+custom_traceback)
-                        except Exception:
-                            raise e from None
-                        raise exception_type('\n'+custom_traceback) from None
-                    except:
-                        tp, exc, tb = sys.exc_info()
-                        #_testcapi.set_exc_info(tp, exc, tb.tb_next)
-                        del tp, exc, tb
-                        raise
-        else:
-            try:
-                return func(*args, **kwargs)
-            except:
-                tp, exc, tb = sys.exc_info()
-                #_testcapi.set_exc_info(tp, exc, tb.tb_next)
-                del tp, exc, tb
+        if not _trace_state.enabled:
+            return func(*args, **kwargs)
+        try:
+            return session_post_func(func, *args, **kwargs)
+        except Exception as e:
+            if _trace_state.debug:
                 raise
-                
+            _raise_without_trace_frames(e)
+
     return wrapper 
 
 
@@ -139,39 +161,14 @@ def client_run_trace(func):
     """
     @wraps(func)
     def wrapper(*args, **kwargs):
-        if _whether_enable_trace():
-            try:
-                return client_run_trace_func(func, *args, **kwargs)
-            except Exception as e:
-                if os.getenv("APPBUILDER_TRACE_DEBUG", "None").lower() == "true":
-                    raise
-                else:
-                    exc_type, exc_value, exc_traceback = sys.exc_info()
-                    tb = traceback.extract_tb(exc_traceback)
-                    filtered_tb = [frame for frame in tb if "appbuilder/utils/trace" not in frame.filename]
-                    formatted_lines = traceback.format_list(filtered_tb)
-                    formatted_lines += traceback.format_exception_only(exc_type, exc_value)
-                    custom_traceback = ''.join(formatted_lines)
-                    exception_type = type(e)
-                    try:
-                        try:
-                            exception_type('\n'+custom_traceback)
-                        except Exception:
-                            raise e from None
-                        raise exception_type('\n'+custom_traceback) from None
-                    except:
-                        tp, exc, tb = sys.exc_info()
-                        # _testcapi.set_exc_info(tp, exc, tb.tb_next)
-                        del tp, exc, tb
-                        raise
-        else:
-            try:
-                return func(*args, **kwargs)
-            except:
-                tp, exc, tb = sys.exc_info()
-                # _testcapi.set_exc_info(tp, exc, tb.tb_next)
-                del tp, exc, tb
+        if not _trace_state.enabled:
+            return func(*args, **kwargs)
+        try:
+            return client_run_trace_func(func, *args, **kwargs)
+        except Exception as e:
+            if _trace_state.debug:
                 raise
+            _raise_without_trace_frames(e)
 
     return wrapper 
 
@@ -197,39 +194,15 @@ def client_tool_trace(func):
     """
     @wraps(func)
     def wrapper(*args, **kwargs):
-        if _whether_enable_trace():
-            try:
-                return client_tool_trace_func(func, *args, **kwargs)
-            except Exception as e:
-                if os.getenv("APPBUILDER_TRACE_DEBUG", "None").lower() == "true":
-                    raise
-                else:
-                    exc_type, exc_value, exc_traceback = sys.exc_info()
-                    tb = traceback.extract_tb(exc_traceback)
-                    filtered_tb = [frame for frame in tb if "appbuilder/utils/trace" not in frame.filename]
-                    formatted_lines = traceback.format_list(filtered_tb)
-                    formatted_lines += traceback.format_exception_only(exc_type, exc_value)
-                    custom_traceback = ''.join(formatted_lines)
-                    exception_type = type(e)
-                    try:
-                        try:
-                            exception_type('\n'+custom_traceback)
-                        except Exception:
-                            raise e from None
-                        raise exception_type('\n'+custom_traceback) from None
-                    except:
-                        tp, exc, tb = sys.exc_info()
-                        # _testcapi.set_exc_info(tp, exc, tb.tb_next)
-                        del tp, exc, tb
-                        raise
-        else:
-            try:
-                return func(*args, **kwargs)
-            except:
-                tp, exc, tb = sys.exc_info()
-                # _testcapi.set_exc_info(tp, exc, tb.tb_next)
-                del tp, exc, tb
+        if not _trace_state.enabled:
+            return func(*args, **kwargs)
+        try:
+            return client_tool_trace_func(func, *args, **kwargs)
+        except Exception as e:
+            if _trace_state.debug:
                 raise
+            _raise_without_trace_frames(e)
+
     return wrapper 
 
 
@@ -255,40 +228,15 @@ def assistent_tool_trace(func):
     """
     @wraps(func)
     def wrapper(*args, **kwargs):
-        if _whether_enable_trace():
-            try:
-                return assistent_tool_trace_func(func, *args, **kwargs)
-            except Exception as e:
-                if os.getenv("APPBUILDER_TRACE_DEBUG", "None").lower() == "true":
-                    raise
-                else:
-                    exc_type, exc_value, exc_traceback = sys.exc_info()
-                    tb = traceback.extract_tb(exc_traceback)
-                    filtered_tb = [frame for frame in tb if "appbuilder/utils/trace" not in frame.filename]
-                    formatted_lines = traceback.format_list(filtered_tb)
-                    formatted_lines += traceback.format_exception_only(exc_type, exc_value)
-                    custom_traceback = ''.join(formatted_lines)
-                    exception_type = type(e)
-                    try:
-                        try:
-                            exception_type('\n'+custom_traceback)
-                        except Exception:
-                            raise e from None
-                        raise exception_type('\n'+custom_traceback) from None
-                    except:
-                        tp, exc, tb = sys.exc_info()
-                        # _testcapi.set_exc_info(tp, exc, tb.tb_next)
-                        del tp, exc, tb
-                        raise
-        else:
-            try:
-                return func(*args, **kwargs)
-            except:
-                tp, exc, tb = sys.exc_info()
-                # _testcapi.set_exc_info(tp, exc, tb.tb_next)
-                del tp, exc, tb
+        if not _trace_state.enabled:
+            return func(*args, **kwargs)
+        try:
+            return assistent_tool_trace_func(func, *args, **kwargs)
+        except Exception as e:
+            if _trace_state.debug:
                 raise
-    
+            _raise_without_trace_frames(e)
+
     return wrapper
 
 
@@ -313,40 +261,15 @@ def assistant_run_trace(func):
     """
     @wraps(func)
     def wrapper(*args, **kwargs):
-        if _whether_enable_trace():
-            try:
-                return assistant_run_trace_func(func, *args, **kwargs)
-            except Exception as e:
-                if os.getenv("APPBUILDER_TRACE_DEBUG", "None").lower() == "true":
-                    raise
-                else:
-                    exc_type, exc_value, exc_traceback = sys.exc_info()
-                    tb = traceback.extract_tb(exc_traceback)
-                    filtered_tb = [frame for frame in tb if "appbuilder/utils/trace" not in frame.filename]
-                    formatted_lines = traceback.format_list(filtered_tb)
-                    formatted_lines += traceback.format_exception_only(exc_type, exc_value)
-                    custom_traceback = ''.join(formatted_lines)
-                    exception_type = type(e)
-                    try:
-                        try:
-                            exception_type('\n'+custom_traceback)
-                        except Exception:
-                            raise e from None
-                        raise exception_type('\n'+custom_traceback) from None
-                    except:
-                        tp, exc, tb = sys.exc_info()
-                        # _testcapi.set_exc_info(tp, exc, tb.tb_next)
-                        del tp, exc, tb
-                        raise
-        else:
-            try:
-                return func(*args, **kwargs)
-            except:
-                tp, exc, tb = sys.exc_info()
-                # _testcapi.set_exc_info(tp, exc, tb.tb_next)
-                del tp, exc, tb
+        if not _trace_state.enabled:
+            return func(*args, **kwargs)
+        try:
+            return assistant_run_trace_func(func, *args, **kwargs)
+        except Exception as e:
+            if _trace_state.debug:
                 raise
-    
+            _raise_without_trace_frames(e)
+
     return wrapper 
 
 def assistent_stream_run_trace(func):
@@ -370,40 +293,15 @@ def assistent_stream_run_trace(func):
     """
     @wraps(func)
     def wrapper(*args, **kwargs):
-        if _whether_enable_trace():
-            try:
-                return assistent_stream_run_trace_func(func, *args, **kwargs)
-            except Exception as e:
-                if os.getenv("APPBUILDER_TRACE_DEBUG", "None").lower() == "true":
-                    raise
-                else:
-                    exc_type, exc_value, exc_traceback = sys.exc_info()
-                    tb = traceback.extract_tb(exc_traceback)
-                    filtered_tb = [frame for frame in tb if "appbuilder/utils/trace" not in frame.filename]
-                    formatted_lines = traceback.format_list(filtered_tb)
-                    formatted_lines += traceback.format_exception_only(exc_type, exc_value)
-                    custom_traceback = ''.join(formatted_lines)
-                    exception_type = type(e)
-                    try:
-                        try:
-                            exception_type('\n'+custom_traceback)
-                        except Exception:
-                            raise e from None
-                        raise exception_type('\n'+custom_traceback) from None
-                    except:
-                        tp, exc, tb = sys.exc_info()
-                        # _testcapi.set_exc_info(tp, exc, tb.tb_next)
-                        del tp, exc, tb
-                        raise
-        else:
-            try:
-                return func(*args, **kwargs)
-            except:
-                tp, exc, tb = sys.exc_info()
-                # _testcapi.set_exc_info(tp, exc, tb.tb_next)
-                del tp, exc, tb
+        if not _trace_state.enabled:
+            return func(*args, **kwargs)
+        try:
+            return assistent_stream_run_trace_func(func, *args, **kwargs)
+        except Exception as e:
+            if _trace_state.debug:
                 raise
-        
+            _raise_without_trace_frames(e)
+
     return wrapper 
 
 def assistent_stream_run_with_handler_trace(func):
@@ -428,40 +326,15 @@ def assistent_stream_run_with_handler_trace(func):
     """
     @wraps(func)
     def wrapper(*args, **kwargs):
-        if _whether_enable_trace():
-            try:
-                return assistant_stream_run_with_handler_trace_func(func, *args, **kwargs)
-            except Exception as e:
-                if os.getenv("APPBUILDER_TRACE_DEBUG", "None").lower() == "true":
-                    raise
-                else:
-                    exc_type, exc_value, exc_traceback = sys.exc_info()
-                    tb = traceback.extract_tb(exc_traceback)
-                    filtered_tb = [frame for frame in tb if "appbuilder/utils/trace" not in frame.filename]
-                    formatted_lines = traceback.format_list(filtered_tb)
-                    formatted_lines += traceback.format_exception_only(exc_type, exc_value)
-                    custom_traceback = ''.join(formatted_lines)
-                    exception_type = type(e)
-                    try:
-                        try:
-                            exception_type('\n'+custom_traceback)
-                        except Exception:
-                            raise e from None
-                        raise exception_type('\n'+custom_traceback) from None
-                    except:
-                        tp, exc, tb = sys.exc_info()
-                        # _testcapi.set_exc_info(tp, exc, tb.tb_next)
-                        del tp, exc, tb
-                        raise
-        else:
-            try:
-                return func(*args, **kwargs)
-            except:
-                tp, exc, tb = sys.exc_info()
-                # _testcapi.set_exc_info(tp, exc, tb.tb_next)
-                del tp, exc, tb
+        if not _trace_state.enabled:
+            return func(*args, **kwargs)
+        try:
+            return assistant_stream_run_with_handler_trace_func(func, *args, **kwargs)
+        except Exception as e:
+            if _trace_state.debug:
                 raise
-    
+            _raise_without_trace_frames(e)
+
     return wrapper 
 
 def components_run_trace(func):
@@ -485,40 +358,15 @@ def components_run_trace(func):
     """
     @wraps(func)
     def wrapper(*args, **kwargs):
-        if _whether_enable_trace():    
-            try:
-                return components_run_trace_func(func, *args, **kwargs)
-            except Exception as e:
-                if os.getenv("APPBUILDER_TRACE_DEBUG", "None").lower() == "true":
-                    raise
-                else:
-                    exc_type, exc_value, exc_traceback = sys.exc_info()
-                    tb = traceback.extract_tb(exc_traceback)
-                    filtered_tb = [frame for frame in tb if "appbuilder/utils/trace" not in frame.filename]
-                    formatted_lines = traceback.format_list(filtered_tb)
-                    formatted_lines += traceback.format_exception_only(exc_type, exc_value)
-                    custom_traceback = ''.join(formatted_lines)
-                    exception_type = type(e)
-                    try:
-                        try:
-                            exception_type('\n'+custom_traceback)
-                        except Exception:
-                            raise e from None
-                        raise exception_type('\n'+custom_traceback) from None
-                    except:
-                        tp, exc, tb = sys.exc_info()
-                        # _testcapi.set_exc_info(tp, exc, tb.tb_next)
-                        del tp, exc, tb
-                        raise
-        else:
-            try:
-                return func(*args, **kwargs)
-            except:
-                tp, exc, tb = sys.exc_info()
-                # _testcapi.set_exc_info(tp, exc, tb.tb_next)
-                del tp, exc, tb
+        if not _trace_state.enabled:
+            return func(*args, **kwargs)
+        try:
+            return components_run_trace_func(func, *args, **kwargs)
+        except Exception as e:
+            if _trace_state.debug:
                 raise
-                
+            _raise_without_trace_frames(e)
+
     return wrapper
 
 def components_run_stream_trace(func):
@@ -542,41 +390,15 @@ def components_run_stream_trace(func):
     """
     @wraps(func)
     def wrapper(*args, **kwargs):
-        if _whether_enable_trace():
-            try:
-                return components_run_stream_trace_func(func, *args, **kwargs)
-            except Exception as e:
-                if os.getenv("APPBUILDER_TRACE_DEBUG", "None").lower() == "true":
-                    raise
-                else:
-                    exc_type, exc_value, exc_traceback = sys.exc_info()
-                    tb = traceback.extract_tb(exc_traceback)
-                    filtered_tb = [frame for frame in tb if "appbuilder/utils/trace" not in frame.filename]
-                    formatted_lines = traceback.format_list(filtered_tb)
-                    formatted_lines += traceback.format_exception_only(exc_type, exc_value)
-                    custom_traceback = ''.join(formatted_lines)
-                    exception_type = type(e)
-                    try:
-                        try:
-                            exception_type('\n'+custom_traceback)
-                        except Exception:
-                            raise e from None
-                        raise exception_type('\n'+custom_traceback) from None
-                    except:
-                        tp, exc, tb = sys.exc_info()
-                        # _testcapi.set_exc_info(tp, exc, tb.tb_next)
-                        del tp, exc, tb
-                        raise
-        else:
-            try:
-                return func(*args, **kwargs)
-            except:
-                tp, exc, tb = sys.exc_info()
-                # _testcapi.set_exc_info(tp, exc, tb.tb_next)
-                del tp, exc, tb
+        if not _trace_state.enabled:
+            return func(*args, **kwargs)
+        try:
+            return components_run_stream_trace_func(func, *args, **kwargs)
+        except Exception as e:
+            if _trace_state.debug:
                 raise
-  
-    
+            _raise_without_trace_frames(e)
+
     return wrapper
 
 def list_trace(func):
@@ -600,39 +422,14 @@ def list_trace(func):
     """
     @wraps(func)
     def wrapper(*args, **kwargs):
-        if _whether_enable_trace():
-            try:
-                return list_trace_func(func, *args, **kwargs)
-            except Exception as e:
-                if os.getenv("APPBUILDER_TRACE_DEBUG", "None").lower() == "true":
-                    raise
-                else:
-                    exc_type, exc_value, exc_traceback = sys.exc_info()
-                    tb = traceback.extract_tb(exc_traceback)
-                    filtered_tb = [frame for frame in tb if "appbuilder/utils/trace" not in frame.filename]
-                    formatted_lines = traceback.format_list(filtered_tb)
-                    formatted_lines += traceback.format_exception_only(exc_type, exc_value)
-                    custom_traceback = ''.join(formatted_lines)
-                    exception_type = type(e)
-                    try:
-                        try:
-                            exception_type('\n'+custom_traceback)
-                        except Exception:
-                            raise e from None
-                        raise exception_type('\n'+custom_traceback) from None
-                    except:
-                        tp, exc, tb = sys.exc_info()
-                        # _testcapi.set_exc_info(tp, exc, tb.tb_next)
-                        del tp, exc, tb
-                        raise
-        else:
-            try:
-                return func(*args, **kwargs)
-            except:
-                tp, exc, tb = sys.exc_info()
-                # _testcapi.set_exc_info(tp, exc, tb.tb_next)
-                del tp, exc, tb
+        if not _trace_state.enabled:
+            return func(*args, **kwargs)
+        try:
+            return list_trace_func(func, *args, **kwargs)
+        except Exception as e:
+            if _trace_state.debug:
                 raise
-    
+            _raise_without_trace_frames(e)
+
     return wrapper
 
@@ -45,7 +45,8 @@ for package in packages:
     if package.startswith('appbuilder.utils'):
         package_data[package] = ["*.md"]
 
-serve_require = ["chainlit~=1.0.200", "flask~=2.3.2", "flask-restful==0.3.9", "arize-phoenix==4.5.0"]
+serve_require = ["chainlit~=1.0.200", "flask~=2.3.2", "flask-restful==0.3.9", "arize-phoenix==4.5.0",
+                 "starlette>=0.27.0", "uvicorn>=0.23.0"]
 trace_require = ["SQLAlchemy==2.0.31"]
 test_require = ["python-dotenv"]
 langchain_require = ["langchain==0.3.0", "datamodel-code-generator==0.25.8"]